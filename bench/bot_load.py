@@ -0,0 +1,273 @@
+# bench/bot_load.py
+"""
+Bot yük testi: sahte Bot API sunucusuna (bench/fake_bot_api.py) karşı binlerce
+sentetik kullanıcının /start, /sites, site toggle'ları ve /last akışını oynatır.
+
+İki mod ölçülür (aynı senaryo):
+- poll:    bot_poll_loop gerçek getUpdates uzun yoklamasıyla çalışır. Aynı anda
+           --concurrency kullanıcı aktiftir; her kullanıcı bir önceki update'ine
+           cevap (mesaja sendMessage, callback'e answerCallbackQuery) gelince
+           sıradakini gönderir. Gecikme = update'in sunucuya konmasından cevabın
+           sunucuya ulaşmasına kadar (kuyruk dahil).
+- webhook: lambda_webhook.lambda_handler her update için doğrudan çağrılır
+           (sıcak container); gecikme = handler süresi. HTTP yanıtında dönen
+           cevap (sendMessage/answerCallbackQuery) Telegram'ın yapacağı gibi sahte
+           sunucuya uygulanır ve inline_per_update olarak ayrıca raporlanır.
+
+Çıktı: gecikme yüzdelikleri (p50/p90/p99/max, ms), update başına giden
+Bot API çağrısı (metoda göre) ve callback başına atlanan (içerik aynı olduğu
+için hiç yapılmayan) menü düzenlemesi. SQLite backend'i geçici dosyada kullanılır.
+
+Kullanım:
+    python bench/bot_load.py [--users 1000] [--concurrency 50] [--latency-ms 10]
+                             [--p429 0] [--mode both|poll|webhook]
+"""
+import argparse, json, os, sys, tempfile, threading, time
+
+CURRENT_DIR  = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+if CURRENT_DIR not in sys.path:
+    sys.path.insert(0, CURRENT_DIR)
+
+from fake_bot_api import FakeBotAPI
+
+N_SITES = 12
+
+
+def _sites():
+    return [{"name": f"Bölüm {i}", "url": f"https://b{i}.example.edu.tr/tr/Duyuru"} for i in range(N_SITES)]
+
+
+def _script(uid: int, sites):
+    """
+    Bir kullanıcının sırayla göndereceği update gövdeleri (update_id'siz).
+    Callback'lerin message_id'si/klavyesi gönderim anında, kullanıcının gördüğü
+    son bot mesajından doldurulur (bkz. _fill).
+    """
+    a = sites[uid % len(sites)]["url"]
+    b = sites[(uid * 7 + 3) % len(sites)]["url"]
+    user = {"id": uid, "username": f"u{uid}"}
+    chat = {"id": uid, "type": "private"}
+
+    def msg(text):
+        return {"message": {"message_id": 1, "chat": chat, "from": user, "text": text}}
+
+    def cb(data, n):
+        return {"callback_query": {"id": f"{uid}:{n}", "data": data, "from": user,
+                                   "message": {"message_id": None, "chat": chat}}}
+
+    # "list" iki kez: çift dokunuş (aynı içerik → düzenleme atlanmalı)
+    return [msg("/start"), msg("/sites"), cb("sub|" + a, 1), cb("sub|" + b, 2),
+            cb("list", 3), cb("list", 4), cb("back", 5), msg("/last"), cb("back", 6),
+            cb("last", 7), cb("back", 8), cb("uns|" + a, 9)]
+
+
+def _fill(api, upd, last_mid):
+    """Callback'i Telegram gibi: butonun bulunduğu mesajın id'si ve o anki klavyesiyle."""
+    if "callback_query" in upd:
+        m = upd["callback_query"]["message"]
+        cid = m["chat"]["id"]
+        mid = last_mid.get(cid, 1)
+        shown = api.messages.get((cid, mid)) or {}
+        upd = dict(upd, callback_query=dict(upd["callback_query"], message=dict(
+            m, message_id=mid, reply_markup=shown.get("reply_markup"))))
+    return upd
+
+
+def _done_key(method, payload):
+    """Cevabın ait olduğu sohbet: mesaja sendMessage, callback'e answerCallbackQuery."""
+    if method == "sendMessage":
+        return payload.get("chat_id")
+    if method == "answerCallbackQuery":
+        return int(str(payload.get("callback_query_id", "0")).split(":")[0])
+    return None
+
+def _pct(xs, p):
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))]
+
+
+def _report(mode, lat_ms, api, n_updates, elapsed, lost=0, stats=None):
+    by_method = {}
+    for _t, m, _p in api.calls:
+        if mode == "webhook" and m == "getUpdates":
+            continue  # önceki poll modunun arka plan thread'i
+        by_method[m] = by_method.get(m, 0) + 1
+    out = {
+        "mode": mode, "updates": n_updates, "lost": lost, "seconds": round(elapsed, 2),
+        "updates_per_sec": round(n_updates / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_pct(lat_ms, 50), 1), "p90_ms": round(_pct(lat_ms, 90), 1),
+        "p99_ms": round(_pct(lat_ms, 99), 1), "max_ms": round(max(lat_ms or [0]), 1),
+        "calls_per_update": round(sum(by_method.values()) / n_updates, 2) if n_updates else 0.0,
+        "by_method": {m: round(c / n_updates, 2) for m, c in sorted(by_method.items())} if n_updates else {},
+    }
+    if stats and stats.get("callbacks"):
+        # eskiden her callback = answerCallbackQuery + yeni sendMessage; aynı içerikte düzenleme hiç yapılmaz
+        out.update(callbacks=stats["callbacks"], edits=stats["edits"],
+                   edits_skipped=stats["edits_skipped"], edit_fallbacks=stats["edit_fallbacks"],
+                   saved_per_callback=round(stats["edits_skipped"] / stats["callbacks"], 3))
+    if mode == "webhook" and n_updates:
+        out["inline_per_update"] = round(api.inline / n_updates, 2)
+    print(json.dumps(out, ensure_ascii=False))
+    return out
+
+
+def _seed(dbmod, conn, sites):
+    for s in sites:
+        for k in range(10):
+            dbmod.insert_seen(conn, s["url"], f"{hash((s['url'], k)) & (2**64 - 1):016x}",
+                              f"Duyuru {k}", f"{s['url']}/Detay/{k}")
+
+
+def run_poll(api, tg, dbmod, sites, users, concurrency):
+    conn = dbmod.init_db(os.path.join(tempfile.mkdtemp(prefix="botload"), "poll.db"))
+    dbmod.register_sites(conn, [s["url"] for s in sites])
+    _seed(dbmod, conn, sites)
+    api.calls.clear()
+
+    tg.BOT_STATS.update(dict.fromkeys(tg.BOT_STATS, 0))
+    lock = threading.Lock()
+    pending = {}                      # chat_id -> (adım, gönderim zamanı)
+    last_mid = {}                     # chat_id -> kullanıcının gördüğü son bot mesajı
+    scripts = {}
+    lat_ms = []
+    next_user = [0]
+    done = threading.Event()
+    total = users * len(_script(0, sites))
+
+    def _start_next_user():
+        # lock altında çağrılır
+        if next_user[0] >= users:
+            if not pending:
+                done.set()
+            return
+        uid = 10_000 + next_user[0]
+        next_user[0] += 1
+        scripts[uid] = _script(uid, sites)
+        pending[uid] = (0, time.perf_counter())
+        api.push_update(_fill(api, scripts[uid][0], last_mid))
+
+    def on_call(method, payload, result):
+        now = time.perf_counter()
+        if method == "sendMessage":
+            last_mid[payload.get("chat_id")] = result["message_id"]
+        cid = _done_key(method, payload)
+        with lock:
+            if cid not in pending:
+                return
+            step, t = pending.pop(cid)
+            lat_ms.append((now - t) * 1000)
+            step += 1
+            if step < len(scripts[cid]):
+                pending[cid] = (step, time.perf_counter())
+                api.push_update(_fill(api, scripts[cid][step], last_mid))
+            else:
+                del scripts[cid]
+                _start_next_user()
+
+    api.on_call = on_call
+    threading.Thread(target=tg.bot_poll_loop, args=(conn, sites), daemon=True).start()
+    t0 = time.perf_counter()
+    with lock:
+        for _ in range(min(concurrency, users)):
+            _start_next_user()
+
+    # 429 iki kez üst üste gelirse cevap hiç gelmeyebilir: ilerleme durursa bırak
+    last, still = -1, 0
+    while not done.wait(1.0):
+        with lock:
+            n = len(lat_ms)
+        still = still + 1 if n == last else 0
+        last = n
+        if still >= 15:
+            break
+    elapsed = time.perf_counter() - t0
+    api.on_call = None
+    with lock:
+        lost = len(pending)
+    return _report("poll", list(lat_ms), api, total, elapsed, lost=lost, stats=dict(tg.BOT_STATS))
+
+
+def run_webhook(api, sites, users):
+    from lambdapkg import lambda_webhook as lw
+    from storage import db as dbmod
+    from notifiers import telegram_bot as tg
+
+    lw._SITES_CACHE = sites
+    from lambdapkg import warm
+    conn, _info = warm.setup()
+    dbmod.register_sites(conn, [s["url"] for s in sites])
+    _seed(dbmod, conn, sites)
+    api.calls.clear()
+    api.inline = 0
+    tg.BOT_STATS.update(dict.fromkeys(tg.BOT_STATS, 0))
+    last_mid = {}
+
+    def on_call(method, payload, result):
+        if method == "sendMessage":
+            last_mid[payload.get("chat_id")] = result["message_id"]
+    api.on_call = on_call
+
+    scripts = [_script(20_000 + i, sites) for i in range(users)]
+    steps = len(scripts[0])
+    lat_ms = []
+    uid = 0
+    t0 = time.perf_counter()
+    # Kullanıcıları iç içe geçirerek oynat (aynı kullanıcının adımları sıralı)
+    for step in range(steps):
+        for sc in scripts:
+            uid += 1
+            ev = {"headers": {}, "body": json.dumps(dict(_fill(api, sc[step], last_mid), update_id=uid))}
+            t = time.perf_counter()
+            resp = lw.lambda_handler(ev, None)
+            lat_ms.append((time.perf_counter() - t) * 1000)
+            # Webhook yanıtındaki çağrıyı Telegram yapar: bot için dışarı çağrı değil
+            if resp.get("body", "").startswith("{"):
+                api.apply_webhook_reply(json.loads(resp["body"]))
+    elapsed = time.perf_counter() - t0
+    api.on_call = None
+    return _report("webhook", lat_ms, api, users * steps, elapsed, stats=dict(tg.BOT_STATS))
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Sahte Bot API'ye karşı bot yük testi")
+    ap.add_argument("--users", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=50)
+    ap.add_argument("--latency-ms", type=float, default=10.0)
+    ap.add_argument("--p429", type=float, default=0.0)
+    ap.add_argument("--mode", choices=("both", "poll", "webhook"), default="both")
+    a = ap.parse_args()
+
+    api = FakeBotAPI(latency_ms=a.latency_ms, p429=a.p429)
+    base = api.start()
+
+    # Bot modülleri import edilmeden önce: sahte sunucu, geçici SQLite, sessiz log
+    tmp = tempfile.mkdtemp(prefix="botload")
+    os.environ.update({
+        "DB_BACKEND": "sqlite", "DB_PATH": os.path.join(tmp, "webhook.db"),
+        "TELEGRAM_BOT_TOKEN": "123:LOAD", "TELEGRAM_API_BASE": base,
+        "TELEGRAM_SECRET_TOKEN": "",
+    })
+    os.environ.pop("DATABASE_URL", None)
+    import logging
+    logging.disable(logging.WARNING)
+
+    from storage import db as dbmod
+    from notifiers import telegram_bot as tg
+
+    sites = _sites()
+    print(f"Sahte Bot API: {base}  kullanıcı={a.users}  gecikme={a.latency_ms}ms  p429={a.p429}")
+    if a.mode in ("both", "poll"):
+        run_poll(api, tg, dbmod, sites, a.users, a.concurrency)
+    if a.mode in ("both", "webhook"):
+        run_webhook(api, sites, a.users)
+    api.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+# bench/fake_bot_api.py
+"""
+Yerel, sahte Telegram Bot API sunucusu (yük testi / geliştirme için).
+
+Desteklenen metotlar: getUpdates (uzun yoklama + offset onayı), sendMessage,
+editMessageText, editMessageReplyMarkup, answerCallbackQuery. Her çağrı
+kaydedilir (webhook yanıtında dönen çağrılar apply_webhook_reply ile ayrıca sayılır); gecikme ve 429 (retry_after) olasılıkla simüle edilir. Gönderilen
+mesajlar saklanır: düzenlemede içerik aynıysa gerçek API gibi 400
+"message is not modified", mesaj yoksa 400 "message to edit not found" döner.
+
+Bot'u buna yönlendirmek için (bot modülleri import edilmeden önce):
+    TELEGRAM_API_BASE=http://127.0.0.1:8081
+
+Tek başına çalıştırma:
+    python bench/fake_bot_api.py --port 8081 --latency-ms 30 --p429 0.01
+Kod içinden: bkz. bench/bot_load.py (FakeBotAPI().start()).
+"""
+import argparse, json, random, socket, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+_METHODS = ("sendMessage", "editMessageText", "editMessageReplyMarkup", "answerCallbackQuery")
+
+
+class FakeBotAPI:
+    def __init__(self, latency_ms: float = 0.0, p429: float = 0.0, retry_after: int = 1):
+        self.latency_ms = latency_ms
+        self.p429 = p429
+        self.retry_after = retry_after
+        self.calls = []            # (zaman, metot, payload)
+        self.on_call = None        # callable(metot, payload, result) — başarılı çağrıdan sonra
+        self.messages = {}         # (chat_id, message_id) -> {"text", "reply_markup"}
+        self.inline = 0            # webhook yanıtında taşınan (dışarı çağrı gerektirmeyen) cevaplar
+        self._updates = []         # bekleyen update'ler (update_id sıralı)
+        self._next_update_id = 1
+        self._next_msg_id = 1
+        self._cv = threading.Condition()
+        self._server = None
+
+    # --- kontrol ---
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # requests.Session keep-alive kullanabilsin
+
+            def setup(self):
+                super().setup()
+                # başlık ve gövde ayrı yazılıyor; Nagle + gecikmeli ACK ~40 ms eklemesin
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, code, obj):
+                body = json.dumps(obj).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _handle(self, payload):
+                parts = urlparse(self.path).path.strip("/").split("/")
+                method = parts[-1] if len(parts) >= 2 and parts[0].startswith("bot") else ""
+                code, obj = api.dispatch(method, payload)
+                self._reply(code, obj)
+
+            def do_GET(self):
+                qs = parse_qs(urlparse(self.path).query)
+                self._handle({k: v[-1] for k, v in qs.items()})
+
+            def do_POST(self):
+                n = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(n) if n else b""
+                try:
+                    payload = json.loads(raw or b"{}")
+                except ValueError:
+                    payload = {k: v[-1] for k, v in parse_qs(raw.decode("utf-8")).items()}
+                self._handle(payload)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="fake-bot-api", daemon=True).start()
+        h, p = self._server.server_address[:2]
+        return f"http://{h}:{p}"
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def push_update(self, update: dict) -> int:
+        """update_id atar, kuyruğa koyar ve getUpdates bekleyenlerini uyandırır."""
+        with self._cv:
+            uid = self._next_update_id
+            self._next_update_id += 1
+            update = dict(update, update_id=uid)
+            self._updates.append(update)
+            self._cv.notify_all()
+        return uid
+
+    def apply_webhook_reply(self, action: dict):
+        """
+        Webhook HTTP yanıtında dönen {"method": …} çağrısını Telegram'ın yapacağı gibi
+        uygular. Botun dışarı yaptığı bir çağrı olmadığı için calls'a değil inline'a sayılır.
+        """
+        payload = {k: v for k, v in action.items() if k != "method"}
+        with self._cv:
+            self.inline += 1
+        return self.dispatch(action.get("method", ""), payload, inline=True)
+
+    def count(self, method: str | None = None) -> int:
+        return sum(1 for _t, m, _p in self.calls if method is None or m == method)
+
+    # --- Bot API ---
+    def dispatch(self, method: str, payload: dict, inline: bool = False):
+        if method == "getUpdates":
+            with self._cv:
+                self.calls.append((time.monotonic(), method, payload))
+            return 200, {"ok": True, "result": self._get_updates(payload)}
+
+        if self.latency_ms and not inline:
+            time.sleep(self.latency_ms / 1000.0 * random.uniform(0.5, 1.5))
+        if method not in _METHODS:
+            return 404, {"ok": False, "error_code": 404, "description": "Not Found: method not found"}
+        if self.p429 and not inline and random.random() < self.p429:
+            with self._cv:
+                self.calls.append((time.monotonic(), method + ":429", payload))
+            return 429, {"ok": False, "error_code": 429,
+                         "description": f"Too Many Requests: retry after {self.retry_after}",
+                         "parameters": {"retry_after": self.retry_after}}
+
+        with self._cv:
+            if not inline:
+                self.calls.append((time.monotonic(), method, payload))
+            code, result = 200, True
+            if method == "sendMessage":
+                mid = self._next_msg_id
+                self._next_msg_id += 1
+                self.messages[(payload.get("chat_id"), mid)] = {
+                    "text": payload.get("text", ""), "reply_markup": payload.get("reply_markup")}
+                result = {"message_id": mid, "chat": {"id": payload.get("chat_id")},
+                          "date": int(time.time()), "text": payload.get("text", "")}
+            elif method.startswith("editMessage"):
+                key = (payload.get("chat_id"), payload.get("message_id"))
+                msg = self.messages.get(key)
+                new = dict(msg or {}, reply_markup=payload.get("reply_markup"))
+                if method == "editMessageText":
+                    new["text"] = payload.get("text", "")
+                if msg is None:
+                    code, desc = 400, "Bad Request: message to edit not found"
+                elif new == msg:
+                    code, desc = 400, "Bad Request: message is not modified"
+                else:
+                    self.messages[key] = new
+                    result = {"message_id": key[1], "chat": {"id": key[0]}, "text": new.get("text", "")}
+        if code != 200:
+            return code, {"ok": False, "error_code": code, "description": desc}
+        if self.on_call:
+            self.on_call(method, payload, result)
+        return 200, {"ok": True, "result": result}
+
+    def _get_updates(self, params: dict):
+        offset = int(params.get("offset") or 0)
+        timeout = min(float(params.get("timeout") or 0), 50.0)
+        limit = int(params.get("limit") or 100)
+        end = time.monotonic() + timeout
+        with self._cv:
+            # offset'ten küçük update'ler onaylanmış sayılır ve silinir
+            self._updates = [u for u in self._updates if u["update_id"] >= offset]
+            while not self._updates:
+                left = end - time.monotonic()
+                if left <= 0:
+                    return []
+                self._cv.wait(left)
+                self._updates = [u for u in self._updates if u["update_id"] >= offset]
+            return self._updates[:limit]
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Sahte Telegram Bot API sunucusu")
+    ap.add_argument("--port", type=int, default=8081)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--p429", type=float, default=0.0)
+    a = ap.parse_args()
+    api = FakeBotAPI(latency_ms=a.latency_ms, p429=a.p429)
+    print("Dinleniyor:", api.start(port=a.port), "(Ctrl+C ile çık)")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        api.stop()
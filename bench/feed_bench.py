@@ -0,0 +1,267 @@
+# bench/feed_bench.py
+"""
+RSS/Atom/JSON akışları (scraper/feeds.py) ile tarama.
+
+Yerel bir HTTP sunucusu dört site sunar; her liste sayfası aynı duyuruları
+HTML olarak da listeler:
+- rss:  RSS 2.0 (content:encoded ile uzun metin, ETag/304) + bir yorum akışı,
+- atom: Atom, yalnızca kısa özet (detay sayfası yine gerekir),
+- json: JSON Feed, en yeni girdisi 90 gün önce (bayat → HTML),
+- html: akış yok.
+
+Tur 1 (HTML, keşif) → rss ve atom akışları benimsenir, json benimsenmez.
+Tur 2: her siteye bir duyuru eklenir; rss'te liste sayfası ve detay sayfası
+hiç çekilmez, atom'da yalnızca yeni duyurunun detayı çekilir, json/html HTML'le
+devam eder. Tur 3: rss akışı değişmedi (304), site atlanır. Ayrıca: akış
+girdileri HTML yolunun verdiği başlık/link ile aynıdır, tarih biçimi
+try_parse_tr_date ile aynıdır, akıştan (detaysız) kaydedilen öğenin ilk
+yeniden ziyareti "güncellendi" bildirimi açmaz, pick_selector akışı bulur.
+Son olarak büyük bir akışta akışlı ayrıştırmanın FEED_MAX_ITEMS'ta durması
+(süre ve bellek) ölçülür.
+
+Kullanım:
+    python bench/feed_bench.py [N]
+"""
+import argparse, json, os, sys, tempfile, threading, time, tracemalloc
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CURRENT_DIR  = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+TMP = tempfile.mkdtemp(prefix="feed")
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SMTP_HOST"] = ""
+os.environ["PAGE_CACHE_PATH"] = os.path.join(TMP, "pagecache.db")
+os.environ["NEARDUP_MAX_DISTANCE"] = "-1"
+
+import logging
+logging.disable(logging.WARNING)
+
+KINDS = ("rss", "atom", "json", "html")
+COUNT = {}                 # site → duyuru sayısı
+REQ = {}                   # (site, tür) → istek sayısı; tür: list, feed, detail, comments
+HITS304 = {"n": 0}
+LOCK = threading.Lock()
+NOW = datetime.now(timezone(timedelta(hours=3)))
+
+
+def _date(kind, i):
+    age = timedelta(days=90) if kind == "json" else timedelta(hours=COUNT[kind] - i)
+    return NOW - age
+
+
+def _body(kind, i):
+    return (f"Duyuru {i} ayrıntıları: lisansüstü başvuruları çevrimiçi alınacaktır. Son başvuru tarihi, "
+            f"gerekli belgeler ve mülakat takvimi bu duyuruda yer almaktadır. Adayların belgelerini "
+            f"eksiksiz yüklemesi ve sonuçları enstitü sayfasından takip etmesi gerekmektedir ({kind}).")
+
+
+def _list_page(kind, base):
+    feed = {"rss": ("application/rss+xml", "feed.xml"), "atom": ("application/atom+xml", "atom.xml"),
+            "json": ("application/feed+json", "feed.json")}.get(kind)
+    head = ""
+    if feed:
+        head = (f"<link rel='alternate' type='{feed[0]}' title='Yorumlar' href='{base}/{kind}/comments/feed'>"
+                f"<link rel='alternate' type='{feed[0]}' title='Duyurular' href='{base}/{kind}/{feed[1]}'>")
+    items = "".join(f"<li><a href='{base}/{kind}/detay/{i}'>{kind.upper()} duyurusu {i}</a></li>"
+                    for i in reversed(range(COUNT[kind])))
+    return f"<html><head>{head}</head><body><ul class='list'>{items}</ul></body></html>"
+
+
+def _rss(kind, base, n=None):
+    items = "".join(
+        f"<item><title>{kind.upper()} duyurusu {i}</title><link>{base}/{kind}/detay/{i}</link>"
+        f"<guid>{base}/{kind}/detay/{i}</guid><pubDate>{format_datetime(_date(kind, i))}</pubDate>"
+        f"<description>Kısa özet {i}</description>"
+        f"<content:encoded><![CDATA[<p>{_body(kind, i)}</p>]]></content:encoded></item>"
+        for i in reversed(range(n if n is not None else COUNT[kind])))
+    return (f"<?xml version='1.0' encoding='UTF-8'?><rss version='2.0' "
+            f"xmlns:content='http://purl.org/rss/1.0/modules/content/'><channel><title>{kind}</title>"
+            f"<link>{base}/{kind}/list</link>{items}</channel></rss>")
+
+
+def _atom(kind, base):
+    items = "".join(
+        f"<entry><title>{kind.upper()} duyurusu {i}</title><link rel='alternate' href='{base}/{kind}/detay/{i}'/>"
+        f"<id>tag:{kind},{i}</id><updated>{_date(kind, i).isoformat()}</updated><summary>Kısa özet {i}</summary></entry>"
+        for i in reversed(range(COUNT[kind])))
+    return f"<?xml version='1.0' encoding='utf-8'?><feed xmlns='http://www.w3.org/2005/Atom'><title>{kind}</title>{items}</feed>"
+
+
+def _json(kind, base):
+    return json.dumps({"version": "https://jsonfeed.org/version/1.1", "title": kind, "items": [
+        {"id": str(i), "url": f"{base}/{kind}/detay/{i}", "title": f"{kind.upper()} duyurusu {i}",
+         "content_html": f"<p>{_body(kind, i)}</p>", "date_published": _date(kind, i).isoformat()}
+        for i in reversed(range(COUNT[kind]))]}, ensure_ascii=False)
+
+
+def _detail(kind, i):
+    return (f"<html><body><article><h1>{kind.upper()} duyurusu {i}</h1><p>{_body(kind, i)}</p>"
+            f"</article></body></html>")
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code, body="", ctype="text/html; charset=utf-8", etag=None):
+        data = body.encode()
+        self.send_response(code)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        parts = self.path.strip("/").split("/")
+        kind, what = parts[0], parts[1]
+        with LOCK:
+            key = (kind, "detail" if what == "detay" else "comments" if what == "comments" else
+                   "list" if what == "list" else "feed")
+            REQ[key] = REQ.get(key, 0) + 1
+        if what == "list":
+            return self._send(200, _list_page(kind, base))
+        if what == "detay":
+            return self._send(200, _detail(kind, int(parts[2])))
+        if what == "comments":
+            return self._send(200, _rss(kind, base, 0), "application/rss+xml")
+        if what == "feed.xml":
+            etag = f'"rss-{COUNT[kind]}"'
+            if self.headers.get("If-None-Match") == etag:
+                HITS304["n"] += 1
+                return self._send(304, etag=etag)
+            return self._send(200, _rss(kind, base), "application/rss+xml; charset=utf-8", etag)
+        if what == "atom.xml":
+            return self._send(200, _atom(kind, base), "application/atom+xml")
+        if what == "feed.json":
+            return self._send(200, _json(kind, base), "application/feed+json")
+        self._send(404)
+
+
+def _delta(before):
+    with LOCK:
+        return {k: v - before.get(k, 0) for k, v in REQ.items() if v - before.get(k, 0)}
+
+
+def main(n: int) -> int:
+    from storage import db as dbmod
+    import monitor
+    import pick_selector
+    from scraper import feeds
+    from scraper.site_monitor import extract_list_links, fetch
+    from scraper.revisit import revisit_due
+    from formatters.textfmt import try_parse_tr_date
+
+    for k in KINDS:
+        COUNT[k] = n
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    sites = [{"name": k, "url": f"{base}/{k}/list", "list_selector": "ul.list", "item_link_selector": "a",
+              "include_url_regex": "/detay/"} for k in KINDS]
+
+    conn = dbmod.init_db(os.path.join(TMP, "f.db"))
+    dbmod.register_sites(conn, [s["url"] for s in sites])
+    dbmod.upsert_user(conn, 1, "u1")
+    for s in sites:
+        dbmod.toggle_site_sub(conn, 1, s["url"])
+    checks = {}
+
+    def cycle():
+        dbmod.warm_seen(conn, [s["url"] for s in sites])
+        return {s["name"]: monitor.notify_one_site(conn, s) for s in sites}
+
+    # tur 1: HTML + keşif
+    new1 = cycle()
+    adopted = {s["name"]: feeds.site_feed(conn, s) for s in sites}
+    checks["tur 1: tüm duyurular yeni"] = all(v == n for v in new1.values())
+    checks["keşif: rss/atom benimsendi, bayat json ve yorum akışı değil"] = (
+        adopted["rss"] == f"{base}/rss/feed.xml" and adopted["atom"] == f"{base}/atom/atom.xml"
+        and adopted["json"] is None and adopted["html"] is None)
+
+    # akış girdileri HTML yoluyla aynı başlık/link; tarih biçimi aynı
+    html_items = extract_list_links(fetch(f"{base}/rss/list"), "ul.list", "a", f"{base}/rss/list")
+    feed_items = feeds.fetch_feed(f"{base}/rss/feed.xml")[0]
+    checks["akış girdisi = HTML girdisi (başlık, link)"] = (
+        [(it["title"], it["url"]) for it in feed_items] == [(it["title"], it["url"]) for it in html_items])
+    checks["tarih biçimi (try_parse_tr_date)"] = all(
+        try_parse_tr_date(it["date"]) == it["date"] for it in feed_items)
+
+    # tur 2: her siteye bir duyuru
+    for k in KINDS:
+        COUNT[k] += 1
+    before = dict(REQ)
+    new2 = cycle()
+    d = _delta(before)
+    checks["tur 2: her sitede 1 yeni"] = all(v == 1 for v in new2.values())
+    checks["rss: liste ve detay sayfası çekilmedi"] = (
+        d.get(("rss", "list"), 0) == 0 and d.get(("rss", "detail"), 0) == 0 and d.get(("rss", "feed")) == 1)
+    checks["atom: kısa özet → yalnızca yeni duyurunun detayı"] = (
+        d.get(("atom", "list"), 0) == 0 and d.get(("atom", "detail")) == 1)
+    checks["json (bayat) ve html: HTML yolu"] = d.get(("json", "list")) == 1 and d.get(("html", "list")) == 1
+
+    # tur 3: rss akışı değişmedi (304) → site atlanır
+    before = dict(REQ)
+    new3 = cycle()
+    d = _delta(before)
+    checks["tur 3: değişmeyen akış 304, site atlandı"] = (
+        new3["rss"] == 0 and HITS304["n"] == 1 and d.get(("rss", "list"), 0) == 0)
+
+    # akıştan (detaysız) kaydedilen öğe: ilk yeniden ziyaret taban özet yazar, bildirim açmaz
+    rss_url = f"{base}/rss/detay/{n}"
+    conn.write(lambda c: c.execute("UPDATE seen_item SET next_check = datetime('now', '-1 seconds') WHERE url = ?;",
+                                   (rss_url,)))
+    revisit_due(conn, {s["url"]: s for s in sites})
+    rd = conn.read()
+    edits = rd.execute("SELECT COUNT(*) FROM notification_outbox WHERE channel='tg_edit';").fetchone()[0]
+    ch = rd.execute("SELECT content_hash FROM seen_item WHERE url = ?;", (rss_url,)).fetchone()[0]
+    checks["akış öğesinin ilk yeniden ziyareti bildirim açmaz"] = edits == 0 and ch is not None
+
+    # pick_selector: akış bulunur
+    res = pick_selector.discover_site(dict(sites[0], detail_selector="article"))
+    checks["pick_selector feed_url bulur"] = res.get("feed_url") == f"{base}/rss/feed.xml"
+
+    # büyük akış: akışlı ayrıştırma FEED_MAX_ITEMS'ta durur
+    COUNT["big"] = 20000
+    big = _rss("big", base).encode()
+    chunks = [big[i:i + 16384] for i in range(0, len(big), 16384)]
+    consumed = {"n": 0}
+
+    def stream():
+        for c in chunks:
+            consumed["n"] += 1
+            yield c
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    head = feeds.parse_feed(stream(), base, max_items=50)
+    early = time.perf_counter() - t0
+    peak_early = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    t0 = time.perf_counter()
+    full = feeds.parse_feed(iter(chunks), base, max_items=10**9)
+    whole = time.perf_counter() - t0
+    checks["büyük akış: 50 girdide durur"] = len(head) == 50 and consumed["n"] < len(chunks) / 10
+    checks["büyük akış: tamamı okunabilir"] = len(full) == 20000
+
+    print(f"duyuru/site: {n}  tur 1 yeni: {new1}  tur 2: {new2}  tur 3: {new3}")
+    print(f"büyük akış ({len(big) // 1024} KB, 20000 girdi): ilk 50 → {early * 1000:.1f} ms, "
+          f"{consumed['n']}/{len(chunks)} parça, tepe bellek {peak_early // 1024} KB; "
+          f"tamamı → {whole * 1000:.0f} ms")
+    for name, ok in checks.items():
+        print(f"{'OK ' if ok else 'FAIL'} {name}")
+    srv.shutdown()
+    conn.close()
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="RSS/Atom/JSON akışlarıyla tarama ve akışlı ayrıştırma")
+    ap.add_argument("n", nargs="?", type=int, default=12, help="site başına duyuru sayısı (varsayılan: 12)")
+    sys.exit(main(ap.parse_args().n))
@@ -0,0 +1,71 @@
+# bench/import_budget.py
+"""
+Soğuk başlangıç import bütçesi: her giriş noktası `python -X importtime`
+ile ayrı bir süreçte import edilir. Bütçeyi aşan veya kendi yolunda
+gerekmeyen ağır bir modülü yükleyen giriş noktası varsa çıkış kodu 1.
+
+Kullanım:
+    python bench/import_budget.py            # tüm giriş noktaları
+    python bench/import_budget.py -v         # en ağır 10 modülü de göster
+    IMPORT_BUDGET_SCALE=2 python bench/...   # yavaş makinede bütçeleri ölçekle
+"""
+import argparse, os, subprocess, sys
+
+CURRENT_DIR  = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+
+# giriş noktası → (bütçe ms, import edilmemesi gereken modüller)
+BUDGETS = {
+    "lambdapkg.lambda_webhook": (60,  ("bs4", "requests", "yaml", "psycopg", "smtplib", "playwright")),
+    "lambdapkg.lambda_scraper": (250, ("smtplib", "playwright", "psycopg")),
+    "monitor":                  (250, ("smtplib", "playwright", "psycopg")),
+}
+RUNS = 3  # her giriş noktası için en iyi (en düşük) ölçüm alınır
+
+
+def measure(module: str):
+    """(toplam µs, {modül: kümülatif µs}) — tek bir temiz süreçte."""
+    p = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                       cwd=PROJECT_ROOT, capture_output=True, text=True)
+    if p.returncode != 0:
+        raise RuntimeError(f"{module} import edilemedi:\n{p.stderr[-2000:]}")
+    mods = {}
+    for line in p.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cum_us, name = [x.strip() for x in line.replace("import time:", "|", 1).split("|")]
+        if name == "site":
+            mods = {}  # yorumlayıcı açılışı (site ve bağımlılıkları) sayılmaz
+            continue
+        mods[name] = int(cum_us)
+    return mods.get(module, 0), mods
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Giriş noktalarının soğuk başlangıç import bütçesi")
+    ap.add_argument("-v", "--verbose", action="store_true", help="en ağır 10 modülü de göster")
+    verbose = ap.parse_args().verbose
+    scale = float(os.environ.get("IMPORT_BUDGET_SCALE", "1"))
+    failed = 0
+    for module, (budget_ms, forbidden) in BUDGETS.items():
+        best, mods = None, {}
+        for _ in range(RUNS):
+            total, m = measure(module)
+            if best is None or total < best:
+                best, mods = total, m
+        limit = budget_ms * scale
+        loaded = [f for f in forbidden if f in mods]
+        ok = best / 1000 <= limit and not loaded
+        failed += not ok
+        print(f"{'OK ' if ok else 'FAIL'} {module:<26} {best / 1000:7.1f} ms (bütçe {limit:.0f} ms)"
+              + (f"  gereksiz: {', '.join(loaded)}" if loaded else ""))
+        if verbose:
+            top = sorted(((v, k) for k, v in mods.items() if k != module and "." not in k),
+                         reverse=True)[:10]
+            for us, name in top:
+                print(f"       {us / 1000:7.1f} ms  {name}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
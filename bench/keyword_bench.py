@@ -0,0 +1,121 @@
+# bench/keyword_bench.py
+"""
+Anahtar kelime abonelikleri: Aho–Corasick otomatı (storage/keywords.py).
+
+1) Ölçek: U kullanıcı, her biri ~3 ifade (yaklaşık 2000 farklı ifadelik bir
+   havuzdan; bazıları site kapsamlı) takip eder. Öğe başına eşleme süresi
+   yazılır: otomat geçişi kullanıcı sayısından bağımsızdır, yalnızca bulunan
+   alıcıları toplamak alıcı sayısıyla büyür. Sonuçlar naif taramayla
+   karşılaştırılır (fark = 0 olmalı).
+2) Artımlı güncelleme: abonelik ekleme/silme süresi, tüm otomatı baştan
+   kurma süresiyle karşılaştırılır.
+3) Uçtan uca (SQLite, geçici dosya): siteye abone olmayan bir kullanıcı,
+   ifadesi geçen duyuru için outbox satırı alır; geçmeyen için almaz; başka
+   siteye kapsamlı ifade eşleşmez.
+
+Kullanım:
+    python bench/keyword_bench.py                # 1k, 10k, 50k kullanıcı
+    python bench/keyword_bench.py 1000 100000
+"""
+import argparse, os, random, sys, tempfile, time
+
+CURRENT_DIR  = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+os.environ["DB_BACKEND"] = "sqlite"
+
+from formatters.textfmt import text_hash
+from storage.keywords import KeywordIndex, KEYWORDS, normalize_keyword
+
+WORDS = ("öğrenci sınav ders kayıt başvuru tarih burs staj mezuniyet program bölüm fakülte "
+         "akademik takvim ilan sonuç liste yüksek lisans doktora seminer konferans etkinlik "
+         "duyuru yarıyıl güz bahar dönem final bütünleme ekle bırak danışman onay belge "
+         "transkript harç ücret yatay geçiş çift anadal yandal erasmus değişim laboratuvar "
+         "proje teslim rapor sunum komisyon karar yönetmelik madde uyarınca gereken").split()
+SITES = [f"https://s{i}.example.edu.tr/tr/Duyuru" for i in range(8)]
+
+
+def _pool(rng, n=2000):
+    pool = set()
+    while len(pool) < n:
+        pool.add(normalize_keyword(" ".join(rng.sample(WORDS, rng.choice((1, 2, 2, 3))))))
+    return sorted(pool)
+
+
+def _subs(rng, users, pool):
+    out = set()
+    for chat_id in range(users):
+        for _ in range(3):
+            out.add((chat_id, rng.choice(pool), rng.choice(SITES) if rng.random() < 0.3 else ""))
+    return out
+
+
+def _naive(subs, site_url, text):
+    t = " " + normalize_keyword(text)
+    return {c for c, kw, su in subs if " " + kw in t and su in ("", site_url)}
+
+
+def _loaded(subs):
+    idx = KeywordIndex()
+    idx.ensure(None, lambda _conn: list(subs))
+    return idx
+
+
+def run(users: int, items: int = 500):
+    rng = random.Random(users)
+    subs = _subs(rng, users, _pool(rng))
+    t0 = time.perf_counter()
+    idx = _loaded(subs)
+    idx.recipients(SITES[0], "")   # bağlantıları kur
+    build = time.perf_counter() - t0
+
+    docs = [(rng.choice(SITES), " ".join(rng.choices(WORDS, k=rng.randint(60, 140)))) for _ in range(items)]
+    t0 = time.perf_counter()
+    hits = 0
+    for su, text in docs:
+        hits += len(idx.recipients(su, text))
+    match = (time.perf_counter() - t0) / items
+
+    bad = sum(idx.recipients(su, text) != _naive(subs, su, text) for su, text in docs[:50])
+
+    # artımlı: yeni ifade ekle + ilk eşleme (bağlantılar) / abonelik sil
+    t0 = time.perf_counter()
+    for i in range(100):
+        idx.add(10**9 + i, f"yeni ifade {i}")
+        idx.recipients(SITES[0], "kısa metin")
+    incr = (time.perf_counter() - t0) / 100
+    print(f"kullanıcı={users:>7}  ifade={idx.patterns:>5}  kurulum {build * 1000:7.1f} ms  "
+          f"öğe başına eşleme {match * 1000:.2f} ms (ort. {hits / items:.0f} alıcı)  "
+          f"ekleme+bağlantı {incr * 1000:.2f} ms  naif fark {bad}")
+    return bad == 0
+
+
+def end_to_end():
+    from storage import db as dbmod
+    conn = dbmod.init_db(os.path.join(tempfile.mkdtemp(prefix="kw"), "kw.db"))
+    KEYWORDS.clear()
+    a, b = SITES[0], SITES[1]
+    dbmod.register_sites(conn, [a, b])
+    for chat_id in (1, 2, 3):
+        dbmod.upsert_user(conn, chat_id, f"u{chat_id}")
+    dbmod.toggle_site_sub(conn, 1, a)                       # 1: site aboneliği
+    dbmod.add_keyword(conn, 2, "Staj Başvuru")               # 2: ifade, tüm siteler (önek: "başvuruları")
+    dbmod.add_keyword(conn, 3, "staj", [b])                  # 3: ifade, yalnızca b
+    dbmod.insert_seen(conn, a, text_hash(a + "/1"), "STAJ BAŞVURULARI başladı", a + "/1", "Yaz stajı için...")
+    dbmod.insert_seen(conn, a, text_hash(a + "/2"), "Sınav takvimi", a + "/2", "Final sınavları")
+    rows = conn.read().execute(
+        "SELECT recipient, COUNT(*) FROM notification_outbox GROUP BY recipient ORDER BY recipient;").fetchall()
+    ok = dict(rows) == {"1": 2, "2": 1}
+    print(f"uçtan uca: outbox alıcı → satır {dict(rows)}  {'OK' if ok else 'HATA'}")
+    conn.close()
+    return ok
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Anahtar kelime abonelikleri: Aho-Corasick eşleme maliyeti")
+    ap.add_argument("sizes", nargs="*", type=int, default=[1_000, 10_000, 50_000],
+                    help="kullanıcı sayıları (varsayılan: 1k 10k 50k)")
+    ok = all([run(n) for n in ap.parse_args().sizes])
+    sys.exit(0 if end_to_end() and ok else 1)
@@ -0,0 +1,175 @@
+# bench/pagecache_bench.py
+"""
+Sayfa önbelleği (scraper/pagecache.py) fetch / fetch_conditional altında.
+
+Yerel bir HTTP sunucusu N detay sayfası sunar (her istek LATENCY_MS gecikir).
+Çift numaralılar ETag verir ve If-None-Match'e 304 döner; tekler doğrulayıcı
+vermez. Geçici bir önbellek dosyasıyla:
+
+- ilk geçiş: hepsi ağdan, önbelleğe yazılır,
+- ikinci geçiş (TTL 0): ETag'li sayfalar 304 ile önbellekten, diğerleri ağdan;
+  aynı içerik yeni blob açmaz (boyut değişmez),
+- fetch_conditional: çağıranın doğrulayıcıları önbellektekiyle aynıysa 304'te
+  html None, doğrulayıcısız çağırana gövde,
+- TTL > 0: taze kayıtlar için sunucuya hiç istek gitmez,
+- anahtar normalize URL'dir (utm_* ve #parça aynı kayda düşer),
+- içerik değişince eski blob silinir,
+- çevrimdışı: tüm sayfalar sunucu kapalıyken okunur, olmayan sayfa PageCacheMiss,
+- boyut sınırı: toplam sınırın altında kalır, en son kullanılan sayfa
+  silinmez, en eskiler silinir.
+
+Ağdan ve çevrimdışı yeniden işleme süreleri ile isabet oranı yazılır.
+
+Kullanım:
+    python bench/pagecache_bench.py [N]
+"""
+import argparse, os, sys, tempfile, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CURRENT_DIR  = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+TMP = tempfile.mkdtemp(prefix="pagecache")
+os.environ["PAGE_CACHE_PATH"] = os.path.join(TMP, "pagecache.db")
+os.environ["PAGE_CACHE_TTL_SEC"] = "0"
+os.environ["PAGE_CACHE_OFFLINE"] = "0"
+
+import logging
+logging.disable(logging.WARNING)
+
+LATENCY_MS = 20
+VERSION = {}        # i -> sürüm (metin değişikliği)
+HITS = {"200": 0, "304": 0}
+LOCK = threading.Lock()
+
+
+def _detail(i):
+    paras = "".join(f"<p>Duyuru {i} paragraf {j}: başvuru koşulları, tarihler ve gerekli belgeler "
+                    f"ayrıntılı olarak aşağıda açıklanmıştır.</p>" for j in range(30))
+    return f"<html><body><article><h1>Duyuru {i} (sürüm {VERSION.get(i, 0)})</h1>{paras}</article></body></html>"
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(LATENCY_MS / 1000)
+        i = int(self.path.split("?")[0].rstrip("/").rsplit("/", 1)[1])
+        etag = f'"{i}-{VERSION.get(i, 0)}"' if i % 2 == 0 else None
+        with LOCK:
+            if etag and self.headers.get("If-None-Match") == etag:
+                HITS["304"] += 1
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            HITS["200"] += 1
+        body = _detail(i).encode()
+        self.send_response(200)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _requests():
+    with LOCK:
+        return HITS["200"] + HITS["304"]
+
+
+def main(n: int) -> int:
+    from scraper.fetcher import fetch, fetch_conditional
+    from scraper.pagecache import PAGE_CACHE, PageCache, PageCacheMiss
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{srv.server_address[1]}/tr/Duyuru/Detay"
+    urls = [f"{base}/{i}" for i in range(n)]
+    checks = {}
+
+    t0 = time.perf_counter()
+    bodies = [fetch(u) for u in urls]
+    cold = time.perf_counter() - t0
+    first = PAGE_CACHE.take_stats()
+    size1 = PAGE_CACHE.size_bytes
+    checks["ilk geçiş: hepsi ağdan ve yazıldı"] = first["misses"] == n and first["stored"] == n
+
+    HITS.update({"200": 0, "304": 0})
+    again = [fetch(u) for u in urls]
+    second = PAGE_CACHE.take_stats()
+    checks["TTL 0: ETag'liler 304 ile önbellekten"] = (
+        again == bodies and HITS["304"] == (n + 1) // 2 and second["revalidated"] == (n + 1) // 2)
+    checks["aynı içerik yeni blob açmaz"] = PAGE_CACHE.size_bytes == size1
+
+    html, etag, lm = fetch_conditional(urls[0], '"0-0"')
+    html2, _, _ = fetch_conditional(urls[0])
+    checks["fetch_conditional: aynı doğrulayıcı → None, doğrulayıcısız → gövde"] = (
+        html is None and etag == '"0-0"' and html2 == bodies[0])
+
+    PAGE_CACHE.ttl_sec = 3600
+    before = _requests()
+    [fetch(u) for u in urls]
+    checks["TTL > 0: sunucuya istek yok"] = _requests() == before
+    checks["normalize URL anahtarı (utm_*, #parça)"] = (
+        fetch(urls[1] + "?utm_source=tg#ust") == bodies[1] and _requests() == before)
+    PAGE_CACHE.ttl_sec = 0
+
+    VERSION[2] = 1
+    fetch(urls[2])
+    blobs = PAGE_CACHE._db().execute("SELECT COUNT(*) FROM page_blob;").fetchone()[0]
+    checks["değişen içerik: eski blob silinir"] = fetch(urls[2]) != bodies[2] and blobs == n
+    PAGE_CACHE.take_stats()
+
+    # yeniden işleme: sunucu kapalıyken yalnızca önbellekten
+    srv.shutdown()
+    srv.server_close()
+    PAGE_CACHE.offline = True
+    t0 = time.perf_counter()
+    offline = [fetch(u) for u in urls]
+    warm = time.perf_counter() - t0
+    try:
+        fetch(f"{base}/{n + 1}")
+        miss = False
+    except PageCacheMiss:
+        miss = True
+    checks["çevrimdışı: hepsi okunur, olmayan PageCacheMiss"] = (
+        len(offline) == n and all(offline) and offline[3] == bodies[3] and miss)
+    off = PAGE_CACHE.take_stats()
+    PAGE_CACHE.offline = False
+
+    # boyut sınırı: sayfa başına ~1 KB sıkıştırılmış, sınır ~40 sayfa
+    small = PageCache(os.path.join(TMP, "small.db"), 40_000)
+    rnd = lambda i: "".join(f"<p>{i}-{j}-{(i * 7919 + j * 104729) % 1000003:x}</p>" for j in range(120))
+    small.put("https://x.edu.tr/p/keep", rnd(-1))
+    for i in range(200):
+        small.put(f"https://x.edu.tr/p/{i}", rnd(i))
+        if i % 10 == 0:
+            small.get("https://x.edu.tr/p/keep")
+    stats = small.take_stats()
+    checks["LRU: sınır aşılmaz, sık kullanılan kalır, eskiler gider"] = (
+        small.size_bytes <= 40_000 and small.get("https://x.edu.tr/p/keep") is not None
+        and small.get("https://x.edu.tr/p/0") is None and small.get("https://x.edu.tr/p/199") is not None
+        and stats["evicted"] > 0)
+    real = small._db().execute("SELECT COALESCE(SUM(size), 0) FROM page_blob;").fetchone()[0]
+    checks["boyut sayacı DB ile tutarlı"] = real == small.size_bytes
+    small.close()
+
+    print(f"sayfa: {n}  önbellek: {size1 / 1024:.0f} KB (sayfa başına {size1 / n:.0f} B sıkıştırılmış, "
+          f"ham {len(bodies[0])} B)")
+    print(f"ağdan ilk geçiş: {cold * 1000:.0f} ms  çevrimdışı yeniden işleme: {warm * 1000:.0f} ms  "
+          f"isabet oranı: 1. geçiş {first['hit_rate']}, 2. geçiş {second['hit_rate']}, çevrimdışı {off['hit_rate']}  "
+          f"LRU silinen: {stats['evicted']}")
+    for name, ok in checks.items():
+        print(f"{'OK ' if ok else 'FAIL'} {name}")
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Sayfa önbelleği: 304/TTL isabetleri, çevrimdışı okuma, LRU sınırı")
+    ap.add_argument("n", nargs="?", type=int, default=200, help="detay sayfası sayısı (varsayılan: 200)")
+    sys.exit(main(ap.parse_args().n))
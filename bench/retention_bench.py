@@ -0,0 +1,108 @@
+# bench/retention_bench.py
+"""
+Geçmiş büyüdükçe dedupe (insert_seen) ve /last (get_last_items_for_user)
+gecikmesinin sabit kaldığını gösterir. SQLite backend'i ile geçici bir
+dosyada çalışır; Postgres'e dokunmaz.
+
+Kullanım:
+    python bench/retention_bench.py                 # 10k, 100k, 1M satır
+    python bench/retention_bench.py 10000 50000     # özel boyutlar
+"""
+import argparse, os, sys, random, statistics, tempfile, time
+from datetime import datetime, timedelta, timezone
+
+CURRENT_DIR  = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+os.environ["DB_BACKEND"] = "sqlite"
+
+from storage import db as dbmod
+from storage.retention import run_retention
+from storage.seenset import SEEN_INDEX
+from storage.recent import RECENT_ITEMS
+from storage.session import SESSIONS
+from formatters.textfmt import text_hash
+
+SITES   = [f"https://site{i}.example.edu.tr/tr/Duyuru" for i in range(12)]
+CHAT_ID = 42
+SAMPLES = 500
+ITEMS_PER_DAY = 100   # sabit yayın hızı: geçmiş büyüdükçe sıcak pencere aynı kalır
+
+
+def _p(vals, q):
+    vals = sorted(vals)
+    return vals[min(len(vals) - 1, int(len(vals) * q))]
+
+
+def _seed_history(conn, n: int):
+    """n satırlık geçmişi ITEMS_PER_DAY hızıyla geriye doğru yayarak doğrudan (toplu) yazar."""
+    now = datetime.now(timezone.utc)
+    batch = []
+    for i in range(n):
+        su = SITES[i % len(SITES)]
+        url = f"{su}/Detay/{i}"
+        h = text_hash(url)
+        ts = (now - timedelta(days=i / ITEMS_PER_DAY)).strftime("%Y-%m-%d %H:%M:%S")
+        batch.append((su, h, f"Duyuru {i}", url, ts, dbmod.hash64(h), dbmod.site_key(su)))
+        if len(batch) >= 50_000 or i == n - 1:
+            rows = batch
+            def _w(c, rows=rows):
+                c.executemany("INSERT OR IGNORE INTO seen_item(site_url, item_hash, title, url, first_seen) "
+                              "VALUES (?,?,?,?,?);", [r[:5] for r in rows])
+                c.executemany("INSERT OR IGNORE INTO seen_digest(h, site_key) VALUES (?,?);",
+                              [r[5:] for r in rows])
+            conn.write(_w)
+            batch = []
+
+
+def run(n: int):
+    path = os.path.join(tempfile.mkdtemp(prefix="retbench"), "bench.db")
+    # her boyut yeni bir veritabanı: süreç içi önbellekler önceki turdan kalmasın
+    SESSIONS.clear(); SEEN_INDEX.clear(); RECENT_ITEMS.clear()
+    conn = dbmod.init_db(path)
+    dbmod.register_sites(conn, SITES)
+    dbmod.upsert_user(conn, CHAT_ID, "bench")
+    for su in SITES[:4]:
+        dbmod.toggle_site_sub(conn, CHAT_ID, su)
+
+    t0 = time.perf_counter()
+    _seed_history(conn, n)
+    seed_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    moved = run_retention(conn)
+    ret_s = time.perf_counter() - t0
+
+    # dedupe: daha önce görülmüş (arşivdekiler dahil) linkler
+    hit = []
+    for _ in range(SAMPLES):
+        i = random.randrange(n)
+        su = SITES[i % len(SITES)]
+        url = f"{su}/Detay/{i}"
+        t = time.perf_counter()
+        is_new = dbmod.insert_seen(conn, su, text_hash(url), "x", url)
+        hit.append(time.perf_counter() - t)
+        assert not is_new, "arşivlenmiş öğe yeni sayıldı"
+
+    # /last
+    last = []
+    for _ in range(SAMPLES):
+        t = time.perf_counter()
+        dbmod.get_last_items_for_user(conn, CHAT_ID, limit=5)
+        last.append(time.perf_counter() - t)
+
+    conn.close()
+    us = lambda v: f"{v * 1e6:8.0f}"
+    print(f"{n:>10} | seed {seed_s:6.1f}s | retention {ret_s:6.2f}s moved {moved:>9} | "
+          f"dedupe p50 {us(statistics.median(hit))}µs p99 {us(_p(hit, .99))}µs | "
+          f"/last p50 {us(statistics.median(last))}µs p99 {us(_p(last, .99))}µs")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Geçmiş büyürken dedupe ve /last gecikmesi")
+    ap.add_argument("sizes", nargs="*", type=int, default=[10_000, 100_000, 1_000_000],
+                    help="seen_item satır sayıları (varsayılan: 10k 100k 1M)")
+    for n in ap.parse_args().sizes:
+        run(n)
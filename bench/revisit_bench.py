@@ -0,0 +1,141 @@
+# bench/revisit_bench.py
+"""
+Düzenlenen duyuruların yeniden ziyaret ile yakalanması (scraper/revisit.py).
+
+Yerel bir HTTP sunucusu bir liste sayfası ve N detay sayfası sunar. Çift
+numaralı sayfalar ETag verir ve If-None-Match'e 304 döner; tek numaralılar
+doğrulayıcı vermez ve her çekimde değişen bir "Okunma" sayacı içerir (kalıp
+satırı; düzenleme sayılmamalı). Öğeler notify_one_site ile kaydedilir, hepsinin
+yeniden ziyaret zamanı geldi sayılır ve EDITS kadar sayfanın metni değiştirilir.
+Ardından revisit_due turlar halinde çalıştırılır.
+
+Kontroller: tur başına çekilen sayfa ≤ REVISIT_MAX_PER_CYCLE, yalnızca
+düzenlenen sayfalar için "güncellendi" (tg_edit) satırı açılır, ETag'li
+sayfalar 304 ile ayrıştırılmadan geçer, değişmeyen öğelerin aralığı ikiye katlanır.
+
+Kullanım:
+    python bench/revisit_bench.py [N]
+"""
+import argparse, os, sys, tempfile, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CURRENT_DIR  = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SMTP_HOST"] = ""
+os.environ["PAGE_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="revisit"), "pagecache.db")
+
+import logging
+logging.disable(logging.WARNING)
+
+EDITS = 3
+PAGES = {}          # i -> {"ver": int, "hits": int}
+HITS = {"200": 0, "304": 0}
+LOCK = threading.Lock()
+
+
+def _detail(i, page):
+    deadline = 10 + page["ver"]
+    return f"""<html><body><article>
+<h1>Duyuru {i}: lisansüstü başvuru takvimi</h1>
+<p>Okunma: {page['hits']}</p>
+<p>Lisansüstü programlarına başvurular çevrimiçi olarak alınacaktır ve son başvuru tarihi
+{deadline} Mayıs 2025 olarak belirlenmiştir. Başvuru belgelerinin eksiksiz yüklenmesi gerekmektedir.</p>
+<p>Mülakat sonuçları enstitü sayfasında ilan edilecek olup adayların düzenli olarak kontrol etmesi önerilir.</p>
+</article></body></html>"""
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code, body=b"", etag=None):
+        self.send_response(code)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/list":
+            links = "".join(f'<li><a href="/d/{i}">Duyuru {i}: lisansüstü başvuru</a></li>' for i in PAGES)
+            return self._send(200, f"<html><body><ul class='list'>{links}</ul></body></html>".encode())
+        i = int(self.path.rsplit("/", 1)[-1])
+        with LOCK:
+            page = PAGES[i]
+            etag = f'"{i}-{page["ver"]}"' if i % 2 == 0 else None
+            if etag and self.headers.get("If-None-Match") == etag:
+                HITS["304"] += 1
+                return self._send(304, etag=etag)
+            HITS["200"] += 1
+            page["hits"] += 1
+            body = _detail(i, page).encode()
+        self._send(200, body, etag)
+
+
+def main(n: int) -> int:
+    from config import REVISIT_MAX_PER_CYCLE, REVISIT_BASE_SEC
+    from storage import db as dbmod
+    import monitor
+    from scraper.revisit import revisit_due
+
+    for i in range(n):
+        PAGES[i] = {"ver": 0, "hits": 0}
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    site = {"name": "Test", "url": base + "/list", "list_selector": "ul.list", "item_link_selector": "a"}
+
+    conn = dbmod.init_db(os.path.join(tempfile.mkdtemp(prefix="revisit"), "r.db"))
+    dbmod.register_sites(conn, [site["url"]])
+    dbmod.upsert_user(conn, 1, "u1")
+    dbmod.toggle_site_sub(conn, 1, site["url"])
+    new = monitor.notify_one_site(conn, site)
+
+    # hepsinin zamanı gelsin; ilk EDITS çift sayfa (ETag'li) ve bir tek sayfa düzenlensin
+    conn.write(lambda c: c.execute("UPDATE seen_item SET next_check = datetime('now', '-1 seconds');"))
+    edited = [i for i in range(0, n, 2)][:EDITS - 1] + [1]
+    for i in edited:
+        PAGES[i]["ver"] += 1
+    HITS.update({"200": 0, "304": 0})
+
+    cycles, fetched_max, totals = 0, 0, {}
+    while True:
+        before = HITS["200"] + HITS["304"]
+        st = revisit_due(conn, {site["url"]: site})
+        if not st["checked"]:
+            break
+        cycles += 1
+        fetched_max = max(fetched_max, HITS["200"] + HITS["304"] - before)
+        for k, v in st.items():
+            totals[k] = totals.get(k, 0) + v
+
+    rd = conn.read()
+    edits = rd.execute("SELECT COUNT(*) FROM notification_outbox WHERE channel='tg_edit';").fetchone()[0]
+    revised = rd.execute("SELECT COUNT(*) FROM seen_item WHERE revision > 0;").fetchone()[0]
+    # değişmeyenler: bir sonraki kontrol ~2 * REVISIT_BASE_SEC sonra
+    gap = rd.execute(
+        "SELECT MIN((julianday(next_check) - julianday(checked_at)) * 86400) FROM seen_item "
+        "WHERE revision = 0 AND next_check IS NOT NULL;").fetchone()[0] or 0
+
+    ok = (new == n and fetched_max <= REVISIT_MAX_PER_CYCLE and edits == len(edited)
+          and revised == len(edited) and HITS["304"] == (n + 1) // 2 - (len(edited) - 1)
+          and abs(gap - 2 * REVISIT_BASE_SEC) < 5)
+    print(f"öğe: {new}  tur: {cycles}  tur başına en fazla çekim: {fetched_max} (sınır {REVISIT_MAX_PER_CYCLE})")
+    print(f"sonuç: {totals}  http: 200={HITS['200']} 304={HITS['304']}")
+    print(f"güncellendi bildirimi: {edits} (düzenlenen {len(edited)})  sonraki aralık: {gap:.0f} sn  "
+          f"{'OK' if ok else 'HATA'}")
+    srv.shutdown()
+    conn.close()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Düzenlenen duyuruların yeniden ziyaretle tespiti")
+    ap.add_argument("n", nargs="?", type=int, default=50, help="duyuru sayısı (varsayılan: 50)")
+    sys.exit(main(ap.parse_args().n))
@@ -0,0 +1,119 @@
+# bench/roundtrip_budget.py
+"""
+Uçtan uca kontrol: her Telegram komutu/butonu handle_update içinde en fazla
+kaç DB gidiş-dönüşü yapabilir? (storage.db.STATS["db_calls"]; Postgres
+backend'inde her backend çağrısı tek gidiş-dönüştür.)
+
+SQLite backend'i ile geçici bir dosyada çalışır, Telegram'a istek atmaz
+(http_post_json kaydedici ile değiştirilir). Bütçe aşılırsa çıkış kodu 1.
+
+Kullanım:
+    python bench/roundtrip_budget.py [--repeat N] [--budget K]
+"""
+import argparse, os, sys, tempfile
+
+CURRENT_DIR  = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+os.environ["DB_BACKEND"] = "sqlite"
+
+from storage import db as dbmod
+from notifiers import telegram_bot as tg
+
+SITES = [
+    {"name": "Ana sayfa", "url": "https://www.example.edu.tr/tr/Duyuru"},
+    {"name": "Ceng",      "url": "https://ceng.example.edu.tr/tr/Duyuru"},
+]
+CHAT_ID = 1001
+
+_upd_id = 0
+
+def _msg(text):
+    global _upd_id; _upd_id += 1
+    return {"update_id": _upd_id, "message": {
+        "message_id": _upd_id, "chat": {"id": CHAT_ID, "type": "private"},
+        "from": {"id": CHAT_ID, "username": "budget"}, "text": text}}
+
+def _cb(data):
+    global _upd_id; _upd_id += 1
+    return {"update_id": _upd_id, "callback_query": {
+        "id": str(_upd_id), "data": data, "from": {"id": CHAT_ID, "username": "budget"},
+        "message": {"message_id": 1, "chat": {"id": CHAT_ID, "type": "private"}}}}
+
+# (adım adı, update, izin verilen en fazla DB gidiş-dönüşü)
+# İlk adım kullanıcıyı ilk kez görür; sonrakiler sıcak oturumla çalışır.
+STEPS = [
+    ("/start (ilk temas)",   _msg("/start"),                      1),
+    ("/start",               _msg("/start"),                      0),
+    ("/sites",               _msg("/sites"),                      0),
+    ("sub| (abone ol)",      _cb("sub|" + SITES[0]["url"]),       1),
+    ("uns| (bırak)",         _cb("uns|" + SITES[0]["url"]),       1),
+    ("sub| (tekrar)",        _cb("sub|" + SITES[1]["url"]),       1),
+    ("tog| (eski buton)",    _cb("tog|" + SITES[1]["url"]),       1),
+    ("list",                 _cb("list"),                         0),
+    ("back",                 _cb("back"),                         0),
+    ("/last",                _msg("/last 3"),                     1),
+    ("last (buton)",         _cb("last"),                         0),
+    ("/search",              _msg("/search duyuru"),              1),
+    ("srch| (sayfa)",        _cb("srch|1|duyuru"),                1),
+    ("/kw add",              _msg("/kw add staj başvurusu"),      1),
+    ("/kw",                  _msg("/kw"),                         1),
+    ("kwrm|",                _cb("kwrm|1"),                       2),
+    ("emails",               _cb("emails"),                       1),
+    ("/email add",           _msg("/email add budget@example.com"), 1),
+    ("emailrm|",             _cb("emailrm|budget@example.com"),   1),
+    ("/digest on",           _msg("/digest on"),                  1),
+    ("/digest",              _msg("/digest"),                     1),
+    ("bilinmeyen komut",     _msg("merhaba"),                     0),
+]
+
+
+def main(repeat: int = 1, budget_override: int | None = None) -> int:
+    """
+    Adım listesini repeat kez oynatır (sonraki turlar sıcak oturumla); budget_override
+    verilirse her adımın bütçesi yerine o kullanılır.
+    """
+    sent = []
+    tg.http_post_json = lambda url, payload, timeout=20: sent.append((url.rsplit("/", 1)[-1], payload)) or _Ok()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="rtbudget"), "budget.db")
+    conn = dbmod.init_db(path)
+    dbmod.register_sites(conn, [s["url"] for s in SITES])  # süreç başında bir kez (monitor/webhook gibi)
+    sites_by_url = {s["url"]: s for s in SITES}
+
+    failed = 0
+    for rnd in range(repeat):
+        if repeat > 1:
+            print(f"-- tur {rnd + 1}/{repeat}")
+        for name, upd, budget in STEPS:
+            if budget_override is not None:
+                budget = budget_override
+            before = dbmod.STATS["db_calls"]
+            tg.handle_update(conn, upd, sites_by_url)
+            used = dbmod.STATS["db_calls"] - before
+            ok = used <= budget
+            failed += not ok
+            print(f"{'OK ' if ok else 'FAIL'} {name:<22} db={used} (bütçe {budget})")
+
+    conn.close()
+    print(f"\nTelegram çağrısı: {len(sent)}  |  bütçe aşımı: {failed}")
+    return 1 if failed else 0
+
+
+class _Ok:
+    ok = True
+    status_code = 200
+    def json(self):
+        return {"ok": True, "result": {}}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Telegram update başına DB gidiş-dönüşü bütçesi")
+    ap.add_argument("--repeat", type=int, default=1,
+                    help="adım listesinin kaç kez oynatılacağı (varsayılan: 1; sonraki turlar sıcak oturumla)")
+    ap.add_argument("--budget", type=int, default=None,
+                    help="her adım için izin verilen en fazla DB gidiş-dönüşü (varsayılan: adım tablosu)")
+    args = ap.parse_args()
+    sys.exit(main(max(1, args.repeat), args.budget))
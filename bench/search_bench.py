@@ -0,0 +1,119 @@
+# bench/search_bench.py
+"""
+/search tam metin araması (SQLite FTS5; Postgres'te aynı sözleşme tsvector + GIN).
+
+N sentetik duyuru eklenir (insert_seen; tetikleyiciler index'i doldurur), ilk
+yarısı arşive taşınır. Ardından:
+- Türkçe/aksan duyarsızlık: "ogrenci isleri" → "Öğrenci İşleri", "IŞIK" → "ışık",
+- önek eşleşmesi: "basvur" → "başvuruları",
+- arşivdeki öğeler bulunur, yakın kopya takma adları sonuçlarda tekrar etmez,
+- revisit ile değişen başlık index'e yansır,
+- sayfalama: sayfalar çakışmaz, son sayfada "sonraki" yok,
+ve sık/nadir kelimelerle sorgu süreleri (ilk sayfa) ölçülür.
+
+Kullanım:
+    python bench/search_bench.py [N]
+"""
+import argparse, os, random, sys, tempfile, time
+from datetime import datetime, timedelta, timezone
+
+CURRENT_DIR  = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["NEARDUP_MAX_DISTANCE"] = "-1"   # sentetik metinler birbirine benzer; eşleştirme kapalı
+
+import logging
+logging.disable(logging.WARNING)
+
+from formatters.textfmt import text_hash
+
+WORDS = ("sınav ders kayıt tarih burs staj mezuniyet program bölüm fakülte akademik takvim "
+         "ilan sonuç liste yüksek lisans doktora seminer konferans etkinlik yarıyıl güz bahar "
+         "dönem final bütünleme danışman onay belge transkript harç ücret yatay geçiş erasmus "
+         "laboratuvar proje teslim rapor sunum komisyon karar yönetmelik").split()
+SITE = "https://bench.example.edu.tr/tr/Duyuru"
+
+
+def main(n: int) -> int:
+    from storage import db as dbmod
+    conn = dbmod.init_db(os.path.join(tempfile.mkdtemp(prefix="search"), "s.db"))
+    rng = random.Random(n)
+
+    t0 = time.perf_counter()
+    for i in range(n):
+        title = " ".join(rng.choices(WORDS, k=6)).capitalize()
+        body = " ".join(rng.choices(WORDS, k=40))
+        dbmod.insert_seen(conn, SITE, text_hash(f"{SITE}/{i}"), title, f"{SITE}/{i}", body)
+    special = [
+        ("Öğrenci İşleri Daire Başkanlığı duyurusu", "Kayıt yenileme hakkında"),
+        ("Fizik bölümü IŞIK deneyi", "Laboratuvar saatleri"),
+        ("Yaz okulu başvuruları başladı", "Başvurular çevrimiçi alınacaktır"),
+    ]
+    for j, (t, b) in enumerate(special):
+        dbmod.insert_seen(conn, SITE, text_hash(f"{SITE}/s{j}"), t, f"{SITE}/s{j}", b)
+    # takma ad: başka sitedeki kopya (dup_of dolu) index'e girmez
+    conn.write(lambda c: c.execute(
+        "INSERT INTO seen_item(site_url, item_hash, title, url, snippet, dup_of) VALUES (?,?,?,?,?,?);",
+        ("https://b.example.edu.tr/tr/Duyuru", text_hash("alias"), special[0][0], "https://b/alias", "", 1)))
+    ins = time.perf_counter() - t0
+
+    # ilk yarı (ve özel öğeler değil) arşive
+    conn.write(lambda c: c.execute("UPDATE seen_item SET first_seen = datetime('now', '-400 days') WHERE id <= ?;",
+                                   (n // 2,)))
+    dbmod.archive_seen_before(conn, datetime.now(timezone.utc) - timedelta(days=200), n)
+    archived = conn.read().execute("SELECT COUNT(*) FROM seen_archive;").fetchone()[0]
+
+    def first_url(q):
+        items, _ = dbmod.search_items(conn, q)
+        return items[0]["url"] if items else None
+
+    checks = {
+        "ogrenci isleri → Öğrenci İşleri": first_url("ogrenci isleri") == f"{SITE}/s0",
+        "IŞIK / isik": first_url("isik") == f"{SITE}/s1" and first_url("IŞIK") == f"{SITE}/s1",
+        "önek (basvur)": first_url("basvur") == f"{SITE}/s2",
+        "takma ad tekrarlanmaz": len(dbmod.search_items(conn, "daire baskanligi")[0]) == 1,
+    }
+    # arşivdeki bir öğenin başlığı
+    old_title, old_url = conn.read().execute("SELECT title, url FROM seen_archive ORDER BY id LIMIT 1;").fetchone()
+    items, _ = dbmod.search_items(conn, old_title, per_page=50)
+    checks["arşivde bulunur"] = old_url in [it["url"] for it in items]
+
+    # düzenlenen başlık (revisit) index'e yansır
+    conn.write(lambda c: c.execute("UPDATE seen_item SET title = 'Yaz okulu ücretleri açıklandı' WHERE url = ?;",
+                                   (f"{SITE}/s2",)))
+    checks["güncellenen başlık"] = first_url("ucretleri aciklandi") == f"{SITE}/s2"
+
+    # sayfalama
+    seen, page, has_next = set(), 0, True
+    while has_next and page < 50:
+        items, has_next = dbmod.search_items(conn, "staj", page=page, per_page=20)
+        urls = {it["url"] for it in items}
+        checks.setdefault("sayfalar çakışmaz", True)
+        checks["sayfalar çakışmaz"] &= not (urls & seen)
+        seen |= urls
+        page += 1
+
+    timings = {}
+    for q in ("staj", "yatay gecis", "erasmus konferans rapor", "ogrenci isleri"):
+        runs = []
+        for p in (0, 0, 0, 1):
+            t = time.perf_counter()
+            dbmod.search_items(conn, q, page=p)
+            runs.append((time.perf_counter() - t) * 1000)
+        timings[q] = min(runs)
+
+    print(f"öğe: {n + len(special)}  arşivde: {archived}  ekleme: {ins / n * 1e6:.0f} µs/öğe (index dahil)")
+    for name, ok in checks.items():
+        print(f"{'OK ' if ok else 'FAIL'} {name}")
+    print("sorgu (ilk sayfa, en iyi): " + "  ".join(f"{q!r}={ms:.2f} ms" for q, ms in timings.items()))
+    conn.close()
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="/search tam metin arama gecikmesi")
+    ap.add_argument("n", nargs="?", type=int, default=20000, help="duyuru sayısı (varsayılan: 20000)")
+    sys.exit(main(ap.parse_args().n))
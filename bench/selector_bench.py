@@ -0,0 +1,167 @@
+# bench/selector_bench.py
+"""
+pick_selector.py --batch: yerel bir HTTP sunucusu üç farklı düzende liste
+sayfaları (menü, kenar çubuğu ve alt bilgi linkleriyle birlikte) ve detay
+sayfaları sunar; her istek LATENCY_MS gecikir. Seçicisiz bir geçici sites.yaml
+üzerinde toplu mod çalıştırılır.
+
+Kontroller: her site için bulunan list_selector + item_link_selector
+monitor'un yolundan (extract_list_links + filter_links) tam olarak duyuru
+linklerini verir (menü/alt bilgi linkleri yok), detail_selector içerik
+kutusunu bulur, sonuçlar sites.yaml'a yazılır, ikinci çalıştırma seçicileri
+korur ("kept"), eşzamanlı çekim sıralı süreden kısadır. Büyük bir sayfada tek
+geçişli puanlama süresi de yazılır.
+
+Kullanım:
+    python bench/selector_bench.py [--workers N] [--latency-ms MS]
+"""
+import argparse, os, sys, tempfile, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CURRENT_DIR  = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+os.environ["PAGE_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="selector"), "pagecache.db")
+
+import logging
+logging.disable(logging.WARNING)
+
+import yaml
+
+LATENCY_MS = 150
+N_ITEMS = {"gdlr": 10, "news": 8, "posts": 6}
+
+NAV = "<nav class='main-menu'><ul>" + "".join(
+    f"<li><a href='/menu/{i}'>Menü bağlantısı {i}</a></li>" for i in range(8)) + "</ul></nav>"
+FOOTER = "<footer><ul class='footer-links'>" + "".join(
+    f"<li><a href='/f/{i}'>Alt bilgi bağlantısı {i}</a></li>" for i in range(6)) + "</ul></footer>"
+SIDEBAR = "<aside class='sidebar'><ul class='widget-list'>" + "".join(
+    f"<li><a href='/kategori/{i}'>Kategori {i} duyuruları</a></li>" for i in range(7)) + "</ul></aside>"
+
+
+def _list_page(kind: str) -> str:
+    n = N_ITEMS[kind]
+    if kind == "gdlr":
+        items = "".join(
+            f"<div class='gdlr-core-item-list gdlr-core-blog-medium'><h3 class='gdlr-core-blog-title'>"
+            f"<a href='/{kind}/detay/{i}'>Lisansüstü başvuru takvimi {i}</a></h3>"
+            f"<div class='gdlr-core-blog-info-date'>0{i % 9 + 1}.05.2025</div>"
+            f"<div class='gdlr-core-blog-content'>Başvurular çevrimiçi alınacaktır, ayrıntılar ilanda. "
+            f"<a class='gdlr-core-excerpt-read-more' href='/{kind}/detay/{i}'>Devamını oku</a></div></div>"
+            for i in range(n))
+        body = f"<div class='gdlr-core-page-builder-body'><div class='gdlr-core-blog-item-holder'>{items}</div></div>"
+    elif kind == "news":
+        items = "".join(
+            f"<li><a href='/{kind}/detay/{i}'>Sınav programı ilan edildi {i}</a> <span class='date'>1{i}.06.2025</span></li>"
+            for i in range(n))
+        body = f"<main><ul class='news'>{items}</ul></main>{SIDEBAR}"
+    else:
+        items = "".join(
+            f"<article class='post'><h2><a href='/{kind}/detay/{i}'>Staj başvuruları başladı {i}</a></h2>"
+            f"<p>Yaz stajı başvuruları için gerekli belgeler ve son tarih bu duyuruda yer almaktadır.</p></article>"
+            for i in range(n))
+        body = f"<div id='content'>{items}</div>"
+    return f"<html><head><title>x</title></head><body>{NAV}{body}{FOOTER}</body></html>"
+
+
+def _detail_page(kind: str, i: int) -> str:
+    paras = "".join(f"<p>Duyuru {i} paragraf {j}: başvuru koşulları, tarihler ve gerekli belgeler "
+                    f"ayrıntılı olarak aşağıda açıklanmıştır.</p>" for j in range(5))
+    return (f"<html><body>{NAV}<div class='page-wrap'><div class='entry-content'><h1>Duyuru {i}</h1>{paras}</div>"
+            f"{SIDEBAR}</div>{FOOTER}</body></html>")
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(LATENCY_MS / 1000)
+        parts = self.path.strip("/").split("/")
+        if len(parts) == 2 and parts[1] == "list":
+            body = _list_page(parts[0])
+        elif len(parts) == 3 and parts[1] == "detay":
+            body = _detail_page(parts[0], int(parts[2]))
+        else:
+            body = "<html><body>yok</body></html>"
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main(workers: int = 0, latency_ms: int = LATENCY_MS) -> int:
+    """workers 0 ise site sayısı kadar (her site kendi thread'inde)."""
+    global LATENCY_MS
+    LATENCY_MS = latency_ms
+    import pick_selector
+    from scraper.site_monitor import extract_list_links, filter_links, extract_detail, fetch
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    sites = [{"name": k, "url": f"{base}/{k}/list", "list_selector": "", "item_link_selector": "",
+              "include_url_regex": "/detay/"} for k in N_ITEMS]
+    path = os.path.join(tempfile.mkdtemp(prefix="selector"), "sites.yaml")
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump({"sites": sites}, f, allow_unicode=True, sort_keys=False)
+
+    workers = workers or len(sites)
+    t0 = time.perf_counter()
+    pick_selector.batch(path, workers=workers)
+    wall = time.perf_counter() - t0
+    # sıralı alt sınır: site başına liste + detay çekimi
+    sequential = len(sites) * 2 * LATENCY_MS / 1000
+
+    checks = {}
+    written = yaml.safe_load(open(path, encoding="utf-8"))["sites"]
+    for s in written:
+        html = fetch(s["url"])
+        links = filter_links(extract_list_links(html, s.get("list_selector") or "", s["item_link_selector"], s["url"]),
+                             s.get("include_url_regex"))
+        checks[f"{s['name']}: {N_ITEMS[s['name']]} duyuru linki"] = (
+            len(links) == N_ITEMS[s["name"]] and all("/detay/" in it["url"] for it in links))
+        ds = s.get("detail_selector")
+        ok = False
+        if ds:
+            _, snippet, _ = extract_detail(fetch(links[0]["url"]), ds)
+            ok = "paragraf 4" in snippet and "Kategori" not in snippet and "Menü" not in snippet
+        checks[f"{s['name']}: detail_selector ({ds})"] = ok
+    if workers > 1:
+        checks["eşzamanlı çekim"] = wall < sequential
+
+    # ikinci çalıştırma: seçiciler çalıştığı için korunur
+    before = open(path, encoding="utf-8").read()
+    pick_selector.batch(path, workers=workers)
+    checks["ikinci çalıştırma değiştirmez"] = open(path, encoding="utf-8").read() == before
+
+    big = _list_page("gdlr").replace(
+        "<div class='gdlr-core-blog-item-holder'>",
+        "<div class='gdlr-core-blog-item-holder'>" + "".join(
+            f"<div class='gdlr-core-item-list'><h3 class='gdlr-core-blog-title'><a href='/x/detay/{i}'>Ek duyuru {i}</a>"
+            f"</h3><div class='gdlr-core-blog-content'>Kısa açıklama metni {i}</div></div>" for i in range(3000)))
+    t0 = time.perf_counter()
+    cands = pick_selector.list_candidates(big)
+    big_ms = (time.perf_counter() - t0) * 1000
+
+    print()
+    for name, ok in checks.items():
+        print(f"{'OK ' if ok else 'FAIL'} {name}")
+    print(f"toplu mod ({workers} işçi): {wall:.2f} s (sıralı alt sınır {sequential:.2f} s)  "
+          f"büyük sayfa ({len(big) // 1024} KB) aday çıkarımı: {big_ms:.0f} ms, en iyi: {cands[0][1]} | {cands[0][2]}")
+    srv.shutdown()
+    return 0 if all(checks.values()) else 1
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="pick_selector --batch: seçici bulma doğruluğu ve süresi")
+    ap.add_argument("--workers", type=int, default=0,
+                    help="pick_selector.batch işçi sayısı (varsayılan: site sayısı; 1 ise eşzamanlılık kontrolü atlanır)")
+    ap.add_argument("--latency-ms", type=int, default=LATENCY_MS,
+                    help=f"yerel sunucunun istek başına gecikmesi (varsayılan: {LATENCY_MS})")
+    args = ap.parse_args()
+    sys.exit(main(args.workers, args.latency_ms))
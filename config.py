@@ -11,6 +11,7 @@ except Exception:
 # --- Telegram ---
 TELEGRAM_BOT_TOKEN   = os.getenv("TELEGRAM_BOT_TOKEN", "").strip()
 TELEGRAM_SECRET_TOKEN = os.getenv("TELEGRAM_SECRET_TOKEN", "").strip()  # webhook güvenliği (opsiyonel)
+TELEGRAM_API_BASE    = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org").strip().rstrip("/")  # test için sahte sunucu (bench/fake_bot_api.py)
 
 # --- Zamanlama ---
 CHECK_INTERVAL_SEC   = int(os.getenv("CHECK_INTERVAL_SEC", "600"))
@@ -20,6 +21,75 @@ CHECK_INTERVAL_SEC   = int(os.getenv("CHECK_INTERVAL_SEC", "600"))
 # Yoksa geriye dönük olarak DB_PATH (örn. lokal/EC2 için SQLite) kullanılabilir.
 DATABASE_URL = os.getenv("DATABASE_URL", "").strip()
 DB_PATH      = os.getenv("DB_PATH", "monitor.db").strip()  # Lambda testinde geçici olarak /tmp/duyuru.db kullanabilirsin
+DB_BACKEND   = os.getenv("DB_BACKEND", "").strip().lower()  # "postgres" | "sqlite" | boş = DATABASE_URL'e göre otomatik
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "1").strip() not in ("0", "false", "no")  # 0: şema eskiyse göç etme, hata ver
+
+# Lambda sıcak container'ında bağlantı yeniden kullanımı
+DB_CONN_MAX_AGE_SEC  = int(os.getenv("DB_CONN_MAX_AGE_SEC", "900"))  # bu kadar eski bağlantı yenilenir
+DB_LIVENESS_IDLE_SEC = int(os.getenv("DB_LIVENESS_IDLE_SEC", "60"))  # bu kadar boşta kaldıysa kullanmadan önce ping
+
+# --- Saklama (retention) ---
+SEEN_HOT_DAYS          = int(os.getenv("SEEN_HOT_DAYS", "90"))          # seen_item'da tutulacak gün; eskiler seen_archive'a
+RETENTION_INTERVAL_SEC = int(os.getenv("RETENTION_INTERVAL_SEC", "86400"))  # bakım işinin en sık çalışma aralığı
+RETENTION_BATCH        = int(os.getenv("RETENTION_BATCH", "5000"))      # tek transaction'da taşınacak satır
+
+# --- Bellek içi tekilleştirme ---
+SEEN_SET_EXACT_MAX = int(os.getenv("SEEN_SET_EXACT_MAX", "50000"))  # bu kadar öğeye kadar tam küme, üstü Bloom
+SEEN_BLOOM_FP      = float(os.getenv("SEEN_BLOOM_FP", "1e-6"))     # Bloom yanlış pozitif oranı (= atlanabilecek yeni ilan oranı)
+
+# --- Yakın kopya (çapraz paylaşılan duyurular) ---
+NEARDUP_MAX_DISTANCE = int(os.getenv("NEARDUP_MAX_DISTANCE", "6"))  # SimHash Hamming eşiği (bit); -1 = kapalı
+NEARDUP_WINDOW_DAYS  = int(os.getenv("NEARDUP_WINDOW_DAYS", "7"))   # bu kadar günlük öğelerle karşılaştırılır (OUTBOX_KEEP_DAYS'ten kısa olmalı)
+
+# --- Düzenlenen duyurular (yeniden ziyaret) ---
+REVISIT_MAX_PER_CYCLE = int(os.getenv("REVISIT_MAX_PER_CYCLE", "20"))  # tur başına en fazla yeniden çekilen detay sayfası; 0 = kapalı
+REVISIT_BASE_SEC      = int(os.getenv("REVISIT_BASE_SEC", "3600"))      # ilk yeniden ziyaret; her değişmeyen kontrolde aralık 2 katı
+REVISIT_MAX_AGE_DAYS  = int(os.getenv("REVISIT_MAX_AGE_DAYS", "7"))     # bu yaştan eski duyurulara bakılmaz
+
+# --- Sayfa önbelleği (çekilen HTML, scraper/pagecache.py) ---
+PAGE_CACHE_PATH    = os.getenv("PAGE_CACHE_PATH", "").strip()  # boş (varsayılan) = kapalı; lokal: pagecache.db, Lambda: /tmp/pagecache.db
+PAGE_CACHE_MAX_MB  = int(os.getenv("PAGE_CACHE_MAX_MB", "200"))   # sıkıştırılmış toplam boyut; aşılınca en az kullanılan silinir
+PAGE_CACHE_TTL_SEC = int(os.getenv("PAGE_CACHE_TTL_SEC", "0"))    # bu kadar taze kayıt ağa sorulmadan döner (0 = her seferinde doğrula)
+PAGE_CACHE_OFFLINE = os.getenv("PAGE_CACHE_OFFLINE", "0").strip() in ("1", "true", "yes")  # yalnızca önbellekten oku, ağa çıkma
+
+# --- RSS/Atom/JSON akışları (scraper/feeds.py) ---
+FEED_AUTODISCOVER = os.getenv("FEED_AUTODISCOVER", "1").strip() not in ("0", "false", "no")  # liste sayfasının <link rel="alternate"> akışını tara
+FEED_STALE_DAYS   = int(os.getenv("FEED_STALE_DAYS", "30"))     # en yeni girdisi bundan eski akış bayat sayılır, HTML'e dönülür
+FEED_MIN_CONTENT  = int(os.getenv("FEED_MIN_CONTENT", "200"))   # girdi metni en az bu kadar karakterse detay sayfası çekilmez
+FEED_MAX_ITEMS    = int(os.getenv("FEED_MAX_ITEMS", "50"))      # akıştan okunan en fazla girdi (sonrası okunmaz)
+FEED_RECHECK_SEC  = int(os.getenv("FEED_RECHECK_SEC", "86400")) # akış keşfinin site başına tekrar aralığı
+
+# --- Anahtar kelime abonelikleri (/kw) ---
+KEYWORD_MAX_PER_USER = int(os.getenv("KEYWORD_MAX_PER_USER", "20"))  # kullanıcı başına ifade × site kapsamı
+
+# --- /last önbelleği ---
+RECENT_PER_SITE = int(os.getenv("RECENT_PER_SITE", "20"))   # site başına bellekte tutulan son öğe (/last üst sınırı)
+RECENT_TTL_SEC  = int(os.getenv("RECENT_TTL_SEC", "120"))   # başka süreçlerin eklediklerini görmek için tazeleme aralığı
+
+# --- Telegram oturum önbelleği (username, abonelikler) ---
+SESSION_TTL_SEC   = int(os.getenv("SESSION_TTL_SEC", "60"))
+SESSION_MAX_CHATS = int(os.getenv("SESSION_MAX_CHATS", "20000"))
+
+# --- Telegram update işleme (polling) ---
+BOT_WORKERS      = int(os.getenv("BOT_WORKERS", "8"))         # update işleyen thread (aynı sohbet hep aynı thread'de, sırayla)
+BOT_MAX_INFLIGHT = int(os.getenv("BOT_MAX_INFLIGHT", "500"))  # bu kadar işlenmemiş update varken yeni getUpdates yapılmaz
+
+# --- Telegram gönderim motoru (hız sınırları) ---
+TG_GLOBAL_RATE        = float(os.getenv("TG_GLOBAL_RATE", "28"))       # toplam mesaj/sn (Telegram sınırı ~30)
+TG_PER_CHAT_RATE      = float(os.getenv("TG_PER_CHAT_RATE", "1"))      # aynı sohbete mesaj/sn
+TG_PER_CHAT_BURST     = float(os.getenv("TG_PER_CHAT_BURST", "3"))     # sohbet başına kısa süreli patlama
+TG_GROUP_RATE_PER_MIN = float(os.getenv("TG_GROUP_RATE_PER_MIN", "20"))  # grup sohbetine mesaj/dk
+TG_SEND_WORKERS       = int(os.getenv("TG_SEND_WORKERS", "8"))         # eşzamanlı HTTP gönderimi
+TG_MAX_ATTEMPTS       = int(os.getenv("TG_MAX_ATTEMPTS", "5"))         # 429/5xx/ağ hatasında en fazla deneme
+TG_FLUSH_TIMEOUT_SEC  = int(os.getenv("TG_FLUSH_TIMEOUT_SEC", "240"))  # tek tur sonunda kuyruğun boşalması için beklenecek süre
+
+# --- Bildirim outbox'ı (kalıcı gönderim kuyruğu) ---
+OUTBOX_BATCH        = int(os.getenv("OUTBOX_BATCH", "200"))        # tek seferde sahiplenilen satır
+OUTBOX_LEASE_SEC    = int(os.getenv("OUTBOX_LEASE_SEC", "300"))    # sahiplenen süreç ölürse satır bu kadar sonra tekrar alınır
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))   # sonra 'dead'
+OUTBOX_BACKOFF_SEC  = int(os.getenv("OUTBOX_BACKOFF_SEC", "30"))   # yeniden deneme gecikmesi (her denemede 2 katı)
+OUTBOX_POLL_SEC     = int(os.getenv("OUTBOX_POLL_SEC", "10"))      # döngü modunda boş kuyrukta bekleme
+OUTBOX_KEEP_DAYS    = int(os.getenv("OUTBOX_KEEP_DAYS", "14"))     # sonuçlanmış satırların saklanma süresi
 
 # --- SMTP / E-posta ---
 SMTP_HOST   = os.getenv("SMTP_HOST", "").strip()
@@ -28,6 +98,11 @@ SMTP_USER   = os.getenv("SMTP_USER", "").strip()
 SMTP_PASS   = os.getenv("SMTP_PASS", "").strip()
 FROM_EMAIL  = os.getenv("FROM_EMAIL", "").strip()
 TO_EMAIL    = os.getenv("TO_EMAIL", "").strip()  # virgülle ayrılmış global alıcılar (opsiyonel)
+SMTP_MAX_PER_CONN = int(os.getenv("SMTP_MAX_PER_CONN", "100"))  # bir bağlantıda en fazla mesaj (sonra yeniden bağlan)
+SMTP_POOL_SIZE    = int(os.getenv("SMTP_POOL_SIZE", "1"))       # eşzamanlı SMTP oturumu (sağlayıcı izin veriyorsa artır)
+EMAIL_MODE        = os.getenv("EMAIL_MODE", "single").strip().lower()  # single | bcc | digest
+EMAIL_BCC_CHUNK   = int(os.getenv("EMAIL_BCC_CHUNK", "50"))     # bcc: bir mesajdaki en fazla alıcı
+EMAIL_DIGEST_SEC  = int(os.getenv("EMAIL_DIGEST_SEC", "3600"))  # digest: toplama penceresi (0 = her tur/boşaltma)
 
 # --- Diğer ---
 ADMIN_CHAT_ID = os.getenv("ADMIN_CHAT_ID", "").strip()
@@ -1,4 +1,6 @@
 import html, hashlib, re, unicodedata, urllib.parse
+from collections import Counter
+from typing import Optional
 
 TR_MONTHS = {
     "ocak":1,"şubat":2,"mart":3,"nisan":4,"mayıs":5,"haziran":6,
@@ -36,6 +38,62 @@ def text_hash(s: str) -> str:
     s = _normalize_url(s or "")
     return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
+_TR_FOLD = str.maketrans("çğıöşüâîû", "cgiosuaiu")
+
+def fold_tr(s: str) -> str:
+    """
+    Türkçe duyarsız karşılaştırma için metni sadeleştirir: küçük harf
+    (I→ı, İ→i doğru çevrilir) ve ç/ğ/ı/ö/ş/ü → c/g/i/o/s/u.
+    """
+    s = unicodedata.normalize("NFKC", s or "").replace("I", "ı").replace("İ", "i").lower()
+    return s.translate(_TR_FOLD)
+
+_WORD_RE = re.compile(r"\w+")
+SIMHASH_MIN_FEATURES = 8  # daha kısa metinlerde parmak izi güvenilmez (ör. yalnızca "Duyuru")
+_SIMHASH_MIN_LINE_WORDS = 4
+
+def _content_lines(text: str):
+    """
+    Katlanmış metnin satır satır kelimeleri. Metin yeterince uzunsa kısa satırlar
+    (site başlığı, tarih, "Paylaş", okunma sayacı, menü) atlanır: bunlar aynı
+    içerikte sayfadan sayfaya / çekimden çekime değişen kalıptır.
+    """
+    lines = [[t for t in _WORD_RE.findall(l) if len(t) > 1] for l in fold_tr(text).splitlines()]
+    body = [l for l in lines if len(l) >= _SIMHASH_MIN_LINE_WORDS]
+    return body if sum(map(len, body)) > SIMHASH_MIN_FEATURES else lines
+
+def simhash64(text: str) -> Optional[int]:
+    """
+    Yakın kopya tespiti için 64-bit SimHash (işaretsiz). Özellikler: katlanmış
+    metnin satır içi ardışık kelime ikilileri (tekrar sayısı ağırlık; kısa
+    kalıp satırları atlanır, bkz. _content_lines). Benzer metinlerin
+    parmak izleri az bitte ayrışır (Hamming uzaklığı). Metin çok kısaysa None.
+    """
+    feats = Counter()
+    for toks in _content_lines(text):
+        feats.update(a + " " + b for a, b in zip(toks, toks[1:]))
+    if sum(feats.values()) < SIMHASH_MIN_FEATURES:
+        return None
+    v = [0] * 64
+    for f, w in feats.items():
+        x = int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "big")
+        for i in range(64):
+            v[i] += w if (x >> i) & 1 else -w
+    fp = 0
+    for i in range(64):
+        if v[i] > 0:
+            fp |= 1 << i
+    return fp
+
+def body_hash(text: str) -> str:
+    """
+    Düzenleme tespiti için içerik özeti. Boşluk, büyük/küçük harf ve Türkçe
+    karakter farkları ile kısa kalıp satırlarındaki (tarih, sayaç) değişimler
+    değişiklik sayılmaz (bkz. _content_lines).
+    """
+    norm = "\n".join(" ".join(toks) for toks in _content_lines(text))
+    return hashlib.sha256(norm.encode("utf-8")).hexdigest()[:32]
+
 def clean_text(s: str, limit=1200) -> str:
     s = (s or "").strip()
     s = re.sub(r"\s+\n", "\n", s)
@@ -84,13 +142,15 @@ def bulletize(text: str, max_chars=280):
     short = clean[:max_chars].rsplit(" ", 1)[0]
     return short.strip() + "…"
 
-def format_telegram(site_name, title, link, snippet, date_str=None):
+def format_telegram(site_name, title, link, snippet, date_str=None, updated=False):
     title = (title or "").strip()
     snippet = dedupe_lines(snippet or "")
     snippet = strip_date_and_title_from_snippet(snippet, title, date_str)
     preview = bulletize(snippet, max_chars=280)
+    head = f"✏️ <b>{html.escape(site_name or 'Duyuru')}</b> · <i>güncellendi</i>" if updated \
+        else f"📢 <b>{html.escape(site_name or 'Duyuru')}</b>"
     parts = [
-        f"📢 <b>{html.escape(site_name or 'Duyuru')}</b>",
+        head,
         f"<b>{html.escape(title)}</b>",
     ]
     if date_str:
@@ -101,7 +161,40 @@ def format_telegram(site_name, title, link, snippet, date_str=None):
         parts.append(html.escape(preview))
     return "\n".join(parts)
 
-def email_html(site_name, title, link, snippet, date_str=None):
+TG_MAX_CHARS = 4096  # Telegram sendMessage metin sınırı
+
+def format_telegram_digest(items, limit=TG_MAX_CHARS):
+    """
+    Birden çok duyuruyu olabildiğince az mesaja paketler (her biri <= limit karakter).
+    items: [(site_name, title, link, date_str), ...]
+    Dönen: [(mesaj, [items içindeki sıra, ...]), ...]
+    """
+    entries = []
+    for i, (site_name, title, link, date_str) in enumerate(items):
+        title = (title or "").strip() or "Duyuru"
+        meta = html.escape(site_name or "Duyuru") + (f" · {html.escape(date_str)}" if date_str else "")
+        tail = f'\n<i>{meta}</i> — <a href="{html.escape(link)}">İlana git</a>'
+        room = limit - len(tail) - 200  # başlık satırı için pay
+        t = html.escape(title)
+        if len(t) > room:
+            t = html.escape(title[:max(20, room // 2)]) + "…"
+        entries.append((i, f"• <b>{t}</b>{tail}"))
+
+    out, cur, idx = [], [], []
+    def _flush():
+        if cur:
+            head = f"📬 <b>{len(cur)} yeni duyuru</b>"
+            out.append(("\n\n".join([head] + cur), list(idx)))
+            cur.clear(); idx.clear()
+    for i, e in entries:
+        # başlık (~40) + ayraçlar için pay bırak
+        if cur and len("\n\n".join(cur)) + len(e) + 2 + 40 > limit:
+            _flush()
+        cur.append(e); idx.append(i)
+    _flush()
+    return out
+
+def email_html(site_name, title, link, snippet, date_str=None, updated=False):
     title = (title or "").strip()
     snippet = dedupe_lines(snippet or "")
     snippet = strip_date_and_title_from_snippet(snippet, title, date_str)
@@ -111,7 +204,7 @@ def email_html(site_name, title, link, snippet, date_str=None):
   <table role="presentation" width="100%" cellspacing="0" cellpadding="0" style="background:#f7f7f7">
     <tr><td align="center" style="padding:24px">
       <table role="presentation" width="600" cellspacing="0" cellpadding="0" style="background:#ffffff;border-radius:12px;overflow:hidden;box-shadow:0 2px 8px rgba(0,0,0,0.05);font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,Ubuntu,'Helvetica Neue',Arial,sans-serif;color:#111827">
-        <tr><td style="padding:20px 24px;background:#111827;color:#ffffff;font-size:18px;font-weight:600;">{html.escape(site_name or "Yeni duyuru")}</td></tr>
+        <tr><td style="padding:20px 24px;background:#111827;color:#ffffff;font-size:18px;font-weight:600;">{html.escape(site_name or "Yeni duyuru")}{" · güncellendi" if updated else ""}</td></tr>
         <tr><td style="padding:24px">
           <h1 style="margin:0 0 8px 0;font-size:20px;line-height:1.3;color:#111827">{html.escape(title)}</h1>
           {date_html}
@@ -122,4 +215,33 @@ def email_html(site_name, title, link, snippet, date_str=None):
       </table>
     </td></tr>
   </table>
-</body></html>"""
\ No newline at end of file
+</body></html>"""
+
+def email_digest_html(items):
+    """
+    Birden çok duyuruyu tek e-postada listeler.
+    items: [(site_name, title, link, snippet, date_str), ...]
+    """
+    blocks = []
+    for site_name, title, link, snippet, date_str in items:
+        title = (title or "").strip()
+        snippet = dedupe_lines(snippet or "")
+        snippet = strip_date_and_title_from_snippet(snippet, title, date_str)
+        preview = bulletize(snippet, max_chars=280)
+        meta = html.escape(site_name or "Duyuru") + (f" · {html.escape(date_str)}" if date_str else "")
+        blocks.append(f"""
+        <tr><td style="padding:16px 24px;border-bottom:1px solid #e5e7eb">
+          <div style="color:#6b7280;font-size:12px;margin-bottom:4px">{meta}</div>
+          <a href="{html.escape(link)}" style="font-size:16px;font-weight:600;color:#2563eb;text-decoration:none">{html.escape(title)}</a>
+          <p style="margin:6px 0 0 0;line-height:1.5;color:#111827">{html.escape(preview)}</p>
+        </td></tr>""")
+    return f"""<!doctype html><html><body style="margin:0;padding:0;background:#f7f7f7">
+  <table role="presentation" width="100%" cellspacing="0" cellpadding="0" style="background:#f7f7f7">
+    <tr><td align="center" style="padding:24px">
+      <table role="presentation" width="600" cellspacing="0" cellpadding="0" style="background:#ffffff;border-radius:12px;overflow:hidden;box-shadow:0 2px 8px rgba(0,0,0,0.05);font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,Ubuntu,'Helvetica Neue',Arial,sans-serif;color:#111827">
+        <tr><td style="padding:20px 24px;background:#111827;color:#ffffff;font-size:18px;font-weight:600;">{len(items)} yeni duyuru</td></tr>{"".join(blocks)}
+        <tr><td style="padding:16px 24px;color:#6b7280;font-size:12px">Bu e-posta otomatik gönderilmiştir.</td></tr>
+      </table>
+    </td></tr>
+  </table>
+</body></html>"""
@@ -10,9 +10,8 @@ if PROJECT_ROOT not in sys.path:
 VENDORED = os.path.join(PROJECT_ROOT, "vendored")
 if os.path.isdir(VENDORED) and VENDORED not in sys.path:
     sys.path.append(VENDORED)
-from config import TELEGRAM_BOT_TOKEN, DB_PATH
-from storage.db import init_db, get_state, set_state, del_state
-from formatters.textfmt import text_hash
+from config import TELEGRAM_BOT_TOKEN
+from lambdapkg import warm
 from monitor import monitor_once  # monitor.py'de eklediğimiz tek tur fonksiyonu
 
 logging.getLogger().setLevel(logging.INFO)
@@ -32,20 +31,15 @@ def lambda_handler(event, context):
     if not TELEGRAM_BOT_TOKEN:
         raise RuntimeError("TELEGRAM_BOT_TOKEN yok")
 
-    conn = init_db(DB_PATH)
-
-    # Token değiştiyse offset'i bir kez sıfırla (eski update çakışmasın)
-    tok_h = text_hash(TELEGRAM_BOT_TOKEN)[:16]
-    if (get_state(conn, "token_hash") or "") != tok_h:
-        del_state(conn, "update_offset")
-        set_state(conn, "token_hash", tok_h)
-        logging.info("Token değişikliği tespit edildi; update_offset sıfırlandı.")
-
-    total = monitor_once(conn)
+    t0 = time.perf_counter()
+    # Sıcak container'da bağlantı + token kontrolü yeniden kullanılır (lambdapkg/warm.py)
+    conn, info = warm.setup()
 
     try:
-        conn.close()
+        total = monitor_once(conn)
     except Exception:
-        pass
+        warm.discard_if_broken()
+        raise
 
-    return {"statusCode": 200, "body": f"ok:{total}"}
\ No newline at end of file
+    warm.log_invocation("scraper", info, (time.perf_counter() - t0) * 1000, new=total)
+    return {"statusCode": 200, "body": f"ok:{total}", **info}
\ No newline at end of file
@@ -13,11 +13,11 @@ if os.path.isdir(VENDORED) and VENDORED not in sys.path:
     sys.path.append(VENDORED)
     
     
-from config import TELEGRAM_BOT_TOKEN, DB_PATH
-from storage.db import init_db, get_state, set_state, del_state
-from formatters.textfmt import text_hash
-from scraper.site_monitor import load_sites_yaml
+from config import TELEGRAM_BOT_TOKEN
+from lambdapkg import warm
+from scraper.sites import load_sites_yaml  # bs4/requests yüklemeden
 from notifiers.telegram_bot import handle_update  # SENİN mevcut fonksiyonun
+from storage.db import register_sites
 
 logging.getLogger().setLevel(logging.INFO)
 
@@ -40,30 +40,32 @@ def lambda_handler(event, context):
     except Exception:
         return {"statusCode": 400, "body": "bad request"}
 
-    # 3) DB bağlantısı
+    # 3) DB bağlantısı + 4) token_hash kontrolü
+    # Sıcak container'da ikisi de yeniden kullanılır (lambdapkg/warm.py)
     if not TELEGRAM_BOT_TOKEN:
         raise RuntimeError("TELEGRAM_BOT_TOKEN yok")
-    conn = init_db(DB_PATH)
-
-    # 4) Token değiştiyse offset reset (webhook'ta zorunlu değil ama güvenli)
-    tok_h = text_hash(TELEGRAM_BOT_TOKEN)[:16]
-    if (get_state(conn, "token_hash") or "") != tok_h:
-        del_state(conn, "update_offset")
-        set_state(conn, "token_hash", tok_h)
-        logging.info("Token değişikliği tespit edildi; update_offset sıfırlandı.")
+    t0 = time.perf_counter()
+    conn, info = warm.setup()
 
     # 5) Siteleri yükle (sıcak durumda cache'i kullan)
     global _SITES_CACHE
     if _SITES_CACHE is None:
         _SITES_CACHE = load_sites_yaml()
+        register_sites(conn, [s["url"] for s in _SITES_CACHE], prune=True)  # container başına bir kez
     sites_by_url = { s["url"]: s for s in _SITES_CACHE }
 
-    # 6) Mevcut akışınla birebir: handle_update(...)
+    # 6) handle_update(...): ilk cevap (sendMessage / answerCallbackQuery) ayrı bir
+    # HTTPS çağrısı yerine bu HTTP yanıtının gövdesinde Telegram'a döner;
+    # yalnızca ek çağrılar (menü düzenlemeleri vb.) dışarı gider.
+    # Bağlantı kapatılmaz; bir sonraki sıcak çağrı kullanır.
     try:
-        handle_update(conn, update, sites_by_url)
-        return {"statusCode": 200, "body": "ok"}
-    finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
\ No newline at end of file
+        action = handle_update(conn, update, sites_by_url, inline_reply=True)
+    except Exception:
+        warm.discard_if_broken()
+        raise
+    warm.log_invocation("webhook", info, (time.perf_counter() - t0) * 1000,
+                        inline=action["method"] if action else None)
+    if action:
+        return {"statusCode": 200, "headers": {"Content-Type": "application/json"},
+                "body": json.dumps(action, ensure_ascii=False)}
+    return {"statusCode": 200, "body": "ok"}
@@ -0,0 +1,95 @@
+# lambdapkg/warm.py  -- sıcak Lambda container'ında bağlantı/durum yeniden kullanımı
+"""
+Modül seviyesindeki durum, aynı container'daki ardışık çağrılar arasında
+yaşar. Böylece her Telegram update'inde / cron tetiklemesinde yeniden
+TLS el sıkışması + şema kontrolü + token_hash okuması yapılmaz.
+
+- Bağlantı DB_CONN_MAX_AGE_SEC'ten eskiyse kapatılıp yenilenir.
+- DB_LIVENESS_IDLE_SEC'ten uzun süre boşta kaldıysa kullanılmadan önce ping'lenir;
+  ölü ise (ör. Neon/Supabase boşta bağlantıyı kestiyse) sessizce yeniden bağlanılır.
+- Handler hata verirse discard_if_broken() bozuk bağlantıyı bırakır.
+
+setup() her çağrıda {"cold", "reconnected", "setup_ms"} döndürür; handler'lar bunu
+tek satır JSON olarak loglar (CloudWatch Insights ile p50/p99 için).
+"""
+import json, logging, time
+
+from config import TELEGRAM_BOT_TOKEN, DB_PATH, DB_CONN_MAX_AGE_SEC, DB_LIVENESS_IDLE_SEC
+from storage import db as dbmod
+
+_conn = None
+_conn_born = 0.0
+_last_used = 0.0
+_token_checked = False
+_invocations = 0
+
+
+def _open():
+    global _conn, _conn_born
+    _conn = dbmod.init_db(DB_PATH)
+    _conn_born = time.monotonic()
+
+
+def _close():
+    global _conn
+    if _conn is not None:
+        try:
+            _conn.close()
+        except Exception:
+            pass
+    _conn = None
+
+
+def ensure_token_hash(conn):
+    """Token değiştiyse offset'i bir kez sıfırla; container başına tek kontrol."""
+    global _token_checked
+    if _token_checked:
+        return
+    from formatters.textfmt import text_hash
+    tok_h = text_hash(TELEGRAM_BOT_TOKEN)[:16]
+    if (dbmod.get_state(conn, "token_hash") or "") != tok_h:
+        dbmod.del_state(conn, "update_offset")
+        dbmod.set_state(conn, "token_hash", tok_h)
+        logging.info("Token değişikliği tespit edildi; update_offset sıfırlandı.")
+    _token_checked = True
+
+
+def setup():
+    """
+    Bu çağrı için kullanılabilir bir bağlantı döndürür: (conn, info).
+    info = {"cold": ilk çağrı mı, "reconnected": bağlantı yenilendi mi, "setup_ms": süre}
+    """
+    global _last_used, _invocations
+    t0 = time.perf_counter()
+    now = time.monotonic()
+    cold = _invocations == 0
+    _invocations += 1
+    reconnected = False
+
+    if _conn is None:
+        _open()
+        reconnected = not cold
+    elif now - _conn_born > DB_CONN_MAX_AGE_SEC:
+        _close(); _open()
+        reconnected = True
+    elif now - _last_used > DB_LIVENESS_IDLE_SEC and not dbmod.ping(_conn):
+        logging.info("DB bağlantısı ölü; yeniden bağlanılıyor.")
+        _close(); _open()
+        reconnected = True
+
+    ensure_token_hash(_conn)
+    _last_used = time.monotonic()
+    info = {"cold": cold, "reconnected": reconnected,
+            "setup_ms": round((time.perf_counter() - t0) * 1000, 1)}
+    return _conn, info
+
+
+def discard_if_broken():
+    """Handler hatasından sonra çağrılır; bağlantı bozulduysa bir sonraki çağrı yeniden bağlanır."""
+    if _conn is not None and not dbmod.ping(_conn):
+        _close()
+
+
+def log_invocation(handler: str, info: dict, total_ms: float, **extra):
+    rec = {"metric": "invocation", "handler": handler, **info, "total_ms": round(total_ms, 1), **extra}
+    logging.info(json.dumps(rec))
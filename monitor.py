@@ -1,3 +1,4 @@
+import json
 import time
 import threading
 import logging
@@ -10,34 +11,49 @@ from config import (
     ADMIN_CHAT_ID,
     SMTP_HOST,
     TO_EMAIL,
+    TG_FLUSH_TIMEOUT_SEC,
+    FEED_MIN_CONTENT,
 )
 from storage.db import (
     init_db,
+    thread_conn,
     insert_seen,
-    get_subscribers,
-    get_user_subs,
+    seed_admin,
+    register_sites,
+    seen_known,
+    warm_seen,
     get_state,
     set_state,
     del_state,
 )
 from storage import db as dbmod
+from storage.retention import maybe_run_retention
 from scraper.site_monitor import (
     load_sites_yaml,
     fetch_list_html,
+    fetch_detail_html,
     extract_list_links,
     filter_links,
     extract_detail,
 )
-from formatters.textfmt import text_hash, clean_text, format_telegram, email_html
-from notifiers.telegram_bot import bot_poll_loop, send_telegram
-from notifiers.emailer import send_email_single
+from formatters.textfmt import text_hash, clean_text, simhash64, body_hash
+from scraper.revisit import revisit_due, next_revisit_sec
+from scraper.pagecache import PAGE_CACHE
+from scraper import feeds
+from notifiers.telegram_bot import bot_poll_loop, flush_telegram
+from notifiers.outbox import OUTBOX_WAKE, drain_outbox, outbox_loop, email_due, release_digests
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
 
+def _extra_emails():
+    """Her duyuruya eklenecek global alıcılar (TO_EMAIL, virgülle çoklu)."""
+    return [a.strip() for a in TO_EMAIL.split(",") if a.strip()] if TO_EMAIL else []
+
+
 def notify_one_site(conn, site) -> int:
     """
-    Verilen siteyi tarar, yeni bulunan duyuruları bildirir.
+    Verilen siteyi tarar, yeni bulunan duyuruları bildirim kuyruğuna (outbox) yazar.
     Dönüş: new_count (yeni duyuru sayısı)
     """
     base = site["url"]
@@ -49,94 +65,107 @@ def notify_one_site(conn, site) -> int:
 
     logging.info("Kontrol: %s", base)
 
-    html_list = fetch_list_html(base)
-    if not html_list:
-        logging.info("Liste HTML alınamadı: %s", base)
+    # Akış (RSS/Atom/JSON) varsa liste HTML'i yerine o okunur (scraper/feeds.py);
+    # çekilemez, boş veya bayatsa bu tur HTML'e dönülür.
+    feed_url = feeds.site_feed(conn, site)
+    feed = feeds.read_feed(feed_url) if feed_url else None
+    if feed and feed[0] is None:
+        logging.info("Akış değişmedi: %s", base)
         return 0
-
-    items = extract_list_links(html_list, list_selector, item_link_selector, base)
+    if feed:
+        items = feed[0]
+    else:
+        html_list = fetch_list_html(base)
+        if not html_list:
+            logging.info("Liste HTML alınamadı: %s", base)
+            return 0
+        items = extract_list_links(html_list, list_selector, item_link_selector, base)
     items = filter_links(items, include_url_regex, exclude_text_regex)
     if not items:
         logging.info("Item yok/filtre sonrası boş: %s", base)
         return 0
+    if not feed:
+        feeds.maybe_discover(conn, site, html_list, items, lambda u: seen_known(base, text_hash(u)),
+                             lambda found: filter_links(found, include_url_regex, exclude_text_regex))
 
     new_count = 0
+    known_count = 0
+    failed = 0
 
     for it in items:
         link = it["url"]
         title_from_list = it.get("title", "")[:200]
 
-        # Detay sayfasını çek
-        list_html = fetch_list_html(link)
-        if not list_html:
+        # Bellek içi küme "görülmüş" diyorsa ne detay çekilir ne DB'ye sorulur
+        h = text_hash(link)
+        if seen_known(base, h):
+            known_count += 1
             continue
 
-        title_det, body, date_str = extract_detail(list_html, detail_selector)
-        final_title = (title_det or title_from_list or "").strip()[:200]
-        snippet = clean_text(body, limit=1000)
+        if len(it.get("snippet") or "") >= FEED_MIN_CONTENT:
+            # Akış girdisinin metni yeterli: detay sayfası çekilmez. İçerik özeti
+            # boş kalır; ilk yeniden ziyaretteki detay sayfası karşılaştırma tabanı olur.
+            final_title = title_from_list.strip()
+            snippet = clean_text(it["snippet"], limit=1000)
+            date_str, content_hash, etag, last_modified = it.get("date"), None, None, None
+        else:
+            # Detay sayfasını çek (doğrulayıcılar sonraki yeniden ziyaretin koşullu GET'i için)
+            res = fetch_detail_html(link)
+            if not res or not res[0]:
+                failed += 1
+                continue
+            detail_html, etag, last_modified = res
 
-        # Link bazlı tekilleştirme
-        h = text_hash(link)
-        if not insert_seen(conn, base, h, final_title, link):
+            title_det, body, date_str = extract_detail(detail_html, detail_selector)
+            final_title = (title_det or title_from_list or "").strip()[:200]
+            snippet = clean_text(body, limit=1000)
+            date_str = date_str or it.get("date")
+            content_hash = body_hash(snippet)
+
+        # Link bazlı tekilleştirme (muhtemelen yeni → DB ile doğrula).
+        # Yeni ise alıcı başına outbox satırları aynı transaction'da açılır;
+        # gönderim taramayı bekletmez (notifiers/outbox.py). İçerik parmak izi
+        # başka bir sitede yayınlanmış aynı duyuruyu bulursa, onu zaten alanlara
+        # tekrar bildirim gitmez (storage/neardup.py).
+        if not insert_seen(conn, base, h, final_title, link, snippet, date_str,
+                           extra_emails=_extra_emails(), with_email=bool(SMTP_HOST),
+                           email_due=email_due(),
+                           fingerprint=simhash64(f"{final_title}\n{snippet}"),
+                           content_hash=content_hash, etag=etag, last_modified=last_modified,
+                           revisit_sec=next_revisit_sec(0, 0)):
             # zaten görülmüş
             continue
 
         new_count += 1
 
-        # Telegram bildirimleri
-        subscribers = get_subscribers(conn, base)
-        if subscribers:
-            text_msg = format_telegram(site.get("name", ""), final_title, link, snippet, date_str)
-            for cid in subscribers:
-                send_telegram(cid, text_msg)
-
-        # E-posta (kullanıcıların kendi kayıtları + opsiyonel global TO_EMAIL)
-        if SMTP_HOST:
-            email_set = set()
-
-            # 1) Abone e-postalarını çek (psycopg3 için ANY(%s), sqlite için IN (?))
-            if subscribers:
-                try:
-                    cur = conn.cursor()
-                    try:
-                        # psycopg3 (Postgres) yolu
-                        cur.execute(
-                            "SELECT email FROM email_subs WHERE chat_id = ANY(%s)",
-                            (list(subscribers),)
-                        )
-                    except Exception:
-                        # sqlite geri dönüş yolu
-                        q = "SELECT email FROM email_subs WHERE chat_id IN ({})".format(
-                            ",".join(["?"] * len(subscribers))
-                        )
-                        cur.execute(q, tuple(subscribers))
-                    for row in cur.fetchall():
-                        em = row[0]
-                        if em:
-                            email_set.add(em)
-                except Exception:
-                    logging.exception("email_subs fetch failed")
-
-            # 2) Global TO_EMAIL (virgülle çoklu)
-            if TO_EMAIL:
-                for em in [a.strip() for a in TO_EMAIL.split(",") if a.strip()]:
-                    email_set.add(em)
-
-            # 3) Gönder
-            if email_set:
-                em_html = email_html(site.get("name", ""), final_title, link, snippet, date_str)
-                subject = f"Yeni duyuru - {site.get('name')}"
-                for em in sorted(email_set):
-                    ok = send_email_single(subject, em_html, em)
-                    if ok:
-                        logging.info("SMTP sent to %s", em)
-                    else:
-                        logging.warning("SMTP send failed to %s", em)
-
-    logging.info("Tamam: %s (yeni: %d)", base, new_count)
+    if feed and not failed:
+        feeds.feed_done(feed_url, feed[1], feed[2])
+    if new_count:
+        OUTBOX_WAKE.set()
+    logging.info("Tamam: %s (yeni: %d, bellekten atlanan: %d%s)", base, new_count, known_count,
+                 ", akıştan" if feed else "")
     return new_count
 
 
+def revisit_items(conn, sites) -> int:
+    """Düzenlenmiş olabilecek son duyuruları (tur başına sınırlı sayıda) yeniden kontrol eder."""
+    try:
+        stats = revisit_due(conn, {s["url"]: s for s in sites}, extra_emails=_extra_emails(),
+                            with_email=bool(SMTP_HOST), email_due=email_due())
+    except Exception:
+        logging.exception("Yeniden ziyaret başarısız")
+        return 0
+    if stats["updated"]:
+        OUTBOX_WAKE.set()
+    return stats["updated"]
+
+
+def log_page_cache():
+    """Turdaki sayfa önbelleği sayaçları (isabet oranı dahil) tek JSON satırı olarak."""
+    if PAGE_CACHE.enabled:
+        logging.info(json.dumps({"metric": "pagecache", **PAGE_CACHE.take_stats()}))
+
+
 def monitor_once(conn) -> int:
     """
     Tek TUR tarama yapar ve toplam yeni duyuru sayısını döndürür.
@@ -145,6 +174,7 @@ def monitor_once(conn) -> int:
     """
     logging.info("Monitor ONCE started.")
     sites = load_sites_yaml()
+    warm_seen(conn, [s["url"] for s in sites])
     total_new = 0
     for idx, s in enumerate(sites, start=1):
         try:
@@ -161,7 +191,15 @@ def monitor_once(conn) -> int:
             logging.exception("Site işlenirken hata")
         # Lambda'da genellikle gecikme istemeyiz; gerekiyorsa kaldırılabilir.
         # time.sleep(1.2)
+    revisit_items(conn, sites)
+    log_page_cache()
     logging.info("Monitor ONCE bitti. Toplam yeni: %d", total_new)
+    # Lambda çağrısı dönünce süreç dondurulur; bekleyen bildirimler önce gitmeli.
+    # Süre yetmezse kalanlar bir sonraki çağrıda gönderilir.
+    release_digests(conn)
+    drain_outbox(conn, {s["url"]: s for s in sites}, max_sec=TG_FLUSH_TIMEOUT_SEC)
+    flush_telegram(TG_FLUSH_TIMEOUT_SEC)
+    maybe_run_retention(conn)
     return total_new
 
 
@@ -173,6 +211,7 @@ def monitor_loop(conn):
     logging.info("Monitor loop started.")
     while True:
         sites = load_sites_yaml()
+        warm_seen(conn, [s["url"] for s in sites])
         total_new = 0
         for idx, s in enumerate(sites, start=1):
             try:
@@ -188,6 +227,11 @@ def monitor_loop(conn):
             except Exception:
                 logging.exception("Site işlenirken hata")
             time.sleep(1.2)
+        revisit_items(conn, sites)
+        log_page_cache()
+        # özet modundaki kullanıcılara turun tüm yeni duyuruları birlikte gider
+        release_digests(conn)
+        maybe_run_retention(conn)
         logging.info("Tur bitti. Toplam yeni: %d. %d sn uyku.", total_new, CHECK_INTERVAL_SEC)
         time.sleep(CHECK_INTERVAL_SEC)
 
@@ -206,23 +250,16 @@ if __name__ == "__main__":
         logging.info("Token değişikliği tespit edildi; update_offset sıfırlandı.")
 
     sites = load_sites_yaml()
+    register_sites(conn, [s["url"] for s in sites], prune=True)  # abonelik bit numaraları
 
     # (opsiyonel) admin seed
     if ADMIN_CHAT_ID and ADMIN_CHAT_ID.isdigit():
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT OR IGNORE INTO users(chat_id, username) VALUES(?,?)",
-            (int(ADMIN_CHAT_ID), "admin"),
-        )
-        for s in sites:
-            cur.execute(
-                "INSERT OR IGNORE INTO user_subs(chat_id, site_url) VALUES(?,?)",
-                (int(ADMIN_CHAT_ID), s["url"]),
-            )
-        conn.commit()
+        seed_admin(conn, int(ADMIN_CHAT_ID), [s["url"] for s in sites])
         logging.info("ADMIN_CHAT_ID seedlendi: %s", ADMIN_CHAT_ID)
 
-    # LOKAL/EC2 çalıştırma modu (thread + sonsuz loop)
+    # LOKAL/EC2 çalıştırma modu (thread + sonsuz loop); Postgres'te her thread kendi bağlantısıyla
     t1 = threading.Thread(target=bot_poll_loop, args=(conn, sites), daemon=True)
     t1.start()
+    t2 = threading.Thread(target=outbox_loop, args=(thread_conn(conn, DB_PATH), sites), daemon=True)
+    t2.start()
     monitor_loop(conn)
\ No newline at end of file
@@ -0,0 +1,52 @@
+# notifiers/chat_workers.py  -- sohbet başına sıralı, sohbetler arası paralel update işleme
+"""
+bot_poll_loop bir getUpdates partisini update_intake'e kaydedip offset'i tek
+seferde ilerlettikten sonra update'leri buraya verir.
+
+- Her update chat_id'ye göre sabit bir işçi thread'e gider: aynı sohbetin
+  update'leri geliş sırasıyla, farklı sohbetlerinki paralel işlenir.
+- handle_fn(update_id, upd) update'i intake'ten silmekten (tüketmekten) de
+  sorumludur (bkz. telegram_bot.consume_before_reply); havuz yalnızca sırayı ve
+  işlenmemiş update sayısını (geri basınç) tutar.
+- handle_fn hata verse de işçi sıradaki update'e geçer.
+"""
+import logging, queue, threading
+from typing import Callable
+
+
+class ChatWorkers:
+    def __init__(self, handle_fn: Callable[[int, dict], None], workers: int = 8):
+        self.handle_fn = handle_fn
+        self._queues = [queue.Queue() for _ in range(max(1, workers))]
+        self._inflight = 0
+        self._cv = threading.Condition()
+        for i, q in enumerate(self._queues):
+            threading.Thread(target=self._run, args=(q,), name=f"bot-worker-{i}", daemon=True).start()
+
+    def submit(self, chat_id: int, update_id: int, upd: dict):
+        with self._cv:
+            self._inflight += 1
+        self._queues[hash(chat_id) % len(self._queues)].put((update_id, upd))
+
+    def inflight(self) -> int:
+        with self._cv:
+            return self._inflight
+
+    def wait_below(self, limit: int, timeout: float | None = None) -> bool:
+        """İşlenmemiş update sayısı limit'in altına inene kadar bekler (geri basınç)."""
+        with self._cv:
+            return self._cv.wait_for(lambda: self._inflight < limit, timeout)
+
+    def join(self, timeout: float | None = None) -> bool:
+        return self.wait_below(1, timeout)
+
+    def _run(self, q: "queue.Queue"):
+        while True:
+            update_id, upd = q.get()
+            try:
+                self.handle_fn(update_id, upd)
+            except Exception:
+                logging.exception("Update işlenemedi: %s", update_id)
+            with self._cv:
+                self._inflight -= 1
+                self._cv.notify_all()
@@ -0,0 +1,241 @@
+# notifiers/delivery.py  -- hız sınırına duyarlı, eşzamanlı Telegram gönderim motoru
+"""
+Telegram Bot API sınırları: toplamda ~30 mesaj/sn, aynı sohbete ~1 mesaj/sn,
+aynı gruba ~20 mesaj/dk.
+Bu motor gönderimleri kuyruğa alır ve:
+- küresel bir token bucket + sohbet başına token bucket ile hızı sınırlar,
+- 429 cevabında `parameters.retry_after` kadar sonra tekrar dener
+  (ve o sohbeti de o süre boyunca bekletir),
+- ağ/5xx hatalarında üstel geri çekilmeyle en fazla TG_MAX_ATTEMPTS dener,
+- INTERACTIVE (bot cevapları) işleri BULK (duyuru yayını) işlerinin önüne alır.
+
+Zamanlama tek bir dağıtıcı thread'de, HTTP çağrıları işçi havuzunda yapılır.
+submit() hemen bir Future döndürür; tarama döngüsü gönderimleri beklemeden devam eder.
+"""
+import heapq, itertools, logging, threading, time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+INTERACTIVE, BULK = 0, 1
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.at) * self.rate)
+        self.at = now
+
+    def wait_time(self, now: float) -> float:
+        """Bir jeton için kaç saniye beklenmeli (0 → hemen)."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, until: float):
+        self.blocked_until = max(self.blocked_until, until)
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.blocked_until
+
+
+class _Job:
+    __slots__ = ("chat_id", "payload", "priority", "future", "attempts")
+
+    def __init__(self, chat_id, payload, priority):
+        self.chat_id = chat_id
+        self.payload = payload
+        self.priority = priority
+        self.future: Future = Future()
+        self.attempts = 0
+
+
+class DeliveryEngine:
+    """
+    send_fn(payload) → requests.Response benzeri (status_code, ok, json()) veya
+    ağ hatasında istisna. payload Bot API gövdesidir (chat_id dahil; "method"
+    anahtarı yoksa sendMessage).
+    """
+
+    def __init__(self, send_fn: Callable, workers: int, global_rate: float,
+                 per_chat_rate: float, per_chat_burst: float, group_rate: float,
+                 max_attempts: int):
+        self.send_fn = send_fn
+        self.max_attempts = max_attempts
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.group_rate = group_rate
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: Dict[object, TokenBucket] = {}
+        self._lanes = ([], [])         # öncelik başına heap: (due, seq, job)
+        self._seq = itertools.count()
+        self._cv = threading.Condition()
+        self._inflight = 0
+        self._running = False
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tg-send")
+        self._dispatcher: Optional[threading.Thread] = None
+        self.stats = {"sent": 0, "failed": 0, "retried_429": 0, "retried_error": 0}
+
+    # --- dış API ---
+    def start(self):
+        with self._cv:
+            if self._running:
+                return self
+            self._running = True
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="tg-dispatch", daemon=True)
+        self._dispatcher.start()
+        return self
+
+    def submit(self, payload: dict, priority: int = BULK) -> Future:
+        job = _Job(payload.get("chat_id"), payload, priority)
+        self._push(job, time.monotonic())
+        return job.future
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Kuyruk ve uçuştaki işler bitene kadar bekler."""
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cv:
+            while self._lanes[0] or self._lanes[1] or self._inflight:
+                left = None if end is None else end - time.monotonic()
+                if left is not None and left <= 0:
+                    return False
+                self._cv.wait(left if left is not None else 0.5)
+        return True
+
+    def stop(self, drain_timeout: Optional[float] = 60):
+        if drain_timeout:
+            self.drain(drain_timeout)
+        with self._cv:
+            self._running = False
+            self._cv.notify_all()
+        if self._dispatcher:
+            self._dispatcher.join(timeout=5)
+        self._pool.shutdown(wait=True)
+
+    def pending(self) -> int:
+        with self._cv:
+            return len(self._lanes[0]) + len(self._lanes[1]) + self._inflight
+
+    # --- iç işleyiş ---
+    def _push(self, job: _Job, due: float):
+        with self._cv:
+            heapq.heappush(self._lanes[job.priority], (due, next(self._seq), job))
+            self._cv.notify_all()
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        b = self._chats.get(chat_id)
+        if b is None:
+            # grup/kanal sohbetlerinin (negatif id) sınırı dakikada ~20 mesajdır
+            if isinstance(chat_id, int) and chat_id < 0:
+                b = TokenBucket(self.group_rate, self.per_chat_burst)
+            else:
+                b = TokenBucket(self.per_chat_rate, self.per_chat_burst)
+            self._chats[chat_id] = b
+        return b
+
+    def _pick(self, now: float):
+        """
+        Zamanı gelmiş işi önce INTERACTIVE, sonra BULK şeridinden seçer. Sohbeti
+        henüz hazır değilse iş o sohbetin hazır olacağı ana ertelenir.
+        (iş, bir sonraki uyanma zamanı) döndürür.
+        """
+        job, wake = None, None
+        for lane in self._lanes:
+            deferred = []
+            while lane and lane[0][0] <= now:
+                due, seq, cand = heapq.heappop(lane)
+                w = self._chat_bucket(cand.chat_id).wait_time(now)
+                if w > 0:
+                    deferred.append((now + w, seq, cand))
+                    continue
+                job = cand
+                break
+            for item in deferred:
+                heapq.heappush(lane, item)
+            if lane:
+                wake = lane[0][0] if wake is None else min(wake, lane[0][0])
+            if job is not None:
+                break
+        return job, wake
+
+    def _dispatch_loop(self):
+        last_prune = time.monotonic()
+        while True:
+            with self._cv:
+                if not self._running:
+                    return
+                now = time.monotonic()
+                gw = self._global.wait_time(now)
+                if gw > 0:
+                    self._cv.wait(gw)
+                    continue
+                job, wake = self._pick(now)
+                if job is None:
+                    self._cv.wait(None if wake is None else max(0.001, wake - now))
+                    continue
+                self._global.take(now)
+                self._chat_bucket(job.chat_id).take(now)
+                self._inflight += 1
+                if now - last_prune > 60:
+                    self._chats = {k: b for k, b in self._chats.items() if not b.idle(now)}
+                    last_prune = now
+            self._pool.submit(self._run, job)
+
+    def _count(self, key: str):
+        # işçi thread'leri aynı anda artırır; += kilitsiz atomik değildir
+        with self._cv:
+            self.stats[key] += 1
+
+    def _run(self, job: _Job):
+        job.attempts += 1
+        retry_in = None
+        try:
+            r = self.send_fn(job.payload)
+            if r is not None and r.status_code == 429:
+                try:
+                    retry_in = float(r.json().get("parameters", {}).get("retry_after", 1))
+                except Exception:
+                    retry_in = 1.0
+                with self._cv:
+                    self.stats["retried_429"] += 1
+                    self._chat_bucket(job.chat_id).block(time.monotonic() + retry_in)
+            elif r is not None and r.status_code >= 500:
+                retry_in = min(60.0, 2.0 ** job.attempts)
+                self._count("retried_error")
+            else:
+                if r is not None and not r.ok:
+                    self._count("failed")
+                else:
+                    self._count("sent")
+                job.future.set_result(r)
+        except Exception as e:
+            retry_in = min(60.0, 2.0 ** job.attempts)
+            self._count("retried_error")
+            if job.attempts >= self.max_attempts:
+                logging.warning("Telegram gönderimi vazgeçildi (chat %s): %s", job.chat_id, e)
+                self._count("failed")
+                job.future.set_exception(e)
+                retry_in = None
+
+        if retry_in is not None and not job.future.done():
+            if job.attempts >= self.max_attempts:
+                logging.warning("Telegram gönderimi %d denemede başarısız (chat %s)", job.attempts, job.chat_id)
+                self._count("failed")
+                job.future.set_result(r)
+            else:
+                self._push(job, time.monotonic() + retry_in)
+
+        with self._cv:
+            self._inflight -= 1
+            self._cv.notify_all()
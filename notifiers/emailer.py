@@ -1,23 +1,153 @@
 import smtplib, logging
+from concurrent.futures import ThreadPoolExecutor
 from email.message import EmailMessage
-from typing import Iterable
-from config import SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS, FROM_EMAIL
+from typing import List, Sequence, Tuple
+from config import (SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS, FROM_EMAIL,
+                    SMTP_MAX_PER_CONN, SMTP_POOL_SIZE)
 
-def send_email_single(subject: str, body_html: str, recipient: str) -> bool:
-    if not (SMTP_HOST and SMTP_USER and SMTP_PASS and FROM_EMAIL and recipient):
-        return False
+# Sağlayıcının "şimdilik yeter / tekrar bağlan" anlamına gelen geçici cevapları
+_RECONNECT_CODES = (421, 451, 452, 454)
+
+
+def smtp_configured() -> bool:
+    return bool(SMTP_HOST and SMTP_USER and SMTP_PASS and FROM_EMAIL)
+
+
+def _build_message(subject: str, body_html: str, recipients: Sequence[str]) -> EmailMessage:
     msg = EmailMessage()
     msg["Subject"] = subject
     msg["From"] = FROM_EMAIL
-    msg["To"] = recipient
+    # Tek alıcıda To; çok alıcıda adresler birbirini görmesin (zarf alıcıları = BCC)
+    msg["To"] = recipients[0] if len(recipients) == 1 else FROM_EMAIL
     msg.set_content("HTML istemcisi olmayanlar için düz metin.")
     msg.add_alternative(body_html, subtype="html")
-    try:
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30) as smtp:
+    return msg
+
+
+class SmtpSession:
+    """
+    Tek bir kimliği doğrulanmış SMTP bağlantısı üzerinden çok sayıda mesaj gönderir.
+    - Bağlantı ilk send()'de açılır (STARTTLS + login bir kez).
+    - SMTP_MAX_PER_CONN mesajdan sonra veya sağlayıcı bağlantıyı kestiğinde /
+      421-45x ile "sonra gel" dediğinde yeniden bağlanır ve mesajı bir kez tekrar dener.
+    - Reddedilen alıcı yalnızca o mesajı etkiler; bağlantı açık kalır.
+    `with SmtpSession() as s: ...` ile kullanılır.
+    """
+
+    def __init__(self, max_per_conn: int = SMTP_MAX_PER_CONN):
+        self.max_per_conn = max_per_conn
+        self._smtp = None
+        self._count = 0
+        self.stats = {"connects": 0, "sent": 0, "failed": 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _connect(self):
+        smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30)
+        try:
             smtp.starttls()
             smtp.login(SMTP_USER, SMTP_PASS)
-            smtp.send_message(msg, from_addr=FROM_EMAIL, to_addrs=[recipient])
-        return True
-    except Exception:
-        logging.exception("SMTP error to %s", recipient)
-        return False
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp, self._count = smtp, 0
+        self.stats["connects"] += 1
+
+    def _drop(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                try: self._smtp.close()
+                except Exception: pass
+        self._smtp = None
+
+    def close(self):
+        self._drop()
+
+    def send(self, subject: str, body_html: str, recipients: Sequence[str]) -> List[str]:
+        """Mesajı gönderir; kabul edilen alıcıları döndürür (boş liste = başarısız)."""
+        recipients = [r for r in recipients if r]
+        if not (smtp_configured() and recipients):
+            return []
+        msg = _build_message(subject, body_html, recipients)
+        for attempt in (1, 2):
+            try:
+                if self._smtp is None or self._count >= self.max_per_conn:
+                    self._drop()
+                    self._connect()
+                refused = self._smtp.send_message(msg, from_addr=FROM_EMAIL, to_addrs=recipients)
+                self._count += 1
+                if refused:
+                    logging.warning("SMTP bazı alıcıları reddetti: %s", ", ".join(refused))
+                accepted = [r for r in recipients if r not in refused]
+                self.stats["sent"] += 1
+                return accepted
+            except smtplib.SMTPRecipientsRefused as e:
+                logging.warning("SMTP alıcı(lar) reddedildi: %s", ", ".join(e.recipients))
+                self._reset()
+                break
+            except smtplib.SMTPResponseException as e:
+                if e.smtp_code in _RECONNECT_CODES and attempt == 1:
+                    logging.info("SMTP %s; yeniden bağlanılıyor", e.smtp_code)
+                    self._drop()
+                    continue
+                logging.warning("SMTP error to %s: %s %s", ", ".join(recipients), e.smtp_code, e.smtp_error)
+                self._reset()
+                break
+            except (smtplib.SMTPServerDisconnected, OSError):
+                self._drop()
+                if attempt == 1:
+                    continue
+                logging.exception("SMTP error to %s", ", ".join(recipients))
+                break
+            except Exception:
+                logging.exception("SMTP error to %s", ", ".join(recipients))
+                self._drop()
+                break
+        self.stats["failed"] += 1
+        return []
+
+    def _reset(self):
+        """Başarısız işlemden sonra bağlantıyı sonraki mesaj için temizler."""
+        try:
+            self._smtp.rset()
+        except Exception:
+            self._drop()
+
+
+def send_many(messages: Sequence[Tuple[str, str, Sequence[str]]],
+              pool_size: int = SMTP_POOL_SIZE) -> List[List[str]]:
+    """
+    [(konu, html, alıcılar), ...] mesajlarını en fazla pool_size eşzamanlı SMTP
+    oturumuyla gönderir. Dönen: her mesaj için kabul edilen alıcılar (aynı sırada).
+    """
+    results: List[List[str]] = [[] for _ in messages]
+    if not messages:
+        return results
+    n = max(1, min(pool_size, len(messages)))
+    connects = [0] * n
+
+    def _worker(k):
+        with SmtpSession() as s:
+            for i in range(k, len(messages), n):
+                results[i] = s.send(*messages[i])
+            connects[k] = s.stats["connects"]
+
+    if n == 1:
+        _worker(0)
+    else:
+        with ThreadPoolExecutor(max_workers=n, thread_name_prefix="smtp") as ex:
+            list(ex.map(_worker, range(n)))
+    logging.info("SMTP: %d mesaj, %d bağlantı, %d başarısız",
+                 len(messages), sum(connects), sum(1 for r in results if not r))
+    return results
+
+
+def send_email_single(subject: str, body_html: str, recipient: str) -> bool:
+    with SmtpSession() as s:
+        return bool(s.send(subject, body_html, [recipient]))
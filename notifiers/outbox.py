@@ -0,0 +1,278 @@
+# notifiers/outbox.py  -- notification_outbox'ı boşaltan gönderim işçisi
+"""
+Yeni öğe, alıcı başına outbox satırlarıyla birlikte aynı transaction'da
+kaydedilir (storage/db.py: insert_seen). Bu modül satırları partiler halinde
+sahiplenir, gönderir ve sonucu yazar:
+
+- başarılı → 'sent'
+- geçici hata (ağ, 429/5xx, SMTP) → OUTBOX_BACKOFF_SEC * 2^(deneme-1) sonra tekrar
+- kalıcı hata (ör. kullanıcı botu engellemiş, 400/403) veya deneme sınırı → 'dead'
+
+Teslimat en-az-bir-kezdir: gönderim ile 'sent' yazımı arasında süreç ölürse
+kira (OUTBOX_LEASE_SEC) dolunca satır tekrar gönderilir. Süreç yaşarken parti
+ne kadar sürerse sürsün kira OUTBOX_LEASE_SEC/3'te bir uzatılır (başka bir
+boşaltma aynı satırı alıp ikinci kez göndermez); sonuçlar da yalnızca satır
+hâlâ bu sahiplenmeye aitse (attempts = kira belirteci) yazılır. (item, kanal,
+alıcı) tekil olduğundan aynı duyuru bir alıcıya iki kez kuyruğa girmez.
+
+E-posta modu (EMAIL_MODE): single (alıcı başına mesaj), bcc (duyuru başına
+EMAIL_BCC_CHUNK alıcılık BCC mesajı), digest (alıcı başına EMAIL_DIGEST_SEC
+penceresindeki duyuruların tek özeti).
+
+Telegram'da özet modunu seçen kullanıcıların satırları ('tg_digest') tur boyunca
+'held' bekler; tur sonunda release_digests() ile salınır ve alıcı başına
+4096 karakterlik olabildiğince az mesajda gönderilir.
+
+'tg_edit' / 'email_edit' satırları yayınlandıktan sonra düzenlenen duyurular
+içindir (scraper/revisit.py); öğenin güncel içeriği "güncellendi" başlığıyla gider.
+
+Her drain_outbox çağrısı tek satır JSON metrik loglar (gönderilen, hız, kalan iş).
+"""
+import contextlib, json, logging, threading, time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from config import (OUTBOX_BATCH, OUTBOX_LEASE_SEC, OUTBOX_MAX_ATTEMPTS,
+                    OUTBOX_BACKOFF_SEC, OUTBOX_POLL_SEC,
+                    EMAIL_MODE, EMAIL_BCC_CHUNK, EMAIL_DIGEST_SEC)
+from storage import db as dbmod
+from formatters.textfmt import format_telegram, format_telegram_digest, email_html, email_digest_html
+
+# Tarama yeni öğe kaydettiğinde set edilir; outbox_loop beklemeden uyanır.
+OUTBOX_WAKE = threading.Event()
+
+# Telegram'ın kalıcı hata kodları: tekrar denemek anlamsız
+_TG_PERMANENT = (400, 403)
+
+
+def _backoff(attempts: int) -> int:
+    return min(6 * 3600, OUTBOX_BACKOFF_SEC * 2 ** max(0, attempts - 1))
+
+
+def email_due():
+    """
+    digest modunda yeni e-posta satırlarının bekletileceği an: içinde bulunulan
+    EMAIL_DIGEST_SEC penceresinin sonu (UTC). Pencere içinde bulunan tüm
+    duyurular aynı anda vadesi gelip tek özet e-postada toplanır.
+    Diğer modlarda None (hemen gönder).
+    """
+    if EMAIL_MODE != "digest" or EMAIL_DIGEST_SEC <= 0:
+        return None
+    end = (int(time.time()) // EMAIL_DIGEST_SEC + 1) * EMAIL_DIGEST_SEC
+    return datetime.fromtimestamp(end, timezone.utc)
+
+
+def _email_messages(emails):
+    """
+    E-posta satırlarını EMAIL_MODE'a göre mesajlara böler.
+    emails: [(oid, attempts, alıcı, item_id, (site_name, title, url, snippet, date_str)), ...]
+    Dönen: [((konu, html, alıcılar), [satır, ...]), ...]
+    - single: satır başına bir mesaj (duyuru başına tek biçimleme)
+    - bcc:    duyuru başına, EMAIL_BCC_CHUNK alıcılık parçalar halinde tek mesaj
+    - digest: alıcı başına, o alıcının bekleyen tüm duyurularını içeren tek mesaj
+    """
+    rendered = {}
+
+    def _single(item_id, item):
+        if item_id not in rendered:
+            rendered[item_id] = (f"Yeni duyuru - {item[0]}", email_html(*item))
+        return rendered[item_id]
+
+    out = []
+    if EMAIL_MODE == "digest":
+        by_rcpt = defaultdict(list)
+        for e in emails:
+            by_rcpt[e[2]].append(e)
+        for rcpt, rows in by_rcpt.items():
+            rows.sort(key=lambda e: e[3])
+            if len(rows) == 1:
+                subject, body = _single(rows[0][3], rows[0][4])
+            else:
+                subject = f"Duyuru özeti: {len(rows)} yeni duyuru"
+                body = email_digest_html([e[4] for e in rows])
+            out.append(((subject, body, [rcpt]), rows))
+    elif EMAIL_MODE == "bcc":
+        by_item = defaultdict(list)
+        for e in emails:
+            by_item[e[3]].append(e)
+        for item_id, rows in by_item.items():
+            subject, body = _single(item_id, rows[0][4])
+            for i in range(0, len(rows), max(1, EMAIL_BCC_CHUNK)):
+                chunk = rows[i:i + max(1, EMAIL_BCC_CHUNK)]
+                out.append(((subject, body, [e[2] for e in chunk]), chunk))
+    else:
+        for e in emails:
+            subject, body = _single(e[3], e[4])
+            out.append(((subject, body, [e[2]]), [e]))
+    return out
+
+
+def _deliver(rows, sites_by_url):
+    """
+    Sahiplenilmiş satırları gönderir. Her öğe kanal başına bir kez biçimlenir.
+    Dönen: (sent, retries, dead); satırlar kira belirteciyle (attempts), bkz. finish_outbox
+    """
+    from notifiers.telegram_bot import enqueue_telegram
+
+    sent, retries, dead = [], [], []
+
+    def _fail(oid, attempts, err, permanent=False):
+        if permanent or attempts >= OUTBOX_MAX_ATTEMPTS:
+            dead.append((oid, attempts, err))
+        else:
+            retries.append((oid, attempts, _backoff(attempts), err))
+
+    by_item = defaultdict(list)
+    for row in rows:
+        by_item[row[1]].append(row)
+
+    tg_futs = []
+    tg_digest = defaultdict(list)
+    emails, edit_emails = [], []
+    for item_id, item_rows in by_item.items():
+        _id, _item, _ch, _rcpt, _att, site_url, title, url, snippet, date_str = item_rows[0]
+        if site_url is None:
+            for r in item_rows:
+                dead.append((r[0], r[4], "öğe bulunamadı"))
+            continue
+        site_name = (sites_by_url.get(site_url) or {}).get("name", "")
+        tg_text = edit_text = None
+        for oid, _item, channel, recipient, attempts, *_ in item_rows:
+            if channel == "tg":
+                if tg_text is None:
+                    tg_text = format_telegram(site_name, title, url, snippet, date_str)
+                tg_futs.append(([(oid, attempts)], enqueue_telegram(int(recipient), tg_text)))
+            elif channel == "tg_edit":
+                if edit_text is None:
+                    edit_text = format_telegram(site_name, title, url, snippet, date_str, updated=True)
+                tg_futs.append(([(oid, attempts)], enqueue_telegram(int(recipient), edit_text)))
+            elif channel == "tg_digest":
+                tg_digest[recipient].append((oid, attempts, (site_name, title, url, snippet, date_str)))
+            elif channel == "email":
+                emails.append((oid, attempts, recipient, item_id, (site_name, title, url, snippet, date_str)))
+            elif channel == "email_edit":
+                edit_emails.append((oid, attempts, recipient, item_id, (site_name, title, url, snippet, date_str)))
+            else:
+                dead.append((oid, attempts, f"bilinmeyen kanal: {channel}"))
+
+    # Özet modundaki kullanıcılar: alıcı başına, 4096 karakterlik az sayıda mesaj
+    for recipient, entries in tg_digest.items():
+        if len(entries) == 1:
+            msgs = [(format_telegram(*entries[0][2]), [0])]
+        else:
+            msgs = format_telegram_digest([(sn, t, u, d) for (sn, t, u, _sp, d) in (e[2] for e in entries)])
+        for text, idx in msgs:
+            tg_futs.append(([entries[i][:2] for i in idx], enqueue_telegram(int(recipient), text)))
+
+    # E-postalar Telegram kuyruğu boşalırken, paylaşılan SMTP oturum(lar)ıyla gönderilir
+    if emails or edit_emails:
+        from notifiers.emailer import send_many
+        groups = _email_messages(emails)
+        # "güncellendi" e-postaları moddan bağımsız alıcı başına tek mesaj
+        for e in edit_emails:
+            groups.append(((f"Duyuru güncellendi - {e[4][0]}", email_html(*e[4], updated=True), [e[2]]), [e]))
+        results = send_many([msg for msg, _rows in groups])
+        for (_msg, group_rows), accepted in zip(groups, results):
+            accepted = set(accepted)
+            for oid, attempts, rcpt, *_ in group_rows:
+                if rcpt in accepted:
+                    logging.info("SMTP sent to %s", rcpt)
+                    sent.append((oid, attempts))
+                else:
+                    logging.warning("SMTP send failed to %s", rcpt)
+                    _fail(oid, attempts, "smtp")
+
+    # Bir Telegram mesajı birden çok satırı (özet) taşıyabilir; sonuç hepsine yazılır
+    for msg_rows, fut in tg_futs:
+        try:
+            r = fut.result()
+            err = None
+        except Exception as e:
+            r, err = None, str(e)[:200]
+        for oid, attempts in msg_rows:
+            if r is not None and r.ok:
+                sent.append((oid, attempts))
+            elif r is not None and r.status_code in _TG_PERMANENT:
+                _fail(oid, attempts, f"tg {r.status_code}", permanent=True)
+            else:
+                _fail(oid, attempts, err or f"tg {getattr(r, 'status_code', 'yok')}")
+
+    return sent, retries, dead
+
+
+@contextlib.contextmanager
+def _keep_lease(conn, rows, lease_sec: int):
+    """
+    Gönderim sürerken sahiplenilen satırların kirasını lease_sec/3'te bir uzatır
+    (hız sınırları, 429 beklemeleri veya yavaş SMTP yüzünden kiradan uzun süren
+    parti). Boşaltma thread'i bu sırada DB'ye gitmez; bağlantıyı yalnızca bu kullanır.
+    """
+    claims = [(r[0], r[4]) for r in rows]
+    stop = threading.Event()
+
+    def _renew():
+        while not stop.wait(max(1.0, lease_sec / 3)):
+            try:
+                dbmod.renew_outbox(conn, claims, lease_sec)
+            except Exception:
+                logging.exception("Outbox kirası uzatılamadı")
+
+    t = threading.Thread(target=_renew, name="outbox-lease", daemon=True)
+    t.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        t.join()
+
+
+def release_digests(conn) -> int:
+    """Tarama turu bitince çağrılır: özet modundaki kullanıcıların satırlarını gönderime açar."""
+    n = dbmod.release_held_outbox(conn)
+    if n:
+        OUTBOX_WAKE.set()
+    return n
+
+
+def drain_outbox(conn, sites_by_url, max_sec: float | None = None, batch: int = OUTBOX_BATCH) -> dict:
+    """
+    Zamanı gelmiş satırlar bitene (veya max_sec dolana) kadar partiler halinde gönderir.
+    Dönen metrik: claimed, sent, retry, dead, seconds, rate (gönderim/sn), backlog, oldest_sec
+    """
+    t0 = time.monotonic()
+    stats = {"claimed": 0, "sent": 0, "retry": 0, "dead": 0}
+    while True:
+        rows = dbmod.claim_outbox(conn, batch, OUTBOX_LEASE_SEC)
+        if not rows:
+            break
+        with _keep_lease(conn, rows, OUTBOX_LEASE_SEC):
+            sent, retries, dead = _deliver(rows, sites_by_url)
+        dbmod.finish_outbox(conn, sent, retries, dead)
+        stats["claimed"] += len(rows)
+        stats["sent"] += len(sent)
+        stats["retry"] += len(retries)
+        stats["dead"] += len(dead)
+        if max_sec is not None and time.monotonic() - t0 >= max_sec:
+            break
+
+    if not stats["claimed"]:
+        return stats
+    elapsed = time.monotonic() - t0
+    backlog, _due, oldest = dbmod.outbox_backlog(conn)
+    stats.update(seconds=round(elapsed, 2), rate=round(stats["sent"] / elapsed, 1) if elapsed else 0.0,
+                 backlog=backlog, oldest_sec=round(oldest))
+    logging.info(json.dumps({"metric": "outbox", **stats}))
+    return stats
+
+
+def outbox_loop(conn, sites):
+    """LOKAL/EC2 modu: taramadan bağımsız çalışan gönderim thread'i."""
+    sites_by_url = {s["url"]: s for s in sites}
+    logging.info("Outbox loop started.")
+    while True:
+        try:
+            drain_outbox(conn, sites_by_url)
+        except Exception:
+            logging.exception("Outbox loop error")
+        OUTBOX_WAKE.wait(OUTBOX_POLL_SEC)
+        OUTBOX_WAKE.clear()
@@ -1,33 +1,227 @@
-import logging, requests, html
+import contextlib, functools, hashlib, logging, html, json, threading, time
 from typing import Dict, List, Tuple
-from config import TELEGRAM_BOT_TOKEN
-from storage.db import (get_update_offset, set_update_offset, upsert_user,
-                        toggle_site_sub, get_user_subs, list_emails,
-                        add_email, remove_email, get_last_items_for_user)
+from config import (TELEGRAM_BOT_TOKEN, TELEGRAM_API_BASE, TG_GLOBAL_RATE, TG_PER_CHAT_RATE, TG_PER_CHAT_BURST,
+                    TG_GROUP_RATE_PER_MIN, TG_SEND_WORKERS, TG_MAX_ATTEMPTS,
+                    BOT_WORKERS, BOT_MAX_INFLIGHT)
+from storage.db import (thread_conn, get_update_offset, intake_updates, pending_updates, finish_updates,
+                        touch_user, set_site_sub, get_sub_bits, site_bit_cached, register_sites, list_emails,
+                        add_email, remove_email, get_last_items_for_user,
+                        get_tg_mode, set_tg_mode, search_items, search_terms,
+                        add_keyword, remove_keyword, list_keywords)
+from storage.session import SESSIONS
 
-API = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
+API = f"{TELEGRAM_API_BASE}/bot{TELEGRAM_BOT_TOKEN}"
+
+_session = None
+
+def _http():
+    """
+    requests'i ilk gerçek istekte yükler (webhook soğuk başlangıcını hafifletir)
+    ve keep-alive bağlantıları paylaşan tek bir Session döndürür.
+    """
+    global _session
+    if _session is None:
+        import requests
+        _session = requests.Session()
+    return _session
 
 def http_post_json(url, payload, timeout=20):
-    return requests.post(url, json=payload, timeout=timeout)
+    return _http().post(url, json=payload, timeout=timeout)
 
 def http_get(url, params=None, timeout=30):
-    return requests.get(url, params=params, timeout=timeout)
+    return _http().get(url, params=params, timeout=timeout)
 
-def send_telegram(chat_id, text, reply_markup=None):
+_engine = None
+
+def delivery_engine():
+    """
+    Süreç başına tek gönderim motoru (notifiers/delivery.py); ilk toplu
+    gönderimde başlatılır. Webhook gibi tek mesajlık yollar onu hiç yüklemez.
+    """
+    global _engine
+    if _engine is None:
+        from notifiers.delivery import DeliveryEngine
+        _engine = DeliveryEngine(
+            _post_message, workers=TG_SEND_WORKERS, global_rate=TG_GLOBAL_RATE,
+            per_chat_rate=TG_PER_CHAT_RATE, per_chat_burst=TG_PER_CHAT_BURST,
+            group_rate=TG_GROUP_RATE_PER_MIN / 60.0, max_attempts=TG_MAX_ATTEMPTS,
+        ).start()
+    return _engine
+
+def _message_payload(chat_id, text, reply_markup=None):
     data = {"chat_id": chat_id, "text": text, "parse_mode":"HTML", "disable_web_page_preview": True}
     if reply_markup: data["reply_markup"] = reply_markup
+    return data
+
+def _post_message(data):
+    """
+    Bot API çağrısı. data["method"] yoksa sendMessage; varsa o metot çağrılır
+    (Telegram'ın webhook cevabında kullandığı biçimle aynı).
+    """
+    method = data.get("method", "sendMessage")
+    if "method" in data:
+        data = {k: v for k, v in data.items() if k != "method"}
+    return http_post_json(f"{API}/{method}", data, timeout=20)
+
+def _not_modified(r) -> bool:
+    """editMessage* için 400 'message is not modified': içerik zaten aynı (başarı sayılır)."""
+    if r is None or r.status_code != 400:
+        return False
+    try: return "not modified" in (r.json().get("description") or "")
+    except: return False
+
+def _log_send_result(r):
+    if r is not None and not r.ok and not _not_modified(r):
+        try: desc = r.json().get("description","")
+        except: desc = r.text[:200]
+        logging.warning("Telegram send fail %s %s", r.status_code, desc)
+
+def _call_now(data):
+    """
+    Etkileşimli Bot API çağrısı: bitene kadar bekler ve Response döndürür.
+    Motor çalışıyorsa öncelikli şeritten (toplu yayının önünden) geçer;
+    çalışmıyorsa doğrudan gönderilir ve kısa bir 429 beklemesine bir kez uyulur.
+    """
+    _consume_update()
     try:
-        r = http_post_json(f"{API}/sendMessage", data, timeout=20)
-        if not r.ok:
-            try: desc = r.json().get("description","")
-            except: desc = r.text[:200]
-            logging.warning("Telegram send fail %s %s", r.status_code, desc)
+        if _engine is not None:
+            from notifiers.delivery import INTERACTIVE
+            r = _engine.submit(data, INTERACTIVE).result(timeout=60)
+        else:
+            r = _post_message(data)
+            if r.status_code == 429:
+                try: wait = float(r.json().get("parameters", {}).get("retry_after", 1))
+                except: wait = 1.0
+                if wait <= 5:
+                    time.sleep(wait)
+                    r = _post_message(data)
+        _log_send_result(r)
         return r
     except Exception:
         logging.exception("Telegram error")
         return None
 
+# Webhook: handle_update(…, inline_reply=True) boyunca bu thread'in ilk cevabı
+# (sendMessage / answerCallbackQuery) gönderilmez, HTTP cevabına konmak üzere saklanır.
+_reply_slot = threading.local()
+
+# Polling: update intake'ten (update_intake) ilk dış etkiden, yani bu thread'in ilk
+# Bot API çağrısından hemen önce silinir. Çökmeden sonra yeniden işlenen bir update
+# cevabını ikinci kez göndermez; ondan önceki DB yazımları hedef durumlu olduğundan
+# (ör. set_site_sub) tekrarlanmaları zararsızdır.
+_consume_slot = threading.local()
+
+def _consume_update():
+    fn = getattr(_consume_slot, "fn", None)
+    if fn is not None:
+        _consume_slot.fn = None
+        fn()  # hata yükselir: tüketilemeyen update'in cevabı gönderilmez
+
+@contextlib.contextmanager
+def consume_before_reply(consume_fn):
+    """
+    Blok boyunca ilk Bot API çağrısından önce consume_fn() bir kez çağrılır;
+    blok hiç çağrı yapmadan biterse (veya hata verirse) çıkışta çağrılır.
+    """
+    _consume_slot.fn = consume_fn
+    try:
+        yield
+    finally:
+        _consume_update()
+
+def _defer_reply(data) -> bool:
+    """Cevap webhook'un HTTP yanıtına bırakılabiliyorsa saklar ve True döner."""
+    slot = getattr(_reply_slot, "slot", None)
+    if slot is None or "action" in slot:
+        return False
+    slot["action"] = data
+    return True
+
+def send_telegram(chat_id, text, reply_markup=None):
+    """
+    Etkileşimli cevap: yeni mesaj gönderir, gönderilene kadar bekler (bkz. _call_now).
+    Webhook cevabına bırakıldıysa None döner (sonucu bilinmez).
+    """
+    data = _message_payload(chat_id, text, reply_markup)
+    if _defer_reply(dict(data, method="sendMessage")):
+        return None
+    return _call_now(data)
+
+# Callback menülerinin yerinde düzenlenmesi (bench/bot_load.py raporlar)
+BOT_STATS = {"callbacks": 0, "edits": 0, "edits_skipped": 0, "edit_fallbacks": 0}
+_SHOWN_PER_CHAT = 8  # sohbet başına içerik özeti tutulan son mesaj sayısı
+
+def _render_hash(obj) -> str:
+    raw = json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+def edit_message(chat_id, message_id, text, reply_markup=None, shown_markup=None, markup_only=False):
+    """
+    Callback'in geldiği mesajı yeni mesaj göndermeden yerinde günceller.
+    - Metin ve klavyenin özeti mesajda en son gösterilenle aynıysa hiç çağrı yapılmaz
+      (özet oturumda; yoksa Telegram'ın callback'te gönderdiği klavye = shown_markup).
+    - Yalnızca klavye değiştiyse (veya markup_only) editMessageReplyMarkup,
+      aksi halde editMessageText kullanılır.
+    - Mesaj düzenlenemezse (silinmiş vb.) eskisi gibi yeni mesaj gönderilir.
+    """
+    shown = SESSIONS.get(chat_id).setdefault("shown", {})
+    reply_markup = reply_markup or {"inline_keyboard": []}
+    th = _render_hash(text)
+    mh = _render_hash(reply_markup)
+    prev_t, prev_m = shown.get(message_id, (None, None))
+    if prev_m is None and shown_markup is not None:
+        prev_m = _render_hash(shown_markup or {"inline_keyboard": []})
+    text_same = markup_only or th == prev_t
+    if text_same and mh == prev_m:
+        BOT_STATS["edits_skipped"] += 1
+        return None
+
+    if text_same:
+        data = {"method": "editMessageReplyMarkup", "chat_id": chat_id,
+                "message_id": message_id, "reply_markup": reply_markup}
+    else:
+        data = dict(_message_payload(chat_id, text, reply_markup),
+                    method="editMessageText", message_id=message_id)
+    r = _call_now(data)
+    if r is not None and (r.ok or _not_modified(r)):
+        BOT_STATS["edits"] += 1
+        shown.pop(message_id, None)
+        shown[message_id] = (prev_t if markup_only else th, mh)
+        while len(shown) > _SHOWN_PER_CHAT:
+            shown.pop(next(iter(shown)))
+        return r
+    BOT_STATS["edit_fallbacks"] += 1
+    return send_telegram(chat_id, text, reply_markup)
+
+def _log_future(fut):
+    e = fut.exception()
+    if e is not None:
+        logging.warning("Telegram gönderilemedi: %s", e)
+    else:
+        _log_send_result(fut.result())
+
+def enqueue_telegram(chat_id, text, reply_markup=None):
+    """
+    Toplu (duyuru) gönderimi: kuyruğa alır ve hemen döner (Future).
+    Hız sınırları, 429/retry_after ve yeniden denemeler motor tarafından yönetilir.
+    """
+    from notifiers.delivery import BULK
+    fut = delivery_engine().submit(_message_payload(chat_id, text, reply_markup), BULK)
+    fut.add_done_callback(_log_future)
+    return fut
+
+def flush_telegram(timeout=None) -> bool:
+    """Kuyruktaki tüm gönderimler bitene kadar bekler (Lambda dönmeden önce)."""
+    if _engine is None:
+        return True
+    done = _engine.drain(timeout)
+    logging.info("Telegram gönderim: %s%s", _engine.stats, "" if done else " (zaman aşımı, kuyrukta kalan var)")
+    return done
+
 def answer_callback_query(cb_id, text=""):
+    if _defer_reply({"method": "answerCallbackQuery", "callback_query_id": cb_id, "text": text}):
+        return
+    _consume_update()
     try:
         http_post_json(f"{API}/answerCallbackQuery", {"callback_query_id": cb_id, "text": text}, timeout=10)
     except Exception:
@@ -49,12 +243,25 @@ def _display_name(obj):
     return full
 
 def sites_keyboard(conn, chat_id, sites):
-    subs = get_user_subs(conn, chat_id)
+    """
+    Site menüsü: kullanıcının abonelik bit eşlemine göre önceden çizilmiş klavye.
+    Bit eşlemi oturumdadır (touch_user okudu / toggle güncelledi); DB'ye gidilmez.
+    Butonlar hedef durumu taşır (sub|url abone ol, uns|url bırak): aynı dokunuş
+    iki kez işlense de sonuç değişmez. Dönen sözlük paylaşılır, değiştirilmemeli.
+    """
+    sig = tuple((s["url"], s["name"]) for s in sites)
+    return _render_sites_keyboard(sig, get_sub_bits(conn, chat_id))
+
+@functools.lru_cache(maxsize=4096)
+def _render_sites_keyboard(sig, bits):
+    # Bit numaraları süreç içinde değişmediğinden (site_index açılışta kurulur)
+    # (site listesi, bit eşlemi) çifti klavyeyi tek başına belirler; binlerce kullanıcı birkaç yüz farklı eşlem paylaşır.
     kb = []
-    for s in sites:
-        url = s["url"]; name = s["name"]
-        on = "✅" if url in subs else "➕"
-        kb.append([{"text": f"{on} {name}", "callback_data": f"tog|{url}"}])
+    for url, name in sig:
+        idx = site_bit_cached(url)
+        on = idx is not None and bits >> idx & 1
+        kb.append([{"text": f"{'✅' if on else '➕'} {name}",
+                    "callback_data": f"{'uns' if on else 'sub'}|{url}"}])
     kb.append([{"text":"📝 Mesaj abonelikleri", "callback_data":"list"}])
     kb.append([{"text":"📧 E-posta abonelikleri", "callback_data":"emails"}])
     # Yeni: Son duyurular
@@ -71,17 +278,85 @@ def emails_keyboard(conn, chat_id):
     rows.append([{"text":"↩️ Geri", "callback_data":"back"}])
     return "E-posta aboneliklerin:", {"inline_keyboard": rows}
 
-def handle_update(conn, upd, sites_by_url):
+def keywords_keyboard(conn, chat_id, sites_by_url):
+    rows = list_keywords(conn, chat_id)
+    if not rows:
+        txt = ("Takip ettiğin ifade yok.\n"
+               "/kw add &lt;ifade&gt; [site:&lt;anahtar&gt;] ile ekleyebilirsin (ör. /kw add staj).")
+        return txt, {"inline_keyboard": [[{"text": "↩️ Geri", "callback_data": "back"}]]}
+    kb = []
+    for kw_id, phrase, site_url in rows:
+        where = (sites_by_url.get(site_url) or {}).get("name") or site_url if site_url else "tüm siteler"
+        kb.append([{"text": f"❌ {phrase} · {where}", "callback_data": f"kwrm|{kw_id}"}])
+    kb.append([{"text": "↩️ Geri", "callback_data": "back"}])
+    return "Takip ettiğin ifadeler (silmek için dokun):", {"inline_keyboard": kb}
+
+SEARCH_PER_PAGE = 5
+_CALLBACK_DATA_MAX = 64  # Telegram sınırı (bayt)
+
+def _search_callback(page: int, query: str) -> str:
+    """
+    Sayfalama butonu: srch|<sayfa>|<katlanmış sorgu>. Sorgu butonda taşındığı
+    için oturum gerekmez (webhook/Lambda); 64 bayta sığmayan son kelimeler atılır.
+    """
+    head = f"srch|{page}|"
+    words = query.split()
+    while words and len((head + " ".join(words)).encode()) > _CALLBACK_DATA_MAX:
+        words.pop()
+    return head + " ".join(words)
+
+def search_view(conn, query: str, page: int, sites_by_url):
+    """Arama sonuç sayfası: (metin, klavye). query katlanmış kelimelerdir (search_terms)."""
+    items, has_next = search_items(conn, query, page=page, per_page=SEARCH_PER_PAGE)
+    back = [{"text": "↩️ Geri", "callback_data": "back"}]
+    if not items:
+        txt = "🔎 Sonuç bulunamadı." if page == 0 else "🔎 Başka sonuç yok."
+        return txt, {"inline_keyboard": [back]}
+    lines = [f"🔎 <b>{html.escape(query)}</b> · sayfa {page + 1}"]
+    for it in items:
+        su = it.get("site_url") or ""
+        nm = (sites_by_url.get(su) or {}).get("name") or su
+        day = str(it.get("first_seen") or "")[:10]
+        lines.append(f"• <b>{html.escape(nm)}</b> · {html.escape(day)}\n"
+                     f"  <a href=\"{html.escape(it.get('url') or '')}\">{html.escape(it.get('title') or '')}</a>")
+    nav = []
+    if page > 0:
+        nav.append({"text": "◀️ Önceki", "callback_data": _search_callback(page - 1, query)})
+    if has_next:
+        nav.append({"text": "Sonraki ▶️", "callback_data": _search_callback(page + 1, query)})
+    return "\n\n".join(lines), {"inline_keyboard": [nav, back] if nav else [back]}
+
+def handle_update(conn, upd, sites_by_url, inline_reply=False):
+    """
+    Tek bir Telegram update'ini işler.
+    inline_reply=True (webhook): ilk cevap (mesaja sendMessage, callback'e
+    answerCallbackQuery) gönderilmez, {"method": …, …} olarak döndürülür; çağıran
+    onu webhook'un HTTP yanıtına koyar. Diğer çağrılar (menü düzenlemeleri vb.,
+    sonucu gerekenler) her zamanki gibi hemen yapılır.
+    """
+    if not inline_reply:
+        _handle_update(conn, upd, sites_by_url)
+        return None
+    _reply_slot.slot = {}
+    try:
+        _handle_update(conn, upd, sites_by_url)
+        return _reply_slot.slot.get("action")
+    finally:
+        _reply_slot.slot = None
+
+def _handle_update(conn, upd, sites_by_url):
     # --- normal mesaj ---
     if "message" in upd:
         msg = upd["message"]
         chat_id = msg["chat"]["id"]
 
-        # username üret ve kaydet (boşsa üzerine yazmayacağız; db fonksiyonu hallediyor)
+        text = (msg.get("text","") or "").strip()
+
+        # username üret ve kaydet (boşsa/değişmediyse üzerine yazmayacağız; db fonksiyonu hallediyor)
+        # menü çizecek komutlar için abonelikler de aynı gidiş-dönüşte gelir
         uname = _display_name(msg.get("from") or {}) or _display_name(msg.get("chat") or {})
-        upsert_user(conn, chat_id, uname)
+        subs = touch_user(conn, chat_id, uname, with_subs=text.startswith(("/start", "/sites", "/last")))
 
-        text = (msg.get("text","") or "").strip()
         if text.startswith("/start"):
             send_telegram(
                 chat_id,
@@ -91,7 +366,10 @@ def handle_update(conn, upd, sites_by_url):
                 "/emails – E‑posta abonelikleri\n"
                 "/email add &lt;e-posta&gt; – E‑posta aboneliği ekle\n"
                 "/email remove &lt;e-posta&gt; – E‑posta aboneliği kaldır\n"
-                "/last [n] [site:&lt;anahtar&gt;] – Son n duyuruyu göster (varsayılan n=5)",
+                "/last [n] [site:&lt;anahtar&gt;] – Son n duyuruyu göster (varsayılan n=5)\n"
+                "/search &lt;kelimeler&gt; – Tüm duyuru geçmişinde ara\n"
+                "/kw add &lt;ifade&gt; [site:&lt;anahtar&gt;] – İfade geçen duyuruları bildir (/kw: listele)\n"
+                "/digest on|off – Duyuruları tur sonunda tek mesajda topla",
                 reply_markup=sites_keyboard(conn, chat_id, list(sites_by_url.values()))
             )
         elif text.startswith("/sites"):
@@ -114,6 +392,53 @@ def handle_update(conn, upd, sites_by_url):
                     send_telegram(chat_id, "Kullanım: /email add <adres> | /email remove <adres>")
             else:
                 send_telegram(chat_id, "Kullanım: /email add <adres> | /email remove <adres>")
+        elif text.startswith("/digest"):
+            # /digest [on|off] — argümansız: mevcut modu göster
+            parts = text.split()
+            arg = parts[1].lower() if len(parts) > 1 else ""
+            if arg in ("on", "ac", "aç"):
+                set_tg_mode(conn, chat_id, "digest")
+                send_telegram(chat_id, "📬 Özet modu açık: bir turda bulunan duyurular tek mesajda gelecek.")
+            elif arg in ("off", "kapat"):
+                set_tg_mode(conn, chat_id, "instant")
+                send_telegram(chat_id, "🔔 Anlık mod: her duyuru ayrı mesaj olarak gelecek.")
+            else:
+                mode = get_tg_mode(conn, chat_id)
+                send_telegram(chat_id,
+                    f"Şu anki mod: {'📬 özet' if mode == 'digest' else '🔔 anlık'}\n"
+                    "Değiştirmek için: /digest on | /digest off")
+        elif text.startswith("/search"):
+            # /search <kelimeler> — tüm siteler, sıcak pencere + arşiv
+            query = " ".join(search_terms(text[len("/search"):]))
+            if not query:
+                send_telegram(chat_id, "Kullanım: /search &lt;kelimeler&gt;  (ör. /search staj başvuru)")
+                return
+            txt, kb = search_view(conn, query, 0, sites_by_url)
+            send_telegram(chat_id, txt, reply_markup=kb)
+        elif text.startswith("/kw"):
+            # /kw | /kw add <ifade> [site:<anahtar>] | /kw remove <ifade>
+            parts = text.split()
+            cmd = parts[1].lower() if len(parts) > 1 else ""
+            if cmd == "add":
+                site_kw = next((p.split(":", 1)[1].strip().lower() for p in parts[2:]
+                                if p.lower().startswith("site:")), None)
+                phrase = " ".join(p for p in parts[2:] if not p.lower().startswith("site:"))
+                targets = []
+                if site_kw:
+                    targets = [u for u, st in sites_by_url.items()
+                               if site_kw in (st.get("name") or "").lower() or site_kw in u.lower()]
+                    if not targets:
+                        send_telegram(chat_id, "Eşleşen site bulunamadı."); return
+                ok, msgt = add_keyword(conn, chat_id, phrase, targets)
+                send_telegram(chat_id, html.escape(msgt))
+            elif cmd in ("remove", "rm", "del"):
+                n = remove_keyword(conn, chat_id, phrase=" ".join(parts[2:]))
+                send_telegram(chat_id, "İfade kaldırıldı." if n else "Bu ifadeyi takip etmiyorsun.")
+            elif cmd:
+                send_telegram(chat_id, "Kullanım: /kw add &lt;ifade&gt; [site:&lt;anahtar&gt;] | /kw remove &lt;ifade&gt;")
+            else:
+                txt, kb = keywords_keyboard(conn, chat_id, sites_by_url)
+                send_telegram(chat_id, txt, reply_markup=kb)
         elif text.startswith("/last"):
             # /last [n] [site:<anahtar>]
             parts = text.split()
@@ -133,8 +458,7 @@ def handle_update(conn, upd, sites_by_url):
             if want < 1: want = 1
             if want > 10: want = 10
 
-            # abone olunan siteler
-            subs = get_user_subs(conn, chat_id)
+            # abone olunan siteler (touch_user ile geldi)
             if not subs:
                 send_telegram(chat_id, "Seçili siten yok. Önce /sites ile seçim yap.")
                 return
@@ -149,7 +473,8 @@ def handle_update(conn, upd, sites_by_url):
 
             allowed = {u for u in subs if _match(u)}
 
-            items = get_last_items_for_user(conn, chat_id, limit=want, allowed_site_urls=allowed if site_kw else None)
+            items = get_last_items_for_user(conn, chat_id, limit=want,
+                                            allowed_site_urls=allowed if site_kw else None, subs=subs)
 
             if not items:
                 send_telegram(chat_id, "Uygun duyuru bulunamadı.")
@@ -175,36 +500,43 @@ def handle_update(conn, upd, sites_by_url):
             back_kb = {"inline_keyboard": [[{"text": "↩️ Geri", "callback_data": "back"}]]}
             send_telegram(chat_id, "\n\n".join(lines), reply_markup=back_kb)
         else:
-            send_telegram(chat_id, "Komutlar: /start, /sites, /emails, /email add <a>, /email remove <a>, /last")
+            send_telegram(chat_id, "Komutlar: /start, /sites, /emails, /email add <a>, /email remove <a>, /last, /search, /kw, /digest")
 
     # --- inline callback ---
     elif "callback_query" in upd:
         cb = upd["callback_query"]; cb_id = cb["id"]
         data = cb.get("data",""); chat_id = cb["message"]["chat"]["id"]
+        BOT_STATS["callbacks"] += 1
 
-        # callback'te de kullanıcı kaydını/username'ini tazele
+        # callback'te de kullanıcı kaydını/username'ini tazele (+ menü için abonelikler)
         uname = _display_name(cb.get("from") or {}) or _display_name(cb.get("message", {}).get("chat") or {})
-        upsert_user(conn, chat_id, uname)
+        subs = touch_user(conn, chat_id, uname,
+                          with_subs=data in ("list", "back", "last") or data.startswith(_SUB_PREFIXES))
+
+        # Menüler yeni mesaj yerine butonun bulunduğu mesajda güncellenir
+        message_id = cb["message"].get("message_id")
+        shown_kb = cb["message"].get("reply_markup") or {}
+        def _show(text, kb, markup_only=False):
+            edit_message(chat_id, message_id, text, kb, shown_markup=shown_kb, markup_only=markup_only)
+        back_kb = {"inline_keyboard": [[{"text": "↩️ Geri", "callback_data": "back"}]]}
 
         if data == "list":
-            subs = get_user_subs(conn, chat_id)
             if not subs: txt = "Seçili siten yok."
             else:
                 # Kaynak (sites.yaml) sırasını koru
                 names = [s["name"] for s in sites_by_url.values() if s["url"] in subs]
                 txt = "Son duyurularda listelenen ve bildirim almayı seçtiğin sitelerin:\n\n• " + "\n• ".join(names)
-            kb = {"inline_keyboard": [[{"text": "↩️ Geri", "callback_data": "back"}]]}
             answer_callback_query(cb_id, "Liste")
-            send_telegram(chat_id, txt, reply_markup=kb); return
+            _show(txt, back_kb); return
 
         if data == "emails":
             txt, kb = emails_keyboard(conn, chat_id)
             answer_callback_query(cb_id, "E-posta")
-            send_telegram(chat_id, txt, reply_markup=kb); return
+            _show(txt, kb); return
 
         if data == "back":
             answer_callback_query(cb_id, "Geri")
-            send_telegram(chat_id, "Menü:", reply_markup=sites_keyboard(conn, chat_id, list(sites_by_url.values()))); return
+            _show("Menü:", sites_keyboard(conn, chat_id, list(sites_by_url.values()))); return
 
         if data == "noop":
             answer_callback_query(cb_id, "Komutu yaz: /email add <adres>"); return
@@ -214,30 +546,44 @@ def handle_update(conn, upd, sites_by_url):
             remove_email(conn, chat_id, em)
             txt, kb = emails_keyboard(conn, chat_id)
             answer_callback_query(cb_id, "Silindi")
-            send_telegram(chat_id, txt, reply_markup=kb); return
+            _show(txt, kb); return
 
-        if data.startswith("tog|"):
-            site_url = data.split("|",1)[1]
+        if data.startswith("kwrm|"):
+            kw_id = data.split("|", 1)[1]
+            if kw_id.isdigit():
+                remove_keyword(conn, chat_id, kw_id=int(kw_id))
+            txt, kb = keywords_keyboard(conn, chat_id, sites_by_url)
+            answer_callback_query(cb_id, "Silindi")
+            _show(txt, kb); return
+
+        if data.startswith("srch|"):
+            _, page, query = data.split("|", 2)
+            txt, kb = search_view(conn, query, int(page) if page.isdigit() else 0, sites_by_url)
+            answer_callback_query(cb_id, "Arama")
+            _show(txt, kb); return
+
+        if data.startswith(_SUB_PREFIXES):
+            kind, site_url = data.split("|",1)
             if site_url not in sites_by_url:
                 answer_callback_query(cb_id, "Site bulunamadı"); return
-            toggle_site_sub(conn, chat_id, site_url)
+            if kind == "tog":
+                on = _legacy_toggle_target(conn, chat_id, site_url, shown_kb, data)
+            else:
+                on = kind == "sub"
+            set_site_sub(conn, chat_id, site_url, on)  # oturumdaki abonelikleri de günceller
             answer_callback_query(cb_id, "Güncellendi")
-            send_telegram(chat_id, "Güncellendi ✔️",
-                reply_markup=sites_keyboard(conn, chat_id, list(sites_by_url.values()))
-            )
+            # yalnızca klavye değişir; mesaj düzenlenemezse "Güncellendi" ile yeni menü gider
+            _show("Güncellendi ✔️", sites_keyboard(conn, chat_id, list(sites_by_url.values())), markup_only=True)
         if data == "last":
             answer_callback_query(cb_id, "Son duyurular")
-            # Abone olunan siteler
-            subs = get_user_subs(conn, chat_id)
+            # Abone olunan siteler (touch_user ile geldi)
             if not subs:
-                send_telegram(chat_id, "Seçili siten yok. Önce /sites ile seçim yap.",
-                              reply_markup={"inline_keyboard": [[{"text":"↩️ Geri","callback_data":"back"}]]})
+                _show("Seçili siten yok. Önce /sites ile seçim yap.", back_kb)
                 return
             # Son 5 duyuru (abonelikler join ile zaten filtreli)
-            items = get_last_items_for_user(conn, chat_id, limit=5)
+            items = get_last_items_for_user(conn, chat_id, limit=5, subs=subs)
             if not items:
-                send_telegram(chat_id, "Uygun duyuru bulunamadı.",
-                              reply_markup={"inline_keyboard": [[{"text":"↩️ Geri","callback_data":"back"}]]})
+                _show("Uygun duyuru bulunamadı.", back_kb)
                 return
             lines = ["🕘 <b>Son duyurular</b>", "Abone olunan son {} duyuru:".format(len(items))]
             for it in items:
@@ -246,23 +592,100 @@ def handle_update(conn, upd, sites_by_url):
                 title = it.get("title") or ""
                 url = it.get("url") or ""
                 lines.append(f"• <b>{html.escape(nm)}</b>\n  <a href=\"{html.escape(url)}\">{html.escape(title)}</a>")
-            back_kb = {"inline_keyboard": [[{"text": "↩️ Geri", "callback_data": "back"}]]}
-            send_telegram(chat_id, "\n\n".join(lines), reply_markup=back_kb); return
+            _show("\n\n".join(lines), back_kb); return
+
+_SUB_PREFIXES = ("sub|", "uns|", "tog|")
+
+def _legacy_toggle_target(conn, chat_id, site_url, shown_kb, data) -> bool:
+    """
+    Eski "tog|url" butonları (önceden gönderilmiş menüler): hedef, butonun mesajda
+    gösterdiği durumun tersidir; buton bulunamazsa mevcut bit eşleminin tersi.
+    """
+    for row in shown_kb.get("inline_keyboard") or []:
+        for b in row:
+            if b.get("callback_data") == data:
+                return not (b.get("text") or "").startswith("✅")
+    idx = site_bit_cached(site_url)
+    return idx is None or not get_sub_bits(conn, chat_id) >> idx & 1
 
-def bot_poll_loop(conn, sites, get_updates_fn=http_get, set_off_fn=set_update_offset, get_off_fn=get_update_offset):
+def _update_chat_id(upd) -> int:
+    """Update'in ait olduğu sohbet (sıralama anahtarı); bilinmeyen türlerde 0."""
+    if "message" in upd:
+        return int((upd["message"].get("chat") or {}).get("id") or 0)
+    if "callback_query" in upd:
+        return int(((upd["callback_query"].get("message") or {}).get("chat") or {}).get("id") or 0)
+    return 0
+
+def bot_poll_loop(conn, sites, get_updates_fn=http_get, set_off_fn=None, get_off_fn=get_update_offset,
+                  intake_fn=intake_updates, conn_fn=thread_conn, workers=BOT_WORKERS):
+    """
+    LOKAL/EC2 modu: getUpdates uzun yoklaması.
+    Her parti önce intake_fn ile update_intake'e yazılır ve offset aynı
+    transaction'da bir kez ilerletilir (set_off_fn verilirse ardından o da
+    çağrılır); sonra update'ler sohbet başına sıralı işçi havuzuna dağıtılır.
+    Her update ilk cevabından hemen önce intake'ten silinir (consume_before_reply):
+    süreç çökerse açılışta kalanların tamamı (offset'i geçilmiş ama cevabı
+    gönderilmemiş olanlar) sayfa sayfa, update_id sırasıyla ve havuz dolduysa
+    bekleyerek yeniden işlenir. Cevaplar en fazla bir kez gider; cevaptan önceki
+    DB yazımları hedef durumlu olduğundan yeniden işlenmeleri sonucu değiştirmez.
+
+    Bağlantılar conn_fn(conn) ile alınır: yoklama/intake'in ve her işçi
+    thread'in kendi bağlantısı olur (Postgres'te transaction/pipeline durumu
+    bağlantı başınadır; SQLite'ta conn_fn aynı nesneyi döndürür).
+    """
+    from notifiers.chat_workers import ChatWorkers
     sites_by_url = {s["url"]: s for s in sites}
-    offset = get_off_fn(conn)
+    intake_conn = conn_fn(conn)
+    local = threading.local()
+
+    def _conn():
+        c = getattr(local, "conn", None)
+        if c is None:
+            c = local.conn = conn_fn(conn)
+        return c
+
+    def _handle(update_id, upd):
+        c = _conn()
+        with consume_before_reply(lambda: finish_updates(c, [update_id])):
+            handle_update(c, upd, sites_by_url)
+
+    pool = ChatWorkers(_handle, workers)
+    offset = get_off_fn(intake_conn)
+
+    # önceki çalışmadan kalanlar: tamamı, sayfa sayfa; havuz BOT_MAX_INFLIGHT'ta tutulur
+    after, replayed = 0, 0
+    while True:
+        page = pending_updates(intake_conn, BOT_MAX_INFLIGHT, after)
+        if not page:
+            break
+        for update_id, chat_id, payload in page:
+            pool.wait_below(BOT_MAX_INFLIGHT)
+            pool.submit(chat_id, update_id, json.loads(payload))
+        after = page[-1][0]
+        replayed += len(page)
+    if replayed:
+        logging.info("Bot: önceki çalışmadan kalan %d update yeniden işleniyor.", replayed)
+
     logging.info("Bot loop started.")
     while True:
         try:
+            pool.wait_below(BOT_MAX_INFLIGHT)
             r = get_updates_fn(f"{API}/getUpdates", params={"timeout": 25, "offset": offset+1}, timeout=30)
-            if r.ok:
-                data = r.json()
-                for upd in data.get("result", []):
-                    # önce offset'i yükseltip kaydet (aynı update tekrar işlenmesin)
-                    offset = max(offset, upd["update_id"])
-                    set_off_fn(conn, offset)
-                    # sonra işle
-                    handle_update(conn, upd, sites_by_url)
+            if not r.ok:
+                time.sleep(1)
+                continue
+            batch = [u for u in r.json().get("result", []) if u["update_id"] > offset]
+            if not batch:
+                continue
+            rows = [(u["update_id"], _update_chat_id(u), json.dumps(u, ensure_ascii=False)) for u in batch]
+            new_offset = max(u["update_id"] for u in batch)
+            # önce kalıcı kayıt + offset (tek transaction), sonra işle
+            intake_fn(intake_conn, rows, new_offset)
+            if set_off_fn:
+                set_off_fn(intake_conn, new_offset)
+            offset = new_offset
+            for (update_id, chat_id, _p), upd in zip(rows, batch):
+                pool.submit(chat_id, update_id, upd)
         except Exception:
             logging.exception("Bot loop error")
+            time.sleep(1)
@@ -1,90 +1,351 @@
-import yaml, requests
-from bs4 import BeautifulSoup
+# pick_selector.py  -- sites.yaml için liste/detay seçicisi bulma
+"""
+Etkileşimli (varsayılan): siteler sırayla gezilir, aday listeler gösterilir,
+seçilen seçici sites.yaml'a yazılır.
+
+Toplu (--batch): tüm siteler ortak çekme katmanıyla (fetch_list_html /
+fetch_detail_html: statik, gerekirse Playwright) eşzamanlı çekilir. Her sayfa
+tek DOM geçişinde puanlanır; en iyi adaylar monitor'un kullandığı
+extract_list_links + filter_links ile doğrulanır ve geçen ilk aday
+list_selector / item_link_selector olarak yazılır. Bulunan ilk duyurunun detay
+sayfasından detail_selector çıkarılır (extract_detail ile doğrulanır). Liste
+sayfası bir RSS/Atom/JSON akışı duyuruyor ve akış listedeki duyuruları
+kapsıyorsa feed_url yazılır (monitor o siteyi akıştan okur).
+Mevcut seçicisi çalışan sitelere dokunulmaz (--force ile yeniden bulunur).
+--offline ile sayfalar yalnızca sayfa önbelleğinden okunur (ağa çıkılmaz; PAGE_CACHE_PATH gerekir).
+
+Kullanım:
+    python pick_selector.py                       # etkileşimli
+    python pick_selector.py --batch [--dry-run] [--force] [--offline] [--workers 8] [--sites sites.yaml]
+"""
+import argparse, logging, re, sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+
+from scraper.feeds import discover_feeds, fetch_feed, feed_covers, is_stale
+from scraper.pagecache import PAGE_CACHE
+from scraper.site_monitor import (fetch_list_html, fetch_detail_html, extract_list_links,
+                                  filter_links, extract_detail)
 
 COMMON_HINTS = ['announ', 'duyur', 'news', 'post', 'item', 'list', 'entry', 'haber']
+# menü, alt bilgi vb. tekrar eden ama duyuru olmayan bloklar
+_CHROME_RE = re.compile(r"nav|menu|footer|header|breadcrumb|sidebar|widget|social|pagination|lang", re.I)
+_CHROME_TAGS = {"nav", "header", "footer", "aside"}
+_SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "head", "iframe"}
+MIN_ITEMS = 3          # listede en az bu kadar linkli tekrar eden öğe
+MIN_TITLE = 5          # extract_list_links'in kabul ettiği en kısa başlık
+TOP_CANDIDATES = 6     # doğrulanacak en fazla aday
+MIN_DETAIL_TEXT = 200  # detay seçicisinin kapsaması gereken en az metin
+
+SITES_PATH = "sites.yaml"
+
 
-def load_sites():
-    with open("sites.yaml","r",encoding="utf-8") as f:
+def load_sites(path: str = None):
+    with open(path or SITES_PATH, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
 
-def save_selector(site_url, selector):
-    data = load_sites()
+def save_sites(data, path: str = None):
+    with open(path or SITES_PATH, "w", encoding="utf-8") as f:
+        yaml.safe_dump(data, f, allow_unicode=True, sort_keys=False, width=200)
+
+def save_selector(site_url, list_selector, item_link_selector, detail_selector=None, path: str = None):
+    """Seçicileri monitor'un okuduğu anahtarlara yazar (list_selector / item_link_selector / detail_selector)."""
+    data = load_sites(path)
     for s in data["sites"]:
         if s["url"] == site_url:
-            s["selector"] = selector
-    with open("sites.yaml","w",encoding="utf-8") as f:
-        yaml.safe_dump(data, f, allow_unicode=True)
-
-def candidate_selectors_from_dom(soup: BeautifulSoup):
-    candidates = []
-
-    # id ve class'larda ipucu içeren elemanlar
-    for tag in soup.find_all(True, {"id": True}):
-        idv = tag.get("id","")
-        if any(h in idv.lower() for h in COMMON_HINTS):
-            candidates.append(tag)
-
-    for tag in soup.find_all(True, {"class": True}):
-        cls_tokens = tag.get("class") or []
-        cls = " ".join(cls_tokens[:3])
-        if any(h in cls.lower() for h in COMMON_HINTS):
-            candidates.append(tag)
-
-    # liste gibi davranan büyük kapsayıcılar
-    for node in soup.find_all(["ul","ol","div","section","main","article"]):
-        kids = node.find_all(["li","article","div"], recursive=False)
-        if len(kids) >= 3:
-            candidates.append(node)
-
-    # tekrarları basitçe ele
-    unique = []
-    seen = set()
-    for c in candidates:
-        key = (c.name, c.get("id"), tuple(c.get("class") or []), len((c.get_text() or "")))
-        if key not in seen:
-            seen.add(key)
-            unique.append(c)
-    return unique
-
-def guess_selector(node):
+            s["list_selector"] = list_selector
+            s["item_link_selector"] = item_link_selector
+            if detail_selector:
+                s["detail_selector"] = detail_selector
+    save_sites(data, path)
+
+
+# --- tek geçişte puanlama ---
+def _sig(tag: Tag):
+    cls = tag.get("class") or []
+    return (tag.name, cls[0] if cls else "")
+
+def _sig_selector(sig) -> str:
+    name, cls = sig
+    return f"{name}.{cls}" if cls else name
+
+def dom_stats(soup: BeautifulSoup):
+    """
+    Tüm elemanlar için tek (iteratif, sonra-sıralı) geçişte:
+    {id(tag): (metin uzunluğu, link metni uzunluğu, linkli mi, Counter(çocuk imzası → linkli çocuk), tag)}
+    get_text/find_all tekrarı yok; her düğüm bir kez ziyaret edilir.
+    """
+    stats = {}
+    stack = [(soup, False)]
+    while stack:
+        node, done = stack.pop()
+        if not done:
+            stack.append((node, True))
+            stack.extend((c, False) for c in reversed(node.contents)
+                         if isinstance(c, Tag) and c.name not in _SKIP_TAGS)
+            continue
+        text = link_text = 0
+        has_link = node.name == "a" and bool(node.get("href"))
+        kids = Counter()
+        for c in node.contents:
+            if isinstance(c, Tag):
+                st = stats.get(id(c))
+                if st is None:
+                    continue  # atlanan etiket
+                text += st[0]; link_text += st[1]
+                has_link = has_link or st[2]
+                if st[2]:
+                    kids[_sig(c)] += 1
+            elif isinstance(c, NavigableString) and not isinstance(c, Comment):
+                text += len(c.strip())
+        if node.name == "a" and node.get("href"):
+            link_text = text
+        stats[id(node)] = (text, link_text, has_link, kids, node)
+    return stats
+
+def _is_chrome(tag: Tag) -> bool:
+    for t in [tag, *tag.parents]:
+        if not isinstance(t, Tag) or t.name == "[document]":
+            break
+        if t.name in _CHROME_TAGS:
+            return True
+        attrs = " ".join([t.get("id") or "", *(t.get("class") or [])])
+        if attrs and _CHROME_RE.search(attrs):
+            return True
+    return False
+
+def score_containers(soup: BeautifulSoup, stats=None):
+    """
+    Liste kapsayıcısı adayları, puana göre: [(puan, kapsayıcı, öğe imzası), ...]
+    Puan = linkli tekrar eden çocuk sayısı × öğe metni yeterliliği × link yoğunluğu
+    cezası (≈1: menü) × menü/alt bilgi cezası × ipucu (duyuru/news…) bonusu.
+    """
+    stats = stats or dom_stats(soup)
+    out = []
+    for st in stats.values():
+        tag = st[4]
+        if not st[3]:
+            continue
+        sig, n = st[3].most_common(1)[0]
+        if n < MIN_ITEMS:
+            continue
+        text, link_text = st[0], st[1]
+        avg_item = text / max(1, n)
+        density = link_text / text if text else 1.0
+        score = n * min(1.0, avg_item / 40)
+        if density > 0.9 and avg_item < 30:
+            score *= 0.3
+        attrs = " ".join([tag.get("id") or "", *(tag.get("class") or []), sig[1]]).lower()
+        if any(h in attrs for h in COMMON_HINTS):
+            score *= 1.5
+        if _is_chrome(tag):
+            score *= 0.2
+        out.append((score, tag, sig))
+    out.sort(key=lambda x: -x[0])
+    return out
+
+def guess_selector(node: Tag, soup: BeautifulSoup = None) -> str:
+    """#id, yoksa etiket.sınıf; soup verilirse ve seçici ilk olarak bu düğümü bulmuyorsa ebeveynle daraltılır."""
     if node.get("id"):
         return f"#{node.get('id')}"
-    if node.get("class"):
-        classes = node.get("class")
-        # çok sınıf varsa ilk 2-3 taneyle başlayalım
-        return "." + ".".join(classes[:2])
-    # daha genel bir fallback
-    return node.name
-
-def show_candidates_for_url(url: str):
-    headers = {"User-Agent":"duyuru-monitor/1.0"}
-    r = requests.get(url, headers=headers, timeout=20)
-    r.raise_for_status()
-    soup = BeautifulSoup(r.text, "html.parser")
-    cands = candidate_selectors_from_dom(soup)
+    classes = node.get("class") or []
+    sel = node.name + "".join(f".{c}" for c in classes[:2])
+    parent, depth = node.parent, 0
+    while soup is not None and soup.select_one(sel) is not node and isinstance(parent, Tag) \
+            and parent.name != "[document]" and depth < 3:
+        sel = f"{guess_selector(parent)} > {sel}"
+        parent, depth = parent.parent, depth + 1
+    return sel
+
+def _anchor_selector(container: Tag, sig) -> str:
+    """Öğelerdeki başlık linkinin öğeye göre en sık yolu: '.blog-title a' veya 'a'."""
+    paths = Counter()
+    for item in container.find_all(sig[0], recursive=False):
+        if _sig(item) != sig:
+            continue
+        for a in item.find_all("a", href=True):
+            if len(a.get_text(strip=True)) < MIN_TITLE:
+                continue
+            p = a.parent
+            cls = (p.get("class") or [None])[0] if p is not item else None
+            if cls:
+                paths[f".{cls} a"] += 1
+            elif p is not item and p.name in ("h2", "h3", "h4", "h5"):
+                paths[f"{p.name} a"] += 1
+            else:
+                paths["a"] += 1
+            break
+    return paths.most_common(1)[0][0] if paths else "a"
+
+def list_candidates(html: str):
+    """Sayfadaki liste adayları: [(puan, list_selector, item_link_selector, öğe sayısı, örnek metin), ...]"""
+    soup = BeautifulSoup(html, "html.parser")
+    stats = dom_stats(soup)
     out = []
+    for score, tag, sig in score_containers(soup, stats)[:TOP_CANDIDATES]:
+        list_sel = guess_selector(tag, soup)
+        item_sel = f"{_sig_selector(sig)} {_anchor_selector(tag, sig)}"
+        text = (tag.get_text(separator="\n") or "").strip()
+        out.append((score, list_sel, item_sel, stats[id(tag)][3][sig], "\n".join(text.splitlines()[:8])))
+    return out
+
+def validate_list(html: str, site: dict, list_sel: str, item_sel: str, expected: int = MIN_ITEMS):
+    """monitor ile aynı yoldan: extract_list_links + filter_links. Dönen: bulunan linkler (yetersizse [])."""
+    try:
+        links = filter_links(extract_list_links(html, list_sel, item_sel, site["url"]),
+                             site.get("include_url_regex"), site.get("exclude_text_regex"))
+    except Exception:
+        return []  # geçersiz seçici
+    return links if len(links) >= max(MIN_ITEMS, int(expected * 0.6)) else []
+
+def detail_candidate(html: str):
+    """
+    İçerik bloğu: bağlantı dışı metnin ≥%80'ini kapsayan en derin eleman
+    (sarmalayıcılar değil içerik kutusu). Dönen: seçici veya None.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    stats = dom_stats(soup)
+    body = soup.body or soup
+    best = stats[id(body)][0] - stats[id(body)][1]
+    if best < MIN_DETAIL_TEXT:
+        return None
+    node = body
+    while True:
+        kids = [c for c in node.children if isinstance(c, Tag) and id(c) in stats]
+        nxt = next((c for c in kids if stats[id(c)][0] - stats[id(c)][1] >= 0.8 * best), None)
+        if nxt is None:
+            break
+        node = nxt
+    return None if node is body else guess_selector(node, soup)
+
+def validate_detail(html: str, detail_sel: str) -> bool:
+    soup = BeautifulSoup(html, "html.parser")
+    if not soup.select_one(detail_sel):
+        return False
+    _, snippet, _ = extract_detail(html, detail_sel)
+    return len(snippet) >= MIN_DETAIL_TEXT
+
+
+# --- toplu mod ---
+def discover_site(site: dict, force: bool = False) -> dict:
+    """
+    Tek site: liste sayfasını çeker, mevcut seçiciyi dener (force değilse), yoksa
+    adayları sırayla doğrular; detay seçicisi eksikse ilk duyurudan çıkarır.
+    Dönen: {"status", "list_selector", "item_link_selector", "detail_selector", "feed_url", "links"}
+    """
+    res = {"status": "fail", "links": 0}
+    html = fetch_list_html(site["url"])
+    if not html:
+        res["status"] = "fetch_failed"
+        return res
+
+    links = []
+    if not force and site.get("item_link_selector"):
+        links = validate_list(html, site, site.get("list_selector") or "", site["item_link_selector"])
+        if links:
+            res["status"] = "kept"
+    if not links:
+        for _, list_sel, item_sel, n, _ in list_candidates(html):
+            links = validate_list(html, site, list_sel, item_sel, n)
+            if links:
+                res.update(status="found", list_selector=list_sel, item_link_selector=item_sel)
+                break
+    res["links"] = len(links)
+    if not links:
+        return res
+
+    if site.get("feed") is not False and (force or not site.get("feed_url")):
+        feed = feed_candidate(html, site, links)
+        if feed:
+            res["feed_url"] = feed
+
+    if force or not site.get("detail_selector"):
+        got = fetch_detail_html(links[0]["url"])
+        detail_html = got[0] if got else None
+        sel = detail_candidate(detail_html) if detail_html else None
+        if sel and validate_detail(detail_html, sel):
+            res["detail_selector"] = sel
+    return res
+
+def feed_candidate(html: str, site: dict, links: list):
+    """Sayfanın duyurduğu akışlardan liste linklerini kapsayan ilki (bayat olmayan) veya None."""
+    for url in discover_feeds(html, site["url"])[:3]:
+        try:
+            items = fetch_feed(url)[0] or []
+        except Exception as e:
+            logging.info("Akış denenemedi (%s): %s", url, e)
+            continue
+        items = filter_links(items, site.get("include_url_regex"), site.get("exclude_text_regex"))
+        if not is_stale(items) and feed_covers(items, links):
+            return url
+    return None
+
+def batch(path: str = None, workers: int = 8, dry_run: bool = False, force: bool = False) -> int:
+    data = load_sites(path)
+    sites = data["sites"]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        results = list(ex.map(lambda s: _safe_discover(s, force), sites))
+
+    changed = failed = 0
+    for site, res in zip(sites, results):
+        keys = [k for k in ("list_selector", "item_link_selector", "detail_selector", "feed_url") if k in res]
+        for k in keys:
+            if site.get(k) != res[k]:
+                site[k] = res[k]
+                changed += 1
+        failed += res["status"] not in ("kept", "found")
+        extra = "  ".join(f"{k}={res[k]!r}" for k in keys)
+        print(f"{res['status']:<12} {site['name']:<34} link={res['links']:<3} {extra}")
+    if changed and not dry_run:
+        save_sites(data, path)
+    print(f"\n{len(sites)} site, {changed} alan güncellendi{' (dry-run, yazılmadı)' if dry_run and changed else ''}, "
+          f"{failed} başarısız")
+    if PAGE_CACHE.enabled:
+        st = PAGE_CACHE.take_stats()
+        print(f"sayfa önbelleği: isabet oranı {st['hit_rate']}, ağdan {st['misses']}, 304 {st['revalidated']}, "
+              f"bulunamayan (çevrimdışı) {st['offline_misses']}")
+    return 1 if failed else 0
+
+def _safe_discover(site, force):
+    try:
+        return discover_site(site, force)
+    except Exception as e:
+        logging.warning("%s: %s", site.get("name"), e)
+        return {"status": "error", "links": 0}
+
+
+# --- etkileşimli mod ---
+def show_candidates_for_url(site: dict):
+    html = fetch_list_html(site["url"])
+    out = []
+    if not html:
+        print("⚠️ Sayfa çekilemedi.")
+        return out
+    cands = list_candidates(html)
     if not cands:
         print("⚠️ Otomatik aday bulunamadı. Muhtemelen sayfa JS ile yükleniyor veya içerik çok farklı.")
         return out
-    print(f"\nAdaylar ({url}):")
-    for i, node in enumerate(cands[:12], start=1):
-        sel = guess_selector(node)
-        text = (node.get_text(separator="\n") or "").strip()
-        snippet = "\n".join(text.splitlines()[:8])
-        print(f"\n[{i}] selector: {sel}\n--- snippet ---\n{snippet}\n-----------")
-        out.append(sel)
+    print(f"\nAdaylar ({site['url']}):")
+    for i, (score, list_sel, item_sel, n, snippet) in enumerate(cands, start=1):
+        ok = len(validate_list(html, site, list_sel, item_sel, n))
+        print(f"\n[{i}] list_selector: {list_sel}  item_link_selector: {item_sel}  "
+              f"(puan {score:.1f}, {ok} link doğrulandı)\n--- snippet ---\n{snippet}\n-----------")
+        out.append((list_sel, item_sel))
     return out
 
-def interactive():
-    data = load_sites()
+def interactive(path: str = None):
+    data = load_sites(path)
     for s in data["sites"]:
-        if s.get("selector"):
-            print(f"✓ {s['name']} zaten selector içeriyor: {s['selector']}")
+        if s.get("item_link_selector"):
+            print(f"✓ {s['name']} zaten selector içeriyor: {s['item_link_selector']}")
             continue
 
         print(f"\n+++ {s['name']}\nURL: {s['url']}")
         try:
-            options = show_candidates_for_url(s["url"])
+            options = show_candidates_for_url(s)
         except Exception as e:
             print("Hata:", e)
             continue
@@ -92,9 +353,9 @@ def interactive():
         if not options:
             ch = input("Manuel CSS selector girmek ister misin? (y/n): ").strip().lower()
             if ch == "y":
-                manual = input("CSS selector: ").strip()
+                manual = input("item_link_selector: ").strip()
                 if manual:
-                    save_selector(s["url"], manual)
+                    save_selector(s["url"], "", manual, path=path)
                     print("Kaydedildi:", manual)
             continue
 
@@ -102,14 +363,29 @@ def interactive():
         if choose.isdigit():
             idx = int(choose) - 1
             if 0 <= idx < len(options):
-                sel = options[idx]
-                save_selector(s["url"], sel)
-                print("Kaydedildi:", sel)
+                list_sel, item_sel = options[idx]
+                save_selector(s["url"], list_sel, item_sel, path=path)
+                print("Kaydedildi:", list_sel, "|", item_sel)
         elif choose == "m":
-            manual = input("CSS selector: ").strip()
+            manual = input("item_link_selector: ").strip()
             if manual:
-                save_selector(s["url"], manual)
+                save_selector(s["url"], "", manual, path=path)
                 print("Kaydedildi:", manual)
 
 if __name__ == "__main__":
-    interactive()
+    ap = argparse.ArgumentParser(description="sites.yaml için liste/detay seçicisi bulma")
+    ap.add_argument("--batch", action="store_true", help="tüm siteler, etkileşimsiz")
+    ap.add_argument("--dry-run", action="store_true", help="toplu: sonuçları yalnızca yazdır")
+    ap.add_argument("--force", action="store_true", help="toplu: çalışan seçicileri de yeniden bul")
+    ap.add_argument("--offline", action="store_true", help="yalnızca sayfa önbelleğinden oku (PAGE_CACHE_PATH)")
+    ap.add_argument("--workers", type=int, default=8, help="toplu: eşzamanlı çekim (varsayılan: 8)")
+    ap.add_argument("--sites", default=SITES_PATH, help=f"site listesi (varsayılan: {SITES_PATH})")
+    a = ap.parse_args()
+    if a.offline:
+        if not PAGE_CACHE.enabled:
+            sys.exit("--offline için sayfa önbelleği gerekli: PAGE_CACHE_PATH ayarlayın (ör. pagecache.db).")
+        PAGE_CACHE.offline = True  # yalnızca önbellekteki sayfalarla (scraper/pagecache.py)
+    if a.batch:
+        logging.basicConfig(level=logging.WARNING)
+        sys.exit(batch(a.sites, workers=a.workers, dry_run=a.dry_run, force=a.force))
+    interactive(a.sites)
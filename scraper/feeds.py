@@ -0,0 +1,305 @@
+# scraper/feeds.py  -- RSS/Atom/JSON Feed ile duyuru listesi
+"""
+Birçok CMS sayfası (<link rel="alternate">) başlık, tarih ve özet içeren bir
+akış yayınlar. Akış kullanılabilen sitede liste HTML'i ayrıştırılmaz; girdiler
+extract_list_links ile aynı biçimde ({"title", "url"} + "snippet", "date",
+"ts") döner ve metni yeterli (FEED_MIN_CONTENT) girdiler için detay sayfası
+hiç çekilmez.
+
+Seçim site başına (sites.yaml):
+- feed_url: "<adres>"  → bu akış kullanılır (pick_selector --batch yazabilir),
+- feed: false           → hep HTML,
+- hiçbiri               → FEED_AUTODISCOVER açıksa tarama sırasında liste
+  sayfasındaki akışlar denenir; akışın tüm girdileri liste sayfasında görünen
+  veya zaten görülmüş linklerse (eski duyurular yeniden bildirilmesin diye)
+  akış benimsenir ve bot_state'te ("feed:<site url>") saklanır.
+  FEED_RECHECK_SEC'te bir yeniden denenir.
+
+Akış XML'i ağdan geldikçe parça parça (XMLPullParser) ayrıştırılır; biten her
+girdi işlenip bellekten atılır, FEED_MAX_ITEMS'a ulaşınca bağlantı kapatılır.
+JSON Feed küçük olduğundan tek seferde okunur. Akışlar sayfa önbelleğine
+yazılmaz; değişmeyen akış koşullu GET ile (304) anlaşılır.
+
+En yeni girdisi FEED_STALE_DAYS'ten eski akış bayat sayılır ve o tur HTML'e
+dönülür; akış çekilemez veya boş dönerse de öyle.
+"""
+import json, logging, time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import requests
+from bs4 import BeautifulSoup
+
+from config import FEED_AUTODISCOVER, FEED_STALE_DAYS, FEED_MAX_ITEMS, FEED_RECHECK_SEC
+from formatters.textfmt import clean_text, _normalize_url
+from scraper.fetcher import HEADERS, absolute_url
+from scraper.pagecache import PAGE_CACHE, PageCacheMiss
+from storage import db as dbmod
+
+FEED_TYPES = ("application/rss+xml", "application/atom+xml", "application/rdf+xml",
+              "application/feed+json", "application/json")
+_CHUNK = 16 * 1024
+_MAX_JSON_BYTES = 5 * 1024 * 1024
+_TEXT_TAGS = ("encoded", "content", "description", "summary")          # uzun olan seçilir
+_DATE_TAGS = ("pubDate", "published", "updated", "date", "issued", "modified")
+
+_VALIDATORS: Dict[str, Tuple[Optional[str], Optional[str]]] = {}  # akış → son tam işlenen sürümün doğrulayıcıları
+_DISCOVERED: Dict[str, dict] = {}                                    # site url → {"url": akış | None, "checked": epoch}
+
+
+# --- keşif ---
+def discover_feeds(html: str, base_url: str) -> List[str]:
+    """Sayfanın <link rel="alternate"> akışları (yorum akışları hariç), sayfadaki sırayla."""
+    soup = BeautifulSoup(html, "html.parser")
+    out = []
+    for ln in soup.find_all("link", href=True):
+        rel = [r.lower() for r in (ln.get("rel") or [])]
+        typ = (ln.get("type") or "").split(";")[0].strip().lower()
+        if "alternate" not in rel or typ not in FEED_TYPES:
+            continue
+        url = absolute_url(base_url, ln["href"])
+        label = f"{url} {ln.get('title') or ''}".lower()
+        if url and url not in out and "comment" not in label and "yorum" not in label:
+            out.append(url)
+    return out
+
+
+def feed_covers(feed_items: List[dict], html_items: List[dict],
+                known: Optional[Callable[[str], bool]] = None) -> bool:
+    """
+    Akış liste sayfasının yerine geçebilir mi: en az bir ortak link var ve
+    akıştaki her link ya liste sayfasında ya da known(url) ile zaten görülmüş.
+    known verilmezse (DB yok) akışın yalnızca liste sayfası kadar ilk girdisine bakılır.
+    """
+    html = {_normalize_url(it["url"]) for it in html_items}
+    if not feed_items or not html:
+        return False
+    head = feed_items if known else feed_items[:len(html)]
+    urls = [_normalize_url(it["url"]) for it in head]
+    return any(u in html for u in urls) and all(
+        u in html or (known is not None and known(it["url"])) for u, it in zip(urls, head))
+
+
+# --- ayrıştırma ---
+def _local(tag) -> str:
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def _text(html_or_text: str) -> str:
+    if "<" in html_or_text:
+        html_or_text = BeautifulSoup(html_or_text, "html.parser").get_text(separator="\n")
+    return clean_text(html_or_text, limit=1600)
+
+
+def _parse_date(s: Optional[str]) -> Optional[datetime]:
+    s = (s or "").strip()
+    if not s:
+        return None
+    try:
+        d = parsedate_to_datetime(s)           # RSS: RFC 822
+    except (TypeError, ValueError):
+        try:
+            d = datetime.fromisoformat(s.replace("Z", "+00:00"))  # Atom / JSON Feed: ISO 8601
+        except ValueError:
+            return None
+    return d if d.tzinfo else d.replace(tzinfo=timezone.utc)
+
+
+def _item(title: str, url: Optional[str], text: str, date: Optional[datetime]) -> Optional[dict]:
+    if not url:
+        return None
+    return {
+        "title": _text(title or "").replace("\n", " ").strip(),
+        "url": url,
+        "snippet": _text(text or ""),
+        # duyuru tarihiyle aynı biçim (try_parse_tr_date): yayın yerinin saatiyle
+        "date": date.strftime("%d.%m.%Y %H:%M") if date else None,
+        "ts": date.timestamp() if date else None,
+    }
+
+
+def _xml_entry(el, base_url: str) -> Optional[dict]:
+    title, link, texts, date = "", None, [], None
+    for ch in el:
+        name, val = _local(ch.tag), (ch.text or "").strip()
+        if name == "title":
+            title = val
+        elif name == "link":
+            href = ch.get("href")
+            if href is None:                                  # RSS: <link>adres</link>
+                link = link or absolute_url(base_url, val)
+            elif ch.get("rel", "alternate") == "alternate":   # Atom: <link rel="alternate" href=...>
+                link = absolute_url(base_url, href)
+        elif name == "guid" and not link and val.startswith("http") and ch.get("isPermaLink", "true") != "false":
+            link = val
+        elif name in _TEXT_TAGS and val:
+            texts.append(val)
+        elif name in _DATE_TAGS and date is None:
+            date = _parse_date(val)
+    return _item(title, link, max(texts, key=len, default=""), date)
+
+
+def _parse_xml(chunks: Iterable[bytes], first: bytes, base_url: str, max_items: int) -> List[dict]:
+    parser = ET.XMLPullParser(events=("end",))
+    items: List[dict] = []
+    for chunk in _chain(first, chunks):
+        parser.feed(chunk)
+        for _, el in parser.read_events():
+            if _local(el.tag) in ("item", "entry"):
+                it = _xml_entry(el, base_url)
+                el.clear()  # işlenen girdi bellekte tutulmaz
+                if it:
+                    items.append(it)
+                    if len(items) >= max_items:
+                        return items
+    parser.close()
+    return items
+
+
+def _parse_json(chunks: Iterable[bytes], first: bytes, base_url: str, max_items: int) -> List[dict]:
+    buf = bytearray()
+    for chunk in _chain(first, chunks):
+        buf += chunk
+        if len(buf) > _MAX_JSON_BYTES:
+            raise ValueError("JSON akışı çok büyük")
+    items = []
+    for e in json.loads(bytes(buf)).get("items") or []:
+        it = _item(e.get("title") or "", absolute_url(base_url, e.get("url") or e.get("external_url")),
+                   max((e.get(k) or "" for k in ("content_html", "content_text", "summary")), key=len),
+                   _parse_date(e.get("date_published") or e.get("date_modified")))
+        if it:
+            items.append(it)
+            if len(items) >= max_items:
+                break
+    return items
+
+
+def _chain(first: bytes, rest: Iterable[bytes]):
+    yield first
+    yield from rest
+
+
+def parse_feed(data, base_url: str, max_items: int = FEED_MAX_ITEMS) -> List[dict]:
+    """RSS 2.0 / RSS 1.0 / Atom / JSON Feed; data: bytes, str veya bytes parçaları (akış)."""
+    chunks = iter([data.encode("utf-8") if isinstance(data, str) else data]) \
+        if isinstance(data, (bytes, str)) else iter(data)
+    first = b""
+    for first in chunks:
+        if first.strip():
+            break
+    if first.lstrip()[:1] in (b"{", b"["):
+        return _parse_json(chunks, first, base_url, max_items)
+    return _parse_xml(chunks, first, base_url, max_items)
+
+
+def fetch_feed(url: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+               max_items: int = FEED_MAX_ITEMS):
+    """
+    Akışı ağdan okurken ayrıştırır. Dönen: (girdiler, etag, last_modified);
+    akış verilen doğrulayıcılardan beri değişmediyse (304) girdiler None.
+    """
+    if PAGE_CACHE.offline:
+        raise PageCacheMiss(url)  # akışlar önbelleğe yazılmaz: çevrimdışı turda HTML yolu kullanılır
+    headers = dict(HEADERS)
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    with requests.get(url, headers=headers, timeout=25, stream=True) as r:
+        if r.status_code == 304:
+            return None, etag, last_modified
+        r.raise_for_status()
+        items = parse_feed(r.iter_content(_CHUNK), r.url or url, max_items)
+        return items, r.headers.get("ETag"), r.headers.get("Last-Modified")
+
+
+def is_stale(items: List[dict], days: int = FEED_STALE_DAYS) -> bool:
+    """En yeni tarihli girdi `days`'ten eskiyse True; tarihsiz akış bayat sayılmaz."""
+    stamps = [it["ts"] for it in items if it.get("ts")]
+    return bool(stamps) and time.time() - max(stamps) > days * 86400
+
+
+# --- tarama ---
+def site_feed(conn, site: dict) -> Optional[str]:
+    """Site için kullanılacak akış: sites.yaml'daki feed_url veya keşfedilmiş olan."""
+    if site.get("feed") is False:
+        return None
+    if site.get("feed_url"):
+        return site["feed_url"]
+    if not FEED_AUTODISCOVER:
+        return None
+    return (_discovered(conn, site["url"]) or {}).get("url")
+
+
+def read_feed(feed_url: str):
+    """
+    Tarama için akış: (girdiler, etag, last_modified); son tam işlenen sürümden
+    beri değişmediyse girdiler None. Çekilemezse, boşsa veya bayatsa None (HTML'e dön).
+    """
+    etag, last_modified = _VALIDATORS.get(feed_url, (None, None))
+    try:
+        items, etag, last_modified = fetch_feed(feed_url, etag, last_modified)
+    except Exception as e:
+        logging.warning("Akış okunamadı (%s): %s", feed_url, e)
+        return None
+    if items is None:
+        return None, etag, last_modified
+    if not items:
+        return None
+    if is_stale(items):
+        logging.info("Akış bayat (%d günden eski), HTML kullanılıyor: %s", FEED_STALE_DAYS, feed_url)
+        return None
+    return items, etag, last_modified
+
+
+def feed_done(feed_url: str, etag: Optional[str], last_modified: Optional[str]):
+    """Akışın tüm girdileri işlendi: sonraki tur değişmediyse (304) site atlanır."""
+    if etag or last_modified:
+        _VALIDATORS[feed_url] = (etag, last_modified)
+
+
+def maybe_discover(conn, site: dict, html: str, html_items: List[dict],
+                   known: Callable[[str], bool], filter_fn=None) -> Optional[str]:
+    """
+    HTML ile taranan sitede (feed_url yok, feed: false değil) liste sayfasının
+    akışlarını FEED_RECHECK_SEC'te bir dener; liste sayfasını kapsayan ilk akış
+    bot_state'e yazılır ve sonraki turlarda kullanılır.
+    """
+    if not FEED_AUTODISCOVER or site.get("feed") is False or site.get("feed_url"):
+        return None
+    state = _discovered(conn, site["url"])
+    if state and time.time() - state.get("checked", 0) < FEED_RECHECK_SEC:
+        return None
+    found = None
+    for url in discover_feeds(html, site["url"])[:3]:
+        try:
+            items = fetch_feed(url)[0] or []
+        except Exception as e:
+            logging.info("Akış denenemedi (%s): %s", url, e)
+            continue
+        if filter_fn:
+            items = filter_fn(items)
+        if not is_stale(items) and feed_covers(items, html_items, known):
+            found = url
+            break
+    _save_discovered(conn, site["url"], {"url": found, "checked": int(time.time())})
+    if found:
+        logging.info("Akış bulundu, sonraki turlardan itibaren kullanılacak: %s → %s", site["url"], found)
+    return found
+
+
+def _discovered(conn, site_url: str) -> Optional[dict]:
+    if site_url not in _DISCOVERED:
+        raw = dbmod.get_state(conn, "feed:" + site_url)
+        try:
+            _DISCOVERED[site_url] = json.loads(raw) if raw else None
+        except ValueError:
+            _DISCOVERED[site_url] = None
+    return _DISCOVERED[site_url]
+
+
+def _save_discovered(conn, site_url: str, state: dict):
+    _DISCOVERED[site_url] = state
+    dbmod.set_state(conn, "feed:" + site_url, json.dumps(state))
@@ -1,16 +1,77 @@
+import logging
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from config import USER_AGENT
+from scraper.pagecache import PAGE_CACHE, PageCacheMiss
 HEADERS = {"User-Agent": USER_AGENT}
 
 def fetch(url: str) -> str:
-    r = requests.get(url, headers=HEADERS, timeout=25)
+    """Sayfa gövdesi; önbellekteki kopya taze veya 304 ile doğrulandıysa oradan (scraper/pagecache.py)."""
+    return fetch_conditional(url)[0]
+
+def fetch_conditional(url: str, etag: str | None = None, last_modified: str | None = None):
+    """
+    Koşullu GET (If-None-Match / If-Modified-Since).
+    Dönen: (html, etag, last_modified); sayfa çağıranın verdiği doğrulayıcılardan
+    beri değişmediyse html None'dır.
+
+    Sayfa önbellekteyse onun doğrulayıcıları gönderilir; 304 gelirse gövde
+    önbellekten döner (çağıranın doğrulayıcıları önbellektekiyle aynıysa None).
+    """
+    cached = PAGE_CACHE.get(url)
+    if cached is not None and (PAGE_CACHE.offline or cached.fresh(PAGE_CACHE.ttl_sec)):
+        PAGE_CACHE.count("hits")
+        return _from_cache(cached, etag, last_modified)
+    if PAGE_CACHE.offline:
+        PAGE_CACHE.count("offline_misses")
+        raise PageCacheMiss(url)
+
+    if cached is not None and (cached.etag or cached.last_modified):
+        if (etag, last_modified) != (cached.etag, cached.last_modified):
+            etag = last_modified = None  # çağıranın sürümü önbellektekinden eski: 304'te de gövde döner
+        send_etag, send_lm = cached.etag, cached.last_modified
+    else:
+        send_etag, send_lm = etag, last_modified
+    headers = dict(HEADERS)
+    if send_etag:
+        headers["If-None-Match"] = send_etag
+    if send_lm:
+        headers["If-Modified-Since"] = send_lm
+    r = requests.get(url, headers=headers, timeout=25)
+    if r.status_code == 304:
+        if cached is not None and (send_etag, send_lm) == (cached.etag, cached.last_modified):
+            PAGE_CACHE.count("revalidated")
+            PAGE_CACHE.touch(url)
+            return _from_cache(cached, etag, last_modified)
+        return None, etag, last_modified
     r.raise_for_status()
-    return r.text
+    PAGE_CACHE.count("misses")
+    html, etag, last_modified = r.text, r.headers.get("ETag"), r.headers.get("Last-Modified")
+    _store(url, html, etag, last_modified)
+    return html, etag, last_modified
+
+def _from_cache(cached, etag, last_modified):
+    """Çağıran bu sürümü zaten biliyorsa (aynı doğrulayıcılar) html None."""
+    if (etag or last_modified) and (etag, last_modified) == (cached.etag, cached.last_modified):
+        return None, cached.etag, cached.last_modified
+    return cached.body, cached.etag, cached.last_modified
+
+def _store(url, html, etag=None, last_modified=None, kind="static"):
+    try:
+        PAGE_CACHE.put(url, html, etag, last_modified, kind=kind)
+    except Exception as e:
+        logging.warning("Sayfa önbelleğe yazılamadı: %s", e)
 
 def fetch_js(url: str) -> str:
-    # Playwright fallback (opsiyonel)
+    # Playwright fallback (opsiyonel); çıktısı önbellekte statik HTML'den ayrı tutulur
+    cached = PAGE_CACHE.get(url, kind="js")
+    if cached is not None and (PAGE_CACHE.offline or cached.fresh(PAGE_CACHE.ttl_sec)):
+        PAGE_CACHE.count("hits")
+        return cached.body
+    if PAGE_CACHE.offline:
+        PAGE_CACHE.count("offline_misses")
+        raise PageCacheMiss(url)
     from playwright.sync_api import sync_playwright
     with sync_playwright() as p:
         b = p.chromium.launch(headless=True)
@@ -19,6 +80,8 @@ def fetch_js(url: str) -> str:
         page.wait_for_timeout(1500)
         htmlc = page.content()
         b.close()
+    PAGE_CACHE.count("misses")
+    _store(url, htmlc, kind="js")
     return htmlc
 
 def needs_js(html_text: str) -> bool:
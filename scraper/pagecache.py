@@ -0,0 +1,217 @@
+# scraper/pagecache.py  -- çekilen sayfalar için diskte sıkıştırılmış önbellek
+"""
+Seçici değiştirirken, extract_detail'i ayıklarken veya geriye dönük işlemede
+her detay sayfası kaynaktan yeniden çekilmesin diye fetch / fetch_js altında
+duran kalıcı bir önbellek (SQLite dosyası, PAGE_CACHE_PATH; okumalar mmap ile).
+İsteğe bağlıdır: PAGE_CACHE_PATH boşsa (varsayılan) kapalıdır. Lambda'da
+yalnızca /tmp yazılabilir: PAGE_CACHE_PATH=/tmp/pagecache.db.
+
+- Anahtar: normalize URL (formatters.textfmt._normalize_url) + tür ('static' /
+  'js'; Playwright çıktısı statik HTML'den ayrı tutulur).
+- İçerik adresli: gövde sha256'sıyla zlib sıkıştırılmış tek bir blob olarak
+  saklanır; aynı içerikli sayfalar (veya değişmeden yeniden çekilen sayfa) tek
+  kopyadır.
+- Doğrulayıcılar: sunucunun ETag / Last-Modified değerleri saklanır; sonraki
+  çekim koşullu GET'tir, 304 gelirse gövde önbellekten döner.
+- TTL: PAGE_CACHE_TTL_SEC'ten taze kayıt ağa hiç sorulmadan döner (0 = hep
+  doğrula).
+- Boyut: sıkıştırılmış toplam PAGE_CACHE_MAX_MB'ı geçince en uzun süredir
+  kullanılmayan sayfalar (LRU, accessed_at) %90'a inene kadar silinir.
+- Çevrimdışı (PAGE_CACHE_OFFLINE=1 veya PAGE_CACHE.offline = True): kayıt
+  yaşına bakılmadan önbellekten okunur, ağa hiç çıkılmaz; olmayan sayfa
+  PageCacheMiss verir.
+
+Dosya açılamazsa (ör. salt okunur dizin) önbellek bir uyarıyla kapanır ve
+çekim eskisi gibi doğrudan ağdan yapılır.
+"""
+import hashlib, logging, sqlite3, threading, time, zlib
+from typing import NamedTuple, Optional
+
+from config import PAGE_CACHE_PATH, PAGE_CACHE_MAX_MB, PAGE_CACHE_TTL_SEC, PAGE_CACHE_OFFLINE
+from formatters.textfmt import _normalize_url
+
+_EVICT_TO = 0.9     # sınır aşılınca hedef doluluk
+_EVICT_CHUNK = 64   # tek seferde sırası gelen sayfa
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS page_blob(
+  hash TEXT PRIMARY KEY,
+  data BLOB NOT NULL,
+  size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS page(
+  key TEXT PRIMARY KEY,
+  hash TEXT NOT NULL,
+  etag TEXT,
+  last_modified TEXT,
+  fetched_at REAL NOT NULL,
+  accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_page_accessed ON page(accessed_at);
+CREATE INDEX IF NOT EXISTS idx_page_hash ON page(hash);
+"""
+
+
+class PageCacheMiss(LookupError):
+    """Çevrimdışı modda önbellekte olmayan sayfa."""
+
+
+class CachedPage(NamedTuple):
+    body: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+    def fresh(self, ttl_sec: int) -> bool:
+        return ttl_sec > 0 and time.time() - self.fetched_at < ttl_sec
+
+
+def _empty_stats() -> dict:
+    # hits: ağa sorulmadan (taze veya çevrimdışı), revalidated: 304 ile önbellekten,
+    # misses: ağdan tam gövde, offline_misses: çevrimdışıyken bulunamayan
+    return {"hits": 0, "revalidated": 0, "misses": 0, "offline_misses": 0, "stored": 0, "evicted": 0}
+
+
+class PageCache:
+    def __init__(self, path: str, max_bytes: int, ttl_sec: int = 0, offline: bool = False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_sec = ttl_sec
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disabled = not path or max_bytes <= 0
+        self._size = 0
+        self.stats = _empty_stats()
+
+    @property
+    def enabled(self) -> bool:
+        return self._db() is not None
+
+    def _db(self):
+        """Bağlantıyı ilk kullanımda açar (import maliyeti yok)."""
+        if self._conn is not None or self._disabled:
+            return self._conn
+        with self._lock:
+            if self._conn is None and not self._disabled:
+                try:
+                    conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                    conn.execute("PRAGMA journal_mode=WAL;")
+                    conn.execute("PRAGMA synchronous=NORMAL;")
+                    conn.execute(f"PRAGMA mmap_size={int(self.max_bytes * 1.25)};")
+                    conn.executescript(_SCHEMA)
+                    self._size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM page_blob;").fetchone()[0]
+                    self._conn = conn
+                except sqlite3.Error as e:
+                    logging.warning("Sayfa önbelleği açılamadı (%s): %s; önbelleksiz devam", self.path, e)
+                    self._disabled = True
+        return self._conn
+
+    @staticmethod
+    def _key(url: str, kind: str) -> str:
+        return f"{kind} {_normalize_url(url)}"
+
+    def get(self, url: str, kind: str = "static") -> Optional[CachedPage]:
+        """Kayıt (yaşına bakılmaksızın) veya None; kullanım zamanı güncellenir."""
+        conn = self._db()
+        if conn is None:
+            return None
+        key = self._key(url, kind)
+        with self._lock:
+            row = conn.execute(
+                "SELECT b.data, p.etag, p.last_modified, p.fetched_at FROM page p "
+                "JOIN page_blob b ON b.hash = p.hash WHERE p.key = ?;", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE page SET accessed_at = ? WHERE key = ?;", (time.time(), key))
+        return CachedPage(zlib.decompress(row[0]).decode("utf-8"), row[1], row[2], row[3])
+
+    def put(self, url: str, body: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+            kind: str = "static"):
+        conn = self._db()
+        if conn is None:
+            return
+        raw = body.encode("utf-8")
+        h = hashlib.sha256(raw).hexdigest()
+        key, now = self._key(url, kind), time.time()
+        with self._lock:
+            conn.execute("BEGIN;")
+            try:
+                if conn.execute("SELECT 1 FROM page_blob WHERE hash = ?;", (h,)).fetchone() is None:
+                    data = zlib.compress(raw, 6)
+                    conn.execute("INSERT INTO page_blob(hash, data, size) VALUES (?,?,?);", (h, data, len(data)))
+                    self._size += len(data)
+                old = conn.execute("SELECT hash FROM page WHERE key = ?;", (key,)).fetchone()
+                conn.execute(
+                    "INSERT INTO page(key, hash, etag, last_modified, fetched_at, accessed_at) VALUES (?,?,?,?,?,?) "
+                    "ON CONFLICT(key) DO UPDATE SET hash = excluded.hash, etag = excluded.etag, "
+                    "last_modified = excluded.last_modified, fetched_at = excluded.fetched_at, "
+                    "accessed_at = excluded.accessed_at;",
+                    (key, h, etag, last_modified, now, now))
+                if old and old[0] != h:
+                    self._drop_blob_locked(conn, old[0])
+                if self._size > self.max_bytes:
+                    self._evict_locked(conn)
+                conn.execute("COMMIT;")
+            except Exception:
+                conn.execute("ROLLBACK;")
+                self._size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM page_blob;").fetchone()[0]
+                raise
+            self.stats["stored"] += 1
+
+    def count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def touch(self, url: str, kind: str = "static"):
+        """304 sonrası: içerik aynı, kayıt yeniden taze sayılır."""
+        conn = self._db()
+        if conn is None:
+            return
+        now = time.time()
+        with self._lock:
+            conn.execute("UPDATE page SET fetched_at = ?, accessed_at = ? WHERE key = ?;",
+                         (now, now, self._key(url, kind)))
+
+    def _drop_blob_locked(self, conn, h: str):
+        """Başka sayfa kullanmıyorsa blob'u siler."""
+        if conn.execute("SELECT 1 FROM page WHERE hash = ? LIMIT 1;", (h,)).fetchone() is None:
+            row = conn.execute("SELECT size FROM page_blob WHERE hash = ?;", (h,)).fetchone()
+            if row:
+                conn.execute("DELETE FROM page_blob WHERE hash = ?;", (h,))
+                self._size -= row[0]
+
+    def _evict_locked(self, conn):
+        target = self.max_bytes * _EVICT_TO
+        while self._size > target:
+            rows = conn.execute("SELECT key, hash FROM page ORDER BY accessed_at LIMIT ?;", (_EVICT_CHUNK,)).fetchall()
+            if not rows:
+                break
+            for key, h in rows:
+                conn.execute("DELETE FROM page WHERE key = ?;", (key,))
+                self._drop_blob_locked(conn, h)
+                self.stats["evicted"] += 1
+                if self._size <= target:
+                    break
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    def take_stats(self) -> dict:
+        """Son çağrıdan beri sayaçlar + isabet oranı (ağa tam gövde için gidilmeyen istek oranı); sıfırlar."""
+        with self._lock:
+            s, self.stats = self.stats, _empty_stats()
+        total = s["hits"] + s["revalidated"] + s["misses"] + s["offline_misses"]
+        s["hit_rate"] = round((s["hits"] + s["revalidated"]) / total, 3) if total else None
+        s["size_mb"] = round(self._size / 1e6, 2)
+        return s
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+PAGE_CACHE = PageCache(PAGE_CACHE_PATH, PAGE_CACHE_MAX_MB * 1_000_000, PAGE_CACHE_TTL_SEC, PAGE_CACHE_OFFLINE)
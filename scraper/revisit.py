@@ -0,0 +1,85 @@
+# scraper/revisit.py  -- yayınlandıktan sonra düzenlenen duyuruları yakalama
+"""
+Link seen_item'a girdikten sonra normalde bir daha çekilmez; son başvuru tarihi
+değişiklikleri, düzeltmeler vb. bu yüzden görünmezdi. Her yeni öğe içerik
+özetiyle (formatters.textfmt.body_hash) ve sunucunun doğrulayıcılarıyla
+(ETag / Last-Modified) kaydedilir ve bir yeniden ziyaret zamanı alır:
+
+- ilk kontrol REVISIT_BASE_SEC sonra; içerik her değişmediğinde aralık 2 katı
+  (1 sa, 2 sa, 4 sa, …), değiştiğinde başa döner,
+- REVISIT_MAX_AGE_DAYS'ten eski öğelere bakılmaz (takvim boşaltılır),
+- tur başına en fazla REVISIT_MAX_PER_CYCLE sayfa çekilir (en gecikmiş önce;
+  kalanlar sonraki turlara kayar),
+- doğrulayıcı varsa koşullu GET yapılır: 304 → sayfa ayrıştırılmaz.
+
+Özet değiştiyse öğe güncellenir ve abonelere "güncellendi" bildirimi
+('tg_edit' / 'email_edit' outbox satırı) açılır. Yakın kopya takma adlarına
+(seen_item.dup_of) bakılmaz; kök öğenin bildirimi takma adların sitelerine de gider.
+"""
+import json, logging, time
+from typing import Dict, Iterable, Optional
+
+from config import REVISIT_MAX_PER_CYCLE, REVISIT_BASE_SEC, REVISIT_MAX_AGE_DAYS
+from storage import db as dbmod
+from scraper.site_monitor import fetch_detail_html, extract_detail
+from formatters.textfmt import body_hash, clean_text
+
+
+def next_revisit_sec(revisits: int, age_sec: float) -> Optional[int]:
+    """revisits değişmeden geçen kontrol sayısı; öğe pencereden çıkacaksa None."""
+    delay = REVISIT_BASE_SEC * 2 ** max(0, revisits)
+    if REVISIT_MAX_PER_CYCLE <= 0 or age_sec + delay > REVISIT_MAX_AGE_DAYS * 86400:
+        return None
+    return delay
+
+
+def revisit_due(conn, sites_by_url: Dict[str, dict], limit: int = REVISIT_MAX_PER_CYCLE,
+                extra_emails: Iterable[str] = (), with_email: bool = False, email_due=None) -> dict:
+    """
+    Zamanı gelmiş en fazla `limit` öğeyi yeniden çeker ve sonucu kaydeder.
+    Dönen metrik: checked, not_modified, unchanged, updated, failed
+    """
+    stats = {"checked": 0, "not_modified": 0, "unchanged": 0, "updated": 0, "failed": 0}
+    if limit <= 0:
+        return stats
+    extra_emails = list(extra_emails)
+    now = time.time()
+    for item_id, site_url, url, old_hash, etag, last_modified, revisits, first_epoch in dbmod.due_revisits(conn, limit):
+        stats["checked"] += 1
+        age = now - (first_epoch or now)
+        res = fetch_detail_html(url, etag, last_modified)
+        if res is None:
+            # çekilemedi: değişmemiş say (takvim ilerlesin, hep en önde kalmasın)
+            stats["failed"] += 1
+            dbmod.record_revisit(conn, item_id, etag, last_modified, next_revisit_sec(revisits + 1, age))
+            continue
+        html_detail, etag, last_modified = res
+        if html_detail is None:
+            stats["not_modified"] += 1
+            dbmod.record_revisit(conn, item_id, etag, last_modified, next_revisit_sec(revisits + 1, age))
+            continue
+
+        site = sites_by_url.get(site_url) or {}
+        title, body, date_str = extract_detail(html_detail, site.get("detail_selector"))
+        snippet = clean_text(body, limit=1000)
+        h = body_hash(snippet)
+        if old_hash is None:
+            # akıştan detay çekilmeden kaydedilmiş öğe: ilk detay özeti karşılaştırma tabanı olur
+            stats["unchanged"] += 1
+            dbmod.record_revisit(conn, item_id, etag, last_modified, next_revisit_sec(revisits + 1, age),
+                                 baseline_hash=h)
+            continue
+        if h == old_hash:
+            stats["unchanged"] += 1
+            dbmod.record_revisit(conn, item_id, etag, last_modified, next_revisit_sec(revisits + 1, age))
+            continue
+
+        stats["updated"] += 1
+        n = dbmod.record_revisit(conn, item_id, etag, last_modified, next_revisit_sec(0, age),
+                                 changed=(h, (title or "")[:200], snippet, date_str),
+                                 extra_emails=extra_emails, with_email=with_email, email_due=email_due)
+        logging.info("Duyuru güncellendi: %s (%d bildirim)", url, n)
+
+    if stats["checked"]:
+        logging.info(json.dumps({"metric": "revisit", **stats}))
+    return stats
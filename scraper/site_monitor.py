@@ -1,14 +1,10 @@
-import yaml, logging, re
+import logging, re
 from bs4 import BeautifulSoup
 from typing import Dict, List, Tuple
-from scraper.fetcher import fetch, fetch_js, needs_js, absolute_url
+from scraper.fetcher import fetch, fetch_conditional, fetch_js, needs_js, absolute_url
+from scraper.sites import load_sites_yaml  # geriye dönük uyumluluk için burada da
 from formatters.textfmt import clean_text, try_parse_tr_date
 
-def load_sites_yaml():
-    with open("sites.yaml","r",encoding="utf-8") as f:
-        data = yaml.safe_load(f)
-    return data["sites"]
-
 def extract_list_links(full_html: str, list_selector: str, item_link_selector: str, base_url: str):
     soup = BeautifulSoup(full_html, "html.parser")
     container = soup.select_one(list_selector) if list_selector else soup
@@ -76,3 +72,25 @@ def fetch_list_html(url: str):
             logging.warning("Playwright başarısız: %s", e)
             return None
     return html_list
+
+def fetch_detail_html(url: str, etag: str | None = None, last_modified: str | None = None):
+    """
+    Detay sayfası; doğrulayıcılar (etag/last_modified) verilirse koşullu GET.
+    Dönen: (html, etag, last_modified) — sayfa değişmediyse (304) html None;
+    çekilemezse None. JS ile çizilen sayfalarda doğrulayıcılar statik HTML'i
+    anlattığından saklanmaz (None döner).
+    """
+    try:
+        html_detail, etag, last_modified = fetch_conditional(url, etag, last_modified)
+    except Exception as e:
+        logging.warning("Statik çekilemedi: %s", e)
+        html_detail, etag, last_modified = "", None, None
+    if html_detail is None:
+        return None, etag, last_modified
+    if not html_detail or needs_js(html_detail):
+        try:
+            return fetch_js(url), None, None
+        except Exception as e:
+            logging.warning("Playwright başarısız: %s", e)
+            return None
+    return html_detail, etag, last_modified
@@ -0,0 +1,7 @@
+# scraper/sites.py  -- sites.yaml okuma (hafif; webhook soğuk başlangıcında bs4/requests yüklemez)
+
+def load_sites_yaml():
+    import yaml  # yalnızca gerçekten okunurken yüklenir
+    with open("sites.yaml","r",encoding="utf-8") as f:
+        data = yaml.safe_load(f)
+    return data["sites"]
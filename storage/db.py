@@ -1,219 +1,393 @@
-# storage/db.py  -- PostgreSQL (psycopg3) uyarlaması
-import os, logging, re
-from typing import Iterable, List, Set, Optional
-
-import psycopg
-from psycopg.rows import tuple_row
-
-DATABASE_URL = os.environ.get("DATABASE_URL", "").strip()
-if not DATABASE_URL:
-    # Lambda'da DATABASE_URL şart; lokal geliştirmede env'e koy.
-    raise RuntimeError("DATABASE_URL boş. Neon/Supabase DSN'ini env'e ekleyin.")
+# storage/db.py  -- depolama katmanı cephesi (backend seçimi + ortak kurallar)
+"""
+Uygulamanın geri kalanı yalnızca bu modülü kullanır. Asıl SQL backend'lerdedir:
+- storage/pg.py      → PostgreSQL (DATABASE_URL; Neon/Supabase, Lambda)
+- storage/sqlite.py  → SQLite (DB_PATH; lokal/EC2/Docker, WAL + tek yazıcı)
+
+Her backend BACKEND_API'deki fonksiyonları aynı imzalarla sunar; buradaki
+fonksiyonlar backend'den bağımsız kuralları (doğrulama, limitler, bellek
+önbellekleri) uygular. Burada tanımlı olmayan BACKEND_API isimleri doğrudan
+backend'e yönlendirilir.
+
+Her backend fonksiyonu Postgres'te tek gidiş-dönüş olacak şekilde yazılır;
+STATS["db_calls"] bu çağrıları sayar (bkz. bench/roundtrip_budget.py).
+"""
+import importlib, logging, re, zlib
+from typing import Dict, Iterable, Optional, Set
+
+from config import DATABASE_URL, DB_BACKEND, KEYWORD_MAX_PER_USER
+from storage.seenset import SEEN_INDEX
+from storage.recent import RECENT_ITEMS
+from storage.session import SESSIONS
+from storage.neardup import NEAR_DUPS
+from storage.keywords import KEYWORDS, normalize_keyword
+from formatters.textfmt import fold_tr
 
 EMAIL_RE = re.compile(r"^[A-Z0-9._%+\-]+@[A-Z0-9.\-]+\.[A-Z]{2,}$", re.I)
 
-# --- INIT ---
-def init_db(_db_path_ignored: str = ""):
+BACKEND_API = (
+    "connect", "ping", "get_schema_version", "apply_migration",
+    "get_update_offset", "set_update_offset",
+    "intake_updates", "pending_updates", "finish_updates",
+    "get_state", "set_state", "del_state",
+    "get_subscribers",
+    "get_emails_for_chats",
+    "list_keywords", "load_keywords",
+    "seed_admin",
+    "iter_seen_hashes", "add_digests", "archive_seen_before", "load_digests",
+    "load_fingerprints", "due_revisits", "record_revisit",
+    "load_recent", "search_items",
+    "claim_outbox", "finish_outbox", "renew_outbox", "outbox_backlog", "purge_outbox",
+    "release_held_outbox", "get_tg_mode",
+)
+
+TG_MODES = ("instant", "digest")
+
+_BACKENDS = {"postgres": "storage.pg", "sqlite": "storage.sqlite"}
+_backend = None
+_wrapped = {}
+
+STATS = {"db_calls": 0}
+
+
+def backend_name() -> str:
+    """DB_BACKEND açıkça verilmemişse: DATABASE_URL varsa postgres, yoksa sqlite."""
+    if DB_BACKEND in _BACKENDS:
+        return DB_BACKEND
+    return "postgres" if DATABASE_URL else "sqlite"
+
+def backend():
+    global _backend
+    if _backend is None:
+        _backend = importlib.import_module(_BACKENDS[backend_name()])
+    return _backend
+
+def _be(name: str):
     """
-    PostgreSQL'e bağlanır ve tablo şemasını (gerekirse) oluşturur.
+    Backend fonksiyonu için STATS["db_calls"]'ı artıran bir sarmalayıcı döndürür.
+    Backend modülü (ve psycopg) ilk gerçek çağrıda yüklenir, import anında değil.
     """
-    conn = psycopg.connect(DATABASE_URL, autocommit=True)
-    with conn.cursor() as cur:
-        # users
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS users(
-            chat_id    BIGINT PRIMARY KEY,
-            username   TEXT,
-            first_seen TIMESTAMPTZ DEFAULT NOW()
-        );
-        """)
-
-        # user_subs
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS user_subs(
-            chat_id  BIGINT NOT NULL REFERENCES users(chat_id) ON DELETE CASCADE,
-            site_url TEXT   NOT NULL,
-            PRIMARY KEY(chat_id, site_url)
-        );
-        """)
-
-        # email_subs
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS email_subs(
-            chat_id BIGINT NOT NULL REFERENCES users(chat_id) ON DELETE CASCADE,
-            email   TEXT   NOT NULL,
-            PRIMARY KEY(chat_id, email)
-        );
-        """)
-
-        # seen_item
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS seen_item(
-            id         BIGSERIAL PRIMARY KEY,
-            site_url   TEXT NOT NULL,
-            item_hash  TEXT NOT NULL UNIQUE,
-            title      TEXT,
-            url        TEXT,
-            first_seen TIMESTAMPTZ DEFAULT NOW()
-        );
-        """)
-
-        # bot_state
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS bot_state(
-            key   TEXT PRIMARY KEY,
-            value TEXT
-        );
-        """)
-
-        # Performans için birkaç index (opsiyonel ama faydalı)
-        cur.execute("CREATE INDEX IF NOT EXISTS ix_seen_item_site ON seen_item(site_url);")
-        cur.execute("CREATE INDEX IF NOT EXISTS ix_user_subs_site ON user_subs(site_url);")
-    return conn
-
-
-# --- bot state / offsets ---
-def get_update_offset(conn) -> int:
-    with conn.cursor(row_factory=tuple_row) as cur:
-        cur.execute("SELECT value FROM bot_state WHERE key=%s;", ("update_offset",))
-        row = cur.fetchone()
-        try:
-            return int(row[0]) if row else 0
-        except:
-            return 0
+    fn = _wrapped.get(name)
+    if fn is None:
+        def fn(*args, **kwargs):
+            STATS["db_calls"] += 1
+            return getattr(backend(), name)(*args, **kwargs)
+        fn.__name__ = name
+        _wrapped[name] = fn
+    return fn
 
-def set_update_offset(conn, offset: int):
-    with conn.cursor() as cur:
-        cur.execute("""
-            INSERT INTO bot_state(key,value) VALUES(%s,%s)
-            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value;
-        """, ("update_offset", str(offset)))
+def __getattr__(name):
+    if name in BACKEND_API:
+        return _be(name)
+    raise AttributeError(f"module 'storage.db' has no attribute {name!r}")
 
 
-def get_state(conn, key: str) -> Optional[str]:
-    with conn.cursor(row_factory=tuple_row) as cur:
-        cur.execute("SELECT value FROM bot_state WHERE key=%s;", (key,))
-        row = cur.fetchone()
-        return row[0] if row else None
-
-def set_state(conn, key: str, value: str):
-    with conn.cursor() as cur:
-        cur.execute("""
-            INSERT INTO bot_state(key,value) VALUES(%s,%s)
-            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value;
-        """, (key, value))
+# --- INIT ---
+def init_db(db_path: str = ""):
+    """
+    Seçili backend'e bağlanır ve şemanın güncel olduğundan emin olur
+    (süreç başına en fazla tek sürüm sorgusu; bkz. storage/migrate.py).
+    """
+    from storage.migrate import ensure_schema
+    conn = _be("connect")(db_path)
+    ensure_schema(conn)
+    return conn
 
-def del_state(conn, key: str):
-    with conn.cursor() as cur:
-        cur.execute("DELETE FROM bot_state WHERE key=%s;", (key,))
+def thread_conn(conn, db_path: str = ""):
+    """
+    Başka bir thread'in kullanacağı bağlantı. psycopg bağlantısının transaction /
+    pipeline durumu bağlantı başınadır, bu yüzden Postgres'te yeni bir bağlantı
+    açılır (şema init_db'de zaten doğrulandı). SQLite'ta aynı nesne döner:
+    SqliteDB thread başına okuma bağlantısı ve tek yazıcı thread'le zaten güvenlidir.
+    """
+    if backend_name() == "sqlite":
+        return conn
+    return _be("connect")(db_path)
+
+
+# --- site index (abonelik bit eşlemi) ---
+# Her site bir bit numarası alır (site_index). Kullanıcının abonelikleri users.sub_bits'te
+# tek bir 64-bit tamsayıdır; oturumda da böyle tutulur. sites.yaml'dan çıkarılan sitelerin
+# numaraları açılışta (register_sites(…, prune=True)) bırakılır ve yeni sitelere verilir.
+# Sınır aşılırsa register_sites hata verir (site sessizce abone olunamaz hale gelmez).
+SUB_BITS_MAX = 64
+_BITS_MASK = (1 << SUB_BITS_MAX) - 1
+_SITE_IDX: Dict[str, int] = {}
+_IDX_SITE: Dict[int, str] = {}
+_index_loaded = False
+
+def register_sites(conn, site_urls: Iterable[str], prune: bool = False) -> Dict[str, int]:
+    """
+    Sitelere (yoksa) bit numarası verir ve süreç içi eşlemeyi tazeler.
+    Süreç başında bir kez (site listesi yüklenince) prune=True ile çağrılır: listede
+    olmayan sitelerin numaraları ve kullanıcılardaki bitleri tek transaction'da
+    serbest bırakılır. Bit numarası alamayan site olursa RuntimeError (açılışta).
+    """
+    global _index_loaded
+    site_urls = list(dict.fromkeys(site_urls))
+    if len(site_urls) > SUB_BITS_MAX:
+        # DB'ye yazmadan: listenin tamamı zaten sığmaz
+        raise RuntimeError(f"Abonelik bit eşlemi en fazla {SUB_BITS_MAX} site destekler; "
+                           f"sites.yaml'da {len(site_urls)} site var.")
+    rows = _be("sync_site_index")(conn, site_urls, prune)
+    over = [url for idx, url in rows if idx >= SUB_BITS_MAX]
+    if over:
+        # prune'suz çağrılarda listeden çıkarılmış eski siteler hâlâ yer tutar
+        raise RuntimeError(f"Abonelik bit eşlemi en fazla {SUB_BITS_MAX} site destekler; "
+                           f"site_index dolu, bit numarası alamayanlar: {', '.join(over)}")
+    # dönen eşleme tablonun tamamıdır; süreç içi kopya baştan kurulur
+    _SITE_IDX.clear(); _IDX_SITE.clear()
+    for idx, url in rows:
+        _SITE_IDX[url] = idx
+        _IDX_SITE[idx] = url
+    _index_loaded = True
+    return dict(_SITE_IDX)
+
+def site_bit(conn, site_url: str) -> Optional[int]:
+    """Sitenin bit numarası; bilinmiyorsa kaydedilir (eşleme boşsa önce yüklenir)."""
+    if site_url not in _SITE_IDX:
+        register_sites(conn, [site_url])
+    return _SITE_IDX.get(site_url)
+
+def site_bit_cached(site_url: str) -> Optional[int]:
+    """DB'ye gitmeden: süreçte bilinen bit numarası (yoksa None)."""
+    return _SITE_IDX.get(site_url)
+
+def bits_to_urls(bits: int) -> Set[str]:
+    urls, i = set(), 0
+    while bits:
+        if bits & 1 and i in _IDX_SITE:
+            urls.add(_IDX_SITE[i])
+        bits >>= 1
+        i += 1
+    return urls
+
+def _signed64(v: int) -> int:
+    return v - (1 << 64) if v >= (1 << 63) else v
 
 
 # --- users & subs ---
 def upsert_user(conn, chat_id: int, username: str):
+    """touch_user(…, with_subs=False) ile aynı: username değişmediyse DB'ye gitmez."""
+    touch_user(conn, chat_id, username)
+
+def touch_user(conn, chat_id: int, username: str, with_subs: bool = False) -> Optional[Set[str]]:
     """
-    İlk kez gelirse ekler. Varsa ve yeni username boş değilse günceller.
+    Telegram güncellemesi başında çağrılır. Kullanıcıyı kaydeder/username'i
+    tazeler ve istenirse aboneliklerini döndürür. Oturum önbelleği sayesinde
+    - username aynıysa (veya boşsa ve kullanıcı biliniyorsa) upsert atlanır,
+    - abonelik bit eşlemi önbellekteyse okunmaz;
+    gerekenler tek gidiş-dönüşte yapılır (upsert … RETURNING sub_bits).
     """
     username = (username or "").strip()
-    with conn.cursor() as cur:
-        cur.execute("""
-            INSERT INTO users(chat_id, username) VALUES (%s, %s)
-            ON CONFLICT (chat_id) DO UPDATE SET
-              username = CASE
-                           WHEN COALESCE(EXCLUDED.username, '') <> '' THEN EXCLUDED.username
-                           ELSE users.username
-                         END;
-        """, (chat_id, username))
+    sess = SESSIONS.get(chat_id)
+    known = "username" in sess
+    need_upsert = not known or (username and username != sess["username"])
+    need_subs = with_subs and "subs" not in sess
+    if need_upsert or need_subs:
+        if not _index_loaded:
+            register_sites(conn, ())
+        bits = _be("touch_user")(conn, chat_id, username if need_upsert else None, need_subs)
+        if need_upsert:
+            sess["username"] = username or sess.get("username", "")
+        if need_subs:
+            sess["subs"] = bits & _BITS_MASK
+    return bits_to_urls(sess["subs"]) if with_subs else None
+
+def get_sub_bits(conn, chat_id: int) -> int:
+    """Abonelik bit eşlemi (oturumda varsa DB'ye gitmez)."""
+    sess = SESSIONS.get(chat_id)
+    if "subs" not in sess:
+        if not _index_loaded:
+            register_sites(conn, ())
+        sess["subs"] = _be("get_sub_bits")(conn, chat_id) & _BITS_MASK
+    return sess["subs"]
+
+def get_user_subs(conn, chat_id: int) -> Set[str]:
+    return bits_to_urls(get_sub_bits(conn, chat_id))
+
+def set_site_sub(conn, chat_id: int, site_url: str, on: bool) -> bool:
+    """
+    Siteye aboneliği açar/kapatır (tek ifade); dönüş: işlemden sonra abone mi.
+    Hedef durum açıkça verilir: aynı update yeniden işlense de sonuç aynıdır.
+    """
+    idx = site_bit(conn, site_url)
+    if idx is None:
+        return False
+    bits = _be("set_site_sub")(conn, chat_id, site_url, _signed64(1 << idx), bool(on))
+    if bits is None:
+        return False
+    bits &= _BITS_MASK
+    SESSIONS.get(chat_id)["subs"] = bits
+    return bool(bits >> idx & 1)
 
 def toggle_site_sub(conn, chat_id: int, site_url: str) -> bool:
-    with conn.cursor(row_factory=tuple_row) as cur:
-        cur.execute("SELECT 1 FROM user_subs WHERE chat_id=%s AND site_url=%s;", (chat_id, site_url))
-        exists = cur.fetchone() is not None
-    with conn.cursor() as cur:
-        if exists:
-            cur.execute("DELETE FROM user_subs WHERE chat_id=%s AND site_url=%s;", (chat_id, site_url))
-            return False
-        else:
-            cur.execute("""
-                INSERT INTO user_subs(chat_id, site_url) VALUES(%s,%s)
-                ON CONFLICT DO NOTHING;
-            """, (chat_id, site_url))
-            return True
+    """Aboneliği mevcut bit eşlemine (oturumda varsa DB'ye gitmeden) göre tersine çevirir."""
+    idx = site_bit(conn, site_url)
+    if idx is None:
+        return False
+    return set_site_sub(conn, chat_id, site_url, not get_sub_bits(conn, chat_id) >> idx & 1)
+
+def set_tg_mode(conn, chat_id: int, mode: str) -> bool:
+    """Telegram bildirim modu: 'instant' (her duyuru ayrı) veya 'digest' (tur sonunda toplu)."""
+    if mode not in TG_MODES:
+        return False
+    _be("set_tg_mode")(conn, chat_id, mode)
+    return True
 
-def get_user_subs(conn, chat_id: int) -> Set[str]:
-    with conn.cursor(row_factory=tuple_row) as cur:
-        cur.execute("SELECT site_url FROM user_subs WHERE chat_id=%s;", (chat_id,))
-        return {row[0] for row in cur.fetchall()}
 
-def get_subscribers(conn, site_url: str) -> List[int]:
-    with conn.cursor(row_factory=tuple_row) as cur:
-        cur.execute("SELECT chat_id FROM user_subs WHERE site_url=%s;", (site_url,))
-        return [row[0] for row in cur.fetchall()]
+# --- özet anahtarları ---
+def hash64(item_hash: str) -> int:
+    """sha256 hex özetinin ilk 64 bitini işaretli BIGINT'e çevirir (seen_digest.h)."""
+    v = int((item_hash or "0")[:16], 16)
+    return v - (1 << 64) if v >= (1 << 63) else v
+
+def site_key(site_url: str) -> int:
+    """site_url için 32-bit işaretli anahtar (seen_digest.site_key)."""
+    v = zlib.crc32((site_url or "").encode("utf-8"))
+    return v - (1 << 32) if v >= (1 << 31) else v
 
 
 # --- email subs ---
 def add_email(conn, chat_id: int, email: str):
     if not EMAIL_RE.match(email or ""):
         return False, "Geçersiz e-posta adresi."
+    email = (email or "").lower()
     try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO email_subs(chat_id, email) VALUES(%s,%s)
-                ON CONFLICT DO NOTHING;
-            """, (chat_id, (email or "").lower()))
-        return True, "E-posta eklendi."
+        _be("add_email")(conn, chat_id, email)
     except Exception:
         logging.exception("add_email")
         return False, "E-posta eklenemedi."
+    sess = SESSIONS.get(chat_id)
+    if "emails" in sess and email not in sess["emails"]:
+        sess["emails"].append(email)
+    return True, "E-posta eklendi."
 
 def remove_email(conn, chat_id: int, email: str):
-    with conn.cursor() as cur:
-        cur.execute("DELETE FROM email_subs WHERE chat_id=%s AND email=%s;",
-                    (chat_id, (email or "").lower()))
+    email = (email or "").lower()
+    _be("remove_email")(conn, chat_id, email)
+    sess = SESSIONS.get(chat_id)
+    if "emails" in sess and email in sess["emails"]:
+        sess["emails"].remove(email)
     return True, "E-posta kaldırıldı."
 
 def list_emails(conn, chat_id: int):
-    with conn.cursor(row_factory=tuple_row) as cur:
-        cur.execute("SELECT email FROM email_subs WHERE chat_id=%s;", (chat_id,))
-        return [row[0] for row in cur.fetchall()]
+    sess = SESSIONS.get(chat_id)
+    if "emails" not in sess:
+        sess["emails"] = list(_be("list_emails")(conn, chat_id))
+    return list(sess["emails"])
+
+
+
+# --- anahtar kelime abonelikleri ---
+KEYWORD_MIN_LEN = 3
+KEYWORD_MAX_LEN = 60
+
+def add_keyword(conn, chat_id: int, phrase: str, site_urls: Iterable[str] = ()):
+    """
+    İfade aboneliği ekler; site_urls boşsa tüm siteler. Eşleme otomatı
+    (storage/keywords.py) aynı süreçte hemen güncellenir. Dönen: (ok, mesaj)
+    """
+    phrase = " ".join((phrase or "").split())
+    keyword = normalize_keyword(phrase)
+    if len(keyword) < KEYWORD_MIN_LEN:
+        return False, f"İfade en az {KEYWORD_MIN_LEN} karakter olmalı."
+    if len(phrase) > KEYWORD_MAX_LEN:
+        return False, f"İfade en fazla {KEYWORD_MAX_LEN} karakter olabilir."
+    targets = sorted(set(site_urls)) or [""]
+    added = _be("add_keywords")(conn, chat_id, keyword, phrase, targets, KEYWORD_MAX_PER_USER)
+    if added is None:
+        return False, f"En fazla {KEYWORD_MAX_PER_USER} ifade aboneliği olabilir (/kw ile listele, sil)."
+    for site_url in added:
+        KEYWORDS.add(chat_id, keyword, site_url)
+    return True, "İfade eklendi." if added else "Bu ifadeyi zaten takip ediyorsun."
+
+def remove_keyword(conn, chat_id: int, phrase: Optional[str] = None, kw_id: Optional[int] = None) -> int:
+    """İfadeyi (tüm site kapsamlarıyla) ya da tek bir satırı (kw_id) siler. Dönen: silinen satır."""
+    keyword = normalize_keyword(phrase) if phrase else None
+    rows = _be("remove_keywords")(conn, chat_id, keyword, kw_id)
+    for kw, site_url in rows:
+        KEYWORDS.remove(chat_id, kw, site_url)
+    return len(rows)
 
 
 # --- seen items ---
-def insert_seen(conn, site_url: str, item_hash: str, title: str, url: str) -> bool:
+def insert_seen(conn, site_url: str, item_hash: str, title: str, url: str,
+                snippet: str = "", date_str: Optional[str] = None,
+                extra_emails: Iterable[str] = (), with_email: bool = False,
+                email_due=None, fingerprint: Optional[int] = None,
+                content_hash: Optional[str] = None, etag: Optional[str] = None,
+                last_modified: Optional[str] = None, revisit_sec: Optional[int] = None) -> bool:
     """
-    Gerçekten yeni mi önce kontrol et → yeni ise INSERT.
-    Böylece gereksiz INSERT denemeleri sequence'i tüketmez.
+    Öğe daha önce görülmediyse kaydeder ve True döner.
+    Tekilleştirme seen_digest (64-bit özet kümesi) ile yapılır; böylece
+    seen_archive'a taşınmış öğeler de tekrar "yeni" sayılmaz.
+    Aynı transaction'da abonelere notification_outbox satırları açılır
+    (with_email ise abonelerin e-postaları + extra_emails için de; e-posta
+    satırları email_due (UTC datetime) verilirse o ana kadar bekletilir).
+    Gönderimi notifiers/outbox.py yapar.
+
+    fingerprint (formatters.textfmt.simhash64) verilirse son NEARDUP_WINDOW_DAYS
+    içindeki yakın kopyası aranır (storage/neardup.py); bulunursa öğe onun takma
+    adı olarak kaydedilir ve aynı duyuruyu zaten almış alıcılara satır açılmaz.
+
+    content_hash / etag / last_modified ve revisit_sec düzenleme tespiti içindir
+    (scraper/revisit.py); takma adlara yeniden bakılmaz, kökleri bakılır.
+
+    Başlık + özette ifadesi geçen anahtar kelime abonelerine (storage/keywords.py)
+    siteye abone olmasalar da satır açılır.
+
+    DB hatasında False döner ve link bellek içi kümeye eklenmez: sonraki turda
+    yeniden denenir (yalnızca gerçek ekleme veya doğrulanmış tekrar "görülmüş" olur).
     """
+    h, sk = hash64(item_hash), site_key(site_url)
+    dup_of = None
+    if fingerprint is not None and NEAR_DUPS.enabled:
+        NEAR_DUPS.ensure(conn, _be("load_fingerprints"))
+        dup_of = NEAR_DUPS.find(fingerprint)
+    KEYWORDS.ensure(conn, _be("load_keywords"))
+    keyword_chats = KEYWORDS.recipients(site_url, f"{title}\n{snippet or ''}")
     try:
-        with conn.cursor() as cur:
-            # URL ya da hash zaten var mı?
-            cur.execute(
-                "SELECT 1 FROM seen_item WHERE url = %s OR item_hash = %s LIMIT 1",
-                (url, item_hash)
-            )
-            if cur.fetchone():
-                return False
-
-            # Gerçekten yeni → ekle
-            cur.execute(
-                "INSERT INTO seen_item(site_url, item_hash, title, url) VALUES (%s, %s, %s, %s)",
-                (site_url, item_hash, title, url)
-            )
-        conn.commit()
-        return True
+        row = _be("insert_seen")(conn, site_url, item_hash, h, sk, title, url,
+                                 snippet, date_str, list(extra_emails), with_email, email_due,
+                                 _signed64(fingerprint) if fingerprint is not None else None, dup_of,
+                                 content_hash, etag, last_modified, None if dup_of else revisit_sec,
+                                 sorted(keyword_chats))
     except Exception:
-        conn.rollback()
         logging.exception("insert_seen failed")
         return False
+    # yeni de olsa zaten kayıtlı da olsa artık "görülmüş"
+    SEEN_INDEX.add(sk, h)
+    if row:
+        item_id, first_seen = row
+        RECENT_ITEMS.push(site_url, item_id, title, url, first_seen)
+        if fingerprint is not None and NEAR_DUPS.enabled:
+            NEAR_DUPS.add(fingerprint, dup_of or item_id)
+        if dup_of:
+            logging.info("Yakın kopya: %s → #%d'in takma adı", url, dup_of)
+    return row is not None
+
+def warm_seen(conn, site_urls: Iterable[str]) -> int:
+    """Verilen sitelerin bellek içi görüldü kümelerini (gerekiyorsa) tek sorguda yükler."""
+    return SEEN_INDEX.warm(conn, [site_key(u) for u in site_urls], _be("load_digests"))
+
+def seen_known(site_url: str, item_hash: str) -> bool:
+    """
+    True → link bellek içi kümeye göre görülmüş; DB'ye sormaya gerek yok.
+    False → muhtemelen yeni; insert_seen ile doğrulanmalı.
+    """
+    return SEEN_INDEX.known(site_key(site_url), hash64(item_hash))
 
-def get_last_items_for_user(conn, chat_id: int, limit: int = 5, allowed_site_urls: set[str] | None = None):
+def get_last_items_for_user(conn, chat_id: int, limit: int = 5, allowed_site_urls: Set[str] | None = None,
+                            subs: Set[str] | None = None):
     """
     Kullanıcının abone olduğu (user_subs) sitelerden en yeni ilanları döndürür.
     - allowed_site_urls verilirse sadece bu URL'lerle sınırlar.
-    - SQLite ve Postgres (psycopg3) ile çalışır.
+    - subs (kullanıcının abonelikleri) çağıran tarafından zaten okunduysa
+      verilir; o zaman DB'ye hiç gidilmez (tamponlar tazeyse).
+    Site başına bellek tamponları k-yollu birleştirilir (storage/recent.py).
     Dönen: [{site_url, title, url, first_seen}, ...]
     """
-    cur = conn.cursor()
-
     if limit is None or limit <= 0:
         limit = 5
     if limit > 20:
@@ -222,61 +396,34 @@ def get_last_items_for_user(conn, chat_id: int, limit: int = 5, allowed_site_url
     if allowed_site_urls is not None and len(allowed_site_urls) == 0:
         return []
 
-    try:
-        # --- Postgres/psycopg3 yolu (paramstyle %s + ANY(%s)) ---
-        if allowed_site_urls is not None:
-            cur.execute(
-                """
-                SELECT s.site_url, s.title, s.url, s.first_seen
-                FROM seen_item s
-                WHERE s.site_url = ANY(%s)
-                  AND EXISTS (SELECT 1 FROM user_subs u WHERE u.chat_id = %s AND u.site_url = s.site_url)
-                ORDER BY s.first_seen DESC
-                LIMIT %s
-                """,
-                (list(allowed_site_urls), chat_id, limit)
-            )
-        else:
-            cur.execute(
-                """
-                SELECT s.site_url, s.title, s.url, s.first_seen
-                FROM seen_item s
-                JOIN user_subs u
-                  ON u.site_url = s.site_url AND u.chat_id = %s
-                ORDER BY s.first_seen DESC
-                LIMIT %s
-                """,
-                (chat_id, limit)
-            )
-        rows = cur.fetchall()
-    except Exception:
-        # --- SQLite yolu (paramstyle ? + IN (...)) ---
-        if allowed_site_urls is not None:
-            placeholders = ",".join(["?"] * len(allowed_site_urls))
-            q = f"""
-                SELECT s.site_url, s.title, s.url, s.first_seen
-                FROM seen_item s
-                WHERE s.site_url IN ({placeholders})
-                  AND EXISTS (SELECT 1 FROM user_subs u WHERE u.chat_id = ? AND u.site_url = s.site_url)
-                ORDER BY s.first_seen DESC
-                LIMIT ?
-            """
-            params = list(allowed_site_urls) + [chat_id, limit]
-            cur.execute(q, tuple(params))
-        else:
-            q = """
-                SELECT s.site_url, s.title, s.url, s.first_seen
-                FROM seen_item s
-                JOIN user_subs u
-                  ON u.site_url = s.site_url
-                WHERE u.chat_id = ?
-                ORDER BY s.first_seen DESC
-                LIMIT ?
-            """
-            cur.execute(q, (chat_id, limit))
-        rows = cur.fetchall()
-
-    return [
-        {"site_url": r[0], "title": r[1], "url": r[2], "first_seen": r[3]}
-        for r in rows
-    ]
+    if subs is None:
+        subs = get_user_subs(conn, chat_id)
+    site_urls = set(subs) & set(allowed_site_urls) if allowed_site_urls is not None else set(subs)
+    if not site_urls:
+        return []
+
+    RECENT_ITEMS.ensure(conn, site_urls, _be("load_recent"))
+    return RECENT_ITEMS.merged(site_urls, limit)
+
+
+# --- arama ---
+SEARCH_MAX_TERMS = 8
+_SEARCH_TERM_RE = re.compile(r"\w+")
+
+def search_terms(text: str) -> list:
+    """Arama metnini katlanmış kelimelere böler (Türkçe/aksan duyarsız, en fazla SEARCH_MAX_TERMS)."""
+    return _SEARCH_TERM_RE.findall(fold_tr(text))[:SEARCH_MAX_TERMS]
+
+def search_items(conn, text: str, page: int = 0, per_page: int = 5):
+    """
+    Tüm duyuru geçmişinde (sıcak pencere + arşiv) tam metin arama; alaka
+    sırasına göre sayfalı. Tek gidiş-dönüş: sonraki sayfanın varlığı için bir
+    fazla satır istenir. Dönen: ([{site_url, title, url, first_seen}, ...], sonraki_var_mı)
+    """
+    terms = search_terms(text)
+    if not terms:
+        return [], False
+    page = max(0, page)
+    rows = _be("search_items")(conn, terms, per_page + 1, page * per_page)
+    items = [{"site_url": r[0], "title": r[1], "url": r[2], "first_seen": r[3]} for r in rows[:per_page]]
+    return items, len(rows) > per_page
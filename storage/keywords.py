@@ -0,0 +1,187 @@
+# storage/keywords.py  -- anahtar kelime abonelikleri için Aho–Corasick otomatı
+"""
+Kullanıcılar site yerine (veya site içinde) kelime/ifade takip edebilir
+(keyword_subs). Yeni bir öğenin başlık + özeti, tüm kullanıcıların ifadelerine
+tek geçişte Aho–Corasick otomatıyla eşlenir: maliyet metin uzunluğu + eşleşme
+sayısıdır; kullanıcı sayısına bağlı değildir (aynı ifadeyi takip eden binlerce
+kullanıcı otomatta tek bir kalıptır).
+
+Metin ve ifadeler aynı şekilde sadeleştirilir (fold_tr + kelimeler tek boşlukla):
+"Staj  Başvuruları!" → " staj basvurulari". Kalıp başında boşluk olduğundan
+eşleşme kelime başında başlamak zorundadır ("staj" → "stajlar" evet, "mustaj"
+hayır); Türkçe ekler yüzünden kelime sonu serbesttir.
+
+Artımlı güncelleme: aboneliği olan bir ifadeye yeni kullanıcı eklemek/çıkarmak
+yalnızca kalıbın abone haritasını değiştirir. Yeni ifade trie'ye eklenir,
+aboneliği kalmayan ifadenin çıktısı kaldırılır (düğümleri yerinde kalır); her
+iki durumda da hata/çıktı bağlantıları bir sonraki eşlemede tek BFS ile
+(yalnızca trie boyutuyla orantılı) yeniden hesaplanır. Ölü kalıplar canlıları
+geçince trie sıfırdan kurulur.
+
+Index süreç başında DB'den yüklenir, aynı süreçte yapılan abonelik
+değişiklikleriyle güncellenir ve _RELOAD_SEC'te bir yeniden yüklenir (başka
+süreçlerin, ör. webhook Lambda'sının, eklediklerini görmek için).
+"""
+import re, threading, time
+from collections import deque
+from typing import Dict, List, Set
+
+from formatters.textfmt import fold_tr
+
+_RELOAD_SEC = 300
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize_keyword(text: str) -> str:
+    """Eşleme biçimi: katlanmış kelimeler tek boşlukla ("Staj Başvurusu" → "staj basvurusu")."""
+    return " ".join(_WORD_RE.findall(fold_tr(text)))
+
+
+class KeywordIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._reset()
+
+    def _reset(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]     # düğümde biten kalıplar
+        self._link: List[int] = [0]           # hata zincirinde çıktısı olan en yakın düğüm (0 = yok)
+        self._pid: Dict[str, int] = {}        # ifade → kalıp no
+        self._subs: List[Dict[int, Set[str]]] = []  # kalıp no → {chat_id: {site_url, '' = tüm siteler}}
+        self._end: List[int] = []             # kalıp no → bittiği düğüm
+        self._dead = 0
+        self._dirty = False
+
+    @property
+    def patterns(self) -> int:
+        return len(self._pid)
+
+    def ensure(self, conn, load_fn):
+        """
+        Yüklenmemişse veya _RELOAD_SEC dolduysa tüm abonelikleri tek sorguda yükler.
+        load_fn(conn) → [(chat_id, keyword, site_url), ...]
+        """
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._loaded_at < _RELOAD_SEC:
+            return 0
+        rows = load_fn(conn)
+        with self._lock:
+            self._reset()
+            for chat_id, keyword, site_url in rows:
+                self._add_locked(chat_id, keyword, site_url or "")
+            self._loaded_at = now
+        return len(rows)
+
+    def add(self, chat_id: int, keyword: str, site_url: str = ""):
+        with self._lock:
+            if self._loaded_at is None:
+                return  # yüklenmemiş: ensure() DB'den okuyacak
+            self._add_locked(chat_id, keyword, site_url or "")
+
+    def remove(self, chat_id: int, keyword: str, site_url: str = ""):
+        with self._lock:
+            pid = self._pid.get(keyword)
+            if pid is None:
+                return
+            subs = self._subs[pid]
+            sites = subs.get(chat_id)
+            if sites is not None:
+                sites.discard(site_url or "")
+                if not sites:
+                    del subs[chat_id]
+            if subs:
+                return
+            # kalıbın abonesi kalmadı: çıktısını kaldır, düğümler kalır
+            self._out[self._end[pid]].remove(pid)
+            del self._pid[keyword]
+            self._dead += 1
+            self._dirty = True
+            if self._dead > max(64, len(self._pid)):
+                self._rebuild_locked()
+
+    def recipients(self, site_url: str, text: str) -> Set[int]:
+        """Metinde ifadesi geçen ve o siteyi (veya tüm siteleri) kapsayan aboneler."""
+        with self._lock:
+            if not self._pid:
+                return set()
+            if self._dirty:
+                self._link_locked()
+            chats: Set[int] = set()
+            for pid in self._match_locked(" " + normalize_keyword(text)):
+                for chat_id, sites in self._subs[pid].items():
+                    if "" in sites or site_url in sites:
+                        chats.add(chat_id)
+            return chats
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+            self._loaded_at = None
+
+    # --- otomat ---
+    def _add_locked(self, chat_id: int, keyword: str, site_url: str):
+        pid = self._pid.get(keyword)
+        if pid is None:
+            pid = self._insert_locked(keyword)
+        self._subs[pid].setdefault(chat_id, set()).add(site_url)
+
+    def _insert_locked(self, keyword: str) -> int:
+        node = 0
+        for ch in " " + keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({}); self._fail.append(0); self._out.append([]); self._link.append(0)
+            node = nxt
+        pid = len(self._subs)
+        self._subs.append({})
+        self._end.append(node)
+        self._out[node].append(pid)
+        self._pid[keyword] = pid
+        self._dirty = True
+        return pid
+
+    def _link_locked(self):
+        """Hata ve çıktı bağlantıları (BFS; trie boyutuyla orantılı)."""
+        goto, fail, out, link = self._goto, self._fail, self._out, self._link
+        q = deque()
+        for nxt in goto[0].values():
+            fail[nxt] = 0; link[nxt] = 0
+            q.append(nxt)
+        while q:
+            node = q.popleft()
+            for ch, nxt in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                link[nxt] = fail[nxt] if out[fail[nxt]] else link[fail[nxt]]
+                q.append(nxt)
+        self._dirty = False
+
+    def _match_locked(self, text: str) -> Set[int]:
+        goto, fail, out, link = self._goto, self._fail, self._out, self._link
+        found: Set[int] = set()
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            o = node
+            while o:
+                if out[o]:
+                    found.update(out[o])
+                o = link[o]
+        return found
+
+    def _rebuild_locked(self):
+        live = [(kw, self._subs[pid]) for kw, pid in self._pid.items()]
+        self._reset()
+        for kw, subs in live:
+            self._subs[self._insert_locked(kw)].update(subs)
+
+
+KEYWORDS = KeywordIndex()
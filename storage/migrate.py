@@ -0,0 +1,84 @@
+# storage/migrate.py  -- sürümlü şema göçleri
+"""
+Şema, backend modüllerindeki MIGRATIONS listesiyle (sürüm, açıklama, DDL)
+tanımlanır; uygulanan son sürüm schema_version tablosunda tek satırdır.
+
+Sıcak yollarda (her Telegram update'i, her cron tetiklemesi) ensure_schema
+tek bir sürüm sorgusu yapar; veritabanı başına bir kez doğrulandıktan sonra hiç
+sorgu yapmaz. DDL yalnızca sürüm gerideyse çalışır.
+
+Deploy sırasında çevrimdışı çalıştırmak için:
+    python -m storage.migrate           # bekleyen göçleri uygula
+    python -m storage.migrate --status  # sürümü göster
+AUTO_MIGRATE=0 iken eski şemayla açılan süreç göç yapmak yerine hata verir.
+"""
+import logging, sys
+
+from config import AUTO_MIGRATE
+from storage import db as dbmod
+
+# Sürüm uygulandıktan sonra çalışacak Python adımları (SQL ile yapılamayanlar)
+def _post_v2(conn):
+    from storage.retention import backfill_digest
+    backfill_digest(conn)
+
+POST_STEPS = {2: _post_v2}
+
+_schema_ok = set()  # doğrulanmış veritabanları (bkz. _target)
+
+
+def latest_version() -> int:
+    return dbmod.backend().MIGRATIONS[-1][0]
+
+
+def migrate(conn) -> list:
+    """Bekleyen göçleri sırayla uygular; uygulanan sürümleri döndürür."""
+    current = dbmod.get_schema_version(conn)
+    applied = []
+    for version, desc, statements in dbmod.backend().MIGRATIONS:
+        if version <= current:
+            continue
+        if dbmod.apply_migration(conn, version, statements):
+            logging.info("Şema göçü uygulandı: v%d (%s)", version, desc)
+            applied.append(version)
+        post = POST_STEPS.get(version)
+        if post:
+            post(conn)
+    return applied
+
+
+def _target(conn) -> str:
+    """Aynı veritabanına açılan yeni bağlantılar (ör. Lambda yeniden bağlanması) tekrar kontrol edilmez."""
+    return f"{dbmod.backend_name()}:{getattr(conn, 'path', '')}"
+
+
+def ensure_schema(conn, auto: bool = AUTO_MIGRATE):
+    """
+    Şema güncel mi? Veritabanı başına süreçte bir kez tek sorgu; geride ise (auto ise) göç eder.
+    """
+    key = _target(conn)
+    if key in _schema_ok:
+        return
+    current = dbmod.get_schema_version(conn)
+    if current < latest_version():
+        if not auto:
+            raise RuntimeError(
+                f"Veritabanı şeması eski (v{current} < v{latest_version()}). "
+                "Deploy sırasında `python -m storage.migrate` çalıştırın."
+            )
+        migrate(conn)
+    _schema_ok.add(key)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    from config import DB_PATH
+    c = dbmod.connect(DB_PATH)
+    try:
+        if "--status" in sys.argv[1:]:
+            print(f"{dbmod.backend_name()}: v{dbmod.get_schema_version(c)} (son: v{latest_version()})")
+        else:
+            done = migrate(c)
+            print(f"{dbmod.backend_name()}: uygulanan göçler: {done or 'yok'} → v{dbmod.get_schema_version(c)}")
+    finally:
+        c.close()
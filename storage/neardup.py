@@ -0,0 +1,110 @@
+# storage/neardup.py  -- yakın kopya duyurular için SimHash + LSH index'i
+"""
+Aynı duyuru çoğu zaman ana sayfada ve birkaç bölümün /Duyuru sayfasında farklı
+linklerle yayınlanır. Link özeti (text_hash) bunları ayırt edemez; bu modül
+içerik parmak izlerini (formatters.textfmt.simhash64) tutar ve yeni bir öğeye
+Hamming uzaklığı ≤ NEARDUP_MAX_DISTANCE olan son öğeyi bulur.
+
+LSH: 64 bit, d+1 banda bölünür (d = eşik). İki parmak izi en fazla d bitte
+ayrışıyorsa güvercin yuvası ilkesiyle en az bir bandı birebir aynıdır; bu
+yüzden yalnızca band değeri ortak olan adaylar karşılaştırılır (tam tarama yok,
+kaçırma yok). Adaylar gerçek Hamming uzaklığıyla doğrulanır.
+
+Eşleşen öğe, kökün (ilk görülen kopya) takma adı olarak kaydedilir
+(seen_item.dup_of); kök ve takma adlarının outbox'ında zaten bulunan alıcılara
+tekrar bildirim açılmaz (bkz. backend insert_seen).
+
+Index NEARDUP_WINDOW_DAYS penceresindeki parmak izlerinden ısıtılır, aynı
+süreçte eklenenlerle güncellenir ve _RELOAD_SEC'te bir yeniden yüklenir
+(başka süreçlerin eklediklerini görmek ve pencere dışını atmak için).
+Eskimiş index yalnızca bir eşleşmeyi kaçırır (eski davranış: ayrı bildirim).
+"""
+import threading, time
+from typing import Dict, List, Optional, Tuple
+
+from config import NEARDUP_MAX_DISTANCE, NEARDUP_WINDOW_DAYS
+
+_RELOAD_SEC = 3600
+
+
+def _bands(max_distance: int) -> List[Tuple[int, int]]:
+    """64 biti max_distance+1 banda böler: [(kaydırma, maske), ...]"""
+    n = max(1, min(64, max_distance + 1))
+    out, shift = [], 0
+    for i in range(n):
+        width = 64 // n + (1 if i < 64 % n else 0)
+        out.append((shift, (1 << width) - 1))
+        shift += width
+    return out
+
+
+class NearDupIndex:
+    def __init__(self, max_distance: int = NEARDUP_MAX_DISTANCE, window_days: int = NEARDUP_WINDOW_DAYS):
+        self.max_distance = max_distance
+        self.window_sec = window_days * 86400
+        self._bands = _bands(max_distance)
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in self._bands]
+        self._entries: List[Tuple[int, int, float]] = []   # (parmak izi, kök item_id, epoch)
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_distance >= 0
+
+    def ensure(self, conn, load_fn):
+        """
+        Yüklenmemişse veya _RELOAD_SEC dolduysa pencereyi tek sorguda yükler.
+        load_fn(conn, since_epoch) → [(id, simhash, dup_of, epoch), ...] (id sıralı)
+        """
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._loaded_at < _RELOAD_SEC:
+            return 0
+        rows = load_fn(conn, int(time.time() - self.window_sec))
+        with self._lock:
+            self._tables = [{} for _ in self._bands]
+            self._entries = []
+            for item_id, fp, dup_of, ts in rows:
+                self._add_locked(fp & 0xFFFFFFFFFFFFFFFF, dup_of or item_id, float(ts))
+            self._loaded_at = now
+        return len(rows)
+
+    def find(self, fp: int) -> Optional[int]:
+        """En yakın (eşitlikte en eski) eşleşmenin kök item_id'si; yoksa None."""
+        cutoff = time.time() - self.window_sec
+        best = None
+        with self._lock:
+            seen = set()
+            for (shift, mask), table in zip(self._bands, self._tables):
+                for i in table.get((fp >> shift) & mask, ()):
+                    if i in seen:
+                        continue
+                    seen.add(i)
+                    efp, root, ts = self._entries[i]
+                    if ts < cutoff:
+                        continue
+                    d = (efp ^ fp).bit_count()
+                    if d <= self.max_distance and (best is None or (d, root) < best):
+                        best = (d, root)
+        return best[1] if best else None
+
+    def add(self, fp: int, root_id: int):
+        with self._lock:
+            if self._loaded_at is None:
+                return  # yüklenmemiş: ensure() DB'den okuyacak
+            self._add_locked(fp, root_id, time.time())
+
+    def _add_locked(self, fp: int, root_id: int, ts: float):
+        i = len(self._entries)
+        self._entries.append((fp, root_id, ts))
+        for (shift, mask), table in zip(self._bands, self._tables):
+            table.setdefault((fp >> shift) & mask, []).append(i)
+
+    def clear(self):
+        with self._lock:
+            self._tables = [{} for _ in self._bands]
+            self._entries = []
+            self._loaded_at = None
+
+
+NEAR_DUPS = NearDupIndex()
@@ -0,0 +1,926 @@
+# storage/pg.py  -- PostgreSQL (psycopg3) backend'i
+# Doğrudan import etme; storage/db.py cephesi üzerinden kullan.
+import itertools, logging
+from typing import Iterable, List, Set, Optional
+
+import psycopg
+from psycopg.rows import tuple_row
+
+from config import DATABASE_URL
+
+# --- şema göçleri (storage/migrate.py çalıştırır) ---
+# (sürüm, açıklama, [DDL, ...]) — yalnızca sona ekle, mevcutları değiştirme.
+def _fold_sql(col: str) -> str:
+    return f"translate(lower(translate(coalesce({col}, ''), 'İI', 'ii')), 'çğıöşüâîû', 'cgiosuaiu')"
+
+_SEARCH_DOC = (f"setweight(to_tsvector('turkish'::regconfig, {_fold_sql('title')}), 'A') || "
+               f"setweight(to_tsvector('turkish'::regconfig, {_fold_sql('snippet')}), 'B')")
+
+MIGRATIONS = [
+    (1, "temel tablolar", [
+        """
+        CREATE TABLE IF NOT EXISTS users(
+            chat_id    BIGINT PRIMARY KEY,
+            username   TEXT,
+            first_seen TIMESTAMPTZ DEFAULT NOW()
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS user_subs(
+            chat_id  BIGINT NOT NULL REFERENCES users(chat_id) ON DELETE CASCADE,
+            site_url TEXT   NOT NULL,
+            PRIMARY KEY(chat_id, site_url)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS email_subs(
+            chat_id BIGINT NOT NULL REFERENCES users(chat_id) ON DELETE CASCADE,
+            email   TEXT   NOT NULL,
+            PRIMARY KEY(chat_id, email)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS seen_item(
+            id         BIGSERIAL PRIMARY KEY,
+            site_url   TEXT NOT NULL,
+            item_hash  TEXT NOT NULL UNIQUE,
+            title      TEXT,
+            url        TEXT,
+            first_seen TIMESTAMPTZ DEFAULT NOW()
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS bot_state(
+            key   TEXT PRIMARY KEY,
+            value TEXT
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_seen_item_site ON seen_item(site_url);",
+        "CREATE INDEX IF NOT EXISTS ix_user_subs_site ON user_subs(site_url);",
+    ]),
+    (2, "seen_archive + seen_digest (retention)", [
+        """
+        CREATE TABLE IF NOT EXISTS seen_archive(
+            id         BIGINT PRIMARY KEY,
+            site_url   TEXT NOT NULL,
+            item_hash  TEXT NOT NULL,
+            title      TEXT,
+            url        TEXT,
+            first_seen TIMESTAMPTZ
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS seen_digest(
+            h        BIGINT  PRIMARY KEY,
+            site_key INTEGER NOT NULL
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_seen_item_first ON seen_item(first_seen);",
+        "CREATE INDEX IF NOT EXISTS ix_seen_digest_site ON seen_digest(site_key);",
+    ]),
+    (3, "/last için (site_url, first_seen) index'i", [
+        "CREATE INDEX IF NOT EXISTS ix_seen_item_site_first ON seen_item(site_url, first_seen DESC, id DESC);",
+    ]),
+    (4, "notification_outbox + öğe özeti/tarihi", [
+        "ALTER TABLE seen_item    ADD COLUMN IF NOT EXISTS snippet  TEXT;",
+        "ALTER TABLE seen_item    ADD COLUMN IF NOT EXISTS date_str TEXT;",
+        "ALTER TABLE seen_archive ADD COLUMN IF NOT EXISTS snippet  TEXT;",
+        "ALTER TABLE seen_archive ADD COLUMN IF NOT EXISTS date_str TEXT;",
+        """
+        CREATE TABLE IF NOT EXISTS notification_outbox(
+            id           BIGSERIAL   PRIMARY KEY,
+            item_id      BIGINT      NOT NULL,
+            channel      TEXT        NOT NULL,                  -- 'tg' | 'email'
+            recipient    TEXT        NOT NULL,                  -- chat_id veya e-posta
+            status       TEXT        NOT NULL DEFAULT 'pending', -- pending | sent | dead
+            attempts     INTEGER     NOT NULL DEFAULT 0,
+            next_attempt TIMESTAMPTZ NOT NULL DEFAULT NOW(),    -- sahiplenilince kira bitişi
+            last_error   TEXT,
+            created_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            sent_at      TIMESTAMPTZ,
+            UNIQUE(item_id, channel, recipient)
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_outbox_due ON notification_outbox(next_attempt, id) WHERE status = 'pending';",
+        "CREATE INDEX IF NOT EXISTS ix_outbox_created ON notification_outbox(created_at) WHERE status <> 'pending';",
+    ]),
+    (5, "kullanıcı başına Telegram modu (anlık/özet)", [
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS tg_mode TEXT NOT NULL DEFAULT 'instant';",
+        "CREATE INDEX IF NOT EXISTS ix_outbox_held ON notification_outbox(id) WHERE status = 'held';",
+    ]),
+    (6, "update_intake (polling: işlenmemiş update'lerin kalıcı kaydı)", [
+        """
+        CREATE TABLE IF NOT EXISTS update_intake(
+            update_id   BIGINT PRIMARY KEY,
+            chat_id     BIGINT NOT NULL,
+            payload     TEXT   NOT NULL,                     -- update JSON'u
+            received_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        """,
+    ]),
+    (7, "site_index + users.sub_bits (abonelik bit eşlemi)", [
+        """
+        CREATE TABLE IF NOT EXISTS site_index(
+            idx      SMALLINT PRIMARY KEY,                   -- bit numarası; hiç değişmez/yeniden kullanılmaz
+            site_url TEXT     NOT NULL UNIQUE
+        );
+        """,
+        """
+        INSERT INTO site_index(idx, site_url)
+        SELECT ROW_NUMBER() OVER (ORDER BY site_url) - 1, site_url
+        FROM (SELECT DISTINCT site_url FROM user_subs) s
+        ON CONFLICT DO NOTHING;
+        """,
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS sub_bits BIGINT NOT NULL DEFAULT 0;",
+        """
+        UPDATE users SET sub_bits = COALESCE((
+            SELECT bit_or(1::bigint << si.idx)
+            FROM user_subs us JOIN site_index si ON si.site_url = us.site_url
+            WHERE us.chat_id = users.chat_id AND si.idx < 64
+        ), 0);
+        """,
+    ]),
+    (8, "seen_item.simhash + dup_of (yakın kopya takma adları)", [
+        "ALTER TABLE seen_item    ADD COLUMN IF NOT EXISTS simhash BIGINT;",  # 64-bit SimHash (işaretli)
+        "ALTER TABLE seen_item    ADD COLUMN IF NOT EXISTS dup_of  BIGINT;",  # kök öğenin id'si (takma ad ise)
+        "ALTER TABLE seen_archive ADD COLUMN IF NOT EXISTS simhash BIGINT;",
+        "ALTER TABLE seen_archive ADD COLUMN IF NOT EXISTS dup_of  BIGINT;",
+        "CREATE INDEX IF NOT EXISTS ix_seen_item_dup ON seen_item(dup_of) WHERE dup_of IS NOT NULL;",
+    ]),
+    (9, "seen_item içerik özeti + yeniden ziyaret takvimi (düzenleme tespiti)", [
+        "ALTER TABLE seen_item ADD COLUMN IF NOT EXISTS content_hash  TEXT;",   # formatters.textfmt.body_hash
+        "ALTER TABLE seen_item ADD COLUMN IF NOT EXISTS etag          TEXT;",
+        "ALTER TABLE seen_item ADD COLUMN IF NOT EXISTS last_modified TEXT;",
+        "ALTER TABLE seen_item ADD COLUMN IF NOT EXISTS checked_at    TIMESTAMPTZ;",
+        "ALTER TABLE seen_item ADD COLUMN IF NOT EXISTS next_check    TIMESTAMPTZ;",  # NULL = artık bakılmaz
+        "ALTER TABLE seen_item ADD COLUMN IF NOT EXISTS revisits      INT NOT NULL DEFAULT 0;",  # değişmeden geçen kontrol
+        "ALTER TABLE seen_item ADD COLUMN IF NOT EXISTS revision      INT NOT NULL DEFAULT 0;",  # tespit edilen düzenleme
+        "CREATE INDEX IF NOT EXISTS ix_seen_item_next_check ON seen_item(next_check) WHERE next_check IS NOT NULL;",
+    ]),
+    (10, "search_doc (tam metin arama: turkish tsvector + GIN, seen_item ve seen_archive)", [
+        # metin formatters.textfmt.fold_tr ile aynı şekilde katlanır (İ/I → i, ç/ğ/ı/ö/ş/ü → c/g/i/o/s/u);
+        # başlık A, özet B ağırlığında
+        f"ALTER TABLE seen_item    ADD COLUMN IF NOT EXISTS search_doc tsvector GENERATED ALWAYS AS ({_SEARCH_DOC}) STORED;",
+        f"ALTER TABLE seen_archive ADD COLUMN IF NOT EXISTS search_doc tsvector GENERATED ALWAYS AS ({_SEARCH_DOC}) STORED;",
+        "CREATE INDEX IF NOT EXISTS ix_seen_item_search    ON seen_item    USING GIN (search_doc);",
+        "CREATE INDEX IF NOT EXISTS ix_seen_archive_search ON seen_archive USING GIN (search_doc);",
+    ]),
+    (11, "keyword_subs (kelime/ifade abonelikleri; site_url '' = tüm siteler)", [
+        """
+        CREATE TABLE IF NOT EXISTS keyword_subs(
+            id         BIGSERIAL PRIMARY KEY,
+            chat_id    BIGINT NOT NULL REFERENCES users(chat_id) ON DELETE CASCADE,
+            keyword    TEXT   NOT NULL,              -- storage.keywords.normalize_keyword
+            phrase     TEXT   NOT NULL,              -- kullanıcının yazdığı hali (listelemek için)
+            site_url   TEXT   NOT NULL DEFAULT '',
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            UNIQUE(chat_id, keyword, site_url)
+        );
+        """,
+    ]),
+    (12, "ix_outbox_created yalnızca sonuçlanmış satırlar (held özet satırları purge'e girmez)", [
+        "DROP INDEX IF EXISTS ix_outbox_created;",
+        "CREATE INDEX IF NOT EXISTS ix_outbox_created ON notification_outbox(created_at) WHERE status IN ('sent', 'dead');",
+    ]),
+]
+
+# Aynı anda başlayan iki sürecin göçü iki kez uygulamaması için
+_MIGRATE_LOCK_ID = 0x6475_7975  # "duyu"
+_SITE_INDEX_LOCK_ID = _MIGRATE_LOCK_ID + 1
+
+
+# --- INIT ---
+def connect(_db_path_ignored: str = ""):
+    """PostgreSQL'e bağlanır (şemaya dokunmaz; bkz. storage/migrate.py)."""
+    if not DATABASE_URL:
+        # Lambda'da DATABASE_URL şart; lokal geliştirmede env'e koy.
+        raise RuntimeError("DATABASE_URL boş. Neon/Supabase DSN'ini env'e ekleyin.")
+    return psycopg.connect(DATABASE_URL, autocommit=True)
+
+def ping(conn) -> bool:
+    """Bağlantı kullanılabilir mi? (kapalı/bozuk ise sorgu atmadan False)"""
+    if conn.closed or conn.broken:
+        return False
+    try:
+        conn.execute("SELECT 1;")
+        return True
+    except psycopg.Error:
+        return False
+
+def get_schema_version(conn) -> int:
+    """Tek sorgu; schema_version tablosu yoksa 0."""
+    try:
+        with conn.cursor(row_factory=tuple_row) as cur:
+            cur.execute("SELECT version FROM schema_version;")
+            row = cur.fetchone()
+            return int(row[0]) if row else 0
+    except psycopg.errors.UndefinedTable:
+        return 0
+
+def apply_migration(conn, version: int, statements: List[str]) -> bool:
+    """
+    Tek transaction'da (advisory lock altında) göçü uygular ve sürümü yazar.
+    Başka bir süreç bu arada uyguladıysa False döner.
+    """
+    with conn.transaction():
+        with conn.cursor(row_factory=tuple_row) as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (_MIGRATE_LOCK_ID,))
+            cur.execute("CREATE TABLE IF NOT EXISTS schema_version(version INTEGER NOT NULL);")
+            cur.execute("SELECT version FROM schema_version;")
+            row = cur.fetchone()
+            if row and int(row[0]) >= version:
+                return False
+            for sql in statements:
+                cur.execute(sql)
+            if row:
+                cur.execute("UPDATE schema_version SET version=%s;", (version,))
+            else:
+                cur.execute("INSERT INTO schema_version(version) VALUES (%s);", (version,))
+    return True
+
+
+# --- bot state / offsets ---
+def get_update_offset(conn) -> int:
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute("SELECT value FROM bot_state WHERE key=%s;", ("update_offset",))
+        row = cur.fetchone()
+        try:
+            return int(row[0]) if row else 0
+        except:
+            return 0
+
+def set_update_offset(conn, offset: int):
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO bot_state(key,value) VALUES(%s,%s)
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value;
+        """, ("update_offset", str(offset)))
+
+
+def intake_updates(conn, rows: List[tuple], offset: int):
+    """
+    Bir getUpdates partisini [(update_id, chat_id, payload_json), ...] kaydeder
+    ve offset'i aynı transaction'da (tek gidiş-dönüş) ilerletir.
+    """
+    with conn.transaction(), conn.pipeline():
+        with conn.cursor() as cur:
+            cur.executemany(
+                "INSERT INTO update_intake(update_id, chat_id, payload) VALUES (%s,%s,%s) "
+                "ON CONFLICT (update_id) DO NOTHING;", rows)
+            cur.execute("""
+                INSERT INTO bot_state(key,value) VALUES('update_offset',%s)
+                ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value;
+            """, (str(offset),))
+
+def pending_updates(conn, limit: int, after_id: int = 0):
+    """
+    Kaydedilmiş ama işlenmesi bitmemiş update'ler, update_id sırasıyla ve
+    after_id'den sonrakiler: [(update_id, chat_id, payload_json), ...] (sayfalı okuma).
+    """
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute(
+            "SELECT update_id, chat_id, payload FROM update_intake WHERE update_id > %s "
+            "ORDER BY update_id LIMIT %s;", (after_id, limit))
+        return cur.fetchall()
+
+def finish_updates(conn, update_ids: List[int]):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM update_intake WHERE update_id = ANY(%s);", (list(update_ids),))
+
+
+def get_state(conn, key: str) -> Optional[str]:
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute("SELECT value FROM bot_state WHERE key=%s;", (key,))
+        row = cur.fetchone()
+        return row[0] if row else None
+
+def set_state(conn, key: str, value: str):
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO bot_state(key,value) VALUES(%s,%s)
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value;
+        """, (key, value))
+
+def del_state(conn, key: str):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM bot_state WHERE key=%s;", (key,))
+
+
+# --- users & subs ---
+_UPSERT_USER_SQL = """
+    INSERT INTO users(chat_id, username) VALUES (%s, %s)
+    ON CONFLICT (chat_id) DO UPDATE SET
+      username = CASE
+                   WHEN COALESCE(EXCLUDED.username, '') <> '' THEN EXCLUDED.username
+                   ELSE users.username
+                 END;
+"""
+
+def upsert_user(conn, chat_id: int, username: str):
+    """
+    İlk kez gelirse ekler. Varsa ve yeni username boş değilse günceller.
+    """
+    username = (username or "").strip()
+    with conn.cursor() as cur:
+        cur.execute(_UPSERT_USER_SQL, (chat_id, username))
+
+def touch_user(conn, chat_id: int, username: str | None, with_subs: bool) -> Optional[int]:
+    """
+    username None değilse upsert (abonelik bit eşlemini RETURNING ile döndürür),
+    değilse with_subs için tek okuma; her durumda en fazla tek gidiş-dönüş.
+    """
+    with conn.cursor(row_factory=tuple_row) as cur:
+        if username is not None:
+            cur.execute(_UPSERT_USER_SQL.rstrip().rstrip(";") + " RETURNING sub_bits;", (chat_id, username))
+        elif with_subs:
+            cur.execute("SELECT sub_bits FROM users WHERE chat_id=%s;", (chat_id,))
+        else:
+            return None
+        row = cur.fetchone()
+    if not with_subs:
+        return None
+    return row[0] if row else 0
+
+def set_site_sub(conn, chat_id: int, site_url: str, mask: int, on: bool) -> Optional[int]:
+    """
+    Tek ifadede sub_bits'te sitenin bitini on'a göre açar/kapatır ve user_subs'ı (gönderim
+    için site → aboneler index'i) buna göre ekler/siler. Hedef durum açık verildiği için
+    aynı istek tekrar uygulansa da sonuç değişmez. Dönen: yeni sub_bits (kullanıcı yoksa None).
+    """
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute("""
+            WITH u AS (
+                UPDATE users SET sub_bits = (sub_bits | %(set)s::bigint) & %(keep)s::bigint
+                WHERE chat_id = %(c)s
+                RETURNING sub_bits
+            ), del AS (
+                DELETE FROM user_subs WHERE chat_id = %(c)s AND site_url = %(s)s
+                  AND NOT %(on)s AND EXISTS (SELECT 1 FROM u)
+            ), ins AS (
+                INSERT INTO user_subs(chat_id, site_url)
+                SELECT %(c)s, %(s)s FROM u WHERE %(on)s
+                ON CONFLICT DO NOTHING
+            )
+            SELECT sub_bits FROM u;
+        """, {"c": chat_id, "s": site_url, "on": on,
+              "set": mask if on else 0, "keep": -1 if on else ~mask})
+        row = cur.fetchone()
+        return row[0] if row else None
+
+def get_sub_bits(conn, chat_id: int) -> int:
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute("SELECT sub_bits FROM users WHERE chat_id=%s;", (chat_id,))
+        row = cur.fetchone()
+        return row[0] if row else 0
+
+def _bits_mask(idxs: Iterable[int]) -> int:
+    """Bit numaralarının işaretli 64-bit (BIGINT) maskesi (64 ve üstü yok sayılır)."""
+    m = sum(1 << i for i in set(idxs) if i < 64)
+    return m - (1 << 64) if m >= (1 << 63) else m
+
+def sync_site_index(conn, site_urls: List[str], prune: bool = False):
+    """
+    Eksik siteleri boştaki en küçük bit numarasıyla ekler (eşzamanlı süreçler aynı
+    numarayı almasın diye advisory lock altında); tüm eşlemeyi [(idx, site_url)] döndürür.
+    prune: listede olmayan (ve sınır dışı numaralı) sitelerin numaraları bırakılır ve
+    bitleri users.sub_bits'ten silinir (user_subs satırları kalır). Numara alan sitenin biti user_subs'tan kurulur:
+    listeye geri eklenen site abonelerini korur, numarayı devralan yeni site boş başlar.
+    """
+    urls = list(dict.fromkeys(site_urls))
+    with conn.transaction():
+        with conn.cursor(row_factory=tuple_row) as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (_SITE_INDEX_LOCK_ID,))
+            cur.execute("SELECT idx, site_url FROM site_index;")
+            rows = cur.fetchall()
+            keep = set(urls)
+            removed = [idx for idx, u in rows if prune and (u not in keep or idx >= 64)]
+            if removed:
+                m = _bits_mask(removed)
+                cur.execute("DELETE FROM site_index WHERE idx = ANY(%s);", (removed,))
+                cur.execute("UPDATE users SET sub_bits = sub_bits & %s::bigint WHERE sub_bits & %s::bigint <> 0;",
+                            (~m, m))
+            used = {idx for idx, _ in rows} - set(removed)
+            known = {u for idx, u in rows if idx not in removed}
+            free = (i for i in itertools.count() if i not in used)
+            for idx, u in [(next(free), u) for u in urls if u not in known]:
+                cur.execute("INSERT INTO site_index(idx, site_url) VALUES (%s, %s);", (idx, u))
+                m = _bits_mask([idx])
+                if m:
+                    cur.execute("""
+                        UPDATE users SET sub_bits = CASE
+                            WHEN chat_id IN (SELECT chat_id FROM user_subs WHERE site_url = %(u)s)
+                            THEN sub_bits | %(m)s::bigint ELSE sub_bits & %(k)s::bigint END
+                        WHERE sub_bits & %(m)s::bigint <> 0
+                           OR chat_id IN (SELECT chat_id FROM user_subs WHERE site_url = %(u)s);
+                    """, {"u": u, "m": m, "k": ~m})
+            cur.execute("SELECT idx, site_url FROM site_index ORDER BY idx;")
+            return cur.fetchall()
+
+def get_subscribers(conn, site_url: str) -> List[int]:
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute("SELECT chat_id FROM user_subs WHERE site_url=%s;", (site_url,))
+        return [row[0] for row in cur.fetchall()]
+
+
+def get_tg_mode(conn, chat_id: int) -> str:
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute("SELECT tg_mode FROM users WHERE chat_id=%s;", (chat_id,))
+        row = cur.fetchone()
+        return row[0] if row else "instant"
+
+def set_tg_mode(conn, chat_id: int, mode: str):
+    with conn.cursor() as cur:
+        cur.execute("UPDATE users SET tg_mode=%s WHERE chat_id=%s;", (mode, chat_id))
+
+
+# --- email subs ---
+def add_email(conn, chat_id: int, email: str):
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO email_subs(chat_id, email) VALUES(%s,%s)
+            ON CONFLICT DO NOTHING;
+        """, (chat_id, email))
+
+def remove_email(conn, chat_id: int, email: str):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM email_subs WHERE chat_id=%s AND email=%s;", (chat_id, email))
+
+def list_emails(conn, chat_id: int):
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute("SELECT email FROM email_subs WHERE chat_id=%s;", (chat_id,))
+        return [row[0] for row in cur.fetchall()]
+
+def add_keywords(conn, chat_id: int, keyword: str, phrase: str, site_urls: List[str], max_per_user: int):
+    """
+    İfadeyi verilen sitelere ('' = tüm siteler) ekler. Kullanıcının diğer
+    abonelikleriyle birlikte max_per_user aşılacaksa hiçbiri eklenmez (None).
+    Dönen: yeni eklenen site_url'ler.
+    """
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute(
+            """
+            WITH lim AS (
+                SELECT COUNT(*) + cardinality(%s::text[]) <= %s AS ok FROM keyword_subs
+                WHERE chat_id=%s AND NOT (keyword=%s AND site_url = ANY(%s::text[]))
+            ), ins AS (
+                INSERT INTO keyword_subs(chat_id, keyword, phrase, site_url)
+                SELECT %s, %s, %s, u FROM unnest(%s::text[]) u, lim WHERE lim.ok
+                ON CONFLICT DO NOTHING
+                RETURNING site_url
+            )
+            SELECT (SELECT ok FROM lim), (SELECT array_agg(site_url) FROM ins)
+            """,
+            (site_urls, max_per_user, chat_id, keyword, site_urls,
+             chat_id, keyword, phrase, site_urls)
+        )
+        ok, added = cur.fetchone()
+        return list(added or []) if ok else None
+
+def remove_keywords(conn, chat_id: int, keyword: Optional[str] = None, kw_id: Optional[int] = None):
+    """İfadenin (tüm kapsamlarıyla) veya tek bir satırın aboneliğini siler. Dönen: [(keyword, site_url), ...]"""
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute(
+            "DELETE FROM keyword_subs WHERE chat_id=%s AND (keyword=%s OR id=%s) RETURNING keyword, site_url;",
+            (chat_id, keyword, kw_id))
+        return cur.fetchall()
+
+def list_keywords(conn, chat_id: int):
+    """Dönen: [(id, phrase, site_url), ...] (eklenme sırasıyla)"""
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute("SELECT id, phrase, site_url FROM keyword_subs WHERE chat_id=%s ORDER BY id;", (chat_id,))
+        return cur.fetchall()
+
+def load_keywords(conn):
+    """Otomat için tüm abonelikler: [(chat_id, keyword, site_url), ...]"""
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute("SELECT chat_id, keyword, site_url FROM keyword_subs;")
+        return cur.fetchall()
+
+def get_emails_for_chats(conn, chat_ids: Iterable[int]) -> Set[str]:
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute("SELECT email FROM email_subs WHERE chat_id = ANY(%s);", (list(chat_ids),))
+        return {row[0] for row in cur.fetchall() if row[0]}
+
+
+# --- admin seed ---
+def seed_admin(conn, chat_id: int, site_urls: Iterable[str]):
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO users(chat_id, username) VALUES(%s,%s)
+            ON CONFLICT DO NOTHING;
+        """, (chat_id, "admin"))
+        cur.executemany("""
+            INSERT INTO user_subs(chat_id, site_url) VALUES(%s,%s)
+            ON CONFLICT DO NOTHING;
+        """, [(chat_id, u) for u in site_urls])
+        cur.execute("""
+            UPDATE users SET sub_bits = COALESCE((
+                SELECT bit_or(1::bigint << si.idx)
+                FROM user_subs us JOIN site_index si ON si.site_url = us.site_url
+                WHERE us.chat_id = users.chat_id AND si.idx < 64
+            ), 0) WHERE chat_id = %s;
+        """, (chat_id,))
+
+
+# --- seen items ---
+def insert_seen(conn, site_url: str, item_hash: str, h: int, site_key: int, title: str, url: str,
+                snippet: str, date_str: str, extra_emails: List[str], with_email: bool,
+                email_due, simhash: Optional[int] = None, dup_of: Optional[int] = None,
+                content_hash: Optional[str] = None, etag: Optional[str] = None,
+                last_modified: Optional[str] = None, revisit_sec: Optional[int] = None,
+                keyword_chats: List[int] = ()):
+    """
+    Tekilleştirme seen_digest üzerinden tek gidiş-dönüşte yapılır:
+    özet eklenebildiyse öğe yenidir ve seen_item'a da yazılır.
+    (WHERE'de satır üretmeyen INSERT sequence'i tüketmez.)
+    Aynı ifadede (dolayısıyla aynı transaction'da) sitenin abonelerine, ifadesi
+    eşleşen kullanıcılara (keyword_chats) ve e-posta alıcılarına notification_outbox satırları açılır (e-posta satırları
+    email_due verilirse o ana kadar bekler; özet modundaki Telegram kullanıcılarının
+    satırları 'held' olarak açılır ve tur sonunda release_held_outbox ile salınır).
+    dup_of verilirse öğe o kökün takma adıdır: kökün veya diğer takma adlarının
+    outbox'ında aynı kanal ailesinde (tg/tg_digest, email) bulunan alıcılar atlanır.
+    revisit_sec verilirse öğe o kadar saniye sonra düzenleme için yeniden ziyaret edilir.
+    Dönen: yeni ise (id, first_seen), zaten kayıtlıysa None; DB hatası yükseltilir.
+    """
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                WITH d AS (
+                    INSERT INTO seen_digest(h, site_key) VALUES (%s, %s)
+                    ON CONFLICT DO NOTHING
+                    RETURNING h
+                ), s AS (
+                    INSERT INTO seen_item(site_url, item_hash, title, url, snippet, date_str, simhash, dup_of,
+                                          content_hash, etag, last_modified, checked_at, next_check)
+                    SELECT %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(),
+                           NOW() + make_interval(secs => %s::int) FROM d
+                    ON CONFLICT (item_hash) DO NOTHING
+                    RETURNING id, first_seen
+                ), fam AS (
+                    -- aynı duyurunun daha önce kaydedilmiş kopyaları (dup_of NULL ise boş)
+                    SELECT v AS id FROM (VALUES (%s::bigint)) t(v) WHERE v IS NOT NULL
+                    UNION ALL
+                    SELECT id FROM seen_item WHERE dup_of = %s::bigint
+                ), done AS (
+                    SELECT o.channel = 'email' AS is_email, o.recipient
+                    FROM notification_outbox o WHERE o.item_id IN (SELECT id FROM fam)
+                ), subs AS (
+                    SELECT us.chat_id, u.tg_mode
+                    FROM (SELECT chat_id FROM user_subs WHERE site_url = %s
+                          UNION
+                          SELECT unnest(%s::bigint[])) us(chat_id)
+                    JOIN users u ON u.chat_id = us.chat_id
+                ), tg AS (
+                    INSERT INTO notification_outbox(item_id, channel, recipient, status)
+                    SELECT s.id,
+                           CASE WHEN subs.tg_mode = 'digest' THEN 'tg_digest' ELSE 'tg' END,
+                           subs.chat_id::text,
+                           CASE WHEN subs.tg_mode = 'digest' THEN 'held' ELSE 'pending' END
+                    FROM s CROSS JOIN subs
+                    WHERE NOT EXISTS (SELECT 1 FROM done
+                                      WHERE NOT done.is_email AND done.recipient = subs.chat_id::text)
+                    ON CONFLICT DO NOTHING
+                ), em AS (
+                    INSERT INTO notification_outbox(item_id, channel, recipient, next_attempt)
+                    SELECT s.id, 'email', e.email, COALESCE(%s::timestamptz, NOW())
+                    FROM s CROSS JOIN (
+                        SELECT es.email FROM email_subs es JOIN subs USING (chat_id)
+                        UNION
+                        SELECT unnest(%s::text[])
+                    ) e(email)
+                    WHERE %s AND e.email <> ''
+                      AND NOT EXISTS (SELECT 1 FROM done WHERE done.is_email AND done.recipient = e.email)
+                    ON CONFLICT DO NOTHING
+                )
+                SELECT id, first_seen FROM s
+                """,
+                (h, site_key, site_url, item_hash, title, url, snippet, date_str, simhash, dup_of,
+                 content_hash, etag, last_modified, revisit_sec, dup_of, dup_of, site_url, list(keyword_chats),
+                 email_due, list(extra_emails), with_email)
+            )
+            row = cur.fetchone()
+        conn.commit()
+        return tuple(row) if row else None
+    except Exception:
+        conn.rollback()
+        raise
+
+def due_revisits(conn, limit: int):
+    """
+    Yeniden ziyaret zamanı gelmiş en fazla `limit` öğe (en gecikmiş önce).
+    Dönen: [(id, site_url, url, content_hash, etag, last_modified, revisits, first_seen_epoch), ...]
+    """
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute(
+            """
+            SELECT id, site_url, url, content_hash, etag, last_modified, revisits,
+                   EXTRACT(EPOCH FROM first_seen)::bigint
+            FROM seen_item
+            WHERE next_check IS NOT NULL AND next_check <= NOW()
+            ORDER BY next_check
+            LIMIT %s
+            """,
+            (limit,)
+        )
+        return cur.fetchall()
+
+def record_revisit(conn, item_id: int, etag: Optional[str], last_modified: Optional[str],
+                   next_sec: Optional[int], changed: Optional[tuple] = None,
+                   extra_emails: List[str] = (), with_email: bool = False, email_due=None,
+                   baseline_hash: Optional[str] = None) -> int:
+    """
+    Yeniden ziyaret sonucunu tek gidiş-dönüşte kaydeder. next_sec None ise öğeye
+    bir daha bakılmaz. baseline_hash, özeti olmayan öğenin (akıştan, detay
+    çekilmeden kaydedilmiş) ilk özetidir; bildirim açılmaz. changed = (content_hash, title, snippet, date_str) verilirse
+    öğe güncellenir ve öğenin (ve takma adlarının) sitelerinin abonelerine ve
+    ilk bildirimi almış olanlara 'tg_edit' / 'email_edit' satırları açılır; önceki bir düzenleme bildirimi
+    satırı varsa yeniden bekleyene çevrilir. Dönen: açılan/yenilenen satır sayısı.
+    """
+    with conn.cursor() as cur:
+        if changed is None:
+            cur.execute(
+                """
+                UPDATE seen_item SET etag=%s, last_modified=%s, checked_at=NOW(),
+                       next_check=NOW() + make_interval(secs => %s::int), revisits=revisits + 1,
+                       content_hash=COALESCE(%s, content_hash)
+                WHERE id=%s
+                """, (etag, last_modified, next_sec, baseline_hash, item_id))
+            return 0
+        content_hash, title, snippet, date_str = changed
+        cur.execute(
+            """
+            WITH upd AS (
+                UPDATE seen_item SET content_hash=%s, title=COALESCE(NULLIF(%s, ''), title), snippet=%s,
+                       date_str=COALESCE(%s, date_str), etag=%s, last_modified=%s, checked_at=NOW(),
+                       next_check=NOW() + make_interval(secs => %s::int), revisits=0, revision=revision + 1
+                WHERE id=%s
+                RETURNING id
+            ), fam AS (
+                SELECT id, site_url FROM seen_item WHERE id = %s OR dup_of = %s
+            ), subs AS (
+                -- sitelerin aboneleri + ilk bildirimi almış olanlar (ör. anahtar kelime aboneleri)
+                SELECT us.chat_id, u.tg_mode
+                FROM (SELECT chat_id FROM user_subs WHERE site_url IN (SELECT site_url FROM fam)
+                      UNION
+                      SELECT recipient::bigint FROM notification_outbox
+                      WHERE item_id IN (SELECT id FROM fam) AND channel IN ('tg', 'tg_digest')) us(chat_id)
+                JOIN users u ON u.chat_id = us.chat_id
+            ), tg AS (
+                INSERT INTO notification_outbox(item_id, channel, recipient, status)
+                SELECT upd.id, 'tg_edit', subs.chat_id::text,
+                       CASE WHEN subs.tg_mode = 'digest' THEN 'held' ELSE 'pending' END
+                FROM upd CROSS JOIN subs
+                ON CONFLICT (item_id, channel, recipient) DO UPDATE SET
+                    status=excluded.status, attempts=0, next_attempt=NOW(),
+                    last_error=NULL, sent_at=NULL, created_at=NOW()
+                RETURNING 1
+            ), em AS (
+                INSERT INTO notification_outbox(item_id, channel, recipient, next_attempt)
+                SELECT upd.id, 'email_edit', e.email, COALESCE(%s::timestamptz, NOW())
+                FROM upd CROSS JOIN (
+                    SELECT es.email FROM email_subs es JOIN subs USING (chat_id)
+                    UNION
+                    SELECT unnest(%s::text[])
+                ) e(email)
+                WHERE %s AND e.email <> ''
+                ON CONFLICT (item_id, channel, recipient) DO UPDATE SET
+                    status='pending', attempts=0, next_attempt=excluded.next_attempt,
+                    last_error=NULL, sent_at=NULL, created_at=NOW()
+                RETURNING 1
+            )
+            SELECT (SELECT COUNT(*) FROM tg) + (SELECT COUNT(*) FROM em)
+            """,
+            (content_hash, title, snippet, date_str, etag, last_modified, next_sec, item_id,
+             item_id, item_id, email_due, list(extra_emails), with_email)
+        )
+        row = cur.fetchone()
+    return int(row[0]) if row else 0
+
+def load_fingerprints(conn, since_epoch: int):
+    """Pencere içindeki parmak izleri: [(id, simhash, dup_of, epoch), ...] (id sıralı)"""
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute(
+            """
+            SELECT id, simhash, dup_of, EXTRACT(EPOCH FROM first_seen)::bigint FROM seen_item
+            WHERE first_seen >= to_timestamp(%s) AND simhash IS NOT NULL
+            ORDER BY id
+            """,
+            (since_epoch,)
+        )
+        return cur.fetchall()
+
+def load_recent(conn, site_urls: Iterable[str], per_site: int):
+    """
+    Her site için en yeni per_site öğe (ix_seen_item_site_first ile, site başına
+    bir index taraması). Dönen: [(site_url, title, url, first_seen, id), ...]
+    """
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute(
+            """
+            SELECT x.site_url, x.title, x.url, x.first_seen, x.id
+            FROM unnest(%s::text[]) AS su(site_url)
+            CROSS JOIN LATERAL (
+                SELECT s.id, s.site_url, s.title, s.url, s.first_seen
+                FROM seen_item s
+                WHERE s.site_url = su.site_url
+                ORDER BY s.first_seen DESC, s.id DESC
+                LIMIT %s
+            ) x
+            ORDER BY x.site_url, x.first_seen DESC, x.id DESC
+            """,
+            (list(site_urls), per_site)
+        )
+        return cur.fetchall()
+
+
+def search_items(conn, terms: List[str], limit: int, offset: int):
+    """
+    Tam metin arama (search_doc GIN index'leri, ts_rank_cd). terms katlanmış
+    kelimelerdir; hepsi önek olarak aranır (VE). Yakın kopya takma adları
+    atlanır. Dönen: [(site_url, title, url, first_seen), ...]
+    """
+    query = " & ".join(f"{t}:*" for t in terms)
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute(
+            """
+            WITH q AS (SELECT to_tsquery('turkish', %s) AS q)
+            SELECT site_url, title, url, first_seen FROM (
+                SELECT s.id, s.site_url, s.title, s.url, s.first_seen, ts_rank_cd(s.search_doc, q.q) AS r
+                FROM seen_item s, q WHERE s.search_doc @@ q.q AND s.dup_of IS NULL
+                UNION ALL
+                SELECT a.id, a.site_url, a.title, a.url, a.first_seen, ts_rank_cd(a.search_doc, q.q)
+                FROM seen_archive a, q WHERE a.search_doc @@ q.q AND a.dup_of IS NULL
+            ) x
+            ORDER BY r DESC, id DESC
+            LIMIT %s OFFSET %s
+            """,
+            (query, limit, offset)
+        )
+        return cur.fetchall()
+
+
+# --- retention ---
+def iter_seen_hashes(conn, after_id: int, limit: int):
+    """seen_item'ı id sırasıyla sayfalar: [(id, site_url, item_hash), ...]"""
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute(
+            "SELECT id, site_url, item_hash FROM seen_item WHERE id > %s ORDER BY id LIMIT %s;",
+            (after_id, limit)
+        )
+        return cur.fetchall()
+
+def add_digests(conn, rows: Iterable[tuple]):
+    with conn.cursor() as cur:
+        cur.executemany(
+            "INSERT INTO seen_digest(h, site_key) VALUES (%s, %s) ON CONFLICT DO NOTHING;",
+            list(rows)
+        )
+
+def load_digests(conn, site_keys: Iterable[int]):
+    """[(site_key, h), ...] — bellek içi görüldü kümelerini ısıtmak için."""
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute("SELECT site_key, h FROM seen_digest WHERE site_key = ANY(%s);", (list(site_keys),))
+        return cur.fetchall()
+
+def archive_seen_before(conn, cutoff, limit: int) -> int:
+    """
+    first_seen < cutoff olan en fazla `limit` satırı seen_item'dan seen_archive'a taşır.
+    Taşınan satır sayısını döndürür.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            WITH moved AS (
+                DELETE FROM seen_item
+                WHERE id IN (
+                    SELECT id FROM seen_item
+                    WHERE first_seen < %s
+                    ORDER BY first_seen
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, site_url, item_hash, title, url, first_seen, snippet, date_str, simhash, dup_of
+            )
+            INSERT INTO seen_archive(id, site_url, item_hash, title, url, first_seen, snippet, date_str,
+                                     simhash, dup_of)
+            SELECT id, site_url, item_hash, title, url, first_seen, snippet, date_str, simhash, dup_of FROM moved
+            ON CONFLICT (id) DO NOTHING
+            """,
+            (cutoff, limit)
+        )
+        return cur.rowcount or 0
+
+def purge_outbox(conn, cutoff, limit: int) -> int:
+    """cutoff'tan eski, sonuçlanmış (sent/dead) outbox satırlarını siler; pending/held kalır."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            DELETE FROM notification_outbox
+            WHERE id IN (
+                SELECT id FROM notification_outbox
+                WHERE status IN ('sent', 'dead') AND created_at < %s
+                LIMIT %s
+            )
+            """,
+            (cutoff, limit)
+        )
+        return cur.rowcount or 0
+
+
+# --- notification outbox ---
+def claim_outbox(conn, limit: int, lease_sec: int):
+    """
+    Zamanı gelmiş en fazla `limit` bekleyen satırı (aynı vadedekiler alıcıya göre
+    bitişik; özet e-postası bölünmesin) sahiplenir: deneme sayısını
+    artırır ve next_attempt'i kira bitişine öteler (süreç ölürse kira dolunca
+    satır yeniden sahiplenilebilir). SKIP LOCKED ile eşzamanlı işçiler aynı
+    satırı almaz. Dönen: [(id, item_id, channel, recipient, attempts,
+    site_url, title, url, snippet, date_str), ...]  (öğe arşivdeyse oradan)
+    """
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute(
+            """
+            WITH c AS (
+                UPDATE notification_outbox o
+                SET attempts = o.attempts + 1,
+                    next_attempt = NOW() + make_interval(secs => %s)
+                WHERE o.id IN (
+                    SELECT id FROM notification_outbox
+                    WHERE status = 'pending' AND next_attempt <= NOW()
+                    ORDER BY next_attempt, recipient, id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING o.id, o.item_id, o.channel, o.recipient, o.attempts
+            )
+            SELECT c.id, c.item_id, c.channel, c.recipient, c.attempts,
+                   COALESCE(s.site_url, a.site_url), COALESCE(s.title, a.title),
+                   COALESCE(s.url, a.url), COALESCE(s.snippet, a.snippet),
+                   COALESCE(s.date_str, a.date_str)
+            FROM c
+            LEFT JOIN seen_item s    ON s.id = c.item_id
+            LEFT JOIN seen_archive a ON a.id = c.item_id
+            ORDER BY c.item_id, c.id
+            """,
+            (lease_sec, limit)
+        )
+        return cur.fetchall()
+
+def finish_outbox(conn, sent: List[tuple], retries: List[tuple], dead: List[tuple]):
+    """
+    Bir partinin sonuçlarını tek gidiş-dönüşte yazar. Her satır sahiplenmedeki
+    attempts değeriyle (kira belirteci) gelir; kira dolup satırı başka bir
+    boşaltma sahiplendiyse (attempts artmıştır) sonuç yazılmaz.
+    sent: [(id, attempts)], retries: [(id, attempts, gecikme_sn, hata)],
+    dead: [(id, attempts, hata)]
+    """
+    with conn.transaction(), conn.pipeline():
+        with conn.cursor() as cur:
+            if sent:
+                cur.execute(
+                    "UPDATE notification_outbox SET status='sent', sent_at=NOW(), last_error=NULL "
+                    "WHERE status='pending' AND (id, attempts) IN "
+                    "(SELECT * FROM unnest(%s::bigint[], %s::int[]));",
+                    ([i for i, _a in sent], [a for _i, a in sent]))
+            if retries:
+                cur.executemany(
+                    "UPDATE notification_outbox SET next_attempt = NOW() + make_interval(secs => %s), "
+                    "last_error=%s WHERE id=%s AND attempts=%s AND status='pending';",
+                    [(d, e, i, a) for (i, a, d, e) in retries])
+            if dead:
+                cur.executemany(
+                    "UPDATE notification_outbox SET status='dead', last_error=%s "
+                    "WHERE id=%s AND attempts=%s AND status='pending';",
+                    [(e, i, a) for (i, a, e) in dead])
+
+def renew_outbox(conn, claims: List[tuple], lease_sec: int) -> int:
+    """Hâlâ bu boşaltmaya ait satırların [(id, attempts)] kirasını uzatır; uzatılan sayısı."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "UPDATE notification_outbox SET next_attempt = NOW() + make_interval(secs => %s) "
+            "WHERE status='pending' AND (id, attempts) IN "
+            "(SELECT * FROM unnest(%s::bigint[], %s::int[]));",
+            (lease_sec, [i for i, _a in claims], [a for _i, a in claims]))
+        return cur.rowcount or 0
+
+def release_held_outbox(conn) -> int:
+    """Özet modundaki kullanıcılar için bekletilen satırları gönderime açar."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "UPDATE notification_outbox SET status='pending', next_attempt=NOW() WHERE status='held';")
+        return cur.rowcount or 0
+
+def outbox_backlog(conn):
+    """(bekleyen, şu an zamanı gelmiş, en eski bekleyenin yaşı sn)"""
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute(
+            """
+            SELECT COUNT(*),
+                   COUNT(*) FILTER (WHERE next_attempt <= NOW()),
+                   COALESCE(EXTRACT(EPOCH FROM NOW() - MIN(created_at)), 0)
+            FROM notification_outbox WHERE status = 'pending'
+            """
+        )
+        n, due, age = cur.fetchone()
+        return int(n), int(due), float(age)
@@ -0,0 +1,69 @@
+# storage/recent.py  -- site başına son duyurular halka tamponu (/last için)
+"""
+Her site için en yeni RECENT_PER_SITE öğe bellekte, yeniden eskiye sıralı
+tutulur. /last, kullanıcının sitelerinin tamponlarını k-yollu birleştirerek
+(heapq.merge) DB'ye gitmeden cevaplanır.
+
+- Tampon, aynı süreçte insert_seen ile eklenen öğelerle anında güncellenir.
+- Başka bir süreçte (ör. ayrı Lambda'da) eklenen öğeleri kaçırmamak için
+  her sitenin tamponu RECENT_TTL_SEC dolunca DB'den (tek sorguda) tazelenir.
+"""
+import heapq, threading, time
+from collections import deque
+from itertools import islice
+from typing import Dict, Iterable, List
+
+from config import RECENT_PER_SITE, RECENT_TTL_SEC
+
+
+class RecentItems:
+    def __init__(self, per_site: int = RECENT_PER_SITE, ttl_sec: int = RECENT_TTL_SEC):
+        self.per_site = per_site
+        self.ttl_sec = ttl_sec
+        self._bufs: Dict[str, deque] = {}
+        self._loaded_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def ensure(self, conn, site_urls: Iterable[str], load_fn):
+        """
+        Yüklenmemiş veya TTL'i dolmuş siteleri tek sorguda yükler.
+        load_fn(conn, urls, per_site) → [(site_url, title, url, first_seen, id), ...]
+        (site başına yeniden eskiye sıralı)
+        """
+        now = time.monotonic()
+        with self._lock:
+            todo = [u for u in set(site_urls)
+                    if now - self._loaded_at.get(u, -1e18) > self.ttl_sec]
+        if not todo:
+            return 0
+        fresh: Dict[str, deque] = {u: deque(maxlen=self.per_site) for u in todo}
+        for su, title, url, first_seen, item_id in load_fn(conn, todo, self.per_site):
+            fresh[su].append(((first_seen, item_id),
+                              {"site_url": su, "title": title, "url": url, "first_seen": first_seen}))
+        with self._lock:
+            for u, buf in fresh.items():
+                self._bufs[u] = buf
+                self._loaded_at[u] = now
+        return len(todo)
+
+    def push(self, site_url: str, item_id: int, title: str, url: str, first_seen):
+        with self._lock:
+            buf = self._bufs.get(site_url)
+            if buf is None:
+                return  # yüklenmemiş site: ensure() DB'den okuyacak
+            buf.appendleft(((first_seen, item_id),
+                            {"site_url": site_url, "title": title, "url": url, "first_seen": first_seen}))
+
+    def merged(self, site_urls: Iterable[str], limit: int) -> List[dict]:
+        with self._lock:
+            bufs = [list(self._bufs[u]) for u in set(site_urls) if self._bufs.get(u)]
+        merged = heapq.merge(*bufs, key=lambda e: e[0], reverse=True)
+        return [dict(item) for _key, item in islice(merged, limit)]
+
+    def clear(self):
+        with self._lock:
+            self._bufs.clear()
+            self._loaded_at.clear()
+
+
+RECENT_ITEMS = RecentItems()
@@ -0,0 +1,100 @@
+# storage/retention.py  -- seen_item saklama / arşivleme bakım işi
+"""
+seen_item yalnızca "sıcak" pencereyi (SEEN_HOT_DAYS) tutar; daha eski satırlar
+seen_archive'a taşınır. Tekilleştirme seen_digest'teki 64-bit özetlerle
+yapıldığından arşivlenen öğeler tekrar bildirilmez. Böylece dedupe ve /last
+sorguları geçmiş büyüdükçe değil, yalnızca sıcak pencere kadar iş yapar.
+
+Tek sefer çalıştırmak için:  python -m storage.retention
+"""
+import logging, time
+from datetime import datetime, timedelta, timezone
+
+from config import SEEN_HOT_DAYS, RETENTION_INTERVAL_SEC, RETENTION_BATCH, OUTBOX_KEEP_DAYS
+from storage import db as dbmod
+
+BACKFILL_STATE_KEY  = "seen_digest_backfilled"
+LAST_RUN_STATE_KEY  = "retention_last_run"
+
+
+def backfill_digest(conn, batch: int = RETENTION_BATCH) -> int:
+    """
+    seen_digest tablosundan önce kaydedilmiş seen_item satırlarının özetlerini
+    bir kez ekler (sonraki çağrılarda tek bir bot_state okuması yapar).
+    """
+    if dbmod.get_state(conn, BACKFILL_STATE_KEY):
+        return 0
+    last_id, total = 0, 0
+    while True:
+        rows = dbmod.iter_seen_hashes(conn, last_id, batch)
+        if not rows:
+            break
+        dbmod.add_digests(conn, [(dbmod.hash64(h), dbmod.site_key(su)) for (_id, su, h) in rows])
+        last_id = rows[-1][0]
+        total += len(rows)
+    dbmod.set_state(conn, BACKFILL_STATE_KEY, "1")
+    if total:
+        logging.info("seen_digest dolduruldu: %d öğe", total)
+    return total
+
+
+def run_retention(conn, hot_days: int = SEEN_HOT_DAYS, batch: int = RETENTION_BATCH) -> int:
+    """
+    first_seen'i sıcak pencereden eski satırları partiler halinde arşive taşır.
+    Taşınan toplam satır sayısını döndürür. hot_days <= 0 ise taşıma yapmaz.
+    Sonuçlanmış eski outbox satırları da burada temizlenir.
+    """
+    purge_outbox(conn, batch=batch)
+    if hot_days <= 0:
+        return 0
+    cutoff = datetime.now(timezone.utc) - timedelta(days=hot_days)
+    moved = 0
+    while True:
+        n = dbmod.archive_seen_before(conn, cutoff, batch)
+        moved += n
+        if n < batch:
+            break
+    logging.info("Retention: %d satır seen_archive'a taşındı (sıcak pencere: %d gün)", moved, hot_days)
+    return moved
+
+
+def purge_outbox(conn, keep_days: int = OUTBOX_KEEP_DAYS, batch: int = RETENTION_BATCH) -> int:
+    """Gönderilmiş/vazgeçilmiş outbox satırlarını keep_days sonra siler (bekleyen ve held özet satırlarına dokunmaz)."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=keep_days)
+    purged = 0
+    while True:
+        n = dbmod.purge_outbox(conn, cutoff, batch)
+        purged += n
+        if n < batch:
+            break
+    if purged:
+        logging.info("Retention: %d sonuçlanmış outbox satırı silindi", purged)
+    return purged
+
+
+def maybe_run_retention(conn, interval_sec: int = RETENTION_INTERVAL_SEC) -> int:
+    """
+    Tarama turlarının sonunda çağrılır; son çalışmadan bu yana interval_sec
+    geçmediyse yalnızca bir bot_state okuması yapar.
+    """
+    now = int(time.time())
+    try:
+        last = int(dbmod.get_state(conn, LAST_RUN_STATE_KEY) or 0)
+    except ValueError:
+        last = 0
+    if now - last < interval_sec:
+        return 0
+    dbmod.set_state(conn, LAST_RUN_STATE_KEY, str(now))
+    try:
+        return run_retention(conn)
+    except Exception:
+        logging.exception("Retention başarısız")
+        return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    from config import DB_PATH
+    c = dbmod.init_db(DB_PATH)
+    run_retention(c)
+    c.close()
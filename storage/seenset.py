@@ -0,0 +1,116 @@
+# storage/seenset.py  -- site başına bellek içi "görüldü" kümesi
+"""
+Kararlı durumda tarama sırasında görülen linklerin neredeyse tamamı zaten
+bilinir. Her biri için DB'ye gitmek yerine site başına bir üyelik yapısı
+tutulur:
+- küçük siteler (≤ SEEN_SET_EXACT_MAX): tam küme (yanlış pozitif yok)
+- büyük siteler: Bloom filtresi (yanlış pozitif oranı SEEN_BLOOM_FP)
+
+"Bilinmiyor" cevabı kesindir → link DB'de insert_seen ile doğrulanır.
+"Biliniyor" cevabı tam kümede kesin, Bloom'da SEEN_BLOOM_FP olasılıkla
+yanlıştır (o oranda yeni bir ilan atlanabilir; oranı buna göre seçin).
+
+Anahtar olarak seen_digest'teki 64-bit özet (storage.db.hash64) kullanılır;
+kümeler seen_digest'ten ısıtılır ve insert_seen ile güncellenir. Başka bir
+süreç öğe eklediyse küme yalnızca "bilinmiyor" der ve DB doğrular; yani
+eskimiş küme yanlış bildirim üretmez.
+"""
+import math, threading
+from typing import Dict, Iterable
+
+from config import SEEN_SET_EXACT_MAX, SEEN_BLOOM_FP
+
+_MASK32 = 0xFFFFFFFF
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, fp_rate: float):
+        capacity = max(1024, int(capacity))
+        fp_rate = min(max(fp_rate, 1e-12), 0.5)
+        self.capacity = capacity
+        self.m = max(64, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.k = max(1, round(self.m / capacity * math.log(2)))
+        self.bits = bytearray((self.m + 7) // 8)
+        self.count = 0
+
+    def _positions(self, h: int):
+        # h zaten sha256'dan gelen düzgün dağılımlı 64 bit → çift hash (Kirsch–Mitzenmacher)
+        h1 = h & _MASK32
+        h2 = ((h >> 32) & _MASK32) | 1
+        m = self.m
+        for i in range(self.k):
+            yield (h1 + i * h2) % m
+
+    def add(self, h: int):
+        for p in self._positions(h):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, h: int) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(h))
+
+    @property
+    def overfull(self) -> bool:
+        return self.count > self.capacity
+
+
+class _ExactSet(set):
+    overfull = False
+
+
+def _make(hashes: list):
+    n = len(hashes)
+    if n <= SEEN_SET_EXACT_MAX:
+        return _ExactSet(hashes)
+    bf = BloomFilter(capacity=n * 2, fp_rate=SEEN_BLOOM_FP)
+    for h in hashes:
+        bf.add(h)
+    return bf
+
+
+class SeenIndex:
+    """site_key → üyelik yapısı. Bot ve tarama thread'leri arasında paylaşılır."""
+
+    def __init__(self):
+        self._sets: Dict[int, object] = {}
+        self._lock = threading.Lock()
+
+    def warm(self, conn, site_keys: Iterable[int], load_fn):
+        """
+        Henüz yüklenmemiş (veya Bloom kapasitesi dolmuş) siteleri tek sorguda yükler.
+        load_fn(conn, keys) → [(site_key, h), ...]
+        """
+        with self._lock:
+            todo = [k for k in set(site_keys)
+                    if k not in self._sets or getattr(self._sets[k], "overfull", False)]
+        if not todo:
+            return 0
+        loaded: Dict[int, list] = {k: [] for k in todo}
+        for k, h in load_fn(conn, todo):
+            loaded[k].append(h)
+        with self._lock:
+            for k, hashes in loaded.items():
+                self._sets[k] = _make(hashes)
+        return len(todo)
+
+    def known(self, site_key: int, h: int) -> bool:
+        s = self._sets.get(site_key)
+        return s is not None and h in s
+
+    def add(self, site_key: int, h: int):
+        with self._lock:
+            s = self._sets.get(site_key)
+            if s is None:
+                return  # yüklenmemiş site: warm() zaten DB'den okuyacak
+            if isinstance(s, _ExactSet) and len(s) >= SEEN_SET_EXACT_MAX:
+                s = _make(list(s))
+                self._sets[site_key] = s
+            s.add(h)
+
+    def clear(self):
+        with self._lock:
+            self._sets.clear()
+
+
+SEEN_INDEX = SeenIndex()
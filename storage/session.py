@@ -0,0 +1,47 @@
+# storage/session.py  -- sohbet (chat_id) başına küçük oturum önbelleği
+"""
+Telegram güncellemelerinde her mesajda tekrar eden okumaları/yazmaları
+atlamak için kullanılır:
+- username: en son yazılan kullanıcı adı (değişmediyse upsert_user atlanır)
+- subs: kullanıcının abonelikleri (menüler/­/last DB'ye gitmeden çizilir)
+
+Girdiler SESSION_TTL_SEC sonra eskir; böylece aynı sohbete başka bir süreçte
+(ör. başka bir Lambda container'ında) yapılan değişiklikler en geç bu kadar
+sürede görünür. En fazla SESSION_MAX_CHATS sohbet tutulur (LRU).
+"""
+import threading, time
+from collections import OrderedDict
+
+from config import SESSION_TTL_SEC, SESSION_MAX_CHATS
+
+
+class ChatSessions:
+    def __init__(self, ttl_sec: int = SESSION_TTL_SEC, max_chats: int = SESSION_MAX_CHATS):
+        self.ttl_sec = ttl_sec
+        self.max_chats = max_chats
+        self._d: "OrderedDict[int, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chat_id: int) -> dict:
+        """Sohbetin oturum sözlüğü; yoksa veya eskidiyse boş bir tane açılır."""
+        now = time.monotonic()
+        with self._lock:
+            sess = self._d.get(chat_id)
+            if sess is None or now - sess["_at"] > self.ttl_sec:
+                sess = {"_at": now}
+                self._d[chat_id] = sess
+            self._d.move_to_end(chat_id)
+            while len(self._d) > self.max_chats:
+                self._d.popitem(last=False)
+            return sess
+
+    def drop(self, chat_id: int):
+        with self._lock:
+            self._d.pop(chat_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._d.clear()
+
+
+SESSIONS = ChatSessions()
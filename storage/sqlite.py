@@ -0,0 +1,984 @@
+# storage/sqlite.py  -- SQLite backend'i (lokal / EC2 / Docker)
+# Doğrudan import etme; storage/db.py cephesi üzerinden kullan.
+import itertools, json, logging, queue, sqlite3, threading
+from concurrent.futures import Future
+from typing import Iterable, List, Set, Optional
+
+from formatters.textfmt import fold_tr
+
+# Yazıcı thread'in tek bir transaction'da toplayacağı en fazla iş sayısı
+WRITE_BATCH_MAX = 64
+
+
+class SqliteDB:
+    """
+    SQLite bağlantı sarmalayıcısı. backend fonksiyonlarına `conn` olarak geçer.
+
+    - WAL journal + synchronous=NORMAL: okuyucular yazıcıyı beklemez,
+      her commit'te fsync yapılmaz (checkpoint'te yapılır).
+    - Okumalar thread başına ayrı bağlantıdan yapılır (bot + tarama thread'leri).
+    - Tüm yazmalar tek bir yazıcı thread'e kuyrukla gider; bu sayede
+      SQLITE_BUSY beklemeleri olmaz ve art arda gelen yazmalar tek
+      transaction'da (group commit) toplanır.
+    - sqlite3 modülü SQL metni başına hazırlanmış statement'ı önbellekler
+      (cached_statements); sorgular sabit metin + parametre olarak yazılır.
+    """
+
+    def __init__(self, path: str):
+        self.path = path or "monitor.db"
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._q: "queue.Queue" = queue.Queue()
+        self.closed = False
+        self._wconn = self._connect()
+        self._writer = threading.Thread(target=self._write_loop, name="sqlite-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        c = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                            check_same_thread=False, cached_statements=256)
+        c.execute("PRAGMA journal_mode=WAL;")
+        c.execute("PRAGMA synchronous=NORMAL;")
+        c.execute("PRAGMA foreign_keys=ON;")
+        c.execute("PRAGMA busy_timeout=5000;")
+        c.execute("PRAGMA temp_store=MEMORY;")
+        # arama index'i (search_fts) tetikleyicileri metni Python'daki gibi katlar
+        c.create_function("fold_tr", 1, fold_tr, deterministic=True)
+        return c
+
+    # --- okuma ---
+    def read(self) -> sqlite3.Connection:
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            c = self._connect()
+            self._local.conn = c
+            with self._readers_lock:
+                self._readers.append(c)
+        return c
+
+    # --- yazma ---
+    def write(self, fn):
+        """
+        fn(conn) yazıcı thread'de, kendi SAVEPOINT'i içinde çalışır.
+        Commit edildikten sonra fn'in dönüşünü döndürür (hata varsa yükseltir).
+        """
+        if threading.current_thread() is self._writer:
+            return fn(self._wconn)
+        fut: Future = Future()
+        self._q.put((fn, fut))
+        return fut.result()
+
+    def _write_loop(self):
+        c = self._wconn
+        while True:
+            job = self._q.get()
+            if job is None:
+                break
+            jobs = [job]
+            while len(jobs) < WRITE_BATCH_MAX:
+                try:
+                    nxt = self._q.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._q.put(None)
+                    break
+                jobs.append(nxt)
+
+            done = []
+            try:
+                c.execute("BEGIN IMMEDIATE;")
+                for fn, fut in jobs:
+                    c.execute("SAVEPOINT job;")
+                    try:
+                        res = fn(c)
+                        c.execute("RELEASE job;")
+                        done.append((fut, res, None))
+                    except BaseException as e:
+                        c.execute("ROLLBACK TO job;")
+                        c.execute("RELEASE job;")
+                        done.append((fut, None, e))
+                c.execute("COMMIT;")
+            except BaseException as e:
+                logging.exception("sqlite writer batch failed")
+                try:
+                    c.execute("ROLLBACK;")
+                except Exception:
+                    pass
+                done = [(fut, None, e) for _fn, fut in jobs]
+
+            for fut, res, err in done:
+                if err is not None:
+                    fut.set_exception(err)
+                else:
+                    fut.set_result(res)
+
+    # psycopg bağlantısıyla aynı yüzey (eski çağıranlar için)
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._q.put(None)
+        self._writer.join(timeout=10)
+        with self._readers_lock:
+            for c in self._readers:
+                try: c.close()
+                except Exception: pass
+            self._readers.clear()
+        try:
+            self._wconn.close()
+        except Exception:
+            pass
+
+
+# --- şema göçleri (storage/migrate.py çalıştırır) ---
+# (sürüm, açıklama, [DDL, ...]) — yalnızca sona ekle, mevcutları değiştirme.
+MIGRATIONS = [
+    (1, "temel tablolar", [
+        """
+        CREATE TABLE IF NOT EXISTS users(
+            chat_id    INTEGER PRIMARY KEY,
+            username   TEXT,
+            first_seen TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS user_subs(
+            chat_id  INTEGER NOT NULL REFERENCES users(chat_id) ON DELETE CASCADE,
+            site_url TEXT    NOT NULL,
+            PRIMARY KEY(chat_id, site_url)
+        ) WITHOUT ROWID;
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS email_subs(
+            chat_id INTEGER NOT NULL REFERENCES users(chat_id) ON DELETE CASCADE,
+            email   TEXT    NOT NULL,
+            PRIMARY KEY(chat_id, email)
+        ) WITHOUT ROWID;
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS seen_item(
+            id         INTEGER PRIMARY KEY,
+            site_url   TEXT NOT NULL,
+            item_hash  TEXT NOT NULL UNIQUE,
+            title      TEXT,
+            url        TEXT,
+            first_seen TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS bot_state(
+            key   TEXT PRIMARY KEY,
+            value TEXT
+        ) WITHOUT ROWID;
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_seen_item_site ON seen_item(site_url);",
+        "CREATE INDEX IF NOT EXISTS ix_user_subs_site ON user_subs(site_url);",
+    ]),
+    (2, "seen_archive + seen_digest (retention)", [
+        """
+        CREATE TABLE IF NOT EXISTS seen_archive(
+            id         INTEGER PRIMARY KEY,
+            site_url   TEXT NOT NULL,
+            item_hash  TEXT NOT NULL,
+            title      TEXT,
+            url        TEXT,
+            first_seen TEXT
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS seen_digest(
+            h        INTEGER PRIMARY KEY,
+            site_key INTEGER NOT NULL
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_seen_item_first ON seen_item(first_seen);",
+        "CREATE INDEX IF NOT EXISTS ix_seen_digest_site ON seen_digest(site_key);",
+    ]),
+    (3, "/last için (site_url, first_seen) index'i", [
+        "CREATE INDEX IF NOT EXISTS ix_seen_item_site_first ON seen_item(site_url, first_seen DESC, id DESC);",
+    ]),
+    (4, "notification_outbox + öğe özeti/tarihi", [
+        "ALTER TABLE seen_item    ADD COLUMN snippet  TEXT;",
+        "ALTER TABLE seen_item    ADD COLUMN date_str TEXT;",
+        "ALTER TABLE seen_archive ADD COLUMN snippet  TEXT;",
+        "ALTER TABLE seen_archive ADD COLUMN date_str TEXT;",
+        """
+        CREATE TABLE IF NOT EXISTS notification_outbox(
+            id           INTEGER PRIMARY KEY,
+            item_id      INTEGER NOT NULL,
+            channel      TEXT    NOT NULL,                   -- 'tg' | 'email'
+            recipient    TEXT    NOT NULL,                   -- chat_id veya e-posta
+            status       TEXT    NOT NULL DEFAULT 'pending', -- pending | sent | dead
+            attempts     INTEGER NOT NULL DEFAULT 0,
+            next_attempt TEXT    NOT NULL DEFAULT CURRENT_TIMESTAMP,  -- sahiplenilince kira bitişi
+            last_error   TEXT,
+            created_at   TEXT    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            sent_at      TEXT,
+            UNIQUE(item_id, channel, recipient)
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_outbox_due ON notification_outbox(next_attempt, id) WHERE status = 'pending';",
+        "CREATE INDEX IF NOT EXISTS ix_outbox_created ON notification_outbox(created_at) WHERE status <> 'pending';",
+    ]),
+    (5, "kullanıcı başına Telegram modu (anlık/özet)", [
+        "ALTER TABLE users ADD COLUMN tg_mode TEXT NOT NULL DEFAULT 'instant';",
+        "CREATE INDEX IF NOT EXISTS ix_outbox_held ON notification_outbox(id) WHERE status = 'held';",
+    ]),
+    (6, "update_intake (polling: işlenmemiş update'lerin kalıcı kaydı)", [
+        """
+        CREATE TABLE IF NOT EXISTS update_intake(
+            update_id   INTEGER PRIMARY KEY,
+            chat_id     INTEGER NOT NULL,
+            payload     TEXT    NOT NULL,                    -- update JSON'u
+            received_at TEXT    NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+    ]),
+    (7, "site_index + users.sub_bits (abonelik bit eşlemi)", [
+        """
+        CREATE TABLE IF NOT EXISTS site_index(
+            idx      INTEGER PRIMARY KEY,                    -- bit numarası; hiç değişmez/yeniden kullanılmaz
+            site_url TEXT    NOT NULL UNIQUE
+        );
+        """,
+        """
+        INSERT OR IGNORE INTO site_index(idx, site_url)
+        SELECT ROW_NUMBER() OVER (ORDER BY site_url) - 1, site_url
+        FROM (SELECT DISTINCT site_url FROM user_subs);
+        """,
+        "ALTER TABLE users ADD COLUMN sub_bits INTEGER NOT NULL DEFAULT 0;",
+        """
+        UPDATE users SET sub_bits = (
+            SELECT COALESCE(SUM(1 << si.idx), 0)
+            FROM user_subs us JOIN site_index si ON si.site_url = us.site_url
+            WHERE us.chat_id = users.chat_id AND si.idx < 64
+        );
+        """,
+    ]),
+    (8, "seen_item.simhash + dup_of (yakın kopya takma adları)", [
+        "ALTER TABLE seen_item    ADD COLUMN simhash INTEGER;",   # 64-bit SimHash (işaretli)
+        "ALTER TABLE seen_item    ADD COLUMN dup_of  INTEGER;",   # kök öğenin id'si (takma ad ise)
+        "ALTER TABLE seen_archive ADD COLUMN simhash INTEGER;",
+        "ALTER TABLE seen_archive ADD COLUMN dup_of  INTEGER;",
+        "CREATE INDEX IF NOT EXISTS ix_seen_item_dup ON seen_item(dup_of) WHERE dup_of IS NOT NULL;",
+    ]),
+    (9, "seen_item içerik özeti + yeniden ziyaret takvimi (düzenleme tespiti)", [
+        "ALTER TABLE seen_item ADD COLUMN content_hash  TEXT;",   # formatters.textfmt.body_hash
+        "ALTER TABLE seen_item ADD COLUMN etag          TEXT;",
+        "ALTER TABLE seen_item ADD COLUMN last_modified TEXT;",
+        "ALTER TABLE seen_item ADD COLUMN checked_at    TEXT;",
+        "ALTER TABLE seen_item ADD COLUMN next_check    TEXT;",   # NULL = artık bakılmaz
+        "ALTER TABLE seen_item ADD COLUMN revisits      INTEGER NOT NULL DEFAULT 0;",  # değişmeden geçen kontrol
+        "ALTER TABLE seen_item ADD COLUMN revision      INTEGER NOT NULL DEFAULT 0;",  # tespit edilen düzenleme
+        "CREATE INDEX IF NOT EXISTS ix_seen_item_next_check ON seen_item(next_check) WHERE next_check IS NOT NULL;",
+    ]),
+    (10, "search_fts (FTS5 tam metin arama; rowid = seen_item.id, arşive taşınınca da kalır)", [
+        # metin fold_tr ile katlanmış tutulur (ı/İ dahil); kalan aksanları tokenizer atar
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(title, body, tokenize = 'unicode61 remove_diacritics 2');",
+        """
+        INSERT OR REPLACE INTO search_fts(rowid, title, body)
+        SELECT id, fold_tr(title), fold_tr(snippet) FROM seen_archive WHERE dup_of IS NULL;
+        """,
+        """
+        INSERT OR REPLACE INTO search_fts(rowid, title, body)
+        SELECT id, fold_tr(title), fold_tr(snippet) FROM seen_item WHERE dup_of IS NULL;
+        """,
+        # yakın kopya takma adları index'e girmez (aynı duyuru sonuçlarda bir kez)
+        """
+        CREATE TRIGGER IF NOT EXISTS tr_seen_item_fts_ins AFTER INSERT ON seen_item
+        WHEN new.dup_of IS NULL BEGIN
+            INSERT OR REPLACE INTO search_fts(rowid, title, body)
+            VALUES (new.id, fold_tr(new.title), fold_tr(new.snippet));
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tr_seen_item_fts_upd AFTER UPDATE OF title, snippet ON seen_item
+        WHEN new.dup_of IS NULL BEGIN
+            INSERT OR REPLACE INTO search_fts(rowid, title, body)
+            VALUES (new.id, fold_tr(new.title), fold_tr(new.snippet));
+        END;
+        """,
+    ]),
+    (11, "keyword_subs (kelime/ifade abonelikleri; site_url '' = tüm siteler)", [
+        """
+        CREATE TABLE IF NOT EXISTS keyword_subs(
+            id         INTEGER PRIMARY KEY,
+            chat_id    INTEGER NOT NULL REFERENCES users(chat_id) ON DELETE CASCADE,
+            keyword    TEXT    NOT NULL,             -- storage.keywords.normalize_keyword
+            phrase     TEXT    NOT NULL,             -- kullanıcının yazdığı hali (listelemek için)
+            site_url   TEXT    NOT NULL DEFAULT '',
+            created_at TEXT    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(chat_id, keyword, site_url)
+        );
+        """,
+    ]),
+    (12, "ix_outbox_created yalnızca sonuçlanmış satırlar (held özet satırları purge'e girmez)", [
+        "DROP INDEX IF EXISTS ix_outbox_created;",
+        "CREATE INDEX IF NOT EXISTS ix_outbox_created ON notification_outbox(created_at) WHERE status IN ('sent', 'dead');",
+    ]),
+]
+
+
+# --- INIT ---
+def connect(db_path: str = "monitor.db"):
+    """SQLite dosyasını açar (WAL); şemaya dokunmaz (bkz. storage/migrate.py)."""
+    return SqliteDB(db_path)
+
+def ping(conn) -> bool:
+    """Yerel dosya: kapatılmadıysa ve yazıcı thread yaşıyorsa kullanılabilir."""
+    return not conn.closed and conn._writer.is_alive()
+
+def get_schema_version(conn) -> int:
+    """Tek sorgu; schema_version tablosu yoksa 0."""
+    try:
+        row = conn.read().execute("SELECT version FROM schema_version;").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return int(row[0]) if row else 0
+
+def apply_migration(conn, version: int, statements: List[str]) -> bool:
+    """
+    Göçü ve sürüm güncellemesini tek yazma işinde (atomik) uygular.
+    Sürüm zaten bu kadar veya ileriyse False döner.
+    """
+    def _apply(c):
+        c.execute("CREATE TABLE IF NOT EXISTS schema_version(version INTEGER NOT NULL);")
+        row = c.execute("SELECT version FROM schema_version;").fetchone()
+        if row and int(row[0]) >= version:
+            return False
+        for sql in statements:
+            c.execute(sql)
+        if row:
+            c.execute("UPDATE schema_version SET version=?;", (version,))
+        else:
+            c.execute("INSERT INTO schema_version(version) VALUES (?);", (version,))
+        return True
+    return conn.write(_apply)
+
+
+# --- bot state / offsets ---
+def get_update_offset(conn) -> int:
+    v = get_state(conn, "update_offset")
+    try:
+        return int(v) if v else 0
+    except ValueError:
+        return 0
+
+def set_update_offset(conn, offset: int):
+    set_state(conn, "update_offset", str(offset))
+
+
+def intake_updates(conn, rows: List[tuple], offset: int):
+    """
+    Bir getUpdates partisini [(update_id, chat_id, payload_json), ...] kaydeder
+    ve offset'i aynı transaction'da ilerletir: ya ikisi birden kalıcı olur ya hiçbiri.
+    """
+    def _intake(c):
+        c.executemany(
+            "INSERT INTO update_intake(update_id, chat_id, payload) VALUES (?,?,?) "
+            "ON CONFLICT (update_id) DO NOTHING;", rows)
+        c.execute("""
+            INSERT INTO bot_state(key,value) VALUES('update_offset',?)
+            ON CONFLICT (key) DO UPDATE SET value = excluded.value;
+        """, (str(offset),))
+    conn.write(_intake)
+
+def pending_updates(conn, limit: int, after_id: int = 0):
+    """
+    Kaydedilmiş ama işlenmesi bitmemiş update'ler, update_id sırasıyla ve
+    after_id'den sonrakiler: [(update_id, chat_id, payload_json), ...] (sayfalı okuma).
+    """
+    return conn.read().execute(
+        "SELECT update_id, chat_id, payload FROM update_intake WHERE update_id > ? "
+        "ORDER BY update_id LIMIT ?;", (after_id, limit)
+    ).fetchall()
+
+def finish_updates(conn, update_ids: List[int]):
+    conn.write(lambda c: c.execute(
+        "DELETE FROM update_intake WHERE update_id IN (SELECT value FROM json_each(?));",
+        (_json_list(update_ids),)))
+
+
+def get_state(conn, key: str) -> Optional[str]:
+    row = conn.read().execute("SELECT value FROM bot_state WHERE key=?;", (key,)).fetchone()
+    return row[0] if row else None
+
+def set_state(conn, key: str, value: str):
+    conn.write(lambda c: c.execute("""
+        INSERT INTO bot_state(key,value) VALUES(?,?)
+        ON CONFLICT (key) DO UPDATE SET value = excluded.value;
+    """, (key, value)))
+
+def del_state(conn, key: str):
+    conn.write(lambda c: c.execute("DELETE FROM bot_state WHERE key=?;", (key,)))
+
+
+# --- users & subs ---
+_UPSERT_USER_SQL = """
+    INSERT INTO users(chat_id, username) VALUES (?, ?)
+    ON CONFLICT (chat_id) DO UPDATE SET
+      username = CASE
+                   WHEN COALESCE(excluded.username, '') <> '' THEN excluded.username
+                   ELSE users.username
+                 END;
+"""
+
+def upsert_user(conn, chat_id: int, username: str):
+    """
+    İlk kez gelirse ekler. Varsa ve yeni username boş değilse günceller.
+    """
+    username = (username or "").strip()
+    conn.write(lambda c: c.execute(_UPSERT_USER_SQL, (chat_id, username)))
+
+def touch_user(conn, chat_id: int, username: str | None, with_subs: bool) -> Optional[int]:
+    """username None değilse upsert_user, with_subs ise abonelik bit eşlemini de döndürür."""
+    if username is not None:
+        conn.write(lambda c: c.execute(_UPSERT_USER_SQL, (chat_id, username)))
+    return get_sub_bits(conn, chat_id) if with_subs else None
+
+def set_site_sub(conn, chat_id: int, site_url: str, mask: int, on: bool) -> Optional[int]:
+    """
+    sub_bits'te sitenin bitini on'a göre açar/kapatır, user_subs'ı (gönderim için site →
+    aboneler index'i) buna göre ekler/siler; tekrar uygulanması sonucu değiştirmez.
+    Dönen: yeni sub_bits (kullanıcı yoksa None).
+    """
+    def _set(c):
+        row = c.execute(
+            "UPDATE users SET sub_bits = (sub_bits | ?) & ? WHERE chat_id=? RETURNING sub_bits;",
+            (mask if on else 0, -1 if on else ~mask, chat_id)).fetchone()
+        if row is None:
+            return None
+        if on:
+            c.execute("INSERT OR IGNORE INTO user_subs(chat_id, site_url) VALUES(?,?);", (chat_id, site_url))
+        else:
+            c.execute("DELETE FROM user_subs WHERE chat_id=? AND site_url=?;", (chat_id, site_url))
+        return row[0]
+    return conn.write(_set)
+
+def get_sub_bits(conn, chat_id: int) -> int:
+    row = conn.read().execute("SELECT sub_bits FROM users WHERE chat_id=?;", (chat_id,)).fetchone()
+    return row[0] if row else 0
+
+def _bits_mask(idxs: Iterable[int]) -> int:
+    """Bit numaralarının işaretli 64-bit maskesi (64 ve üstü yok sayılır)."""
+    m = sum(1 << i for i in set(idxs) if i < 64)
+    return m - (1 << 64) if m >= (1 << 63) else m
+
+def sync_site_index(conn, site_urls: List[str], prune: bool = False):
+    """
+    Eksik siteleri boştaki en küçük bit numarasıyla ekler; tüm eşlemeyi [(idx, site_url)] döndürür.
+    prune: listede olmayan (ve sınır dışı numaralı) sitelerin numaraları bırakılır ve
+    bitleri users.sub_bits'ten silinir (user_subs satırları kalır). Numara alan sitenin biti user_subs'tan kurulur:
+    listeye geri eklenen site abonelerini korur, numarayı devralan yeni site boş başlar.
+    """
+    urls = list(dict.fromkeys(site_urls))
+    def _sync(c):
+        rows = c.execute("SELECT idx, site_url FROM site_index;").fetchall()
+        keep = set(urls)
+        removed = [idx for idx, u in rows if prune and (u not in keep or idx >= 64)]
+        if removed:
+            m = _bits_mask(removed)
+            c.execute("DELETE FROM site_index WHERE idx IN (SELECT value FROM json_each(?));",
+                      (_json_list(removed),))
+            c.execute("UPDATE users SET sub_bits = sub_bits & ? WHERE sub_bits & ? <> 0;", (~m, m))
+        used = {idx for idx, _ in rows} - set(removed)
+        known = {u for idx, u in rows if idx not in removed}
+        free = (i for i in itertools.count() if i not in used)
+        for idx, u in [(next(free), u) for u in urls if u not in known]:
+            c.execute("INSERT INTO site_index(idx, site_url) VALUES (?, ?);", (idx, u))
+            m = _bits_mask([idx])
+            if m:
+                c.execute("""
+                    UPDATE users SET sub_bits = CASE
+                        WHEN chat_id IN (SELECT chat_id FROM user_subs WHERE site_url = ?)
+                        THEN sub_bits | ? ELSE sub_bits & ? END
+                    WHERE sub_bits & ? <> 0
+                       OR chat_id IN (SELECT chat_id FROM user_subs WHERE site_url = ?);
+                """, (u, m, ~m, m, u))
+        return c.execute("SELECT idx, site_url FROM site_index ORDER BY idx;").fetchall()
+    return conn.write(_sync)
+
+def get_subscribers(conn, site_url: str) -> List[int]:
+    rows = conn.read().execute("SELECT chat_id FROM user_subs WHERE site_url=?;", (site_url,)).fetchall()
+    return [row[0] for row in rows]
+
+
+def get_tg_mode(conn, chat_id: int) -> str:
+    row = conn.read().execute("SELECT tg_mode FROM users WHERE chat_id=?;", (chat_id,)).fetchone()
+    return row[0] if row else "instant"
+
+def set_tg_mode(conn, chat_id: int, mode: str):
+    conn.write(lambda c: c.execute("UPDATE users SET tg_mode=? WHERE chat_id=?;", (mode, chat_id)))
+
+
+# --- email subs ---
+def add_email(conn, chat_id: int, email: str):
+    conn.write(lambda c: c.execute(
+        "INSERT OR IGNORE INTO email_subs(chat_id, email) VALUES(?,?);", (chat_id, email)))
+
+def remove_email(conn, chat_id: int, email: str):
+    conn.write(lambda c: c.execute(
+        "DELETE FROM email_subs WHERE chat_id=? AND email=?;", (chat_id, email)))
+
+def list_emails(conn, chat_id: int):
+    rows = conn.read().execute("SELECT email FROM email_subs WHERE chat_id=?;", (chat_id,)).fetchall()
+    return [row[0] for row in rows]
+
+def add_keywords(conn, chat_id: int, keyword: str, phrase: str, site_urls: List[str], max_per_user: int):
+    """
+    İfadeyi verilen sitelere ('' = tüm siteler) ekler. Kullanıcının diğer
+    abonelikleriyle birlikte max_per_user aşılacaksa hiçbiri eklenmez (None).
+    Dönen: yeni eklenen site_url'ler.
+    """
+    def _add(c):
+        targets = _json_list(site_urls)
+        others = c.execute(
+            """
+            SELECT COUNT(*) FROM keyword_subs
+            WHERE chat_id=? AND NOT (keyword=? AND site_url IN (SELECT value FROM json_each(?)));
+            """, (chat_id, keyword, targets)).fetchone()[0]
+        if others + len(site_urls) > max_per_user:
+            return None
+        rows = c.execute(
+            """
+            INSERT OR IGNORE INTO keyword_subs(chat_id, keyword, phrase, site_url)
+            SELECT ?, ?, ?, value FROM json_each(?) WHERE true
+            RETURNING site_url;
+            """, (chat_id, keyword, phrase, targets)).fetchall()
+        return [row[0] for row in rows]
+    return conn.write(_add)
+
+def remove_keywords(conn, chat_id: int, keyword: Optional[str] = None, kw_id: Optional[int] = None):
+    """İfadenin (tüm kapsamlarıyla) veya tek bir satırın aboneliğini siler. Dönen: [(keyword, site_url), ...]"""
+    return conn.write(lambda c: c.execute(
+        "DELETE FROM keyword_subs WHERE chat_id=? AND (keyword=? OR id=?) RETURNING keyword, site_url;",
+        (chat_id, keyword, kw_id)).fetchall())
+
+def list_keywords(conn, chat_id: int):
+    """Dönen: [(id, phrase, site_url), ...] (eklenme sırasıyla)"""
+    return conn.read().execute(
+        "SELECT id, phrase, site_url FROM keyword_subs WHERE chat_id=? ORDER BY id;", (chat_id,)).fetchall()
+
+def load_keywords(conn):
+    """Otomat için tüm abonelikler: [(chat_id, keyword, site_url), ...]"""
+    return conn.read().execute("SELECT chat_id, keyword, site_url FROM keyword_subs;").fetchall()
+
+def get_emails_for_chats(conn, chat_ids: Iterable[int]) -> Set[str]:
+    ids = list(chat_ids)
+    if not ids:
+        return set()
+    # json_each ile tek, sabit metinli (önbelleklenebilir) sorgu
+    rows = conn.read().execute(
+        "SELECT email FROM email_subs WHERE chat_id IN (SELECT value FROM json_each(?));",
+        (_json_list(ids),)
+    ).fetchall()
+    return {row[0] for row in rows if row[0]}
+
+
+# --- admin seed ---
+_RECOMPUTE_BITS_SQL = """
+    UPDATE users SET sub_bits = (
+        SELECT COALESCE(SUM(1 << si.idx), 0)
+        FROM user_subs us JOIN site_index si ON si.site_url = us.site_url
+        WHERE us.chat_id = users.chat_id AND si.idx < 64
+    ) WHERE chat_id = ?;
+"""
+
+def seed_admin(conn, chat_id: int, site_urls: Iterable[str]):
+    urls = list(site_urls)
+    def _seed(c):
+        c.execute("INSERT OR IGNORE INTO users(chat_id, username) VALUES(?,?);", (chat_id, "admin"))
+        c.executemany("INSERT OR IGNORE INTO user_subs(chat_id, site_url) VALUES(?,?);",
+                      [(chat_id, u) for u in urls])
+        c.execute(_RECOMPUTE_BITS_SQL, (chat_id,))
+    conn.write(_seed)
+
+
+# --- seen items ---
+def insert_seen(conn, site_url: str, item_hash: str, h: int, site_key: int, title: str, url: str,
+                snippet: str, date_str: str, extra_emails: List[str], with_email: bool,
+                email_due, simhash: Optional[int] = None, dup_of: Optional[int] = None,
+                content_hash: Optional[str] = None, etag: Optional[str] = None,
+                last_modified: Optional[str] = None, revisit_sec: Optional[int] = None,
+                keyword_chats: List[int] = ()):
+    """
+    Tekilleştirme seen_digest üzerinden yapılır: özet eklenebildiyse öğe yenidir
+    ve seen_item'a da yazılır; sitenin abonelerine ve ifadesi eşleşen
+    kullanıcılara (keyword_chats)/e-posta alıcılarına notification_outbox
+    satırları açılır (e-posta satırları email_due verilirse
+    o ana kadar bekler; özet modundaki Telegram kullanıcılarının satırları
+    'held' açılır). Hepsi aynı yazma işinde (atomik) çalışır.
+    dup_of verilirse öğe o kökün takma adıdır: kökün veya diğer takma adlarının
+    outbox'ında aynı kanal ailesinde (tg/tg_digest, email) bulunan alıcılar atlanır.
+    revisit_sec verilirse öğe o kadar saniye sonra düzenleme için yeniden ziyaret edilir.
+    Dönen: yeni ise (id, first_seen), zaten kayıtlıysa None; DB hatası yükseltilir.
+    """
+    email_due_s = email_due.strftime("%Y-%m-%d %H:%M:%S") if email_due else None
+    keywords_json = _json_list(keyword_chats)
+    def _ins(c):
+        if c.execute("INSERT OR IGNORE INTO seen_digest(h, site_key) VALUES (?, ?);",
+                     (h, site_key)).rowcount != 1:
+            return None
+        row = c.execute(
+            """
+            INSERT OR IGNORE INTO seen_item(site_url, item_hash, title, url, snippet, date_str, simhash, dup_of,
+                                            content_hash, etag, last_modified, checked_at, next_check)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, datetime('now', ?))
+            RETURNING id, first_seen;
+            """,
+            (site_url, item_hash, title, url, snippet, date_str, simhash, dup_of,
+             content_hash, etag, last_modified, _after(revisit_sec))
+        ).fetchone()
+        if row is None:
+            return None
+        # dup_of NULL ise IN (NULL, …) hiçbir satırla eşleşmez → filtre etkisiz
+        c.execute(
+            """
+            INSERT OR IGNORE INTO notification_outbox(item_id, channel, recipient, status)
+            SELECT ?,
+                   CASE WHEN u.tg_mode = 'digest' THEN 'tg_digest' ELSE 'tg' END,
+                   CAST(us.chat_id AS TEXT),
+                   CASE WHEN u.tg_mode = 'digest' THEN 'held' ELSE 'pending' END
+            FROM (SELECT chat_id FROM user_subs WHERE site_url=?
+                  UNION
+                  SELECT value FROM json_each(?)) us
+            JOIN users u ON u.chat_id = us.chat_id
+            WHERE NOT EXISTS (
+                  SELECT 1 FROM notification_outbox o
+                  WHERE o.item_id IN (SELECT ? UNION ALL SELECT id FROM seen_item WHERE dup_of = ?)
+                    AND o.channel <> 'email' AND o.recipient = CAST(us.chat_id AS TEXT));
+            """,
+            (row[0], site_url, keywords_json, dup_of, dup_of)
+        )
+        if with_email:
+            c.execute(
+                """
+                INSERT OR IGNORE INTO notification_outbox(item_id, channel, recipient, next_attempt)
+                SELECT ?, 'email', email, COALESCE(?, CURRENT_TIMESTAMP) FROM (
+                    SELECT es.email FROM email_subs es
+                    WHERE es.chat_id IN (SELECT chat_id FROM user_subs WHERE site_url=?
+                                         UNION
+                                         SELECT value FROM json_each(?))
+                    UNION
+                    SELECT value FROM json_each(?)
+                ) e WHERE email <> ''
+                  AND NOT EXISTS (
+                      SELECT 1 FROM notification_outbox o
+                      WHERE o.item_id IN (SELECT ? UNION ALL SELECT id FROM seen_item WHERE dup_of = ?)
+                        AND o.channel = 'email' AND o.recipient = e.email);
+                """,
+                (row[0], email_due_s, site_url, keywords_json, _json_list(extra_emails), dup_of, dup_of)
+            )
+        return row
+    return conn.write(_ins)
+
+def due_revisits(conn, limit: int):
+    """
+    Yeniden ziyaret zamanı gelmiş en fazla `limit` öğe (en gecikmiş önce).
+    Dönen: [(id, site_url, url, content_hash, etag, last_modified, revisits, first_seen_epoch), ...]
+    """
+    return conn.read().execute(
+        """
+        SELECT id, site_url, url, content_hash, etag, last_modified, revisits,
+               CAST(strftime('%s', first_seen) AS INTEGER)
+        FROM seen_item
+        WHERE next_check IS NOT NULL AND next_check <= datetime('now')
+        ORDER BY next_check
+        LIMIT ?;
+        """,
+        (limit,)
+    ).fetchall()
+
+# düzenleme bildirimi alıcıları (parametre: item_id, item_id): öğenin ve takma
+# adlarının sitelerinin aboneleri + ilk bildirimi almış olanlar (ör. anahtar kelime
+# aboneleri). INSERT'ün SELECT'inin başına konur (ifade INSERT ile başlamalı; rowcount).
+_EDIT_SUBS = """
+    WITH fam AS (SELECT id, site_url FROM seen_item WHERE id = ? OR dup_of = ?),
+    subs AS (
+        SELECT chat_id FROM user_subs WHERE site_url IN (SELECT site_url FROM fam)
+        UNION
+        SELECT CAST(recipient AS INTEGER) FROM notification_outbox
+        WHERE item_id IN (SELECT id FROM fam) AND channel IN ('tg', 'tg_digest')
+    )
+"""
+
+def record_revisit(conn, item_id: int, etag: Optional[str], last_modified: Optional[str],
+                   next_sec: Optional[int], changed: Optional[tuple] = None,
+                   extra_emails: List[str] = (), with_email: bool = False, email_due=None,
+                   baseline_hash: Optional[str] = None) -> int:
+    """
+    Yeniden ziyaret sonucunu tek yazma işinde kaydeder. next_sec None ise öğeye
+    bir daha bakılmaz. baseline_hash, özeti olmayan öğenin (akıştan, detay
+    çekilmeden kaydedilmiş) ilk özetidir; bildirim açılmaz. changed = (content_hash, title, snippet, date_str) verilirse
+    öğe güncellenir ve öğenin (ve takma adlarının) sitelerinin abonelerine ve
+    ilk bildirimi almış olanlara 'tg_edit' / 'email_edit' satırları açılır; önceki bir düzenleme bildirimi
+    satırı varsa yeniden bekleyene çevrilir. Dönen: açılan/yenilenen satır sayısı.
+    """
+    email_due_s = email_due.strftime("%Y-%m-%d %H:%M:%S") if email_due else None
+    def _rec(c):
+        if changed is None:
+            c.execute(
+                """
+                UPDATE seen_item SET etag=?, last_modified=?, checked_at=CURRENT_TIMESTAMP,
+                       next_check=datetime('now', ?), revisits=revisits + 1,
+                       content_hash=COALESCE(?, content_hash)
+                WHERE id=?;
+                """, (etag, last_modified, _after(next_sec), baseline_hash, item_id))
+            return 0
+        content_hash, title, snippet, date_str = changed
+        c.execute(
+            """
+            UPDATE seen_item SET content_hash=?, title=COALESCE(NULLIF(?, ''), title), snippet=?,
+                   date_str=COALESCE(?, date_str), etag=?, last_modified=?, checked_at=CURRENT_TIMESTAMP,
+                   next_check=datetime('now', ?), revisits=0, revision=revision + 1
+            WHERE id=?;
+            """, (content_hash, title, snippet, date_str, etag, last_modified, _after(next_sec), item_id))
+        n = c.execute(
+            "INSERT INTO notification_outbox(item_id, channel, recipient, status)" + _EDIT_SUBS + """
+            SELECT ?, 'tg_edit', CAST(us.chat_id AS TEXT),
+                   CASE WHEN u.tg_mode = 'digest' THEN 'held' ELSE 'pending' END
+            FROM subs us JOIN users u ON u.chat_id = us.chat_id
+            WHERE true
+            ON CONFLICT (item_id, channel, recipient) DO UPDATE SET
+                status=excluded.status, attempts=0, next_attempt=CURRENT_TIMESTAMP,
+                last_error=NULL, sent_at=NULL, created_at=CURRENT_TIMESTAMP;
+            """, (item_id, item_id, item_id)).rowcount
+        if with_email:
+            n += c.execute(
+                "INSERT INTO notification_outbox(item_id, channel, recipient, next_attempt)" + _EDIT_SUBS + """
+                SELECT ?, 'email_edit', email, COALESCE(?, CURRENT_TIMESTAMP) FROM (
+                    SELECT es.email FROM email_subs es WHERE es.chat_id IN (SELECT chat_id FROM subs)
+                    UNION
+                    SELECT value FROM json_each(?)
+                ) WHERE email <> ''
+                ON CONFLICT (item_id, channel, recipient) DO UPDATE SET
+                    status='pending', attempts=0, next_attempt=excluded.next_attempt,
+                    last_error=NULL, sent_at=NULL, created_at=CURRENT_TIMESTAMP;
+                """, (item_id, item_id, item_id, email_due_s, _json_list(extra_emails))).rowcount
+        return n
+    return conn.write(_rec)
+
+def load_fingerprints(conn, since_epoch: int):
+    """Pencere içindeki parmak izleri: [(id, simhash, dup_of, epoch), ...] (id sıralı)"""
+    return conn.read().execute(
+        """
+        SELECT id, simhash, dup_of, CAST(strftime('%s', first_seen) AS INTEGER) FROM seen_item
+        WHERE first_seen >= datetime(?, 'unixepoch') AND simhash IS NOT NULL
+        ORDER BY id;
+        """,
+        (since_epoch,)
+    ).fetchall()
+
+def load_recent(conn, site_urls: Iterable[str], per_site: int):
+    """
+    Her site için en yeni per_site öğe (ix_seen_item_site_first üzerinden).
+    Dönen: [(site_url, title, url, first_seen, id), ...]
+    """
+    return conn.read().execute(
+        """
+        SELECT site_url, title, url, first_seen, id FROM (
+            SELECT s.site_url, s.title, s.url, s.first_seen, s.id,
+                   ROW_NUMBER() OVER (PARTITION BY s.site_url
+                                      ORDER BY s.first_seen DESC, s.id DESC) AS rn
+            FROM seen_item s
+            WHERE s.site_url IN (SELECT value FROM json_each(?))
+        )
+        WHERE rn <= ?
+        ORDER BY site_url, first_seen DESC, id DESC
+        """,
+        (_json_list(site_urls), per_site)
+    ).fetchall()
+
+
+def search_items(conn, terms: List[str], limit: int, offset: int):
+    """
+    Tam metin arama (search_fts, BM25; başlık eşleşmesi 5 kat ağırlıklı). terms
+    katlanmış kelimelerdir; hepsi önek olarak aranır (VE). Sonuçlar sıcak
+    pencere ve arşivden gelir. Dönen: [(site_url, title, url, first_seen), ...]
+    """
+    match = " ".join(f'"{t}"*' for t in terms)
+    return conn.read().execute(
+        """
+        SELECT COALESCE(s.site_url, a.site_url), COALESCE(s.title, a.title),
+               COALESCE(s.url, a.url), COALESCE(s.first_seen, a.first_seen)
+        FROM (
+            SELECT rowid AS id, bm25(search_fts, 5.0, 1.0) AS r FROM search_fts
+            WHERE search_fts MATCH ?
+            ORDER BY r, rowid DESC
+            LIMIT ? OFFSET ?
+        ) f
+        LEFT JOIN seen_item s    ON s.id = f.id
+        LEFT JOIN seen_archive a ON a.id = f.id
+        ORDER BY f.r, f.id DESC
+        """,
+        (match, limit, offset)
+    ).fetchall()
+
+
+# --- retention ---
+def iter_seen_hashes(conn, after_id: int, limit: int):
+    """seen_item'ı id sırasıyla sayfalar: [(id, site_url, item_hash), ...]"""
+    return conn.read().execute(
+        "SELECT id, site_url, item_hash FROM seen_item WHERE id > ? ORDER BY id LIMIT ?;",
+        (after_id, limit)
+    ).fetchall()
+
+def add_digests(conn, rows: Iterable[tuple]):
+    rows = list(rows)
+    conn.write(lambda c: c.executemany(
+        "INSERT OR IGNORE INTO seen_digest(h, site_key) VALUES (?, ?);", rows))
+
+def load_digests(conn, site_keys: Iterable[int]):
+    """[(site_key, h), ...] — bellek içi görüldü kümelerini ısıtmak için."""
+    return conn.read().execute(
+        "SELECT site_key, h FROM seen_digest WHERE site_key IN (SELECT value FROM json_each(?));",
+        (_json_list(site_keys),)
+    ).fetchall()
+
+def archive_seen_before(conn, cutoff, limit: int) -> int:
+    """
+    first_seen < cutoff olan en fazla `limit` satırı seen_item'dan seen_archive'a taşır.
+    Taşınan satır sayısını döndürür.
+    """
+    cutoff_s = cutoff.strftime("%Y-%m-%d %H:%M:%S")
+    def _move(c):
+        ids = [r[0] for r in c.execute(
+            "SELECT id FROM seen_item WHERE first_seen < ? ORDER BY first_seen LIMIT ?;",
+            (cutoff_s, limit)
+        ).fetchall()]
+        if not ids:
+            return 0
+        ids_json = _json_list(ids)
+        c.execute("""
+            INSERT OR IGNORE INTO seen_archive(id, site_url, item_hash, title, url, first_seen, snippet, date_str,
+                                               simhash, dup_of)
+            SELECT id, site_url, item_hash, title, url, first_seen, snippet, date_str, simhash, dup_of FROM seen_item
+            WHERE id IN (SELECT value FROM json_each(?));
+        """, (ids_json,))
+        c.execute("DELETE FROM seen_item WHERE id IN (SELECT value FROM json_each(?));", (ids_json,))
+        return len(ids)
+    return conn.write(_move)
+
+def purge_outbox(conn, cutoff, limit: int) -> int:
+    """cutoff'tan eski, sonuçlanmış (sent/dead) outbox satırlarını siler; pending/held kalır."""
+    cutoff_s = cutoff.strftime("%Y-%m-%d %H:%M:%S")
+    return conn.write(lambda c: c.execute(
+        """
+        DELETE FROM notification_outbox WHERE id IN (
+            SELECT id FROM notification_outbox
+            WHERE status IN ('sent', 'dead') AND created_at < ?
+            LIMIT ?
+        );
+        """, (cutoff_s, limit)).rowcount)
+
+
+# --- notification outbox ---
+def claim_outbox(conn, limit: int, lease_sec: int):
+    """
+    Zamanı gelmiş en fazla `limit` bekleyen satırı (aynı vadedekiler alıcıya göre
+    bitişik; özet e-postası bölünmesin) sahiplenir: deneme sayısını
+    artırır ve next_attempt'i kira bitişine öteler. Tek yazıcı thread olduğundan
+    UPDATE … RETURNING yeterlidir (SKIP LOCKED gerekmez).
+    Dönen satır biçimi pg.claim_outbox ile aynıdır.
+    """
+    def _claim(c):
+        claimed = c.execute(
+            """
+            UPDATE notification_outbox
+            SET attempts = attempts + 1, next_attempt = datetime('now', ?)
+            WHERE id IN (
+                SELECT id FROM notification_outbox
+                WHERE status = 'pending' AND next_attempt <= datetime('now')
+                ORDER BY next_attempt, recipient, id
+                LIMIT ?
+            )
+            RETURNING id;
+            """,
+            (f"+{int(lease_sec)} seconds", limit)
+        ).fetchall()
+        if not claimed:
+            return []
+        return c.execute(
+            """
+            SELECT o.id, o.item_id, o.channel, o.recipient, o.attempts,
+                   COALESCE(s.site_url, a.site_url), COALESCE(s.title, a.title),
+                   COALESCE(s.url, a.url), COALESCE(s.snippet, a.snippet),
+                   COALESCE(s.date_str, a.date_str)
+            FROM notification_outbox o
+            LEFT JOIN seen_item s    ON s.id = o.item_id
+            LEFT JOIN seen_archive a ON a.id = o.item_id
+            WHERE o.id IN (SELECT value FROM json_each(?))
+            ORDER BY o.item_id, o.id
+            """,
+            (_json_list(r[0] for r in claimed),)
+        ).fetchall()
+    return conn.write(_claim)
+
+def finish_outbox(conn, sent: List[tuple], retries: List[tuple], dead: List[tuple]):
+    """
+    Bir partinin sonuçlarını tek yazma işinde yazar. Her satır sahiplenmedeki
+    attempts değeriyle (kira belirteci) gelir; kira dolup satırı başka bir
+    boşaltma sahiplendiyse (attempts artmıştır) sonuç yazılmaz.
+    sent: [(id, attempts)], retries: [(id, attempts, gecikme_sn, hata)],
+    dead: [(id, attempts, hata)]
+    """
+    def _fin(c):
+        if sent:
+            c.execute(
+                "UPDATE notification_outbox SET status='sent', sent_at=CURRENT_TIMESTAMP, last_error=NULL "
+                "WHERE status='pending' AND (id, attempts) IN "
+                "(SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?));",
+                (_json_list(sent),))
+        if retries:
+            c.executemany(
+                "UPDATE notification_outbox SET next_attempt = datetime('now', ?), last_error=? "
+                "WHERE id=? AND attempts=? AND status='pending';",
+                [(f"+{int(d)} seconds", e, i, a) for (i, a, d, e) in retries])
+        if dead:
+            c.executemany(
+                "UPDATE notification_outbox SET status='dead', last_error=? "
+                "WHERE id=? AND attempts=? AND status='pending';",
+                [(e, i, a) for (i, a, e) in dead])
+    conn.write(_fin)
+
+def renew_outbox(conn, claims: List[tuple], lease_sec: int) -> int:
+    """Hâlâ bu boşaltmaya ait satırların [(id, attempts)] kirasını uzatır; uzatılan sayısı."""
+    return conn.write(lambda c: c.execute(
+        "UPDATE notification_outbox SET next_attempt = datetime('now', ?) "
+        "WHERE status='pending' AND (id, attempts) IN "
+        "(SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?));",
+        (f"+{int(lease_sec)} seconds", _json_list(claims))).rowcount)
+
+def release_held_outbox(conn) -> int:
+    """Özet modundaki kullanıcılar için bekletilen satırları gönderime açar."""
+    return conn.write(lambda c: c.execute(
+        "UPDATE notification_outbox SET status='pending', next_attempt=CURRENT_TIMESTAMP "
+        "WHERE status='held';").rowcount)
+
+def outbox_backlog(conn):
+    """(bekleyen, şu an zamanı gelmiş, en eski bekleyenin yaşı sn)"""
+    n, due, age = conn.read().execute(
+        """
+        SELECT COUNT(*),
+               COALESCE(SUM(next_attempt <= datetime('now')), 0),
+               COALESCE((julianday('now') - julianday(MIN(created_at))) * 86400, 0)
+        FROM notification_outbox WHERE status = 'pending'
+        """
+    ).fetchone()
+    return int(n), int(due), float(age)
+
+
+def _after(sec: Optional[int]) -> Optional[str]:
+    """datetime('now', ?) değiştiricisi; None → NULL zaman (bir daha bakılmaz)."""
+    return None if sec is None else f"+{int(sec)} seconds"
+
+def _json_list(values) -> str:
+    return json.dumps(list(values), ensure_ascii=False)
@@ -5,6 +5,7 @@ load_dotenv()
 
 TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 CHAT_IDS_RAW = os.getenv("TELEGRAM_CHAT_ID", "")
+API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org").strip().rstrip("/")
 
 def parse_chat_ids(raw: str):
     # "id1,id2 ; id3" gibi değerleri parçala, boşları ayıkla, sırayı koruyarak tekilleştir
@@ -22,7 +23,7 @@ def send_telegram(text: str) -> bool:
         print("CHAT_ID yok.")
         return False
 
-    url = f"https://api.telegram.org/bot{TOKEN}/sendMessage"
+    url = f"{API_BASE}/bot{TOKEN}/sendMessage"
     all_ok = True
     for cid in chat_ids:
         try:
@@ -0,0 +1,35 @@
+# tests/conftest.py
+"""
+Regresyon testleri geçici SQLite veritabanlarıyla çalışır (ağ ve DATABASE_URL
+gerekmez). Ortam değişkenleri config import edilmeden önce ayarlanır.
+
+Çalıştırma:
+    python -m pytest -q
+"""
+import os, sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ.pop("DATABASE_URL", None)
+os.environ["SMTP_HOST"] = ""
+os.environ["PAGE_CACHE_PATH"] = ""
+
+import pytest
+
+
+@pytest.fixture
+def conn(tmp_path):
+    """Boş şemalı, teste özel SQLite veritabanı; süreç içi önbellekler sıfırlanır."""
+    from storage import db as dbmod
+    from storage.session import SESSIONS
+    for cache in (SESSIONS, dbmod.SEEN_INDEX, dbmod.RECENT_ITEMS, dbmod.NEAR_DUPS, dbmod.KEYWORDS):
+        cache.clear()
+    dbmod._SITE_IDX.clear(); dbmod._IDX_SITE.clear()
+    dbmod._index_loaded = False
+    c = dbmod.init_db(str(tmp_path / "test.db"))
+    yield c
+    c.close()
+    SESSIONS.clear()
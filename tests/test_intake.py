@@ -0,0 +1,158 @@
+# tests/test_intake.py  -- polling intake: sayfalı yeniden işleme, cevaptan önce tüketme, kancalar
+import json, threading, time
+
+from notifiers import chat_workers
+from notifiers import telegram_bot as tg
+from storage import db as dbmod
+
+
+def _wait(cond, timeout=10.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return cond()
+
+
+def _msg(update_id, chat_id):
+    return {"update_id": update_id,
+            "message": {"message_id": update_id, "chat": {"id": chat_id}, "text": f"/m{update_id}"}}
+
+
+def _rows(updates):
+    return [(u["update_id"], tg._update_chat_id(u), json.dumps(u)) for u in updates]
+
+
+class _Resp:
+    def __init__(self, result):
+        self.ok = True
+        self._result = result
+
+    def json(self):
+        return {"ok": True, "result": self._result}
+
+
+def test_pending_updates_pages_in_update_id_order(conn):
+    ups = [_msg(i, i % 3) for i in range(1, 121)]
+    dbmod.intake_updates(conn, _rows(reversed(ups)), 120)
+    seen, after = [], 0
+    while True:
+        page = dbmod.pending_updates(conn, 50, after)
+        if not page:
+            break
+        assert len(page) <= 50
+        seen += [r[0] for r in page]
+        after = page[-1][0]
+    assert seen == list(range(1, 121))
+    assert dbmod.get_update_offset(conn) == 120
+
+
+def _cb(update_id, chat_id, data, shown=None):
+    return {"update_id": update_id, "callback_query": {
+        "id": str(update_id), "data": data, "from": {"id": chat_id, "username": "u"},
+        "message": {"message_id": 1, "chat": {"id": chat_id}, "reply_markup": shown}}}
+
+
+def _old_menu(url, on):
+    """Bu sürümden önce gönderilmiş site menüsü (çevirmeli tog| butonu)."""
+    return {"inline_keyboard": [[{"text": f"{'✅' if on else '➕'} A", "callback_data": "tog|" + url}]]}
+
+
+def test_update_is_consumed_before_its_first_reply(conn, monkeypatch):
+    url = "https://a.example.edu.tr/tr/Duyuru"
+    sites_by_url = {url: {"name": "A", "url": url}}
+    dbmod.register_sites(conn, [url])
+    upd = _cb(5, 7, "sub|" + url)
+    dbmod.intake_updates(conn, _rows([upd]), 5)
+    pending_at_reply = []
+
+    def post(api_url, payload, timeout=20):
+        pending_at_reply.append([r[0] for r in dbmod.pending_updates(conn, 10)])
+        return _Resp({})
+
+    monkeypatch.setattr(tg, "http_post_json", post)
+    with tg.consume_before_reply(lambda: dbmod.finish_updates(conn, [5])):
+        tg.handle_update(conn, upd, sites_by_url)
+    assert pending_at_reply and pending_at_reply[0] == []
+    assert dbmod.get_user_subs(conn, 7) == {url}
+
+
+def test_replayed_subscription_callback_is_idempotent(conn, monkeypatch):
+    url = "https://a.example.edu.tr/tr/Duyuru"
+    sites_by_url = {url: {"name": "A", "url": url}}
+    dbmod.register_sites(conn, [url])
+    monkeypatch.setattr(tg, "http_post_json", lambda *a, **k: _Resp({}))
+    menu = tg.sites_keyboard(conn, 7, [sites_by_url[url]])
+    data = menu["inline_keyboard"][0][0]["callback_data"]
+    assert data == "sub|" + url
+
+    # DB yazıldıktan sonra, cevaptan önce çöküş: aynı update yeniden işlenir
+    for _ in range(2):
+        tg.handle_update(conn, _cb(9, 7, data, menu), sites_by_url)
+        assert dbmod.get_user_subs(conn, 7) == {url}
+    # eski menülerdeki tog| butonları gösterdikleri durumun tersini hedefler
+    for _ in range(2):
+        tg.handle_update(conn, _cb(10, 7, "tog|" + url, _old_menu(url, on=True)), sites_by_url)
+        assert dbmod.get_user_subs(conn, 7) == set()
+
+
+def test_startup_replays_whole_intake_with_backpressure(conn, monkeypatch):
+    limit = 10
+    monkeypatch.setattr(tg, "BOT_MAX_INFLIGHT", limit)
+    old = [_msg(i, 7) for i in range(1, 4 * limit + 6)]   # birkaç sayfa
+    dbmod.intake_updates(conn, _rows(old), old[-1]["update_id"])
+
+    handled, lock, gate = [], threading.Lock(), threading.Event()
+    pools = []
+
+    def handle(c, upd, sites_by_url):
+        gate.wait(10)
+        with lock:
+            handled.append(upd["update_id"])
+
+    real_pool = chat_workers.ChatWorkers
+
+    def spy_pool(*args, **kwargs):
+        pools.append(real_pool(*args, **kwargs))
+        return pools[0]
+
+    monkeypatch.setattr(tg, "handle_update", handle)
+    monkeypatch.setattr(chat_workers, "ChatWorkers", spy_pool)
+
+    new = [_msg(old[-1]["update_id"] + 1, 8), _msg(old[-1]["update_id"] + 2, 7)]
+    calls, offsets, intakes = [], [], []
+    idle = threading.Event()
+
+    def get_updates(url, params=None, timeout=30):
+        calls.append(params["offset"])
+        if len(calls) == 1:
+            return _Resp(new)
+        idle.wait()          # test bitince thread burada kalır
+        return _Resp([])
+
+    def intake(c, rows, offset):
+        intakes.append([r[0] for r in rows])
+        dbmod.intake_updates(c, rows, offset)
+
+    threading.Thread(target=tg.bot_poll_loop, daemon=True,
+                     args=(conn, []), kwargs=dict(get_updates_fn=get_updates, intake_fn=intake,
+                                                  set_off_fn=lambda c, o: offsets.append(o))).start()
+
+    # işçiler takılıyken havuz BOT_MAX_INFLIGHT'ta durur, getUpdates'e geçilmez
+    assert _wait(lambda: pools and pools[0].inflight() == limit)
+    time.sleep(0.2)
+    assert pools[0].inflight() == limit and calls == []
+    gate.set()
+
+    want = [u["update_id"] for u in old + new]
+    assert _wait(lambda: len(handled) == len(want))
+    # aynı sohbetin (7) update'leri sırayla; hiçbiri iki kez işlenmez
+    assert sorted(handled) == want
+    chat7 = [u["update_id"] for u in old + new if u["message"]["chat"]["id"] == 7]
+    assert [i for i in handled if i in set(chat7)] == chat7
+    assert calls[0] == old[-1]["update_id"] + 1            # offset intake'ten okunur
+    assert intakes == [[u["update_id"] for u in new]]
+    assert offsets == [new[-1]["update_id"]]
+    assert _wait(lambda: dbmod.pending_updates(conn, 100) == [])
+    assert dbmod.get_update_offset(conn) == new[-1]["update_id"]
@@ -0,0 +1,69 @@
+# tests/test_neardup.py  -- çapraz paylaşılan duyurular: takma ad kaydı, alıcı başına tek bildirim
+from formatters.textfmt import simhash64, text_hash
+from storage import db as dbmod
+
+A, B, C = (f"https://{s}.example.edu.tr/tr/Duyuru" for s in "abc")
+
+BODY = ("2025-2026 güz dönemi yatay geçiş başvuruları 15 Temmuz tarihinde başlayacaktır. "
+        "Başvurular öğrenci işleri daire başkanlığının çevrimiçi sistemi üzerinden yapılır; "
+        "transkript, ders içerikleri ve disiplin belgesi yüklenmelidir. Eksik belgeli başvurular "
+        "değerlendirmeye alınmaz. Sonuçlar fakülte internet sayfasında ilan edilecektir.")
+
+
+def _insert(conn, site, n, title, body):
+    url = f"{site}/Detay/{n}"
+    return dbmod.insert_seen(conn, site, text_hash(url), title, url, body,
+                             fingerprint=simhash64(f"{title}\n{body}"))
+
+
+def _outbox(conn):
+    rows = conn.read().execute(
+        "SELECT recipient, COUNT(*) FROM notification_outbox GROUP BY recipient ORDER BY recipient;").fetchall()
+    return dict(rows)
+
+
+def _items(conn):
+    return conn.read().execute("SELECT id, site_url, dup_of FROM seen_item ORDER BY id;").fetchall()
+
+
+def _subscribe(conn):
+    dbmod.register_sites(conn, [A, B, C])
+    for chat_id in (1, 2, 3):
+        dbmod.upsert_user(conn, chat_id, f"u{chat_id}")
+    dbmod.toggle_site_sub(conn, 1, A)
+    dbmod.toggle_site_sub(conn, 1, B)     # 1: a ve b
+    dbmod.toggle_site_sub(conn, 2, B)     # 2: yalnızca b
+    dbmod.toggle_site_sub(conn, 3, C)     # 3: yalnızca c
+
+
+def test_cross_post_is_aliased_and_notified_once_per_recipient(conn):
+    _subscribe(conn)
+    title = "Yatay Geçiş Başvuruları"
+    assert _insert(conn, A, 1, title, BODY)
+    assert _insert(conn, B, 9, title, BODY.replace("15 Temmuz", "15 Temmuz 2025"))
+    (root, _, root_dup), (alias, site, dup_of) = _items(conn)
+    assert root_dup is None and site == B and dup_of == root
+    assert _outbox(conn) == {"1": 1, "2": 1}
+
+
+def test_unrelated_announcement_is_not_aliased(conn):
+    _subscribe(conn)
+    _insert(conn, A, 1, "Yatay Geçiş Başvuruları", BODY)
+    other = ("Bahar şenlikleri kapsamında 12 Mayıs'ta kampüs bahçesinde konser ve spor etkinlikleri "
+             "düzenlenecektir. Öğrenci toplulukları stant başvurularını kültür müdürlüğüne iletebilir.")
+    _insert(conn, B, 2, "Bahar Şenliği Programı", other)
+    assert [r[2] for r in _items(conn)] == [None, None]
+    assert _outbox(conn) == {"1": 2, "2": 1}
+
+
+def test_alias_points_at_root_after_cache_reload(conn):
+    _subscribe(conn)
+    title = "Yatay Geçiş Başvuruları"
+    _insert(conn, A, 1, title, BODY)
+    _insert(conn, B, 9, title, BODY)
+    # süreç yeniden başladı: parmak izleri DB'den yüklenir; üçüncü kopya köke bağlanır
+    dbmod.NEAR_DUPS.clear()
+    _insert(conn, C, 4, title, BODY + " ")
+    root = _items(conn)[0][0]
+    assert [r[2] for r in _items(conn)] == [None, root, root]
+    assert _outbox(conn) == {"1": 1, "2": 1, "3": 1}
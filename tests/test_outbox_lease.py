@@ -0,0 +1,72 @@
+# tests/test_outbox_lease.py  -- outbox kirası: belirteçli sonuç yazımı ve gönderim boyunca uzatma
+import threading, time
+
+from notifiers import outbox
+from storage import db as dbmod
+
+
+def _enqueue(conn, n=1):
+    def _ins(c):
+        c.executemany("INSERT INTO notification_outbox(item_id, channel, recipient) VALUES (?, 'tg', ?);",
+                      [(i + 1, str(100 + i)) for i in range(n)])
+    conn.write(_ins)
+
+
+def _row(conn, oid):
+    return conn.read().execute(
+        "SELECT status, attempts, last_error FROM notification_outbox WHERE id=?;", (oid,)).fetchone()
+
+
+def test_taken_over_lease_refuses_stale_results(conn):
+    _enqueue(conn, 3)
+    first = dbmod.claim_outbox(conn, 10, 0)          # kira hemen doluyor
+    second = dbmod.claim_outbox(conn, 10, 300)       # başka bir boşaltma devraldı
+    assert [r[4] for r in first] == [1, 1, 1] and [r[4] for r in second] == [2, 2, 2]
+    a, b, c = (r[0] for r in first)
+
+    # eski sahibin sonuçları yazılmaz
+    dbmod.finish_outbox(conn, [(a, 1)], [(b, 1, 30, "tg 500")], [(c, 1, "tg 403")])
+    assert [_row(conn, i)[0] for i in (a, b, c)] == ["pending"] * 3
+    assert _row(conn, b)[2] is None
+
+    # güncel sahibin sonuçları yazılır
+    dbmod.finish_outbox(conn, [(a, 2)], [(b, 2, 30, "tg 500")], [(c, 2, "tg 403")])
+    assert _row(conn, a)[0] == "sent"
+    assert _row(conn, b)[:3] == ("pending", 2, "tg 500")
+    assert _row(conn, c)[0] == "dead"
+
+
+def test_renew_extends_only_own_claims(conn):
+    _enqueue(conn, 2)
+    rows = dbmod.claim_outbox(conn, 10, 0)
+    (a, _), (b, _) = [(r[0], r[4]) for r in rows]
+    assert dbmod.renew_outbox(conn, [(a, 1), (b, 7)], 300) == 1
+    again = dbmod.claim_outbox(conn, 10, 300)
+    assert [r[0] for r in again] == [b]              # a'nın kirası uzadı, b'ninki dolmuştu
+    assert dbmod.renew_outbox(conn, [(b, 1)], 300) == 0
+
+
+def test_slow_batch_keeps_its_lease(conn, monkeypatch):
+    lease = 3
+    monkeypatch.setattr(outbox, "OUTBOX_LEASE_SEC", lease)
+    _enqueue(conn, 2)
+    stolen, deliveries = [], []
+    delivering = threading.Event()
+
+    def slow_deliver(rows, sites_by_url):
+        deliveries.append([r[0] for r in rows])
+        delivering.set()
+        time.sleep(lease + 1.5)                      # kiradan uzun süren parti
+        return [(r[0], r[4]) for r in rows], [], []
+
+    monkeypatch.setattr(outbox, "_deliver", slow_deliver)
+    t = threading.Thread(target=outbox.drain_outbox, args=(conn, {}))
+    t.start()
+    assert delivering.wait(5)
+    while t.is_alive():
+        stolen += dbmod.claim_outbox(conn, 10, 300)  # ikinci bir boşaltma
+        time.sleep(0.25)
+    t.join()
+    assert stolen == []
+    assert deliveries == [[1, 2]]
+    assert [_row(conn, i)[:2] for i in (1, 2)] == [("sent", 1), ("sent", 1)]
@@ -0,0 +1,17 @@
+# tests/test_outbox_purge.py  -- outbox temizliği: yalnızca sonuçlanmış (sent/dead) satırlar silinir
+from storage import retention
+
+OLD = "2000-01-01 00:00:00"
+
+
+def _add(conn, rows):
+    conn.write(lambda c: c.executemany(
+        "INSERT INTO notification_outbox(item_id, channel, recipient, status, created_at) VALUES (1, 'tg', ?, ?, ?);",
+        rows))
+
+
+def test_purge_keeps_pending_and_held_rows(conn):
+    _add(conn, [("1", "sent", OLD), ("2", "dead", OLD), ("3", "pending", OLD), ("4", "held", OLD)])
+    assert retention.purge_outbox(conn, keep_days=30, batch=1) == 2
+    left = conn.read().execute("SELECT status FROM notification_outbox ORDER BY recipient;").fetchall()
+    assert [r[0] for r in left] == ["pending", "held"]
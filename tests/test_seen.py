@@ -0,0 +1,24 @@
+# tests/test_seen.py  -- görülen linkler: DB hatası linki "görülmüş" işaretlemez
+from formatters.textfmt import text_hash
+from storage import db as dbmod
+
+SITE = "https://a.example.edu.tr/tr/Duyuru"
+URL = f"{SITE}/Detay/1"
+
+
+def test_failed_insert_is_retried_next_round(conn, monkeypatch):
+    h = text_hash(URL)
+    dbmod.warm_seen(conn, [SITE])               # monitor turu gibi: site kümesi yüklü
+
+    def broken_write(fn):
+        raise RuntimeError("database is locked")
+
+    with monkeypatch.context() as m:
+        m.setattr(conn, "write", broken_write)
+        assert dbmod.insert_seen(conn, SITE, h, "Duyuru", URL, "") is False
+    assert not dbmod.seen_known(SITE, h)
+
+    # geçici hata geçti: bir sonraki turda kayıt yapılır ve ancak o zaman görülmüş sayılır
+    assert dbmod.insert_seen(conn, SITE, h, "Duyuru", URL, "") is True
+    assert dbmod.seen_known(SITE, h)
+    assert dbmod.insert_seen(conn, SITE, h, "Duyuru", URL, "") is False
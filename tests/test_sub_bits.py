@@ -0,0 +1,89 @@
+# tests/test_sub_bits.py  -- abonelik bit eşlemi: toggle, oturum önbelleği, 64 site sınırı, numara geri kazanımı
+import pytest
+
+from storage import db as dbmod
+from storage.session import SESSIONS
+
+
+def _urls(n, start=0):
+    return [f"https://s{i}.example.edu.tr/tr/Duyuru" for i in range(start, start + n)]
+
+
+def test_toggle_on_off_updates_bits_subscribers_and_session(conn):
+    urls = _urls(3)
+    dbmod.register_sites(conn, urls)
+    dbmod.touch_user(conn, 42, "ali")
+
+    assert dbmod.toggle_site_sub(conn, 42, urls[1]) is True
+    assert dbmod.toggle_site_sub(conn, 42, urls[2]) is True
+    assert dbmod.get_user_subs(conn, 42) == {urls[1], urls[2]}
+    assert dbmod.get_subscribers(conn, urls[1]) == [42]
+
+    assert dbmod.toggle_site_sub(conn, 42, urls[1]) is False
+    assert dbmod.get_subscribers(conn, urls[1]) == []
+    # oturum önbelleği ve DB aynı bit eşlemini tutar
+    SESSIONS.clear()
+    assert dbmod.get_user_subs(conn, 42) == {urls[2]}
+
+
+def test_toggle_unknown_user_is_noop(conn):
+    dbmod.register_sites(conn, _urls(1))
+    assert dbmod.toggle_site_sub(conn, 999, _urls(1)[0]) is False
+
+
+def test_highest_bit_round_trips(conn):
+    urls = _urls(dbmod.SUB_BITS_MAX)
+    dbmod.register_sites(conn, urls)
+    dbmod.touch_user(conn, 7, "ayse")
+    assert dbmod.toggle_site_sub(conn, 7, urls[-1]) is True   # bit 63: işaretli BIGINT
+    SESSIONS.clear()
+    assert dbmod.get_user_subs(conn, 7) == {urls[-1]}
+    assert dbmod.toggle_site_sub(conn, 7, urls[-1]) is False
+    assert dbmod.get_user_subs(conn, 7) == set()
+
+
+def test_more_sites_than_bits_fails_at_startup_without_writing(conn):
+    with pytest.raises(RuntimeError):
+        dbmod.register_sites(conn, _urls(dbmod.SUB_BITS_MAX + 1))
+    # bit numaraları harcanmadı: sınır içindeki liste hâlâ kaydedilebilir
+    assert len(dbmod.register_sites(conn, _urls(dbmod.SUB_BITS_MAX))) == dbmod.SUB_BITS_MAX
+
+
+def test_full_site_index_fails_instead_of_silently_dropping(conn):
+    dbmod.register_sites(conn, _urls(dbmod.SUB_BITS_MAX))
+    # prune'suz kayıtta eski siteler numaralarını korur; yeni site yer bulamaz
+    with pytest.raises(RuntimeError, match="s64"):
+        dbmod.register_sites(conn, _urls(1, start=dbmod.SUB_BITS_MAX))
+    dbmod.touch_user(conn, 5, "can")
+    with pytest.raises(RuntimeError):
+        dbmod.toggle_site_sub(conn, 5, _urls(1, start=dbmod.SUB_BITS_MAX + 1)[0])
+
+
+def test_removed_sites_free_their_bits_for_new_sites(conn):
+    urls = _urls(dbmod.SUB_BITS_MAX)
+    dbmod.register_sites(conn, urls, prune=True)
+    dbmod.touch_user(conn, 5, "can")
+    dbmod.toggle_site_sub(conn, 5, urls[3])
+    dbmod.toggle_site_sub(conn, 5, urls[10])
+
+    # sites.yaml'dan s3 çıktı, s64 eklendi: s64 s3'ün numarasını alır, biti boş başlar
+    new = _urls(1, start=dbmod.SUB_BITS_MAX)[0]
+    mapping = dbmod.register_sites(conn, urls[:3] + urls[4:] + [new], prune=True)
+    assert mapping[new] == 3 and urls[3] not in mapping
+    SESSIONS.clear()
+    assert dbmod.get_user_subs(conn, 5) == {urls[10]}
+    assert dbmod.get_subscribers(conn, urls[10]) == [5]
+
+
+def test_readded_site_gets_its_subscribers_back(conn):
+    urls = _urls(3)
+    dbmod.register_sites(conn, urls, prune=True)
+    dbmod.touch_user(conn, 5, "can")
+    dbmod.toggle_site_sub(conn, 5, urls[0])
+    dbmod.register_sites(conn, urls[1:], prune=True)
+    SESSIONS.clear()
+    assert dbmod.get_sub_bits(conn, 5) == 0
+    # site listeye geri döndü (başka numarayla olabilir): abonelik user_subs'tan kurulur
+    dbmod.register_sites(conn, urls[1:] + _urls(1, start=9) + urls[:1], prune=True)
+    SESSIONS.clear()
+    assert dbmod.get_user_subs(conn, 5) == {urls[0]}